@@ -0,0 +1,23 @@
+"""resource_execution: recuentos del delta respecto a la versión anterior
+
+Revision ID: exec_delta_1
+Revises: res_collection_1
+Create Date: 2026-06-12
+"""
+from typing import Union, Sequence
+from alembic import op
+
+revision: str = 'exec_delta_1'
+down_revision: Union[str, None] = 'res_collection_1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for col in ("records_inserted", "records_updated", "records_deleted"):
+        op.execute(f"ALTER TABLE opendata.resource_execution ADD COLUMN IF NOT EXISTS {col} integer")
+
+
+def downgrade() -> None:
+    for col in ("records_inserted", "records_updated", "records_deleted"):
+        op.execute(f"ALTER TABLE opendata.resource_execution DROP COLUMN IF EXISTS {col}")
@@ -8,9 +8,14 @@ import shutil
 import hashlib
 from uuid import uuid4
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 from sqlalchemy.orm import Session
 from app.models import Resource, ResourceExecution, Dataset
+from app.builders.staging_writer import StagingWriter
+from app.graphql_data.query_index import INDEX_DIRNAME
+from app.utils import blob_store
+from app.utils.dataset_io import compress_file, data_filename, open_binary
+from app.utils.line_index import build_line_index
 from app.utils.schema_inference import infer_schema
 from app.utils.versioning import compute_next_version
 
@@ -18,17 +23,29 @@ from app.utils.versioning import compute_next_version
 class DatasetBuilder:
     """Builds complete dataset packages with versioning"""
 
+    # Set by build(): the previous version when the new one has identical
+    # content, so later phases (LOAD, NOTIFY) can be skipped.
+    unchanged_from: Optional[Dataset] = None
+    # Set by build(): the latest version before this one (None for the first).
+    previous: Optional[Dataset] = None
+
     def build(
         self,
         session: Session,
         resource: Resource,
         execution: ResourceExecution,
+        staging: Optional[StagingWriter] = None,
+        codec: str = "none",
     ) -> Dataset:
         """
         Build complete dataset package from the execution's staging file.
 
         Creates a versioned package containing:
-        - data.jsonl: The actual data (copied from staging)
+        - data.jsonl: The actual data (moved, or copied, from staging);
+          data.jsonl.zst / data.jsonl.gz plus its frame table with a codec.
+          Hard link to the content-addressed blob in data/blobs, shared by
+          every version with identical content
+        - data.jsonl.idx: Byte offset of every line, for O(1) paging
         - schema.json: Inferred JSON Schema
         - models.py: Generated SQLAlchemy models
         - metadata.json: Package metadata
@@ -37,6 +54,11 @@ class DatasetBuilder:
             session: SQLAlchemy session
             resource: Resource being processed
             execution: ResourceExecution record (must have staging_path and total_records set)
+            staging: StagingWriter that produced the staging file. When given, its
+                full-dataset schema and checksum are used and the file is renamed
+                into the package instead of being re-read and copied.
+            codec: Storage codec for the data file ("none", "gzip" or "zstd").
+                The checksum is always computed over the uncompressed content.
 
         Returns:
             Dataset record
@@ -46,9 +68,10 @@ class DatasetBuilder:
         staging_path = execution.staging_path
         record_count = execution.total_records or 0
 
-        # 1. Infer schema from first 500 records in staging file
+        # 1. Infer schema: whole dataset if streamed through a StagingWriter,
+        #    otherwise the first 500 records in the staging file
         sample: List[Dict] = []
-        if staging_path and os.path.exists(staging_path):
+        if staging is None and staging_path and os.path.exists(staging_path):
             with open(staging_path, "r", encoding="utf-8") as f:
                 for i, line in enumerate(f):
                     if i >= 500:
@@ -57,7 +80,7 @@ class DatasetBuilder:
                         sample.append(json.loads(line))
                     except Exception:
                         pass
-        schema_json = infer_schema(sample)
+        schema_json = staging.schema() if staging is not None else infer_schema(sample)
 
         # 2. Get latest dataset for versioning
         latest_dataset = (
@@ -81,11 +104,36 @@ class DatasetBuilder:
         dataset_dir = f"data/datasets/{resource.id}/{dataset_id}"
         os.makedirs(dataset_dir, exist_ok=True)
 
-        # 5. Copy staged data to dataset
-        if staging_path and os.path.exists(staging_path):
-            shutil.copy(staging_path, f"{dataset_dir}/data.jsonl")
+        # 5. Move staged data to dataset. Content is addressed by checksum: if an
+        #    earlier version holds identical data, the file is a link to its blob
+        data_path = f"{dataset_dir}/{data_filename(codec)}"
+        if staging is not None:
+            checksum = staging.checksum
+            if blob_store.materialize(checksum, codec, data_path):
+                staging.delete()
+            else:
+                staging.publish(data_path, codec)
+                blob_store.adopt(data_path, checksum, codec)
+        elif staging_path and os.path.exists(staging_path):
+            if codec == "none":
+                shutil.copy(staging_path, data_path)
+            else:
+                compress_file(staging_path, data_path, codec)
+        elif codec == "none":
+            open(data_path, "w").close()  # empty file as fallback
         else:
-            open(f"{dataset_dir}/data.jsonl", "w").close()  # empty file as fallback
+            compress_file(os.devnull, data_path, codec)  # empty stream as fallback
+        if staging is None:
+            build_line_index(data_path)
+            checksum = self._compute_checksum(data_path)
+            blob_store.adopt(data_path, checksum, codec)
+
+        self.previous = latest_dataset
+        self.unchanged_from = None
+        if (latest_dataset is not None and latest_dataset.deleted_at is None
+                and latest_dataset.checksum == checksum):
+            self.unchanged_from = latest_dataset
+            print(f"    Unchanged since {latest_dataset.version_string}: sharing its data blob")
 
         # 6. Write schema
         with open(f"{dataset_dir}/schema.json", 'w', encoding='utf-8') as f:
@@ -97,8 +145,9 @@ class DatasetBuilder:
             with open(f"{dataset_dir}/models.py", 'w', encoding='utf-8') as f:
                 f.write(models_code)
 
-        # 8. Compute checksum
-        checksum = self._compute_checksum(f"{dataset_dir}/data.jsonl")
+        # 8. Same data as the previous version: reuse its query index too
+        if self.unchanged_from is not None:
+            self._link_query_index(latest_dataset.data_path, dataset_dir)
 
         # 9. Write metadata
         metadata = {
@@ -124,7 +173,7 @@ class DatasetBuilder:
             patch_version=patch,
             label=_make_execution_label(execution.execution_params),
             schema_json=schema_json,
-            data_path=f"{dataset_dir}/data.jsonl",
+            data_path=data_path,
             record_count=record_count,
             checksum=checksum,
             created_at=datetime.utcnow()
@@ -134,10 +183,21 @@ class DatasetBuilder:
 
         return dataset
 
+    def _link_query_index(self, previous_data_path: str, dataset_dir: str) -> None:
+        """Hard-link the /graphql/data query index of an identical previous version
+        (it is rebuilt on demand if this fails or does not match)."""
+        src = os.path.join(os.path.dirname(previous_data_path), INDEX_DIRNAME)
+        if not os.path.isdir(src):
+            return
+        try:
+            shutil.copytree(src, os.path.join(dataset_dir, INDEX_DIRNAME), copy_function=os.link)
+        except OSError:
+            shutil.rmtree(os.path.join(dataset_dir, INDEX_DIRNAME), ignore_errors=True)
+
     def _compute_checksum(self, filepath: str) -> str:
-        """Compute SHA256 checksum of file"""
+        """Compute SHA256 checksum of the (uncompressed) file content"""
         sha256 = hashlib.sha256()
-        with open(filepath, 'rb') as f:
+        with open_binary(filepath) as f:
             for chunk in iter(lambda: f.read(8192), b''):
                 sha256.update(chunk)
         return sha256.hexdigest()
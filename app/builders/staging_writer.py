@@ -0,0 +1,189 @@
+"""
+Staging Writer - Single-pass writer for the execution staging JSONL.
+
+While records stream out of the fetcher it keeps, incrementally, everything the
+later phases used to re-read the file for: SHA256 checksum, record count, the
+JSON Schema of the whole dataset, the line offset index and the dedup state.
+The dataset package is then published by renaming the staging file into place
+instead of copying it (or by compressing it into place, with a storage codec).
+"""
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Dict, Optional
+
+from app.utils.dataset_io import compress_file
+from app.utils.line_index import LineIndexWriter, index_path
+from app.utils.schema_inference import SchemaAccumulator
+
+
+class StagingWriter:
+    """
+    Writes records to the staging JSONL and accumulates its metadata.
+
+    Usage:
+        with StagingWriter(path, resume=is_resume, dedup_key="id") as staging:
+            for record in records:
+                staging.write(record)
+        staging.dedup()
+        staging.publish(f"{dataset_dir}/data.jsonl")
+    """
+
+    def __init__(
+        self,
+        path: str,
+        resume: bool = False,
+        dedup_key: Optional[str] = None,
+        dedup_order_field: str = "fecha",
+    ):
+        self.path = path
+        self.dedup_key = dedup_key or None
+        self.dedup_order_field = dedup_order_field
+        self._reset_stats()
+        # Resuming appends to the staging left by the paused run: its records are
+        # replayed once so checksum, schema and dedup state cover the whole file.
+        if resume and os.path.exists(path):
+            with open(path, "rb") as f:
+                for line in f:
+                    self._account(line, _parse(line))
+            self._file = open(path, "ab")
+        else:
+            self._file = open(path, "wb")
+
+    def _reset_stats(self) -> None:
+        self.count = 0
+        self.bytes_written = 0
+        self._sha256 = hashlib.sha256()
+        self._schema = SchemaAccumulator()
+        self._index = LineIndexWriter(f"{index_path(self.path)}.staging")
+        self._winners: Dict[Any, tuple] = {}   # key -> (order, offset, length)
+        self._keyless: list = []               # [(offset, length)]
+
+    # ── Writing ──────────────────────────────────────────────────────────────
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """Append one record (already JSON-serializable) to the staging file."""
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        self._file.write(line)
+        self._account(line, record)
+
+    def _account(self, line: bytes, record: Optional[Dict[str, Any]]) -> None:
+        offset = self.bytes_written
+        self._index.add(offset)
+        self._sha256.update(line)
+        self.bytes_written += len(line)
+        if not line.strip():
+            return
+        self.count += 1
+        if isinstance(record, dict):
+            self._schema.add(record)
+        if self.dedup_key:
+            key = record.get(self.dedup_key) if isinstance(record, dict) else None
+            if key is None or key == "":
+                self._keyless.append((offset, len(line)))
+            else:
+                order = str(record.get(self.dedup_order_field) or "")
+                previous = self._winners.get(key)
+                if previous is None or order >= previous[0]:
+                    self._winners[key] = (order, offset, len(line))
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        """Close the file, leaving the staging on disk (e.g. when the run pauses)."""
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+        return False
+
+    # ── Results ──────────────────────────────────────────────────────────────
+
+    @property
+    def checksum(self) -> str:
+        return self._sha256.hexdigest()
+
+    def schema(self) -> Dict:
+        return self._schema.schema()
+
+    def dedup(self) -> int:
+        """
+        Keep one row per value of `dedup_key`: the one with the highest
+        `dedup_order_field` (lexicographic — fine for ISO dates), or the last one
+        emitted on ties or without an order field. Rows without a key are kept.
+
+        The winners are already known from the write pass, so the file is only
+        rewritten (reading just the kept rows) when there are duplicates.
+        Returns the resulting record count.
+        """
+        self.close()
+        if not self.dedup_key or len(self._winners) + len(self._keyless) == self.count:
+            return self.count
+        selection = sorted(
+            [(o, l) for (_, o, l) in self._winners.values()] + self._keyless
+        )  # original order of appearance
+        tmp_path = self.path + ".dedup"
+        self._index.abort()
+        self._reset_stats()
+        self.dedup_key = None
+        with open(self.path, "rb") as src, open(tmp_path, "wb") as dst:
+            for offset, length in selection:
+                src.seek(offset)
+                line = src.read(length)
+                dst.write(line)
+                self._account(line, _parse(line))
+        os.replace(tmp_path, self.path)
+        return self.count
+
+    def publish(self, data_path: str, codec: str = "none") -> None:
+        """
+        Move the staging file (and its line index) to its final dataset path.
+        With a storage codec the file is compressed into place instead; the
+        line index keeps uncompressed offsets (see app/utils/dataset_io.py).
+        """
+        self.close()
+        if codec == "none":
+            self._index.close(self.bytes_written)
+            _move(self.path, data_path)
+        else:
+            self._index.close(compress_file(self.path, data_path, codec))
+            os.remove(self.path)
+        _move(self._index.path, index_path(data_path))
+
+    def discard(self) -> None:
+        """Drop the pending line index (staging file is left untouched)."""
+        self.close()
+        self._index.abort()
+
+    def delete(self) -> None:
+        """Drop the staging file and its pending index (content already stored)."""
+        self.discard()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def _parse(line: bytes) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+def _move(src: str, dst: str) -> None:
+    # Staging and datasets normally share a volume, so this is an atomic rename;
+    # shutil.move copies only if they don't.
+    try:
+        os.replace(src, dst)
+    except OSError:
+        shutil.move(src, dst)
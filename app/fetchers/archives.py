@@ -0,0 +1,216 @@
+"""
+Lectura de archivos comprimidos (zip / 7z / tar / tar.gz / tar.bz2 / gz) sin
+cargarlos enteros en memoria.
+
+La descarga se vuelca por bloques a un fichero temporal en disco
+(`spool_download`) y los miembros se recorren de forma perezosa
+(`iter_members` / `open_member`) como flujos de bytes que los parsers leen por
+bloques: la memoria pico no depende del tamaño del archivo ni del miembro. `gz`
+(un único fichero comprimido) ni siquiera pasa por disco: se descomprime
+directamente desde la respuesta HTTP.
+
+Para previews de ZIP pesados, `iter_zip_stream` recorre los miembros en orden
+desde la propia respuesta, sin esperar a que termine la descarga.
+"""
+import gzip
+import os
+import shutil
+import struct
+import tarfile
+import tempfile
+import zipfile
+import zlib
+from contextlib import contextmanager
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+
+FORMATS = ("zip", "7z", "tar", "tar.gz", "tar.bz2", "gz")
+TAR_MODES = {
+    "tar":     "r:",
+    "tar.gz":  "r:gz",
+    "tar.bz2": "r:bz2",
+}
+CHUNK_BYTES = 1 << 20
+
+
+def infer_archive_format(url: str) -> str:
+    """Formato a partir de la extensión de la url ('' si no se reconoce)."""
+    lowered = (url or "").lower()
+    for ext in ("tar.gz", "tar.bz2", "tar", "zip", "gz", "7z"):
+        if lowered.endswith(f".{ext}") or f".{ext}?" in lowered:
+            return ext
+    return ""
+
+
+def spool_download(response, chunk_size: int = CHUNK_BYTES) -> IO[bytes]:
+    """Vuelca el cuerpo de una respuesta (pedida con stream=True) a un fichero
+    temporal anónimo y lo devuelve posicionado al principio. Se borra al cerrarlo."""
+    f = tempfile.TemporaryFile(prefix="odm_archive_")
+    try:
+        for chunk in response.iter_content(chunk_size):
+            f.write(chunk)
+        f.seek(0)
+    except BaseException:
+        f.close()
+        raise
+    return f
+
+
+def list_members(archive: IO[bytes], fmt: str) -> List[str]:
+    """Nombres de los ficheros (no directorios) del archivo. `gz` no es un
+    contenedor: devuelve []."""
+    try:
+        if fmt == "zip":
+            return [n for n in zipfile.ZipFile(archive).namelist() if not n.endswith("/")]
+        if fmt in TAR_MODES:
+            with tarfile.open(fileobj=archive, mode=TAR_MODES[fmt]) as tf:
+                return [m.name for m in tf if m.isfile()]
+        if fmt == "7z":
+            import py7zr  # import perezoso: dependencia pesada
+            with py7zr.SevenZipFile(archive, mode="r") as z:
+                return [i.filename for i in z.list() if not i.is_directory]
+        if fmt == "gz":
+            return []
+    finally:
+        archive.seek(0)
+    raise ValueError(f"Formato '{fmt}' no soportado. Valores: {' | '.join(FORMATS)}")
+
+
+def iter_members(
+    archive: IO[bytes], fmt: str, names: Optional[Iterable[str]] = None,
+) -> Iterator[Tuple[str, IO[bytes]]]:
+    """
+    (nombre, flujo) de cada fichero del archivo, o solo de `names`, en el orden
+    del archivo. El flujo descomprime al leer y solo es válido hasta pedir el
+    siguiente miembro. Para `gz` hay un único miembro sin nombre.
+    """
+    wanted = set(names) if names is not None else None
+    if fmt == "gz":
+        with gzip.GzipFile(fileobj=archive, mode="rb") as f:
+            yield "", f
+    elif fmt == "zip":
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or (wanted is not None and info.filename not in wanted):
+                    continue
+                with zf.open(info) as f:
+                    yield info.filename, f
+    elif fmt in TAR_MODES:
+        with tarfile.open(fileobj=archive, mode=TAR_MODES[fmt]) as tf:
+            for member in tf:   # cabeceras leídas a medida que se avanza
+                if not member.isfile() or (wanted is not None and member.name not in wanted):
+                    continue
+                f = tf.extractfile(member)
+                if f is not None:
+                    yield member.name, f
+    elif fmt == "7z":
+        # 7z no permite leer un miembro como flujo: se extrae de uno en uno a un
+        # directorio temporal y se abre desde disco.
+        import py7zr
+        with py7zr.SevenZipFile(archive, mode="r") as z:
+            targets = [i.filename for i in z.list() if not i.is_directory
+                       and (wanted is None or i.filename in wanted)]
+            for name in targets:
+                tmp = tempfile.mkdtemp(prefix="odm_7z_")
+                try:
+                    z.reset()
+                    z.extract(path=tmp, targets=[name])
+                    with open(os.path.join(tmp, name), "rb") as f:
+                        yield name, f
+                finally:
+                    shutil.rmtree(tmp, ignore_errors=True)
+    else:
+        raise ValueError(f"Formato '{fmt}' no soportado. Valores: {' | '.join(FORMATS)}")
+
+
+@contextmanager
+def open_member(archive: IO[bytes], fmt: str, entry: str = ""):
+    """
+    Abre el miembro `entry` (o el único fichero del archivo si no se indica) y
+    devuelve (nombre, flujo). Error si falta `entry` y hay varios, o si no existe.
+    """
+    if fmt != "gz" and (not entry or fmt not in TAR_MODES):
+        # Zip y 7z listan desde su índice; un tar sin `entry` necesita una pasada
+        # previa para saber si el fichero es único.
+        names = list_members(archive, fmt)
+        if not entry:
+            if len(names) != 1:
+                raise ValueError(
+                    f"El {fmt.upper()} contiene {len(names)} ficheros — especifica 'entry'. "
+                    f"Disponibles: {names}"
+                )
+            entry = names[0]
+        elif entry not in names:
+            raise ValueError(f"Entrada '{entry}' no encontrada en el {fmt.upper()}. Disponibles: {names}")
+    members = iter_members(archive, fmt, names=None if fmt == "gz" else [entry])
+    try:
+        found = next(members, None)
+        if found is None:
+            raise ValueError(f"Entrada '{entry}' no encontrada en el {fmt.upper()}")
+        yield found
+    finally:
+        members.close()
+
+
+def iter_zip_stream(raw: IO[bytes], logger_=None) -> Iterator[Tuple[str, bytes]]:
+    """Lee miembros de un ZIP remoto secuencialmente desde un response en streaming
+    (`response.raw`), SIN descargar el archivo completo. Recorre las cabeceras
+    locales (PK\\x03\\x04), descomprime cada miembro (deflate o stored) y lo emite
+    como (nombre, bytes). Pensado para previews de ZIPs pesados (p. ej. anuales de
+    PLACSP): el llamante corta la iteración (y con ella la descarga) en cuanto
+    tiene suficiente.
+
+    Limitación deliberada: si un miembro usa data descriptor sin tamaños en la
+    cabecera local (flag bit 3), se descomprime hasta el EOF del deflate, que es
+    correcto para method=8; para method=0 sin tamaño no hay forma fiable y se aborta.
+    """
+    buf = b""
+
+    def _leer(n):
+        nonlocal buf
+        while len(buf) < n:
+            trozo = raw.read(max(n - len(buf), 65536))
+            if not trozo:
+                break
+            buf += trozo
+        out, buf = buf[:n], buf[n:]
+        return out
+
+    while True:
+        firma = _leer(4)
+        if len(firma) < 4 or firma != b"PK\x03\x04":
+            return  # central directory (PK\x01\x02) u otro registro: fin de miembros
+        cab = _leer(26)
+        if len(cab) < 26:
+            return
+        (_ver, flags, method, _t, _d, _crc, csize, usize, nlen, elen) = struct.unpack("<HHHHHIIIHH", cab)
+        nombre = _leer(nlen).decode("utf-8", "replace")
+        _leer(elen)
+        con_descriptor = bool(flags & 0x8)
+
+        if method == 8:
+            dec = zlib.decompressobj(-15)
+            datos = bytearray()
+            if csize and not con_descriptor:
+                datos += dec.decompress(_leer(csize))
+                datos += dec.flush()
+            else:
+                # tamaño desconocido: alimentar hasta EOF del deflate
+                while not dec.eof:
+                    trozo = _leer(65536)
+                    if not trozo:
+                        break
+                    datos += dec.decompress(trozo)
+                # devolver al buffer lo no consumido y saltar el data descriptor
+                buf = dec.unused_data + buf
+                if con_descriptor:
+                    if buf[:4] == b"PK\x07\x08":
+                        _leer(16)
+                    else:
+                        _leer(12)
+            yield nombre, bytes(datos)
+        elif method == 0 and not con_descriptor:
+            yield nombre, _leer(csize)
+        else:
+            if logger_:
+                logger_.warning(f"  {nombre}: método {method} con descriptor no soportado en streaming; se aborta el preview parcial")
+            return
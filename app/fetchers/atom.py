@@ -17,12 +17,22 @@ Params configurables via ResourceParam:
     headers       Headers adicionales como JSON string
     timeout       Timeout en segundos (default: 30)
     entry_tag     Tag XML de cada entrada (default: autodetect)
+    batch_size    Entradas por lote al leer archivos ZIP (default: 500)
+
+El XML se lee con iterparse: cada entrada se convierte y se descarta en cuanto
+se cierra, sin construir el árbol completo de la página ni del miembro del ZIP
+(los anuales de PLACSP pesan decenas de MB por miembro). `stream()` emite un
+lote por página (o por `batch_size` entradas de un miembro) con `current_state`
+apuntando a lo siguiente por leer.
 """
+import io
 import json
 import logging
-import requests
+import time
 import xml.etree.ElementTree as ET
-from typing import List, Dict, Any, Optional
+import zipfile
+from typing import Any, Dict, Generator, Iterator, List, Optional
+from app.fetchers.archives import iter_zip_stream, spool_download
 from app.fetchers.base import BaseFetcher, RawData, ParsedData, DomainData
 
 logger = logging.getLogger(__name__)
@@ -75,48 +85,38 @@ def _element_to_dict(element: ET.Element) -> Dict[str, Any]:
     return result
 
 
-def _parse_feed_entries(root: ET.Element) -> List[Dict[str, Any]]:
-    """Extrae entries/items del feed independientemente del formato."""
-    # ATOM 1.0: <feed> con <entry>
-    entries = root.findall("atom:entry", _NS)
-    if entries:
-        return [_element_to_dict(e) for e in entries]
-
-    # ATOM sin namespace explícito
-    entries = root.findall("{http://www.w3.org/2005/Atom}entry")
-    if entries:
-        return [_element_to_dict(e) for e in entries]
-
-    # RSS 2.0: <rss><channel><item>
-    channel = root.find("channel")
-    if channel is not None:
-        items = channel.findall("item")
-        if items:
-            return [_element_to_dict(i) for i in items]
-
-    # Fallback: cualquier tag <entry> o <item>
-    for tag in ("entry", "item"):
-        found = root.findall(f".//{tag}")
-        if found:
-            return [_element_to_dict(e) for e in found]
-
-    return []
-
-
-def _entry_elements(root: ET.Element) -> List[ET.Element]:
-    """Devuelve los elementos entry/item del feed (cualquier formato)."""
-    ns = "{http://www.w3.org/2005/Atom}"
-    els = root.findall(f"{ns}entry") or root.findall("entry")
-    if not els:
-        ch = root.find("channel")
-        if ch is not None:
-            els = ch.findall("item")
-    if not els:
-        for tag in ("entry", "item"):
-            els = root.findall(f".//{tag}")
-            if els:
-                break
-    return els
+def _iter_entries(source, field_map: Optional[Dict[str, str]] = None,
+                  entry_tag: Optional[str] = None,
+                  feed: Optional[Dict[str, Any]] = None) -> Iterator[Any]:
+    """Recorre un feed ATOM/RSS de forma incremental (iterparse) y emite cada
+    entry/item ya convertido (`_extract_flat` con `field_map`, si no
+    `_element_to_dict`) en cuanto se cierra su elemento, que se vacía y se
+    descuelga del árbol: la memoria no crece con el tamaño del documento.
+
+    `source` es un fichero binario o ruta. Sin `entry_tag` se autodetecta: el
+    primer <entry> o <item> (con o sin namespace) fija el tag. Si se pasa `feed`,
+    recibe en feed['next'] el href del <link rel="next"> del feed."""
+    tags = (entry_tag,) if entry_tag else ("entry", "item")
+    stack: List[ET.Element] = []
+    current: Optional[ET.Element] = None
+    for event, el in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            if current is None and _tag_local(el.tag) in tags:
+                current = el
+                tags = (_tag_local(el.tag),)
+            stack.append(el)
+            continue
+        stack.pop()
+        if el is current:
+            yield _extract_flat(el, field_map) if field_map else _element_to_dict(el)
+            current = None
+            el.clear()
+            parent = stack[-1] if stack else None
+            if parent is not None and len(parent) and parent[-1] is el:
+                del parent[-1]
+        elif (feed is not None and len(stack) == 1 and _tag_local(el.tag) == "link"
+              and el.get("rel") == "next"):
+            feed["next"] = el.get("href")
 
 
 def _first_by_path(el: ET.Element, path: str):
@@ -196,85 +196,27 @@ def _filtrar_por_fecha(batch, date_field: str, desde, hasta=None):
     return conservadas, frontera
 
 
-def _next_link(root: ET.Element) -> Optional[str]:
-    ns = "{http://www.w3.org/2005/Atom}"
-    for link in root.findall(f"{ns}link") or root.findall("link"):
-        if link.get("rel") == "next":
-            return link.get("href")
-    return None
-
-
-def _miembros_zip_en_streaming(response, logger_=None):
-    """Lee miembros de un ZIP remoto secuencialmente desde un response en streaming,
-    SIN descargar el archivo completo. Recorre las cabeceras locales (PK\\x03\\x04),
-    descomprime cada miembro (deflate o stored) y lo emite como (nombre, bytes).
-    Pensado para previews de ZIPs pesados (p. ej. anuales de PLACSP): el llamante
-    corta la iteración (y con ella la descarga) en cuanto tiene suficiente.
-
-    Limitación deliberada: si un miembro usa data descriptor sin tamaños en la
-    cabecera local (flag bit 3), se descomprime hasta el EOF del deflate, que es
-    correcto para method=8; para method=0 sin tamaño no hay forma fiable y se aborta.
-    """
-    import struct
-    import zlib
-
-    crudo = response.raw
-    buf = b""
-
-    def _leer(n):
-        nonlocal buf
-        while len(buf) < n:
-            trozo = crudo.read(max(n - len(buf), 65536))
-            if not trozo:
-                break
-            buf += trozo
-        out, buf = buf[:n], buf[n:]
-        return out
-
-    while True:
-        firma = _leer(4)
-        if len(firma) < 4 or firma != b"PK\x03\x04":
-            return  # central directory (PK\x01\x02) u otro registro: fin de miembros
-        cab = _leer(26)
-        if len(cab) < 26:
-            return
-        (_ver, flags, method, _t, _d, _crc, csize, usize, nlen, elen) = struct.unpack("<HHHHHIIIHH", cab)
-        nombre = _leer(nlen).decode("utf-8", "replace")
-        _leer(elen)
-        con_descriptor = bool(flags & 0x8)
-
-        if method == 8:
-            dec = zlib.decompressobj(-15)
-            datos = bytearray()
-            if csize and not con_descriptor:
-                datos += dec.decompress(_leer(csize))
-                datos += dec.flush()
-            else:
-                # tamaño desconocido: alimentar hasta EOF del deflate
-                while not dec.eof:
-                    trozo = _leer(65536)
-                    if not trozo:
-                        break
-                    datos += dec.decompress(trozo)
-                # devolver al buffer lo no consumido y saltar el data descriptor
-                buf = dec.unused_data + buf
-                if con_descriptor:
-                    if buf[:4] == b"PK\x07\x08":
-                        _leer(16)
-                    else:
-                        _leer(12)
-            yield nombre, bytes(datos)
-        elif method == 0 and not con_descriptor:
-            yield nombre, _leer(csize)
-        else:
-            if logger_:
-                logger_.warning(f"  {nombre}: método {method} con descriptor no soportado en streaming; se aborta el preview parcial")
-            return
-
-
 class AtomFetcher(BaseFetcher):
 
     def fetch(self) -> RawData:
+        preview_limit = int(self.params.get("_preview_limit", 0) or 0)
+        all_records: List[Any] = []
+        for batch in self._batches():
+            all_records.extend(batch)
+            if preview_limit and len(all_records) >= preview_limit:
+                break
+        return all_records[:preview_limit] if preview_limit else all_records
+
+    def stream(self) -> Generator[List[Any], None, None]:
+        """Un lote por página del feed (o por `batch_size` entradas de cada
+        miembro del ZIP) en cuanto se parsea, sin acumular el feed entero."""
+        for batch in self._batches():
+            yield self.normalize(self.parse(batch))
+
+    def _batches(self) -> Generator[List[Any], None, None]:
+        """Recorre el feed (o el ZIP) y emite las entradas por lotes, ya filtradas
+        por la ventana temporal. Antes de cada yield deja en `current_state` el
+        savepoint de lo siguiente por leer; con `_resume_state` retoma desde él."""
         url = self.params.get("url")
         if not url:
             raise ValueError("El parámetro 'url' es obligatorio para AtomFetcher")
@@ -286,6 +228,11 @@ class AtomFetcher(BaseFetcher):
         max_pages = int(self.params.get("max_pages", 0))
         timeout = int(self.params.get("timeout", 30))
         preview_limit = int(self.params.get("_preview_limit", 0))
+        batch_size = int(self.params.get("batch_size", 500) or 500)
+        entry_tag = self.params.get("entry_tag") or None
+        resume_state = self.params.get("_resume_state") or {}
+        if isinstance(resume_state, str):
+            resume_state = json.loads(resume_state)
 
         fixed_params = self.params.get("query_params", {})
         if isinstance(fixed_params, str):
@@ -322,12 +269,10 @@ class AtomFetcher(BaseFetcher):
             logger.info(f"  ventana temporal: desde={desde.isoformat() if desde else '—'} "
                         f"hasta={hasta.isoformat() if hasta else '—'}")
 
-        def _entradas(root):
-            if field_map:
-                return [_extract_flat(e, field_map) for e in _entry_elements(root)]
-            return _parse_feed_entries(root)
+        def _entradas(source, feed=None):
+            return _iter_entries(source, field_map, entry_tag, feed)
 
-        all_records: List[Dict[str, Any]] = []
+        total = 0
 
         # Modo archivo ZIP (repositorio histórico de sindicaciones, p. ej. los
         # anuales/mensuales de PLACSP): la url apunta a un .zip cuyos ficheros
@@ -335,9 +280,6 @@ class AtomFetcher(BaseFetcher):
         # ventana temporal [desde, hasta]; al ser un corpus cerrado no hay
         # frontera de parada ni paginación.
         if url.lower().split("?")[0].endswith(".zip"):
-            import io as _io
-            import zipfile as _zipfile
-
             # Preview: los ZIP anuales pesan cientos de MB y descargarlos enteros
             # revienta el timeout del gateway. Se leen los miembros en streaming
             # desde el principio del archivo y se corta la conexión en cuanto hay
@@ -345,26 +287,27 @@ class AtomFetcher(BaseFetcher):
             # traen tamaños, sin data descriptor).
             if preview_limit:
                 logger.info(f"Preview ATOM desde ZIP (streaming): {url}")
-                session = requests.Session()
+                session = self.http
                 response = self._request(session, "GET", url, headers=headers,
                                          timeout=max(timeout, 300), stream=True)
                 response.raise_for_status()
                 magia = response.raw.peek(2)[:2] if hasattr(response.raw, "peek") else b""
                 hubo_miembros = False
                 try:
-                    for nombre, contenido in _miembros_zip_en_streaming(response, logger):
+                    for nombre, contenido in iter_zip_stream(response.raw, logger):
                         hubo_miembros = True
                         if not contenido:
                             continue
                         try:
-                            root = ET.fromstring(contenido)
+                            batch = list(_entradas(io.BytesIO(contenido)))
                         except ET.ParseError as e:
                             logger.warning(f"  {nombre}: XML inválido, se omite ({e})")
                             continue
-                        batch = _entradas(root)
                         batch, _ = _filtrar_por_fecha(batch, date_field, desde, hasta)
-                        all_records.extend(batch)
-                        if len(all_records) >= preview_limit:
+                        total += len(batch)
+                        if batch:
+                            yield batch
+                        if total >= preview_limit:
                             break
                 finally:
                     response.close()  # corta la descarga restante
@@ -372,62 +315,94 @@ class AtomFetcher(BaseFetcher):
                     raise ValueError(
                         f"La url no devuelve un ZIP (bytes iniciales {magia!r}); "
                         "el repositorio puede exigir cabecera User-Agent (param 'headers')")
-                return all_records[:preview_limit]
+                return
 
             logger.info(f"Fetch ATOM desde archivo ZIP: {url}")
-            session = requests.Session()
-            response = self._request(session, "GET", url, headers=headers, timeout=max(timeout, 300))
-            response.raise_for_status()
-            magia = response.content[:2]
-            if magia != b"PK":
-                raise ValueError(
-                    f"La url no devuelve un ZIP (bytes iniciales {magia!r}); "
-                    "el repositorio puede exigir cabecera User-Agent (param 'headers')")
-            zf = _zipfile.ZipFile(_io.BytesIO(response.content))
-            internos = sorted((n for n in zf.namelist() if not n.endswith("/")), reverse=True)
-            logger.info(f"  {len(internos)} ficheros internos")
-            for nombre in internos:
-                try:
-                    root = ET.fromstring(zf.read(nombre))
-                except ET.ParseError as e:
-                    logger.warning(f"  {nombre}: XML inválido, se omite ({e})")
-                    continue
-                batch = _entradas(root)
-                batch, _ = _filtrar_por_fecha(batch, date_field, desde, hasta)
-                all_records.extend(batch)
-                if preview_limit and len(all_records) >= preview_limit:
-                    return all_records[:preview_limit]
-            logger.info(f"  total: {len(all_records)} entradas en la ventana")
-            return all_records
-        page = 0
+            session = self.http
+            # El ZIP se vuelca por bloques a un temporal en disco y cada miembro se
+            # parsea desde su flujo: ni el archivo ni los ficheros internos se
+            # cargan enteros en memoria.
+            response = self._request(session, "GET", url, headers=headers,
+                                     timeout=max(timeout, 300), stream=True)
+            try:
+                response.raise_for_status()
+                archivo = spool_download(response)
+            finally:
+                response.close()
+            # Savepoint: miembros terminados + entradas ya leídas del siguiente.
+            members_done = int(resume_state.get("members_done", 0))
+            entries_done = int(resume_state.get("entries_done", 0))
+            with archivo:
+                magia = archivo.read(2)
+                archivo.seek(0)
+                if magia != b"PK":
+                    raise ValueError(
+                        f"La url no devuelve un ZIP (bytes iniciales {magia!r}); "
+                        "el repositorio puede exigir cabecera User-Agent (param 'headers')")
+                with zipfile.ZipFile(archivo) as zf:
+                    internos = sorted((n for n in zf.namelist() if not n.endswith("/")), reverse=True)
+                    logger.info(f"  {len(internos)} ficheros internos")
+                    for i, nombre in enumerate(internos):
+                        if i < members_done:
+                            continue
+                        saltar = entries_done if i == members_done else 0
+                        leidas = 0
+                        lote: List[Any] = []
+                        try:
+                            with zf.open(nombre) as f:
+                                for entrada in _entradas(f):
+                                    leidas += 1
+                                    if leidas <= saltar:
+                                        continue
+                                    lote.append(entrada)
+                                    if len(lote) < batch_size:
+                                        continue
+                                    lote, _ = _filtrar_por_fecha(lote, date_field, desde, hasta)
+                                    total += len(lote)
+                                    self.current_state = {"members_done": i, "entries_done": leidas}
+                                    if lote:
+                                        yield lote
+                                    lote = []
+                        except ET.ParseError as e:
+                            logger.warning(f"  {nombre}: XML inválido, se omite el resto ({e})")
+                        lote, _ = _filtrar_por_fecha(lote, date_field, desde, hasta)
+                        total += len(lote)
+                        self.current_state = {"members_done": i + 1, "entries_done": 0}
+                        if lote:
+                            yield lote
+            logger.info(f"  total: {total} entradas en la ventana")
+            return
+
+        page = int(resume_state.get("pages_done", 0))
         logger.info(f"Iniciando fetch ATOM: {url} (paginación={pagination})")
-        session = requests.Session()
+        session = self.http
 
         if pagination == "rel_next":
-            import time
-            next_url: Optional[str] = url
+            next_url: Optional[str] = resume_state["next_url"] if "next_url" in resume_state else url
             while next_url:
                 response = self._request(session, method, next_url, headers=headers, timeout=timeout)
                 response.raise_for_status()
-                root = ET.fromstring(response.text)
-                batch = _entradas(root)
+                feed: Dict[str, Any] = {}
+                batch = list(_entradas(io.BytesIO(response.content), feed))
                 batch, frontera = _filtrar_por_fecha(batch, date_field, desde, hasta)
-                all_records.extend(batch)
-                logger.info(f"  página {page} — {len(batch)} entradas (total: {len(all_records)})")
+                total += len(batch)
+                logger.info(f"  página {page} — {len(batch)} entradas (total: {total})")
                 page += 1
-                if preview_limit and len(all_records) >= preview_limit:
-                    break
+                fin = bool((preview_limit and total >= preview_limit) or frontera
+                           or (max_pages and page >= max_pages))
+                next_url = None if fin else feed.get("next")
+                self.current_state = {"next_url": next_url, "pages_done": page}
+                if batch:
+                    yield batch
                 if frontera:
                     logger.info("  frontera de fecha alcanzada; se detiene la paginación")
-                    break
-                if max_pages and page >= max_pages:
-                    break
-                next_url = _next_link(root)
                 if next_url and delay:
                     time.sleep(delay)
-            return all_records[:preview_limit] if preview_limit else all_records
+            return
 
-        start = 0
+        if resume_state.get("done"):
+            return
+        start = int(resume_state.get("start", 0))
         while True:
             query = {
                 **fixed_params,
@@ -438,42 +413,37 @@ class AtomFetcher(BaseFetcher):
             response = self._request(session, method, url, params=query, headers=headers, timeout=timeout)
             response.raise_for_status()
 
-            if not response.text or not response.text.strip():
+            if not response.content or not response.content.strip():
                 raise ValueError(f"Respuesta vacía del feed en offset {start}")
 
             try:
-                root = ET.fromstring(response.text)
+                entries = list(_entradas(io.BytesIO(response.content)))
             except ET.ParseError as e:
-                raise ValueError(f"No se pudo parsear el XML del feed: {e}\nRespuesta: {response.text[:200]}")
+                raise ValueError(f"No se pudo parsear el XML del feed: {e}\n"
+                                 f"Respuesta: {response.content[:200].decode('utf-8', 'replace')}")
 
-            entries = _entradas(root)
             raw_count = len(entries)
             entries, frontera = _filtrar_por_fecha(entries, date_field, desde)
-            batch_count = len(entries)
-            all_records.extend(entries)
+            total += len(entries)
 
-            logger.info(f"  offset={start} — {batch_count} entradas (total: {len(all_records)})")
+            logger.info(f"  offset={start} — {len(entries)} entradas (total: {total})")
 
             page += 1
-
-            if preview_limit and len(all_records) >= preview_limit:
-                break
+            fin = bool((preview_limit and total >= preview_limit) or frontera
+                       or raw_count < effective_page_size or (max_pages and page >= max_pages))
+            self.current_state = {"start": start + effective_page_size, "pages_done": page, "done": fin}
+            if entries:
+                yield entries
 
             if frontera:
                 logger.info("  frontera de fecha alcanzada; se detiene la paginación")
-                break
-
-            if raw_count < effective_page_size:
-                break
-
-            if max_pages and page >= max_pages:
+            elif max_pages and page >= max_pages and raw_count >= effective_page_size:
                 logger.warning(f"Límite de páginas alcanzado: {max_pages}")
+            if fin:
                 break
 
             start += effective_page_size
 
-        return all_records
-
     def parse(self, raw: RawData) -> ParsedData:
         return raw
 
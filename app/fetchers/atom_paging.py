@@ -1,4 +1,3 @@
-import requests
 import xmltodict
 import json
 import time
@@ -239,7 +238,7 @@ class AtomPagingFetcher(BaseFetcher):
         current_url = url
         pages_fetched = 0
         while current_url and pages_fetched < max_pages:
-            response = requests.get(current_url, headers=headers, timeout=timeout)
+            response = self.http.get(current_url, headers=headers, timeout=timeout)
             response.raise_for_status()
             data = xmltodict.parse(response.text)
             feed = data.get("feed", {})
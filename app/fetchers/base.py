@@ -1,9 +1,13 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Generator, List
+from typing import Any, Dict, Generator, List, Optional
 import time
 import logging
 import requests
 
+from app.fetchers import http_client
+from app.fetchers.concurrency import HostRateLimiter
+from app.fetchers.http_cache import HttpCache, SourceUnchanged, cache_key, wants_http_cache
+
 logger = logging.getLogger(__name__)
 
 RawData = Any
@@ -15,7 +19,8 @@ class BaseSpecies(ABC):
     """Raíz común de toda especie (Fetcher o Discoverer).
 
     Aporta lo transversal —inicialización de params y peticiones HTTP con
-    reintentos— sin imponer un contrato de extracción ni de descubrimiento.
+    reintentos sobre el pool compartido (`self.http`)— sin imponer un contrato
+    de extracción ni de descubrimiento.
     De aquí cuelgan dos roles distintos:
       · BaseFetcher    → extrae una fuente y produce registros.
       · BaseDiscoverer → lee un índice y propone recursos-hijo (Fetchers).
@@ -23,16 +28,40 @@ class BaseSpecies(ABC):
     Catálogo DCAT, Web Tree, Compressed File).
     """
 
+    # Especies cuya ejecución depende de un único documento (un fichero): con la
+    # caché HTTP activa, si ese documento no ha cambiado la ejecución se corta
+    # antes de parsearlo (SourceUnchanged).
+    single_source: bool = False
+
     def __init__(self, params: Dict[str, str]):
         self.params = params
         self.num_workers = int(params.get("num_workers", 1))
         self._max_retries = int(params.get("max_retries", 5))
         self._retry_backoff = float(params.get("retry_backoff", 2.0))
+        # Peticiones independientes en vuelo a la vez (las especies que saben
+        # repartirlas usan app/fetchers/concurrency.map_bounded) y límite por host.
+        self.max_concurrent_requests = max(1, int(params.get("max_concurrent_requests", 1) or 1))
+        rate = float(params.get("rate_limit_per_second", 0) or 0)
+        self._rate_limiter = (HostRateLimiter(rate)
+                              if rate > 0 or self.max_concurrent_requests > 1 else None)
         # Resume protocol: las especies que soportan reanudación a media corriente
         # actualizan este dict tras cada "savepoint" (página, pivote, etc.).
         self.current_state: Dict[str, Any] = {}
         # Estadísticas de perfilado (descubrimiento/extracción), leídas por el manager.
         self.profile_stats: Dict[str, Any] = {}
+        self._http: Optional[http_client.InstrumentedSession] = None
+        # Caché HTTP condicional (opt-in por recurso), ver app/fetchers/http_cache.py.
+        self._http_cache = (HttpCache(scope=str(params.get("_resource_id") or ""),
+                                      dataset_id=str(params.get("_latest_dataset_id") or ""))
+                            if wants_http_cache(params.get("http_cache")) else None)
+
+    @property
+    def http(self) -> "http_client.InstrumentedSession":
+        """Sesión de esta especie sobre el pool de conexiones del proceso
+        (keep-alive entre peticiones; cookies propias). Se crea al primer uso."""
+        if getattr(self, "_http", None) is None:
+            self._http = http_client.session()
+        return self._http
 
     @property
     def is_parallelizable(self) -> bool:
@@ -41,18 +70,34 @@ class BaseSpecies(ABC):
     def _request(self, session_or_none, method: str, url: str, **kwargs) -> requests.Response:
         """Petición HTTP con reintentos ante Timeout/ConnectionError y cortesía 429/503.
 
+        Sin sesión explícita (None) usa `self.http`, sobre el pool compartido.
         - En cada reintento el timeout se multiplica por (1 + intento).
         - La espera entre reintentos sigue backoff exponencial: backoff^intento.
-        - Tras un ConnectionError se crea una nueva sesión para limpiar el estado TCP.
+        - Tras un ConnectionError se reintenta con la misma sesión (conserva sus
+          cookies y cabeceras): urllib3 ya ha descartado la conexión rota y el
+          reintento abre otra o reutiliza una keep-alive que siga viva.
+        - Con `rate_limit_per_second` cada intento espera su ficha del host; una
+          espera por 429/503 pausa el host también para los demás hilos.
+        - Con `http_cache=true` la petición es condicional y un 304 devuelve el
+          cuerpo guardado (ver app/fetchers/http_cache.py); salvo en catas y
+          descubrimientos, que no usan la caché.
         """
         base_timeout = kwargs.pop("timeout", int(self.params.get("timeout", 30)))
-        http = session_or_none
+        http = session_or_none if session_or_none is not None else self.http
+        cache = getattr(self, "_http_cache", None)
+        if self.params.get("_preview_limit") or self.params.get("_discover_mode"):
+            cache = None
+        key = cache_key(method, url, scope=cache.scope, **kwargs) if cache is not None else None
+        meta = cache.lookup(key) if key else None
+        if meta:
+            kwargs["headers"] = {**(kwargs.get("headers") or {}), **HttpCache.conditional_headers(meta)}
 
         for attempt in range(self._max_retries + 1):
             try:
+                if self._rate_limiter is not None:
+                    self._rate_limiter.acquire(url)
                 effective_timeout = base_timeout * (1 + attempt)
-                caller = http if http else requests
-                response = caller.request(method, url, timeout=effective_timeout, **kwargs)
+                response = http.request(method, url, timeout=effective_timeout, **kwargs)
                 # 429/503 no son fallos definitivos: respetamos Retry-After si llega,
                 # si no backoff. Así no maltratamos portales frágiles.
                 if response.status_code in (429, 503):
@@ -62,6 +107,8 @@ class BaseSpecies(ABC):
                             f"HTTP {response.status_code}"
                         )
                     wait = self._retry_after_seconds(response, attempt)
+                    if self._rate_limiter is not None:
+                        self._rate_limiter.pause(url, wait)
                     logger.warning(
                         f"[CORTESÍA {attempt + 1}/{self._max_retries}] {url} — "
                         f"HTTP {response.status_code}, esperando {wait:.0f}s"
@@ -69,6 +116,8 @@ class BaseSpecies(ABC):
                     time.sleep(wait)
                     continue
                 response.raise_for_status()
+                if key:
+                    return self._through_cache(key, meta, response, bool(kwargs.get("stream")))
                 return response
             except (requests.exceptions.Timeout,
                     requests.exceptions.ConnectionError) as exc:
@@ -81,10 +130,27 @@ class BaseSpecies(ABC):
                     f"[RETRY {attempt + 1}/{self._max_retries}] {url} — "
                     f"esperando {wait:.0f}s tras: {exc}"
                 )
-                if isinstance(exc, requests.exceptions.ConnectionError) and http is not None:
-                    http = requests.Session()
                 time.sleep(wait)
 
+    def _through_cache(self, key: str, meta, response: requests.Response, stream: bool) -> requests.Response:
+        """Pasa una respuesta por la caché HTTP: 304 → cuerpo guardado; 200 → se
+        guarda (comparando su hash con la copia anterior). Solo es "sin cambios"
+        si la copia es con la que se construyó la última versión del Dataset."""
+        cache = self._http_cache
+        primera = cache.stats.requests == 0
+        if response.status_code == 304 and meta:
+            response = cache.replay(key, meta, response, stream)
+            sin_cambios = cache.built(meta)
+        else:
+            sin_cambios = cache.observe(key, meta, response, stream)
+        self.profile_stats["http_cache"] = cache.stats.as_dict()
+        # Reanudar siempre necesita los registros.
+        if (sin_cambios and primera and self.single_source
+                and not self.params.get("_resume_state")):
+            response.close()
+            raise SourceUnchanged(f"{response.url} sin cambios desde la última descarga")
+        return response
+
     def _retry_after_seconds(self, response: requests.Response, attempt: int) -> float:
         """Segundos a esperar tras 429/503: respeta Retry-After (segundos o fecha
         HTTP) y, en su defecto, aplica backoff exponencial."""
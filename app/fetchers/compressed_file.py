@@ -3,17 +3,18 @@ CompressedFileFetcher — Descarga un archivo comprimido y convierte su contenid
 
 Soporta:
     zip      — archivo ZIP (extrae una entrada concreta o la única disponible)
+    7z       — archivo 7-Zip (requiere py7zr)
     tar      — archivo TAR sin compresión
     tar.gz   — archivo TAR comprimido con gzip
     tar.bz2  — archivo TAR comprimido con bzip2
     gz       — fichero único comprimido con gzip (no TAR)
 
 El contenido extraído se parsea con los mismos parsers que FileDownloadFetcher:
-    csv | tsv | xlsx
+    csv | tsv | jsonl | xlsx   (csv/tsv/jsonl en streaming, por lotes)
 
 Params configurables (ResourceParam):
     url           URL directa al archivo comprimido                 (obligatorio)
-    format        Formato del archivo: zip | tar | tar.gz | tar.bz2 | gz  (obligatorio)
+    format        Formato del archivo: zip | 7z | tar | tar.gz | tar.bz2 | gz  (se infiere de la url)
     entry         Nombre del fichero a extraer del archivo           (opcional si hay uno solo)
     inner_format  Formato del fichero extraído: csv | tsv | xlsx     (opcional, se infiere de la extensión)
     skip_rows     Filas a saltar antes de la cabecera (default: 0)
@@ -25,23 +26,27 @@ Params configurables (ResourceParam):
     batch_size    Registros por chunk yield (default: 1000)
 
 Flujo:
-    1. GET → archivo comprimido en memoria (BytesIO, sin tocar disco).
-    2. Extracción de la entrada seleccionada.
-    3. Parse del contenido extraído (csv/tsv/xlsx).
+    1. GET en streaming → archivo volcado por bloques a un temporal en disco
+       (gz se descomprime directamente desde la respuesta, sin temporal).
+    2. Apertura de la entrada seleccionada como flujo (app/fetchers/archives.py):
+       se descomprime a medida que el parser lee, sin materializarla en memoria.
+    3. Parse del contenido extraído (csv/tsv/jsonl por lotes; xlsx/xls/pdf leen
+       la entrada completa porque su formato no admite lectura secuencial).
     4. Normalización de columnas: strip → lowercase → espacios/guiones → _ → sin no-ASCII.
     5. Yield en batches de batch_size registros como List[Dict[str, str]].
 """
 
-import gzip
-import io
 import json
 import logging
-import tarfile
-import zipfile
 from typing import Generator, List, Dict, Any
 
+from app.fetchers.archives import (
+    FORMATS, infer_archive_format, list_members, open_member, spool_download,
+)
 from app.fetchers.base import BaseFetcher, RawData, ParsedData, DomainData
-from app.fetchers.file_parsers import infer_file_format, parse_structured_file
+from app.fetchers.file_parsers import (
+    STREAMING_FORMATS, infer_file_format, iter_structured_file, normalize_format, parse_structured_file,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -55,72 +60,6 @@ _EXT_TO_FORMAT = {
     ".pdf":  "pdf",
 }
 
-# Modos de apertura de tarfile según formato
-_TAR_MODES = {
-    "tar":     "r:",
-    "tar.gz":  "r:gz",
-    "tar.bz2": "r:bz2",
-}
-
-
-def _extract_zip(content: bytes, entry: str) -> tuple[bytes, str]:
-    """Extrae una entrada de un ZIP. Si entry está vacío, usa la única disponible."""
-    zf = zipfile.ZipFile(io.BytesIO(content))
-    names = [n for n in zf.namelist() if not n.endswith("/")]
-    if not entry:
-        if len(names) == 1:
-            entry = names[0]
-        else:
-            raise ValueError(
-                f"El ZIP contiene {len(names)} ficheros — especifica 'entry'. "
-                f"Disponibles: {names}"
-            )
-    if entry not in zf.namelist():
-        raise ValueError(f"Entrada '{entry}' no encontrada en el ZIP. Disponibles: {names}")
-    return zf.read(entry), entry
-
-
-def _extract_tar(content: bytes, mode: str, entry: str) -> tuple[bytes, str]:
-    """Extrae una entrada de un TAR. Si entry está vacío, usa el único fichero regular."""
-    tf = tarfile.open(fileobj=io.BytesIO(content), mode=mode)
-    members = [m for m in tf.getmembers() if m.isfile()]
-    if not entry:
-        if len(members) == 1:
-            entry = members[0].name
-        else:
-            names = [m.name for m in members]
-            raise ValueError(
-                f"El TAR contiene {len(members)} ficheros — especifica 'entry'. "
-                f"Disponibles: {names}"
-            )
-    member = tf.getmember(entry)
-    f = tf.extractfile(member)
-    if f is None:
-        raise ValueError(f"No se pudo extraer '{entry}' del TAR")
-    return f.read(), entry
-
-
-def _extract_gz(content: bytes) -> tuple[bytes, str]:
-    """Descomprime un fichero .gz individual (no TAR)."""
-    return gzip.decompress(content), ""
-
-
-def _extract_7z(content: bytes, entry: str) -> tuple[bytes, str]:
-    """Extrae una entrada de un archivo .7z (requiere py7zr, import perezoso)."""
-    import py7zr, tempfile, os
-    with tempfile.TemporaryDirectory() as tmp:
-        with py7zr.SevenZipFile(io.BytesIO(content), mode="r") as z:
-            names = [n for n in z.getnames() if not n.endswith("/")]
-            target = entry or (names[0] if len(names) == 1 else "")
-            if not target:
-                raise ValueError(f"Especifica 'entry'; el 7z contiene varias: {names}")
-            if target not in names:
-                raise ValueError(f"Entrada '{target}' no encontrada en el 7z. Disponibles: {names}")
-            z.extract(path=tmp, targets=[target])
-        with open(os.path.join(tmp, target), "rb") as fh:
-            return fh.read(), target
-
-
 def _infer_inner_format(entry_name: str) -> str:
     """Infiere el formato del fichero extraído a partir de su extensión."""
     inferred = infer_file_format(entry_name)
@@ -129,27 +68,21 @@ def _infer_inner_format(entry_name: str) -> str:
 
 class CompressedFileFetcher(BaseFetcher):
     """
-    Fetcher para archivos comprimidos (ZIP, TAR, TAR.GZ, TAR.BZ2, GZ).
+    Fetcher para archivos comprimidos (ZIP, 7Z, TAR, TAR.GZ, TAR.BZ2, GZ).
     Extrae una entrada y la parsea con los mismos parsers que FileDownloadFetcher.
     """
 
+    single_source = True
+
     def stream(self) -> Generator[List[Dict[str, Any]], None, None]:
         url = self.params.get("url")
         if not url:
             raise ValueError("El parámetro 'url' es obligatorio")
 
-        fmt = self.params.get("format", "").lower().strip()
-        if not fmt:
-            # Inferir del nombre del fichero
-            for ext in ("tar.gz", "tar.bz2", "tar", "zip", "gz", "7z"):
-                if url.lower().endswith(f".{ext}") or f".{ext}?" in url.lower():
-                    fmt = ext
-                    break
-        if not fmt:
-            raise ValueError("El parámetro 'format' es obligatorio. Valores: zip | 7z | tar | tar.gz | tar.bz2 | gz")
+        fmt = self._resolve_fmt(url)
 
         entry      = self.params.get("entry", "").strip()
-        inner_fmt  = self.params.get("inner_format", "").lower().strip()
+        inner_fmt  = normalize_format(self.params.get("inner_format", ""))
         timeout    = int(self.params.get("timeout", 120))
         batch_size = int(self.params.get("batch_size", 1000))
 
@@ -158,35 +91,44 @@ class CompressedFileFetcher(BaseFetcher):
             http_headers = json.loads(http_headers)
 
         logger.info(f"[CompressedFileFetcher] Descargando {fmt.upper()}: {url}")
-        response = self._request(None, "GET", url, headers=http_headers, timeout=timeout)
-        response.raise_for_status()
-        logger.info(f"[CompressedFileFetcher] Descargado — {len(response.content):,} bytes")
-
-        # ── Extracción ────────────────────────────────────────────────────────
-        if fmt == "zip":
-            raw, used_entry = _extract_zip(response.content, entry)
-        elif fmt == "gz":
-            raw, used_entry = _extract_gz(response.content)
-        elif fmt == "7z":
-            raw, used_entry = _extract_7z(response.content, entry)
-        elif fmt in _TAR_MODES:
-            raw, used_entry = _extract_tar(response.content, _TAR_MODES[fmt], entry)
-        else:
-            raise ValueError(f"Formato '{fmt}' no soportado. Valores: zip | 7z | tar | tar.gz | tar.bz2 | gz")
-
-        logger.info(f"[CompressedFileFetcher] Extraído '{used_entry}' — {len(raw):,} bytes")
-
-        # ── Inferir inner_format si no se especificó ──────────────────────────
-        if not inner_fmt and used_entry:
-            inner_fmt = _infer_inner_format(used_entry)
-        if not inner_fmt:
-            raise ValueError(
-                "No se pudo inferir 'inner_format'. Especifícalo como parámetro: pdf | xls | xlsx | csv | tsv"
-            )
-
-        logger.info(f"[CompressedFileFetcher] Parseando como '{inner_fmt}'")
-
-        records = parse_structured_file(raw, inner_fmt, self.params, source_name=used_entry or url)
+        response = self._request(None, "GET", url, headers=http_headers, timeout=timeout, stream=True)
+        archive = None
+        try:
+            response.raise_for_status()
+            if fmt == "gz":
+                response.raw.decode_content = True
+                archive = response.raw
+            else:
+                archive = spool_download(response)
+                logger.info(f"[CompressedFileFetcher] Descargado — {archive.seek(0, 2):,} bytes")
+                archive.seek(0)
+
+            with open_member(archive, fmt, entry) as (used_entry, member):
+                # ── Inferir inner_format si no se especificó ──────────────────
+                if not inner_fmt and used_entry:
+                    inner_fmt = _infer_inner_format(used_entry)
+                if not inner_fmt:
+                    raise ValueError(
+                        "No se pudo inferir 'inner_format'. Especifícalo como parámetro: pdf | xls | xlsx | csv | tsv"
+                    )
+
+                logger.info(f"[CompressedFileFetcher] Parseando '{used_entry}' como '{inner_fmt}'")
+
+                if inner_fmt in STREAMING_FORMATS and not self.params.get("custom_parser"):
+                    # La entrada se descomprime a medida que el parser la lee
+                    total = 0
+                    for batch in iter_structured_file(member, inner_fmt, self.params, batch_size):
+                        total += len(batch)
+                        yield batch
+                    logger.info(f"[CompressedFileFetcher] Stream completado: {total} registros")
+                    return
+
+                records = parse_structured_file(member.read(), inner_fmt, self.params,
+                                                source_name=used_entry or url)
+        finally:
+            if archive is not None and archive is not response.raw:
+                archive.close()
+            response.close()
 
         total = len(records)
         logger.info(f"[CompressedFileFetcher] {total} registros parseados")
@@ -203,17 +145,14 @@ class CompressedFileFetcher(BaseFetcher):
         return records
 
     # ── Modo descubrir (Archivo como Colección) ───────────────────────────────
-    _DATA_FORMATS = {"csv", "tsv", "xlsx", "xls", "json", "pdf"}
+    _DATA_FORMATS = {"csv", "tsv", "jsonl", "xlsx", "xls", "json", "pdf"}
 
     def _resolve_fmt(self, url: str) -> str:
-        fmt = self.params.get("format", "").lower().strip()
-        if not fmt:
-            for ext in ("tar.gz", "tar.bz2", "tar", "zip", "gz", "7z"):
-                if url.lower().endswith(f".{ext}") or f".{ext}?" in url.lower():
-                    fmt = ext
-                    break
+        fmt = self.params.get("format", "").lower().strip() or infer_archive_format(url)
         if not fmt:
-            raise ValueError("El parámetro 'format' es obligatorio. Valores: zip | 7z | tar | tar.gz | tar.bz2 | gz")
+            raise ValueError(f"El parámetro 'format' es obligatorio. Valores: {' | '.join(FORMATS)}")
+        if fmt not in FORMATS:
+            raise ValueError(f"Formato '{fmt}' no soportado. Valores: {' | '.join(FORMATS)}")
         return fmt
 
     def propose(self) -> List[Dict[str, Any]]:
@@ -231,19 +170,13 @@ class CompressedFileFetcher(BaseFetcher):
         timeout = int(self.params.get("timeout", 120))
 
         logger.info(f"[CompressedFileFetcher] (descubrir) Descargando {fmt.upper()}: {url}")
-        response = self._request(None, "GET", url, headers=http_headers, timeout=timeout)
-        response.raise_for_status()
-        content = response.content
-
-        if fmt == "zip":
-            members = [n for n in zipfile.ZipFile(io.BytesIO(content)).namelist() if not n.endswith("/")]
-        elif fmt in _TAR_MODES:
-            tf = tarfile.open(fileobj=io.BytesIO(content), mode=_TAR_MODES[fmt])
-            members = [m.name for m in tf.getmembers() if m.isfile()]
-        elif fmt == "gz":
-            members = []   # gz = un único fichero, no es contenedor de varios
-        else:
-            raise ValueError(f"Formato '{fmt}' no soportado. Valores: zip | 7z | tar | tar.gz | tar.bz2 | gz")
+        response = self._request(None, "GET", url, headers=http_headers, timeout=timeout, stream=True)
+        try:
+            response.raise_for_status()
+            with spool_download(response) as archive:
+                members = list_members(archive, fmt)   # gz = un único fichero: []
+        finally:
+            response.close()
 
         proposals: List[Dict[str, Any]] = []
         omitidos = 0
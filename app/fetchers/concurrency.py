@@ -0,0 +1,151 @@
+"""
+Ejecución concurrente acotada de peticiones HTTP independientes.
+
+Piezas sin dependencias nuevas (hilos; las peticiones van por el pool
+compartido de app/fetchers/http_client.py):
+
+  · HostRateLimiter — token bucket por host (`rate_limit_per_second`). Además
+    admite pausas: cuando un hilo recibe 429/503 con Retry-After, el host queda
+    en pausa para TODOS los hilos, no solo para el que recibió la respuesta.
+  · HostSlots — como mucho N operaciones en vuelo a la vez por host (crawlers
+    con varios dominios en la frontera).
+  · map_bounded(fn, items, max_workers) — aplica `fn` a cada item en un pool de
+    hilos con como mucho `max_workers` peticiones en vuelo y devuelve los
+    resultados en el orden de entrada (o según terminan, con ordered=False).
+    Los items se consumen perezosamente: se puede cortar la iteración (preview,
+    última página) y las peticiones pendientes se cancelan.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, Tuple
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """Cubo de fichas: `rate` fichas/s con ráfaga máxima `burst`. rate=0 = sin límite."""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = float(rate or 0)
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds: float) -> None:
+        """Nadie obtiene ficha hasta dentro de `seconds` (cortesía 429/503)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def acquire(self) -> None:
+        """Bloquea hasta disponer de una ficha (y hasta que acabe la pausa)."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait_s = self._paused_until - now
+                if wait_s <= 0:
+                    if not self.rate:
+                        return
+                    self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+                    self._stamp = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait_s = (1 - self._tokens) / self.rate
+            time.sleep(wait_s)
+
+
+class HostRateLimiter:
+    """Un TokenBucket por host (scheme://netloc), creado bajo demanda."""
+
+    def __init__(self, rate_per_second: float = 0, burst: float = 1.0):
+        self.rate = float(rate_per_second or 0)
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, url: str) -> TokenBucket:
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return bucket
+
+    def acquire(self, url: str) -> None:
+        self._bucket(url).acquire()
+
+    def pause(self, url: str, seconds: float) -> None:
+        self._bucket(url).pause(seconds)
+
+
+class HostSlots:
+    """Semáforo por host (scheme://netloc): `per_host` operaciones a la vez como mucho."""
+
+    def __init__(self, per_host: int):
+        self.per_host = max(1, int(per_host))
+        self._sems: Dict[str, threading.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, url: str):
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            sem = self._sems.get(host)
+            if sem is None:
+                sem = self._sems[host] = threading.Semaphore(self.per_host)
+        with sem:
+            yield
+
+
+def map_bounded(
+    fn: Callable[[Any], Any],
+    items: Iterable[Any],
+    max_workers: int,
+    ordered: bool = True,
+) -> Iterator[Tuple[Any, Any]]:
+    """
+    (item, fn(item)) para cada item, con como mucho `max_workers` llamadas en
+    vuelo. Con ordered=True los resultados salen en el orden de `items` (un
+    resultado lento retiene a los siguientes, que ya se están pidiendo). La
+    primera excepción de `fn` se propaga y cancela lo pendiente; cerrar el
+    generador también.
+    """
+    source = iter(items)
+    max_workers = max(1, int(max_workers))
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="odm_http")
+    inflight: deque = deque()
+
+    def _fill():
+        while len(inflight) < max_workers:
+            item = next(source, _END)
+            if item is _END:
+                return
+            inflight.append((item, pool.submit(fn, item)))
+
+    try:
+        _fill()
+        while inflight:
+            if ordered:
+                item, future = inflight.popleft()
+                result = future.result()
+            else:
+                done, _ = wait([f for _, f in inflight], return_when=FIRST_COMPLETED)
+                i = next(i for i, (_, f) in enumerate(inflight) if f in done)
+                item, future = inflight[i]
+                del inflight[i]
+                result = future.result()
+            _fill()
+            yield item, result
+    finally:
+        for _, future in inflight:
+            future.cancel()
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+_END = object()
@@ -0,0 +1,97 @@
+"""
+Estado de crawl persistente por colección, para re-descubrimientos incrementales.
+
+WebTreeFetcher.discover() guarda al terminar, por cada página HTML visitada, su
+huella (ETag, Last-Modified, sha256 del cuerpo) y los enlaces que extrajo (a
+ficheros y de navegación), además de las URLs de fichero vistas. En la
+siguiente ejecución:
+
+  · cada página conocida se pide de forma condicional (If-None-Match /
+    If-Modified-Since). Un 304, o un 200 con el mismo hash, reutiliza los enlaces
+    guardados sin parsear;
+  · con poda por subárbol (`incremental_crawl=subtree`, el defecto) los hijos de
+    una página sin cambios ni siquiera se piden: se reproducen desde el estado.
+    Un portal sin cambios se re-descubre con una petición condicional (la raíz);
+  · con `incremental_crawl=pages` se pide cada página conocida (condicional) y
+    solo se poda el parseo; `off` ignora el estado.
+
+Como un cambio bajo una página sin cambios pasaría desapercibido con la poda,
+cada `full_crawl_every_days` (default 30) la ejecución usa el modo `pages`.
+
+Los enlaces guardados dependen de la raíz, de los selectores y del motor HTML
+con que se extrajeron: el estado lleva una huella (`key`) de todo ello y, si no
+coincide con la de la ejecución actual, se descarta y el crawl empieza de cero.
+
+El estado vive en un JSON por colección (el manager pasa la ruta en
+`_crawl_state_path`); el fetcher no toca BD.
+"""
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+MODES = ("subtree", "pages", "off")
+
+
+class CrawlState:
+    """Huellas de páginas y ficheros vistos de un crawl (lectura del anterior y
+    escritura del actual)."""
+
+    def __init__(self, pages: Optional[Dict[str, Dict[str, Any]]] = None,
+                 files: Iterable[str] = (), full_crawl_at: float = 0.0, key: str = ""):
+        self.pages: Dict[str, Dict[str, Any]] = pages or {}
+        self.files = set(files)
+        self.full_crawl_at = full_crawl_at
+        self.key = key
+
+    @staticmethod
+    def fingerprint(*parts: str) -> str:
+        """Huella de la configuración con que se extrajeron los enlaces."""
+        return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()[:16]
+
+    @classmethod
+    def load(cls, path: str, key: str = "") -> "CrawlState":
+        """Lee el estado de `path`; si falta, es ilegible o su huella no es
+        `key`, devuelve uno vacío (con esa huella)."""
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(key=key)
+        if (data.get("key") or "") != key:
+            return cls(key=key)
+        return cls(data.get("pages") or {}, data.get("files") or [], float(data.get("full_crawl_at") or 0), key)
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"key": self.key, "full_crawl_at": self.full_crawl_at, "files": sorted(self.files),
+                       "pages": self.pages}, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def page(self, url: str) -> Optional[Dict[str, Any]]:
+        return self.pages.get(url)
+
+    def needs_full_crawl(self, every_days: float) -> bool:
+        return not self.pages or time.time() - self.full_crawl_at > every_days * 86400
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    @staticmethod
+    def entry(response, sha256: str, files: List[List[str]], links: List[str]) -> Dict[str, Any]:
+        return {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "sha256": sha256,
+            "files": files,
+            "links": links,
+        }
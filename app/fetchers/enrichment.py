@@ -0,0 +1,223 @@
+"""
+Etapa de enriquecimiento listado → detalle, común a las especies HTML.
+
+Muchos recursos scrapean un listado y después visitan, fila a fila, la página de
+detalle enlazada (`detail_url_field`) para completar el registro. Esa segunda
+fase es la que domina el coste. `DetailEnricher`:
+
+  · pide los detalles con concurrencia acotada (`max_workers` en vuelo en total,
+    aunque varios pivotes enriquezcan a la vez) y un cubo de fichas por host
+    (`detail_delay` → 1/detail_delay páginas/s por host), además de la cortesía
+    429/503 de `_request`;
+  · deduplica las URLs de detalle entre filas y entre pivotes (también entre
+    hilos: si dos piden la misma a la vez, la segunda espera a la primera);
+  · con `detail_cache=true` guarda en disco los campos extraídos por URL con sus
+    validadores (ETag / Last-Modified / sha256). En la siguiente ejecución la
+    petición es condicional: un 304, o el mismo HTML, reutiliza los campos sin
+    parsear; con `detail_cache_max_age` (días) ni siquiera se pregunta mientras
+    la copia sea reciente.
+
+El directorio (ODM_DETAIL_CACHE_DIR, default data/detail_cache) se separa por
+huella de la configuración de extracción: cambiar los selectores invalida la
+caché. Los contadores salen en `DetailStats` (profile_stats["detail_enrichment"]).
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+from app.fetchers.concurrency import HostRateLimiter, map_bounded
+from app.fetchers.http_cache import wants_http_cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_ROOT = os.environ.get("ODM_DETAIL_CACHE_DIR", "data/detail_cache")
+
+# fetch(url, cabeceras_extra) → respuesta; extract(html) → campos del detalle
+Fetch = Callable[[str, Dict[str, str]], requests.Response]
+Extract = Callable[[str], Dict[str, Any]]
+
+
+class DetailStats:
+    """Contadores de una ejecución, thread-safe.
+
+    fresh        copia en disco reciente (max_age): sin petición.
+    revalidated  304 o mismo HTML que la copia: sin parsear.
+    fetched      detalle nuevo o cambiado: descargado y parseado.
+    deduped      filas servidas por una URL ya resuelta en esta ejecución.
+    errors       detalles que fallaron.
+    """
+
+    def __init__(self):
+        self.fresh = 0
+        self.revalidated = 0
+        self.fetched = 0
+        self.deduped = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, outcome: str, n: int = 1) -> None:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + n)
+
+    def hit_rate(self) -> float:
+        """Fracción de filas resueltas sin descargar y parsear su detalle."""
+        total = self.fresh + self.revalidated + self.fetched + self.deduped
+        return (total - self.fetched) / total if total else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"fresh": self.fresh, "revalidated": self.revalidated, "fetched": self.fetched,
+                "deduped": self.deduped, "errors": self.errors, "hit_rate": round(self.hit_rate(), 3)}
+
+    def summary(self) -> str:
+        return (f"{self.fetched} descargado(s), {self.revalidated} revalidado(s), "
+                f"{self.fresh} en caché, {self.deduped} repetido(s), {self.errors} error(es) "
+                f"— {self.hit_rate():.0%} sin descargar")
+
+
+class DetailEnricher:
+    """Enriquecimiento por página de detalle; una instancia por ejecución (se
+    comparte entre pivotes y trabajadores para deduplicar y limitar por host)."""
+
+    def __init__(self, extract: Extract, config: Any, url_field: str = "_detail_url",
+                 max_workers: int = 1, delay: float = 0.0, cache: bool = False,
+                 max_age_days: float = 0.0, stop_on_error: bool = False,
+                 root: Optional[str] = None):
+        self.extract = extract
+        self.url_field = url_field
+        self.max_workers = max(1, int(max_workers))
+        self.stop_on_error = stop_on_error
+        self.max_age = max_age_days * 86400
+        self._limiter = HostRateLimiter(1 / delay) if delay > 0 else None
+        # Cada trabajador de pivote llama a enrich() con su propio map_bounded: el
+        # semáforo compartido es el que acota las peticiones en vuelo a max_workers.
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        huella = hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode("utf-8"))
+        self.root = (os.path.join(root or CACHE_ROOT, huella.hexdigest()[:16]) if cache else None)
+        self.stats = DetailStats()
+        self._memo: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_params(cls, params: Dict[str, Any], extract: Extract, config: Any,
+                    max_workers: int = 1) -> "DetailEnricher":
+        """Configuración común de los recursos: detail_url_field (o row_link_field),
+        detail_delay (default 1.0; sin esperas en preview), detail_cache,
+        detail_cache_max_age y stop_on_error."""
+        preview = int(params.get("_preview_limit", 0) or 0)
+        return cls(
+            extract, config,
+            url_field=params.get("detail_url_field", params.get("row_link_field", "_detail_url")),
+            max_workers=max_workers,
+            delay=0.0 if preview else float(params.get("detail_delay", 1.0) or 0),
+            cache=wants_http_cache(params.get("detail_cache")),
+            max_age_days=float(params.get("detail_cache_max_age", 0) or 0),
+            stop_on_error=bool(params.get("stop_on_error", False)),
+        )
+
+    def enrich(self, records: List[Dict[str, Any]], fetch: Fetch) -> List[Dict[str, Any]]:
+        """Fusiona en cada registro los campos de su página de detalle (in situ).
+        `fetch` es la petición de la especie (su sesión, cabeceras y reintentos)."""
+        con_url = [r.get(self.url_field) for r in records if r.get(self.url_field)]
+        urls = list(dict.fromkeys(con_url))
+        self.stats.record("deduped", len(con_url) - len(urls))
+        resultados: Dict[str, Any] = {}
+        for url, fields in map_bounded(lambda u: self._resolve(u, fetch), urls, self.max_workers):
+            resultados[url] = fields
+        total = len(records)
+        for i, rec in enumerate(records):
+            fields = resultados.get(rec.get(self.url_field))
+            if isinstance(fields, Exception):
+                logger.error(f"[detalle {i + 1}/{total}] Error en {rec.get(self.url_field)}: {fields}")
+                if self.stop_on_error:
+                    raise fields
+            elif fields:
+                rec.update(fields)
+        return records
+
+    # ── Resolución de una URL ─────────────────────────────────────────────────
+
+    def _resolve(self, url: str, fetch: Fetch) -> Any:
+        """Campos del detalle de `url` (o la excepción); una sola resolución por
+        URL y ejecución, aunque la pidan varias filas o hilos."""
+        with self._lock:
+            future = self._memo.get(url)
+            owner = future is None
+            if owner:
+                future = self._memo[url] = Future()
+        if not owner:
+            self.stats.record("deduped")
+            return future.exception() or future.result()
+        try:
+            future.set_result(self._load(url, fetch))
+        except Exception as exc:
+            self.stats.record("errors")
+            future.set_exception(exc)
+            return exc
+        return future.result()
+
+    def _load(self, url: str, fetch: Fetch) -> Dict[str, Any]:
+        cached = self._read(url)
+        if cached and self.max_age and time.time() - cached.get("stored_at", 0) < self.max_age:
+            self.stats.record("fresh")
+            return cached["fields"]
+        headers = {}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+        with self._slots:
+            if self._limiter is not None:
+                self._limiter.acquire(url)
+            response = fetch(url, headers)
+        if response.status_code == 304 and cached:
+            self.stats.record("revalidated")
+            self._write(url, {**cached, "stored_at": time.time()})
+            return cached["fields"]
+        sha = hashlib.sha256(response.content).hexdigest()
+        if cached and cached.get("sha256") == sha:
+            self.stats.record("revalidated")
+            fields = cached["fields"]
+        else:
+            self.stats.record("fetched")
+            fields = self.extract(response.text)
+        self._write(url, {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "sha256": sha,
+            "fields": fields,
+            "stored_at": time.time(),
+        })
+        return fields
+
+    # ── Caché en disco ────────────────────────────────────────────────────────
+
+    def _path(self, url: str) -> str:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def _read(self, url: str) -> Optional[Dict[str, Any]]:
+        if self.root is None:
+            return None
+        try:
+            with open(self._path(url), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, url: str, entry: Dict[str, Any]) -> None:
+        if self.root is None:
+            return
+        path = self._path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False, default=str)
+        os.replace(tmp, path)
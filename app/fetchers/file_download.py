@@ -1,5 +1,9 @@
 """
 FileDownloadFetcher — Descarga un fichero desde una URL y convierte sus filas en registros.
+
+csv / tsv / jsonl se parsean en streaming sobre la propia respuesta HTTP: los
+lotes salen mientras se descarga y la memoria no depende del tamaño del fichero.
+El resto de formatos (xlsx, xls, pdf, json) necesitan el fichero completo.
 """
 
 import json
@@ -7,22 +11,26 @@ import logging
 from typing import Generator, List, Dict, Any
 
 from app.fetchers.base import BaseFetcher, RawData, ParsedData, DomainData
-from app.fetchers.file_parsers import infer_file_format, parse_structured_file
+from app.fetchers.file_parsers import (
+    STREAMING_FORMATS, infer_file_format, iter_structured_file, normalize_format, parse_structured_file,
+)
 
 logger = logging.getLogger(__name__)
 
 class FileDownloadFetcher(BaseFetcher):
+    single_source = True
+
     def stream(self) -> Generator[List[Dict[str, Any]], None, None]:
         url = self.params.get("url")
         if not url:
             raise ValueError("El parámetro 'url' es obligatorio para FileDownloadFetcher")
 
-        fmt = self.params.get("format", "").lower().strip()
+        fmt = normalize_format(self.params.get("format", ""))
         if not fmt:
             fmt = infer_file_format(url)
         if not fmt:
             raise ValueError(
-                "El parámetro 'format' es obligatorio. Valores válidos: pdf, xls, xlsx, csv, tsv"
+                "El parámetro 'format' es obligatorio. Valores válidos: pdf, xls, xlsx, csv, tsv, json, jsonl"
             )
 
         timeout = int(self.params.get("timeout", 60))
@@ -32,6 +40,10 @@ class FileDownloadFetcher(BaseFetcher):
         if isinstance(http_headers, str):
             http_headers = json.loads(http_headers)
 
+        if fmt in STREAMING_FORMATS and not self.params.get("custom_parser"):
+            yield from self._stream_rows(url, fmt, http_headers, timeout, batch_size)
+            return
+
         logger.info(f"[FileDownloadFetcher] Descargando {fmt.upper()}: {url}")
         response = self._request(None, "GET", url, headers=http_headers, timeout=timeout)
         response.raise_for_status()
@@ -45,6 +57,23 @@ class FileDownloadFetcher(BaseFetcher):
 
         logger.info(f"[FileDownloadFetcher] Stream completado: {total} registros")
 
+    def _stream_rows(self, url, fmt, http_headers, timeout, batch_size):
+        logger.info(f"[FileDownloadFetcher] Descargando {fmt.upper()} en streaming: {url}")
+        response = self._request(None, "GET", url, headers=http_headers, timeout=timeout, stream=True)
+        try:
+            response.raise_for_status()
+            size = response.headers.get("Content-Length")
+            if size:
+                logger.info(f"[FileDownloadFetcher] Tamaño anunciado — {int(size):,} bytes")
+            response.raw.decode_content = True   # gzip/deflate de transporte
+            total = 0
+            for batch in iter_structured_file(response.raw, fmt, self.params, batch_size):
+                total += len(batch)
+                yield batch
+        finally:
+            response.close()
+        logger.info(f"[FileDownloadFetcher] Stream completado: {total} registros")
+
     def fetch(self) -> RawData:
         records = []
         for chunk in self.stream():
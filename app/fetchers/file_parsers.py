@@ -3,18 +3,25 @@ Helpers compartidos para parsear ficheros descargados por distintos fetchers.
 
 Centraliza el soporte para formatos tabulares y PDF, además de una vía
 controlada de parser especializado para artefactos especialmente raros.
+
+Los formatos de texto por filas (csv, tsv, jsonl) tienen además una vía en
+streaming, `iter_structured_file`, que lee de un flujo de bytes (la respuesta
+HTTP o un fichero) por bloques y produce lotes de registros sin cargar el
+fichero ni la lista completa en memoria.
 """
 
 from __future__ import annotations
 
+import codecs
 import csv
 import html
 import importlib
 import io
+import itertools
 import json
 import logging
 import re
-from typing import Any, Callable, Dict, List, Optional
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional
 
 import pandas as pd
 import pdfplumber
@@ -34,6 +41,8 @@ _ACCENT_MAP = str.maketrans(
 )
 
 _EXT_TO_FORMAT = {
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
     ".csv": "csv",
     ".tsv": "tsv",
     ".txt": "tsv",
@@ -104,6 +113,13 @@ def _detect_delimiter(sample: str) -> str:
         return ";" if sample.count(";") >= sample.count(",") else ","
 
 
+# Formatos con vía en streaming (iter_structured_file) y sus alias en `format`.
+STREAMING_FORMATS = ("csv", "tsv", "jsonl")
+_FORMAT_ALIASES = {"json-lines": "jsonl", "jsonlines": "jsonl", "ndjson": "jsonl"}
+# Bloque inicial del que se deducen codificación y delimitador.
+_SNIFF_BYTES = 64 * 1024
+
+
 def infer_file_format(filename_or_url: str) -> str:
     lowered = (filename_or_url or "").lower()
     for ext, fmt in _EXT_TO_FORMAT.items():
@@ -112,6 +128,11 @@ def infer_file_format(filename_or_url: str) -> str:
     return ""
 
 
+def normalize_format(fmt: str) -> str:
+    fmt = (fmt or "").lower().strip()
+    return _FORMAT_ALIASES.get(fmt, fmt)
+
+
 def _parse_json_if_needed(value: Any, default: Any) -> Any:
     if value in (None, ""):
         return default
@@ -228,19 +249,19 @@ def _parse_json_records(content: bytes, params: Dict[str, Any]) -> List[Dict[str
     if not isinstance(data, list):
         return []
 
-    records: List[Dict[str, Any]] = []
-    for item in data:
-        if not isinstance(item, dict):
-            records.append({"valor": item})
-            continue
-        flat = {}
-        for k, v in item.items():
-            flat[_normalize_col(str(k))] = (
-                json.dumps(v, ensure_ascii=False) if isinstance(v, (dict, list))
-                else ("" if v is None else _clean(str(v)))
-            )
-        records.append(flat)
-    return records
+    return [_flat_record(item) for item in data]
+
+
+def _flat_record(item: Any) -> Dict[str, Any]:
+    if not isinstance(item, dict):
+        return {"valor": item}
+    return {
+        _normalize_col(str(k)): (
+            json.dumps(v, ensure_ascii=False) if isinstance(v, (dict, list))
+            else ("" if v is None else _clean(str(v)))
+        )
+        for k, v in item.items()
+    }
 
 
 def _is_utf8(content: bytes) -> bool:
@@ -253,14 +274,6 @@ def _is_utf8(content: bytes) -> bool:
 
 def _parse_csv_like(content: bytes, params: Dict[str, Any], delimiter: str = "") -> List[Dict[str, str]]:
     encoding = params.get("encoding", "utf-8-sig")
-    skip_rows = int(params.get("skip_rows", 0))
-
-    explicit_columns_raw = params.get("columns", "")
-    if explicit_columns_raw:
-        explicit_columns = _parse_json_if_needed(explicit_columns_raw, [])
-    else:
-        explicit_columns = []
-
     text = content.decode(encoding, errors="replace")
 
     if not delimiter:
@@ -269,7 +282,19 @@ def _parse_csv_like(content: bytes, params: Dict[str, Any], delimiter: str = "")
         sample = "\n".join(text.splitlines()[:5])
         delimiter = _detect_delimiter(sample)
 
-    reader = csv.reader(io.StringIO(text), delimiter=delimiter)
+    return list(_csv_records(io.StringIO(text), params, delimiter))
+
+
+def _csv_records(lines: Iterable[str], params: Dict[str, Any], delimiter: str) -> Iterator[Dict[str, str]]:
+    """Registros de un CSV ya decodificado (cualquier iterable de líneas)."""
+    skip_rows = int(params.get("skip_rows", 0))
+    explicit_columns_raw = params.get("columns", "")
+    if explicit_columns_raw:
+        explicit_columns = _parse_json_if_needed(explicit_columns_raw, [])
+    else:
+        explicit_columns = []
+
+    reader = csv.reader(lines, delimiter=delimiter)
     for _ in range(skip_rows):
         next(reader, None)
 
@@ -278,14 +303,106 @@ def _parse_csv_like(content: bytes, params: Dict[str, Any], delimiter: str = "")
     else:
         raw_header = next(reader, None)
         if not raw_header:
-            return []
+            return
         columns = [_normalize_col(c) for c in raw_header]
 
-    records: List[Dict[str, str]] = []
     for row in reader:
         padded = row + [""] * max(0, len(columns) - len(row))
-        records.append({col: _clean(padded[i]) for i, col in enumerate(columns)})
-    return records
+        yield {col: _clean(padded[i]) for i, col in enumerate(columns)}
+
+
+# ── Streaming (csv / tsv / jsonl) ─────────────────────────────────────────────
+
+class _Prefixed(io.RawIOBase):
+    """Flujo que devuelve primero `head` (el bloque ya leído para detectar
+    codificación y delimitador) y después el resto de `stream`."""
+
+    def __init__(self, head: bytes, stream: IO[bytes]):
+        self._head = memoryview(head)
+        self._stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if self._head:
+            n = min(len(b), len(self._head))
+            b[:n] = self._head[:n]
+            self._head = self._head[n:]
+            return n
+        data = self._stream.read(len(b))
+        n = len(data)
+        b[:n] = data
+        return n
+
+
+def _detect_encoding(head: bytes, params: Dict[str, Any], default: str) -> str:
+    """`encoding` si el recurso lo fija; si no, UTF-8 cuando el bloque inicial lo
+    es (tolerando un carácter multibyte cortado al final) y latin-1 si no."""
+    if params.get("encoding"):
+        return params["encoding"]
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return default
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def _iter_records(stream: IO[bytes], fmt: str, params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    head = stream.read(_SNIFF_BYTES) or b""
+    if fmt == "jsonl":
+        encoding = _detect_encoding(head, params, "utf-8-sig")
+        text = io.TextIOWrapper(io.BufferedReader(_Prefixed(head, stream)),
+                                encoding=encoding, errors="replace")
+        invalid = 0
+        for line in text:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                invalid += 1
+                continue
+            yield _flat_record(item)
+        if invalid:
+            logger.warning("[file_parsers] %s líneas JSON inválidas omitidas", invalid)
+        return
+
+    encoding = _detect_encoding(head, params, "utf-8-sig")
+    delimiter = "\t" if fmt == "tsv" else params.get("delimiter", "")
+    if not delimiter:
+        sample = head.decode(encoding, errors="replace")
+        delimiter = _detect_delimiter("\n".join(sample.splitlines()[:5]))
+    text = io.TextIOWrapper(io.BufferedReader(_Prefixed(head, stream)),
+                            encoding=encoding, errors="replace", newline="")
+    yield from _csv_records(text, params, delimiter)
+
+
+def iter_structured_file(
+    stream: IO[bytes],
+    fmt: str,
+    params: Optional[Dict[str, Any]] = None,
+    batch_size: int = 1000,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Parsea en streaming un csv/tsv/jsonl leído de `stream` (bytes) y produce
+    lotes de hasta `batch_size` registros. La memoria es la de un lote, no la del
+    fichero. Mismas reglas que parse_structured_file (skip_rows, columns,
+    delimiter, encoding); codificación y delimitador, si no se fijan, se deducen
+    del primer bloque.
+    """
+    params = params or {}
+    fmt = normalize_format(fmt)
+    if fmt not in STREAMING_FORMATS:
+        raise ValueError(f"Formato '{fmt}' sin vía en streaming. Valores: {', '.join(STREAMING_FORMATS)}")
+    records = _iter_records(stream, fmt, params)
+    size = max(1, int(batch_size))
+    while True:
+        batch = list(itertools.islice(records, size))
+        if not batch:
+            return
+        yield batch
 
 
 def parse_pdf_table(content: bytes, params: Dict[str, Any]) -> List[Dict[str, str]]:
@@ -343,7 +460,7 @@ def parse_structured_file(
     source_name: str = "",
 ) -> List[Dict[str, Any]]:
     params = params or {}
-    fmt = (fmt or "").lower().strip()
+    fmt = normalize_format(fmt)
     custom_parser = params.get("custom_parser")
 
     if custom_parser:
@@ -360,9 +477,11 @@ def parse_structured_file(
         return _parse_csv_like(content, params, delimiter="\t")
     if fmt == "json":
         return _parse_json_records(content, params)
+    if fmt == "jsonl":
+        return [r for batch in iter_structured_file(io.BytesIO(content), fmt, params) for r in batch]
     if fmt == "pdf":
         return parse_pdf_table(content, params)
 
     raise ValueError(
-        f"Formato '{fmt}' no soportado. Valores válidos: pdf, xls, xlsx, csv, tsv, json"
+        f"Formato '{fmt}' no soportado. Valores válidos: pdf, xls, xlsx, csv, tsv, json, jsonl"
     )
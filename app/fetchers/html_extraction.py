@@ -3,7 +3,7 @@
 El primo HTML de `extraction.py`: convierte un documento HTML en registros planos
 mediante selectores CSS. Unifica el dialecto de selección que hoy está duplicado y
 divergente entre las clases html / paginated_html / searchloop_html / url_loop_html.
-PURO y testeable (bs4 sobre una cadena HTML).
+PURO y testeable (sobre una cadena HTML).
 
 Estrategias:
   fields — un registro por fila (rows_selector) o uno por documento (sin él),
@@ -13,12 +13,33 @@ Estrategias:
              field_all_selectors      {campo: css}              → todos los matches, unidos
              field_label_selectors    {campo: {container, label}} → valor junto a una etiqueta
   table  — tabla HTML → registros (cabecera + celdas td).
+
+Motor de parseo (`html_parser`, por recurso):
+  html.parser — BeautifulSoup + soupsieve (defecto).
+  lxml        — árbol lxml y selectores CSS compilados a XPath: parsear y
+                seleccionar es un orden de magnitud más rápido. Cubre el
+                subconjunto de CSS que usan los recursos (tipo, `*`, `.clase`,
+                `#id`, `[attr]`, `[attr=|^=|$=|*=|~=|"|="valor]`, `:first-child`,
+                `:last-child`, `:nth-child(n)`, `:nth-of-type(n)`, combinadores
+                descendiente y `>`, grupos con `,`) con la misma semántica que
+                soupsieve. Si algún selector del recurso cae fuera, ese documento
+                se extrae con html.parser. El árbol puede diferir del de html.parser
+                en HTML mal formado (lxml cierra etiquetas como un navegador).
+`make_soup` aplica la elección a las especies que trabajan sobre BeautifulSoup
+(SearchLoop): con `lxml` usa el constructor de árbol de lxml, con los mismos
+selectores de soupsieve.
 """
 import json
+import logging
 import re
-from typing import Any, Dict, List
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
 from bs4 import BeautifulSoup
 
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("html.parser", "lxml")
+
 
 def _clean(s):
     return re.sub(r"\s+", " ", s).strip() if s else s
@@ -34,78 +55,388 @@ def _as_dict(v) -> Dict[str, Any]:
     return v or {}
 
 
-def _record_from(scope, params: Dict[str, Any]) -> Dict[str, Any]:
+def html_backend(params: Dict[str, Any]) -> str:
+    """Motor elegido por el recurso (`html_parser`), validado."""
+    backend = str(params.get("html_parser") or "html.parser").strip().lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"html_parser debe ser uno de {BACKENDS}, no '{backend}'")
+    return backend
+
+
+def make_soup(html: str, backend: Optional[str] = "html.parser") -> BeautifulSoup:
+    """BeautifulSoup del documento con el constructor de árbol del motor elegido."""
+    return BeautifulSoup(html or "", "lxml" if backend == "lxml" else "html.parser")
+
+
+# ── Motores ──────────────────────────────────────────────────────────────────────
+# Ambos exponen las mismas operaciones sobre nodos de su árbol, que es lo único
+# que usa `_record_from` / `_table`.
+
+class _SoupDom:
+    """BeautifulSoup + soupsieve."""
+
+    @staticmethod
+    def parse(html: str):
+        return BeautifulSoup(html or "", "html.parser")
+
+    @staticmethod
+    def select(scope, css: str) -> list:
+        return scope.select(css)
+
+    @staticmethod
+    def select_one(scope, css: str):
+        return scope.select_one(css)
+
+    @staticmethod
+    def text(el) -> Optional[str]:
+        return _text(el)
+
+    @staticmethod
+    def raw_text(el) -> str:
+        return el.get_text(strip=True)
+
+    @staticmethod
+    def attr(el, name: str):
+        return el.get(name) if hasattr(el, "get") else None
+
+    @staticmethod
+    def labels(scope) -> list:
+        return scope.find_all(["span", "strong", "b", "dt"])
+
+    @staticmethod
+    def next_sibling(el):
+        return el.find_next_sibling()
+
+
+class _LxmlDom:
+    """lxml.html + CSS compilado a XPath (ver `css_to_xpath`)."""
+
+    @staticmethod
+    def parse(html: str):
+        import lxml.html  # dependencia de zeep; import perezoso como el resto de motores
+        from lxml.etree import ParserError
+        if not (html or "").strip():
+            return None
+        try:
+            try:
+                return lxml.html.document_fromstring(html)
+            except ValueError:   # str con declaración de encoding: se parsea en bytes
+                return lxml.html.document_fromstring(html.encode("utf-8"))
+        except ParserError:
+            return None
+
+    @staticmethod
+    def select(scope, css: str) -> list:
+        # Desde la raíz del documento el propio <html> también cuenta (como soupsieve).
+        root = scope.getparent() is None
+        return _compiled(css, root)(scope)
+
+    @classmethod
+    def select_one(cls, scope, css: str):
+        found = cls.select(scope, css)
+        return found[0] if found else None
+
+    @classmethod
+    def text(cls, el) -> Optional[str]:
+        return _clean(cls.raw_text(el)) if el is not None else None
+
+    @staticmethod
+    def raw_text(el) -> str:
+        return "".join(s.strip() for s in _lxml_strings(el, top=True))
+
+    @staticmethod
+    def attr(el, name: str):
+        return el.get(name)
+
+    @staticmethod
+    def labels(scope) -> list:
+        return scope.xpath("descendant::*[self::span or self::strong or self::b or self::dt]")
+
+    @staticmethod
+    def next_sibling(el):
+        sib = el.getnext()
+        while sib is not None and not isinstance(sib.tag, str):   # comentarios, PIs
+            sib = sib.getnext()
+        return sib
+
+
+_NO_TEXT = ("script", "style", "template")
+
+
+def _lxml_strings(el, top: bool = False):
+    """Nodos de texto bajo `el` en orden de documento, como `get_text` de
+    BeautifulSoup: sin comentarios ni el contenido de script/style/template
+    anidados (el de `el` mismo sí cuenta)."""
+    if not isinstance(el.tag, str) or (not top and el.tag in _NO_TEXT):
+        return
+    if el.text:
+        yield el.text
+    for child in el:
+        yield from _lxml_strings(child)
+        if child.tail:
+            yield child.tail
+
+
+# ── CSS → XPath ──────────────────────────────────────────────────────────────────
+
+_TOKEN = re.compile(r"""
+    (?P<comb>\s*>\s*|\s+)
+  | (?P<type>\*|[a-zA-Z][\w-]*)
+  | \#(?P<id>[\w-]+)
+  | \.(?P<cls>[\w-]+)
+  | \[\s*(?P<attr>[\w-]+)\s*(?:(?P<op>[~|^$*]?=)\s*(?P<val>"[^"]*"|'[^']*'|[\w-]+)\s*)?\]
+  | :(?P<pseudo>first-child|last-child|nth-child|nth-of-type)(?:\(\s*(?P<n>\d+)\s*\))?
+""", re.VERBOSE)
+
+
+# coma de grupo: la que no queda dentro de un valor entre comillas
+_GROUP_SEP = re.compile(r""",(?=(?:[^"']*["'][^"']*["'])*[^"']*$)""")
+
+
+class UnsupportedSelector(ValueError):
+    """Selector fuera del subconjunto que el motor lxml traduce a XPath."""
+
+
+def _literal(value: str) -> str:
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    raise UnsupportedSelector(value)
+
+
+def _compound_predicates(tag: str, parts: List[tuple]) -> List[str]:
+    preds = []
+    for kind, a, op, val in parts:
+        if kind == "id":
+            preds.append(f"@id={_literal(a)}")
+        elif kind == "cls":
+            preds.append(f"contains(concat(' ', normalize-space(@class), ' '), {_literal(' ' + a + ' ')})")
+        elif kind == "attr":
+            attr = f"@{a.lower()}"
+            if op is None:
+                preds.append(attr)
+                continue
+            v = _literal(val)
+            if op == "=":
+                preds.append(f"{attr}={v}")
+            elif val == "":              # ^= $= *= ~= con valor vacío no casan nunca
+                preds.append("false()")
+            elif op == "^=":
+                preds.append(f"starts-with({attr}, {v})")
+            elif op == "$=":
+                preds.append(f"substring({attr}, string-length({attr}) - {len(val) - 1})={v}")
+            elif op == "*=":
+                preds.append(f"contains({attr}, {v})")
+            elif op == "~=":
+                if any(c.isspace() for c in val):
+                    preds.append("false()")
+                else:
+                    preds.append(f"contains(concat(' ', normalize-space({attr}), ' '), {_literal(' ' + val + ' ')})")
+            elif op == "|=":
+                preds.append(f"({attr}={v} or starts-with({attr}, {_literal(val + '-')}))")
+        elif kind == "pseudo":
+            if a == "first-child":
+                preds.append("not(preceding-sibling::*)")
+            elif a == "last-child":
+                preds.append("not(following-sibling::*)")
+            elif op is None:
+                raise UnsupportedSelector(f":{a} sin índice")
+            elif a == "nth-child":
+                preds.append(f"count(preceding-sibling::*)={int(op) - 1}")
+            else:
+                if tag == "*":
+                    raise UnsupportedSelector(f"*:{a}")
+                preds.append(f"count(preceding-sibling::{tag})={int(op) - 1}")
+    return preds
+
+
+def _compound_xpath(tag: str, parts: List[tuple]) -> str:
+    return tag + "".join(f"[{p}]" for p in _compound_predicates(tag, parts))
+
+
+def _selector_xpath(selector: str, include_self: bool) -> str:
+    """Un selector sin comas. Se evalúa de derecha a izquierda, como CSS: el último
+    compuesto elige los candidatos (descendientes del ámbito) y los anteriores se
+    comprueban sobre sus ancestros/padres en todo el documento, no solo dentro
+    del ámbito (igual que soupsieve)."""
+    compounds: List[tuple] = []   # (combinador previo, tag, partes)
+    tag, parts, comb = None, [], None
+    pos = 0
+    selector = selector.strip()
+    while pos < len(selector):
+        m = _TOKEN.match(selector, pos)
+        if not m or m.end() == pos:
+            raise UnsupportedSelector(selector)
+        pos = m.end()
+        if m.group("comb") is not None:
+            if tag is None and not parts:
+                raise UnsupportedSelector(selector)
+            compounds.append((comb, tag or "*", parts))
+            tag, parts = None, []
+            comb = ">" if ">" in m.group("comb") else " "
+        elif m.group("type"):
+            if tag is not None or parts:
+                raise UnsupportedSelector(selector)
+            tag = m.group("type").lower()
+        elif m.group("id"):
+            parts.append(("id", m.group("id"), None, None))
+        elif m.group("cls"):
+            parts.append(("cls", m.group("cls"), None, None))
+        elif m.group("attr"):
+            val = m.group("val")
+            if val is not None and val[:1] in "\"'":
+                val = val[1:-1]
+            parts.append(("attr", m.group("attr"), m.group("op"), val))
+        else:
+            parts.append(("pseudo", m.group("pseudo"), m.group("n"), None))
+    if tag is None and not parts:
+        raise UnsupportedSelector(selector)
+    compounds.append((comb, tag or "*", parts))
+
+    # Cada compuesto anterior se comprueba como ancestro (o padre) del siguiente:
+    # `A > B C` → descendant::C[ancestor::B[parent::A]].
+    xpath = ""
+    for i in range(1, len(compounds)):
+        _, prev_tag, prev_parts = compounds[i - 1]
+        axis = "parent" if compounds[i][0] == ">" else "ancestor"
+        xpath = f"{axis}::{_compound_xpath(prev_tag, prev_parts)}" + (f"[{xpath}]" if xpath else "")
+    _, last_tag, last_parts = compounds[-1]
+    step = _compound_xpath(last_tag, last_parts)
+    axis = "descendant-or-self" if include_self else "descendant"
+    return f"{axis}::{step}" + (f"[{xpath}]" if xpath else "")
+
+
+def css_to_xpath(css: str, include_self: bool = False) -> str:
+    """XPath equivalente a `scope.select(css)` (UnsupportedSelector si el
+    selector queda fuera del subconjunto)."""
+    groups = _GROUP_SEP.split(css)
+    if any(not g.strip() for g in groups):
+        raise UnsupportedSelector(css)
+    return " | ".join(_selector_xpath(g, include_self) for g in groups)
+
+
+@lru_cache(maxsize=512)
+def _compiled(css: str, include_self: bool):
+    from lxml.etree import XPath
+    return XPath(css_to_xpath(css, include_self))
+
+
+@lru_cache(maxsize=512)
+def supports_css(css: str) -> bool:
+    if not isinstance(css, str):
+        return False
+    try:
+        css_to_xpath(css)
+        return True
+    except UnsupportedSelector:
+        return False
+
+
+def _selectors_of(nombre: str, params: Dict[str, Any]) -> List[str]:
+    """Todos los selectores CSS que usará la extracción `nombre` con `params`."""
+    if nombre == "table":
+        return [params.get("rows_selector", "table tr"), "th", "td"]
+    sels = [params.get("rows_selector")] if params.get("rows_selector") else []
+    sels += list(_as_dict(params.get("field_selectors")).values())
+    sels += [c.get("selector", "") for c in _as_dict(params.get("field_attr_selectors")).values()]
+    sels += list(_as_dict(params.get("field_all_selectors")).values())
+    sels += list(_as_dict(params.get("field_all_text")).values())
+    sels += [c.get("container", "body") for c in _as_dict(params.get("field_label_selectors")).values()]
+    return sels
+
+
+def _dom_for(nombre: str, params: Dict[str, Any]):
+    if html_backend(params) == "lxml":
+        unsupported = [s for s in _selectors_of(nombre, params) if not supports_css(s)]
+        if not unsupported:
+            return _LxmlDom
+        logger.debug("html_parser=lxml: selectores fuera del subconjunto %s; se usa html.parser", unsupported)
+    return _SoupDom
+
+
+# ── Extracción ───────────────────────────────────────────────────────────────────
+
+def _record_from(scope, params: Dict[str, Any], dom=_SoupDom) -> Dict[str, Any]:
     """Extrae un registro de un ámbito (una fila o el documento entero)."""
     rec: Dict[str, Any] = {}
     sep = params.get("field_all_separator", " | ")
 
     for field, sel in _as_dict(params.get("field_selectors")).items():
-        rec[field] = _text(scope.select_one(sel))
+        rec[field] = dom.text(dom.select_one(scope, sel))
 
     for field, cfg in _as_dict(params.get("field_attr_selectors")).items():
-        el = scope.select_one(cfg.get("selector", ""))
-        rec[field] = el.get(cfg.get("attr", "href")) if el else None
+        el = dom.select_one(scope, cfg.get("selector", ""))
+        rec[field] = dom.attr(el, cfg.get("attr", "href")) if el is not None else None
 
     for field, sel in _as_dict(params.get("field_all_selectors")).items():
-        els = scope.select(sel)
-        rec[field] = sep.join(_text(e) for e in els) if els else None
+        els = dom.select(scope, sel)
+        rec[field] = sep.join(dom.text(e) for e in els) if els else None
 
     # alias de field_all_selectors usado por url_loop
     for field, sel in _as_dict(params.get("field_all_text")).items():
-        els = scope.select(sel)
-        rec[field] = sep.join(_text(e) for e in els) if els else None
+        els = dom.select(scope, sel)
+        rec[field] = sep.join(dom.text(e) for e in els) if els else None
 
     # atributo en el propio elemento de la fila/ámbito (p. ej. data-id) — url_loop
     for field, attr in _as_dict(params.get("field_attrs")).items():
-        rec[field] = scope.get(attr) if hasattr(scope, "get") else None
+        rec[field] = dom.attr(scope, attr)
 
     # texto del propio elemento-fila (cuando la fila ES el dato, p. ej.
     # rows_selector="table td a": el nombre es el texto del enlace)
     self_field = params.get("field_self_text")
     if self_field:
-        rec[str(self_field)] = _text(scope)
+        rec[str(self_field)] = dom.text(scope)
 
     for field, cfg in _as_dict(params.get("field_label_selectors")).items():
-        container = scope.select_one(cfg.get("container", "body")) or scope
+        container = dom.select_one(scope, cfg.get("container", "body"))
+        if container is None:
+            container = scope
         label = (cfg.get("label", "") or "").lower()
         rec[field] = None
-        for sp in container.find_all(["span", "strong", "b", "dt"]):
-            if label in sp.get_text(strip=True).lower():
-                sib = sp.find_next_sibling()
-                rec[field] = _text(sib) if sib else None
+        for sp in dom.labels(container):
+            if label in dom.raw_text(sp).lower():
+                sib = dom.next_sibling(sp)
+                rec[field] = dom.text(sib) if sib is not None else None
                 break
     return rec
 
 
 def _fields(html: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-    soup = BeautifulSoup(html or "", "html.parser")
+    dom = _dom_for("fields", params)
+    soup = dom.parse(html)
     rows_selector = params.get("rows_selector")
+    if soup is None:   # documento vacío (lxml)
+        return [] if rows_selector else [_record_from(_SoupDom.parse(""), params)]
     if rows_selector:
-        return [_record_from(r, params) for r in soup.select(rows_selector)]
-    return [_record_from(soup, params)]
+        return [_record_from(r, params, dom) for r in dom.select(soup, rows_selector)]
+    return [_record_from(soup, params, dom)]
 
 
 def _table(html: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-    soup = BeautifulSoup(html or "", "html.parser")
-    rows = soup.select(params.get("rows_selector", "table tr"))
+    dom = _dom_for("table", params)
+    soup = dom.parse(html)
+    if soup is None:
+        return []
+    rows = dom.select(soup, params.get("rows_selector", "table tr"))
     if not rows:
         return []
     if params.get("has_header", True):
-        headers = [_text(c) for c in (rows[0].select("th") or rows[0].select("td"))]
+        headers = [dom.text(c) for c in (dom.select(rows[0], "th") or dom.select(rows[0], "td"))]
         start = 1
     else:
         headers = None
         start = 0
     out = []
     for row in rows[start:]:
-        cells = row.select("td")
+        cells = dom.select(row, "td")
         if not cells:
             continue
         if headers:
-            rec = {(headers[i] if i < len(headers) and headers[i] else f"col{i}"): _text(c)
+            rec = {(headers[i] if i < len(headers) and headers[i] else f"col{i}"): dom.text(c)
                    for i, c in enumerate(cells)}
         else:
-            rec = {f"col{i}": _text(c) for i, c in enumerate(cells)}
+            rec = {f"col{i}": dom.text(c) for i, c in enumerate(cells)}
         out.append(rec)
     return out
 
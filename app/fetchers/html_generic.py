@@ -11,14 +11,16 @@ Struts2 con sesión, paginación y enriquecimiento por página de detalle; deleg
 en searchloop_html). El árbol de directorios queda como especie propia
 (web_tree): es una tecnología de descubrimiento genuinamente distinta.
 """
+import json
 import os
 import time
 import logging
-import requests
+from urllib.parse import urljoin
 from bs4 import BeautifulSoup
 from app.fetchers.base import BaseFetcher, RawData, ParsedData, DomainData
-from app.fetchers import navigation as nav
-from app.fetchers.html_extraction import extract_html
+from app.fetchers import http_client, navigation as nav
+from app.fetchers.enrichment import DetailEnricher
+from app.fetchers.html_extraction import extract_html, html_backend, make_soup
 from app.fetchers.request_building import build_request
 
 logger = logging.getLogger(__name__)
@@ -29,16 +31,21 @@ class HTMLFetcher(BaseFetcher):
         mode = (self.params.get("navigation") or "single").lower()
         if mode == "searchloop":
             from app.fetchers.searchloop_html import SearchLoopHtmlFetcher
-            return SearchLoopHtmlFetcher(self.params).fetch()
+            inner = SearchLoopHtmlFetcher(self.params)
+            records = inner.fetch()
+            self.profile_stats.update(inner.profile_stats)
+            return records
         if mode == "form_pivot":
-            return self._form_pivot()
-        if mode == "form_paged":
-            return self._form_paged()
-        if mode == "pivot":
-            return self._over_pivots(self._pivots())
-        if mode == "paged":
-            return self._over_pivots([None])
-        return self._extract(self._get(self.params["url"]))
+            records = self._form_pivot()
+        elif mode == "form_paged":
+            records = self._form_paged()
+        elif mode == "pivot":
+            records = self._over_pivots(self._pivots())
+        elif mode == "paged":
+            records = self._over_pivots([None])
+        else:
+            records = self._extract(self._get(self.params["url"]), self.params["url"])
+        return self._with_details(records)
 
     def parse(self, raw: RawData) -> ParsedData:
         return raw
@@ -50,7 +57,6 @@ class HTMLFetcher(BaseFetcher):
     def _headers(self):
         h = self.params.get("headers", {})
         if isinstance(h, str):
-            import json
             h = json.loads(h) if h.strip() else {}
         return {"User-Agent": "Mozilla/5.0 (ODM HTMLFetcher)", **h}
 
@@ -66,14 +72,52 @@ class HTMLFetcher(BaseFetcher):
         resp.raise_for_status()
         return resp.text
 
-    def _extract(self, html):
-        return extract_html(self.params.get("extraction", "fields"), html, self.params)
+    def _with_details(self, records):
+        """Enriquecimiento opcional por página de detalle: con `detail_level`
+        (mismos selectores que la extracción `fields`) se visita la URL de cada
+        registro (`detail_url_field`, def. `_detail_url`; `_extract` ya la resolvió
+        contra la página de la que salió) y se fusionan sus campos. Ver
+        app/fetchers/enrichment.py."""
+        cfg = self._detail_config()
+        if not cfg:
+            return records
+        detail_params = {"html_parser": self.params.get("html_parser"), **cfg}
+        enricher = DetailEnricher.from_params(
+            self.params, lambda html: (extract_html("fields", html, detail_params) or [{}])[0], cfg,
+            max_workers=self.max_concurrent_requests)
+        filas = [r for r in records if isinstance(r, dict)]
+        enricher.enrich(filas, self._get_detail)
+        self.profile_stats["detail_enrichment"] = enricher.stats.as_dict()
+        logger.info(f"Detalle: {enricher.stats.summary()}")
+        return records
+
+    def _get_detail(self, url, headers):
+        return self._request(None, "GET", url, headers={**self._headers(), **headers},
+                             timeout=int(self.params.get("timeout", 30)))
+
+    def _detail_config(self):
+        cfg = self.params.get("detail_level")
+        if isinstance(cfg, str):
+            cfg = json.loads(cfg) if cfg.strip() else {}
+        return cfg or {}
+
+    def _extract(self, html, page_url=None):
+        """Registros de una página; con `detail_level`, el enlace al detalle de
+        cada uno queda absoluto respecto a `page_url` (la URL pedida, no la
+        plantilla: `url_template` aún lleva sus {value}/{page})."""
+        records = extract_html(self.params.get("extraction", "fields"), html, self.params)
+        if page_url and self._detail_config():
+            field = self.params.get("detail_url_field", self.params.get("row_link_field", "_detail_url"))
+            for r in records:
+                if isinstance(r, dict) and r.get(field):
+                    r[field] = urljoin(page_url, r[field])
+        return records
 
     def _pivots(self):
         q = self.params.get("pivot_source_resource") or self.params.get("pivot_source_odmgr_query")
         if q:
             from app.fetchers.pivot_sources import pivots_from_odmgr
-            return pivots_from_odmgr(self.params)
+            return pivots_from_odmgr(self.params, session=self.http)
         return nav.pivot_values(self.params)
 
     def _over_pivots(self, pivots):
@@ -92,7 +136,7 @@ class HTMLFetcher(BaseFetcher):
             visited = 0
             while url and visited < max_pages:
                 html = self._get(url, pivot=value)
-                batch = self._extract(html)
+                batch = self._extract(html, url)
                 pf = self.params.get("pivot_field")
                 if pf and value is not None:
                     for _r in batch:
@@ -104,7 +148,8 @@ class HTMLFetcher(BaseFetcher):
                     return all_records[:preview] if preview else all_records
                 nxt = None
                 if next_sel:
-                    nxt = nav.next_link(html, next_sel, attr=next_attr, base_url=url)
+                    nxt = nav.next_link(make_soup(html, html_backend(self.params)), next_sel,
+                                        attr=next_attr, base_url=url)
                     if nxt == url:
                         nxt = None
                 elif paged_template and batch:
@@ -135,7 +180,7 @@ class HTMLFetcher(BaseFetcher):
                                  headers=self._headers(), data=rq["data"],
                                  timeout=int(self.params.get("timeout", 30)))
             resp.raise_for_status()
-            all_records.extend(self._extract(resp.text))
+            all_records.extend(self._extract(resp.text, getattr(resp, "url", None) or target))
             d = float(self.params.get("delay", 0) or 0)
             if d:
                 time.sleep(d)
@@ -147,9 +192,9 @@ class HTMLFetcher(BaseFetcher):
         Fiel al antiguo PaginatedHtmlFetcher pagination_type=form: primera petición
         con el método configurado; después, POST del formulario de paginación con
         page_param incrementado hasta agotar formulario, páginas vacías o max_pages."""
-        import requests as _rq
         url = self.params["url"]
-        session = _rq.Session()
+        # Sesión propia (cookies del formulario) sobre el pool compartido.
+        session = http_client.session()
         method = (self.params.get("method", "GET") or "GET").upper()
         timeout = int(self.params.get("timeout", 30))
         max_pages = int(self.params.get("max_pages", 500))
@@ -165,7 +210,7 @@ class HTMLFetcher(BaseFetcher):
         all_records = []
         page = 1
         while True:
-            batch = self._extract(resp.text)
+            batch = self._extract(resp.text, getattr(resp, "url", None) or url)
             all_records.extend(batch)
             if preview and len(all_records) >= preview:
                 return all_records[:preview]
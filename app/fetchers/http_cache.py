@@ -0,0 +1,366 @@
+"""
+Caché HTTP en disco con peticiones condicionales (opt-in por recurso: `http_cache=true`).
+
+Muchas fuentes programadas (CSV municipales, PDFs, páginas ATOM) devuelven
+exactamente lo mismo ejecución tras ejecución. Con la caché activa,
+BaseSpecies._request:
+
+  · envía `If-None-Match` / `If-Modified-Since` con los validadores guardados
+    (ETag / Last-Modified) de la última respuesta a la misma petición;
+  · ante un 304 reproduce el cuerpo guardado como si fuera un 200 (la especie
+    no nota nada) y cuenta los bytes que no hubo que descargar;
+  · ante un 200 compara el hash del cuerpo con el guardado: mismo contenido
+    cuenta como "sin cambios" aunque el servidor no soporte validadores.
+
+La caché es de cada recurso (el manager pasa su id en `_resource_id`): clave =
+recurso + método + URL final (con query) + cuerpo de la petición. Cada entrada son
+dos ficheros bajo ODM_HTTP_CACHE_DIR (default: data/http_cache):
+
+    {recurso}/{clave[:2]}/{clave}.json   validadores, sha256, tamaño, cabeceras
+                                         y Dataset construido con ese cuerpo
+    {recurso}/{clave[:2]}/{clave}.body   cuerpo (descomprimido)
+
+Las catas (`_preview_limit`) y los descubrimientos (`_discover_mode`) no usan
+la caché: ni envían validadores ni guardan nada.
+
+"Sin cambios" solo vale si la copia guardada es con la que se construyó la
+última versión del Dataset del recurso (`_latest_dataset_id`; el manager anota
+la versión nueva con `mark_built`, que además borra las entradas del recurso que
+esa ejecución no pidió: páginas o pivotes que ya no existen, URLs con fechas…).
+Al borrar el recurso definitivamente se borra su directorio (`remove_scope`). Si todas las respuestas de una ejecución
+llegan así, el manager la cierra sin crear versión nueva. Las especies de un
+solo documento (`single_source`) ni siquiera lo parsean: la primera respuesta
+sin cambios lanza `SourceUnchanged`.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+CACHE_ROOT = os.environ.get("ODM_HTTP_CACHE_DIR", "data/http_cache")
+
+# Cabeceras de la respuesta original que se guardan para reproducirla.
+_KEEP_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Content-Disposition")
+
+
+class SourceUnchanged(Exception):
+    """La fuente no ha cambiado desde la última ejecución (304 o mismo hash)."""
+
+
+def remove_scope(scope: str, root: Optional[str] = None) -> None:
+    """Borra la caché entera de un recurso (al eliminarlo definitivamente)."""
+    if scope:
+        shutil.rmtree(os.path.join(root or CACHE_ROOT, scope), ignore_errors=True)
+
+
+def wants_http_cache(value: Any) -> bool:
+    return str(value or "").strip().lower() in ("1", "true", "yes", "si", "sí")
+
+
+def cache_key(method: str, url: str, scope: str = "", **kwargs) -> Optional[str]:
+    """Clave de la petición dentro de `scope` (el recurso), o None si no es
+    cacheable (subida de ficheros)."""
+    if kwargs.get("files"):
+        return None
+    prepared = requests.Request(method.upper(), url, params=kwargs.get("params"),
+                                data=kwargs.get("data"), json=kwargs.get("json")).prepare()
+    body = prepared.body or b""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    h = hashlib.sha256(f"{scope}\n{prepared.method} {prepared.url}\n".encode("utf-8"))
+    h.update(body)
+    return h.hexdigest()
+
+
+class CacheStats:
+    """Contadores de una ejecución, thread-safe.
+
+    hits       304: el cuerpo sale de la caché sin descargarlo.
+    unchanged  200 con el mismo contenido que la copia guardada.
+    misses     sin copia previa o contenido distinto.
+    unbuilt    hits o unchanged cuya copia no es la de la última versión del
+               Dataset (p. ej. la primera ejecución real tras una cata).
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.unchanged = 0
+        self.misses = 0
+        self.unbuilt = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+
+    def record(self, outcome: str, bytes_saved: int = 0, built: bool = True) -> None:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self.bytes_saved += bytes_saved
+            if outcome != "misses" and not built:
+                self.unbuilt += 1
+
+    @property
+    def requests(self) -> int:
+        return self.hits + self.unchanged + self.misses
+
+    def run_unchanged(self) -> bool:
+        """True si hubo peticiones cacheadas y todas trajeron el contenido con
+        que se construyó la última versión del Dataset."""
+        return self.requests > 0 and self.misses == 0 and self.unbuilt == 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"hits": self.hits, "unchanged": self.unchanged, "misses": self.misses,
+                "unbuilt": self.unbuilt, "bytes_saved": self.bytes_saved}
+
+    def summary(self) -> str:
+        return (f"{self.hits} hit(s) 304, {self.unchanged} sin cambios, {self.misses} miss(es), "
+                f"{self.unbuilt} sin versión, {self.bytes_saved / 1e6:.1f} MB ahorrados")
+
+
+class HttpCache:
+    """Caché de respuestas de un recurso (`scope`) sobre el directorio común.
+    `dataset_id` es la última versión del Dataset del recurso: solo las copias
+    anotadas con ella cuentan como "sin cambios"."""
+
+    def __init__(self, root: Optional[str] = None, scope: str = "", dataset_id: str = ""):
+        self.scope = scope
+        self.root = os.path.join(root or CACHE_ROOT, scope or "_")
+        self.dataset_id = dataset_id
+        self.stats = CacheStats()
+        self._seen = set()            # claves servidas en esta ejecución
+        self._seen_lock = threading.Lock()
+
+    def _paths(self, key: str):
+        base = os.path.join(self.root, key[:2], key)
+        return f"{base}.json", f"{base}.body"
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta if os.path.exists(body_path) else None
+
+    @staticmethod
+    def conditional_headers(meta: Dict[str, Any]) -> Dict[str, str]:
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def built(self, meta: Optional[Dict[str, Any]]) -> bool:
+        """True si la copia `meta` es con la que se construyó la última versión."""
+        return bool(self.dataset_id and meta and meta.get("dataset_id") == self.dataset_id)
+
+    def mark_built(self, dataset_id: str) -> None:
+        """Anota que la versión `dataset_id` se construyó con las respuestas de
+        esta ejecución (el manager la llama al crear el Dataset) y borra las
+        entradas que no pidió: no se usaron para esta versión."""
+        with self._seen_lock:
+            keys = set(self._seen)
+        for key in sorted(keys):
+            meta = self.lookup(key)
+            if meta is not None:
+                self._write_meta(key, {**meta, "dataset_id": dataset_id})
+        self.dataset_id = dataset_id
+        self._prune(keep=keys)
+
+    def _prune(self, keep) -> None:
+        try:
+            subdirs = [e.path for e in os.scandir(self.root) if e.is_dir()]
+        except OSError:
+            return
+        for subdir in subdirs:
+            for entry in os.scandir(subdir):
+                key, ext = os.path.splitext(entry.name)
+                if ext in (".json", ".body") and key not in keep:
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+
+    def _mark_seen(self, key: str) -> None:
+        with self._seen_lock:
+            self._seen.add(key)
+
+    def store(self, key: str, response: requests.Response, body_file: str, sha256: str, size: int,
+              dataset_id: Optional[str] = None) -> None:
+        """Guarda la entrada; `body_file` (temporal, ya escrito) se mueve a su sitio."""
+        meta_path, body_path = self._paths(key)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        os.replace(body_file, body_path)
+        meta = {
+            "url": response.url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "sha256": sha256,
+            "size": size,
+            "headers": {h: response.headers[h] for h in _KEEP_HEADERS if h in response.headers},
+            "stored_at": time.time(),
+            "dataset_id": dataset_id,
+        }
+        self._write_meta(key, meta)
+
+    def _write_meta(self, key: str, meta: Dict[str, Any]) -> None:
+        meta_path, _ = self._paths(key)
+        tmp = f"{meta_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, meta_path)
+
+    def _tempfile(self) -> tempfile._TemporaryFileWrapper:
+        os.makedirs(self.root, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=self.root, prefix="odm_body_", delete=False)
+
+    # ── Respuestas ────────────────────────────────────────────────────────────
+
+    def replay(self, key: str, meta: Dict[str, Any], response: requests.Response,
+               stream: bool) -> requests.Response:
+        """Convierte el 304 `response` en un 200 con el cuerpo guardado."""
+        response.close()
+        _, body_path = self._paths(key)
+        cached = requests.Response()
+        cached.status_code = 200
+        cached.reason = "OK (cache)"
+        cached.url = response.url
+        cached.request = response.request
+        cached.connection = response.connection
+        cached.elapsed = response.elapsed
+        cached.headers = CaseInsensitiveDict(meta.get("headers") or {})
+        cached.headers["Content-Length"] = str(meta["size"])
+        cached.headers["X-ODM-Cache"] = "hit"
+        cached.encoding = requests.utils.get_encoding_from_headers(cached.headers)
+        if stream:
+            cached.raw = _FileRaw(open(body_path, "rb"))
+        else:
+            with open(body_path, "rb") as f:
+                cached._content = f.read()
+            cached._content_consumed = True
+        self.stats.record("hits", int(meta["size"]), built=self.built(meta))
+        self._mark_seen(key)
+        return cached
+
+    def observe(self, key: str, meta: Optional[Dict[str, Any]], response: requests.Response,
+                stream: bool) -> bool:
+        """Anota un 200 nuevo. Sin stream compara y guarda ya y devuelve True si
+        el contenido es el mismo de la copia guardada y esa copia es la de la
+        última versión del Dataset. Con stream el cuerpo se
+        hashea y guarda según la especie lo lee (al llegar al final); devuelve False."""
+        if stream:
+            response.raw = _TeeRaw(response.raw, self, key, meta, response)
+            return False
+        body = response.content or b""
+        sha = hashlib.sha256(body).hexdigest()
+        return self._settle(key, meta, response, sha, len(body), body=body)
+
+    def _settle(self, key, meta, response, sha256: str, size: int,
+                body: Optional[bytes] = None, body_file: Optional[str] = None) -> bool:
+        same = bool(meta and meta.get("sha256") == sha256)
+        built = same and self.built(meta)
+        self.stats.record("unchanged" if same else "misses", built=built)
+        if body_file is None:
+            with self._tempfile() as f:
+                f.write(body)
+            body_file = f.name
+        # mismo cuerpo: sigue siendo el de la versión con que se construyó
+        self.store(key, response, body_file, sha256, size,
+                   dataset_id=meta.get("dataset_id") if same else None)
+        self._mark_seen(key)
+        return built
+
+
+class _FileRaw:
+    """Cuerpo cacheado con la interfaz mínima de urllib3.HTTPResponse que usan
+    las especies (read, stream, decode_content, close)."""
+
+    decode_content = True
+
+    def __init__(self, fileobj):
+        self._f = fileobj
+
+    def read(self, amt=None, decode_content=None, **kwargs):
+        return self._f.read(-1 if amt is None else amt)
+
+    def stream(self, amt=2 ** 16, decode_content=None):
+        while True:
+            data = self._f.read(amt or 2 ** 16)
+            if not data:
+                break
+            yield data
+
+    def readable(self):
+        return True
+
+    def close(self):
+        self._f.close()
+
+    @property
+    def closed(self):
+        return self._f.closed
+
+
+class _TeeRaw(_FileRaw):
+    """Envuelve el cuerpo de una respuesta en streaming: lo que lee la especie
+    (siempre descomprimido) se hashea y se copia a un temporal, que pasa a la
+    caché solo si se llega al final del cuerpo."""
+
+    def __init__(self, raw, cache: HttpCache, key: str, meta, response):
+        self._raw = raw
+        self._cache, self._key, self._meta, self._response = cache, key, meta, response
+        self._sha = hashlib.sha256()
+        self._size = 0
+        self._tmp = cache._tempfile()
+        self._done = False
+
+    def read(self, amt=None, decode_content=None, **kwargs):
+        data = self._raw.read(amt, decode_content=True)
+        self._feed(data, amt)
+        return data
+
+    def stream(self, amt=2 ** 16, decode_content=None):
+        while True:
+            data = self.read(amt or 2 ** 16)
+            if not data:
+                break
+            yield data
+
+    def _feed(self, data: bytes, amt) -> None:
+        if self._done:
+            return
+        if data:
+            self._sha.update(data)
+            self._size += len(data)
+            self._tmp.write(data)
+        if not data or amt is None:
+            self._done = True
+            self._tmp.close()
+            self._cache._settle(self._key, self._meta, self._response,
+                                self._sha.hexdigest(), self._size, body_file=self._tmp.name)
+
+    def close(self):
+        if not self._done:   # lectura incompleta: no se cachea
+            self._done = True
+            self._tmp.close()
+            try:
+                os.remove(self._tmp.name)
+            except OSError:
+                pass
+        self._raw.close()
+
+    @property
+    def closed(self):
+        return self._raw.closed
+
+    def release_conn(self):
+        release = getattr(self._raw, "release_conn", None)
+        if release is not None:
+            release()
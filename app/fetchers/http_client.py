@@ -0,0 +1,289 @@
+"""
+Capa HTTP compartida por todas las especies.
+
+Un único pool de conexiones por proceso (urllib3 vía un HTTPAdapter compartido):
+conexiones keep-alive por host que sobreviven entre peticiones, páginas,
+hilos y ejecuciones, de modo que una API paginada pagina sin repetir el
+handshake TCP+TLS en cada petición. Cada especie recibe su propia
+`requests.Session` (cookies y cabeceras aisladas entre recursos) montada sobre
+ese pool; BaseSpecies la expone como `self.http`.
+
+Además:
+  · caché DNS con TTL (getaddrinfo una vez por host y TTL, no por conexión),
+  · HTTP/2 opcional (experimental en urllib3; requiere el paquete `h2`),
+  · instrumentación por host: peticiones, códigos, bytes e histograma de
+    latencias, global (`stats()`) y por sesión (`session.stats`).
+
+Configuración por entorno (o `configure()` antes de la primera petición):
+    ODM_HTTP_POOL_HOSTS    hosts con pool abierto a la vez    (default: 32)
+    ODM_HTTP_POOL_MAXSIZE  conexiones keep-alive por host     (default: 16)
+    ODM_HTTP_DNS_TTL       segundos de caché DNS; 0 = sin caché (default: 300)
+    ODM_HTTP2              true para activar HTTP/2 si hay `h2` (default: false)
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores (ms) de las cubetas del histograma de latencias.
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_config: Dict[str, Any] = {
+    "pool_hosts": int(os.environ.get("ODM_HTTP_POOL_HOSTS", "32")),
+    "pool_maxsize": int(os.environ.get("ODM_HTTP_POOL_MAXSIZE", "16")),
+    "dns_ttl": float(os.environ.get("ODM_HTTP_DNS_TTL", "300")),
+    "http2": os.environ.get("ODM_HTTP2", "false").lower() in ("1", "true", "yes"),
+}
+_lock = threading.Lock()
+_adapter: Optional["_SharedAdapter"] = None
+
+
+# ── Instrumentación ───────────────────────────────────────────────────────────
+
+class HostStats:
+    """Contadores de un host. No es thread-safe por sí solo: lo protege HttpStats."""
+
+    __slots__ = ("requests", "errors", "bytes", "latency_ms_total", "status", "histogram")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self.latency_ms_total = 0.0
+        self.status: Dict[int, int] = {}
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Cota superior (ms) de la cubeta donde cae el percentil q (0-1)."""
+        total = sum(self.histogram)
+        if not total:
+            return None
+        acumulado = 0
+        for i, n in enumerate(self.histogram):
+            acumulado += n
+            if acumulado >= q * total:
+                return float(LATENCY_BUCKETS_MS[i]) if i < len(LATENCY_BUCKETS_MS) else float("inf")
+        return float("inf")
+
+    def as_dict(self) -> Dict[str, Any]:
+        etiquetas = [f"<={b}ms" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "latency_ms_avg": round(self.latency_ms_total / self.requests, 1) if self.requests else None,
+            "latency_ms_p50": self.percentile(0.5),
+            "latency_ms_p95": self.percentile(0.95),
+            "status": dict(self.status),
+            "latency_histogram": dict(zip(etiquetas, self.histogram)),
+        }
+
+
+class HttpStats:
+    """Estadísticas por host, thread-safe."""
+
+    def __init__(self):
+        self._hosts: Dict[str, HostStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, url: str, latency_ms: float, status: Optional[int], nbytes: int) -> None:
+        host = urlsplit(url).netloc
+        with self._lock:
+            h = self._hosts.get(host)
+            if h is None:
+                h = self._hosts[host] = HostStats()
+            h.requests += 1
+            if status is None:
+                h.errors += 1
+            else:
+                h.status[status] = h.status.get(status, 0) + 1
+            h.bytes += nbytes
+            h.latency_ms_total += latency_ms
+            h.histogram[bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {host: h.as_dict() for host, h in self._hosts.items()}
+
+    def summary(self) -> List[str]:
+        """Una línea legible por host (para el log de ejecución)."""
+        lineas = []
+        for host, h in sorted(self.snapshot().items()):
+            lineas.append(
+                f"{host}: {h['requests']} peticiones, {h['bytes'] / 1e6:.1f} MB, "
+                f"media {h['latency_ms_avg']} ms, p50≤{h['latency_ms_p50']:g} ms, "
+                f"p95≤{h['latency_ms_p95']:g} ms"
+                + (f", {h['errors']} errores de red" if h["errors"] else "")
+            )
+        return lineas
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hosts.clear()
+
+
+_global_stats = HttpStats()
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """Estadísticas HTTP del proceso por host."""
+    return _global_stats.snapshot()
+
+
+# ── Caché DNS ─────────────────────────────────────────────────────────────────
+
+class DnsCache:
+    """getaddrinfo con TTL. Se engancha en urllib3 para que cada conexión nueva
+    resuelva desde la caché; el nombre original se sigue usando para SNI y la
+    verificación del certificado."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[Tuple[str, int, int], Tuple[float, list]] = {}
+        self._lock = threading.Lock()
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        key = (host, port, family)
+        now = time.monotonic()
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit and hit[0] > now:
+                return hit[1]
+        infos = _orig_getaddrinfo(host, port, family, type, proto, flags)
+        with self._lock:
+            self._entries[key] = (now + self.ttl, infos)
+        return infos
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_orig_getaddrinfo = socket.getaddrinfo
+_dns_cache: Optional[DnsCache] = None
+
+
+class _CachedSocketModule:
+    """Vista del módulo socket para urllib3.util.connection con getaddrinfo cacheado."""
+
+    def __init__(self, cache: DnsCache):
+        self._cache = cache
+
+    def __getattr__(self, name):
+        return getattr(socket, name)
+
+    def getaddrinfo(self, *args, **kwargs):
+        return self._cache.getaddrinfo(*args, **kwargs)
+
+
+def _install_dns_cache(ttl: float) -> None:
+    global _dns_cache
+    if ttl <= 0 or _dns_cache is not None:
+        return
+    import urllib3.util.connection as u3conn
+    _dns_cache = DnsCache(ttl)
+    # Solo la resolución de urllib3: el resto del proceso usa socket sin tocar.
+    u3conn.socket = _CachedSocketModule(_dns_cache)
+
+
+# ── Pool compartido ───────────────────────────────────────────────────────────
+
+class _SharedAdapter(HTTPAdapter):
+    """HTTPAdapter del proceso. Las sesiones lo montan pero no lo cierran: el
+    pool vive mientras viva el proceso (o hasta `close()`)."""
+
+    def close(self):
+        pass
+
+    def _close_pool(self):
+        super().close()
+
+
+def configure(**kwargs) -> None:
+    """Ajusta la configuración (pool_hosts, pool_maxsize, dns_ttl, http2). Rehace
+    el pool; las sesiones creadas después lo usan."""
+    global _adapter
+    desconocidas = set(kwargs) - set(_config)
+    if desconocidas:
+        raise ValueError(f"Opciones HTTP desconocidas: {sorted(desconocidas)}")
+    with _lock:
+        _config.update(kwargs)
+        if _adapter is not None:
+            _adapter._close_pool()
+            _adapter = None
+
+
+def _shared_adapter() -> _SharedAdapter:
+    global _adapter
+    with _lock:
+        if _adapter is None:
+            _install_dns_cache(_config["dns_ttl"])
+            if _config["http2"]:
+                _enable_http2()
+            _adapter = _SharedAdapter(pool_connections=_config["pool_hosts"],
+                                      pool_maxsize=_config["pool_maxsize"])
+        return _adapter
+
+
+def _enable_http2() -> None:
+    try:
+        import h2  # noqa: F401 — dependencia opcional
+        import urllib3.http2
+    except ImportError:
+        logger.warning("ODM_HTTP2 activo pero falta el paquete 'h2' (o urllib3<2.3); se usa HTTP/1.1")
+        return
+    urllib3.http2.inject_into_urllib3()
+
+
+class InstrumentedSession(requests.Session):
+    """Session sobre el pool compartido que anota cada petición en sus propias
+    estadísticas (`self.stats`) y en las del proceso."""
+
+    def __init__(self):
+        super().__init__()
+        adapter = _shared_adapter()
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self.stats = HttpStats()
+
+    def send(self, request, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            response = super().send(request, **kwargs)
+        except requests.exceptions.RequestException:
+            self._record(request.url, (time.perf_counter() - t0) * 1000, None, 0)
+            raise
+        if kwargs.get("stream"):
+            # El cuerpo aún no se ha leído: latencia hasta cabeceras y tamaño declarado.
+            nbytes = int(response.headers.get("Content-Length") or 0)
+        else:
+            nbytes = len(response.content or b"")
+        self._record(request.url, (time.perf_counter() - t0) * 1000, response.status_code, nbytes)
+        return response
+
+    def _record(self, url, latency_ms, status, nbytes):
+        self.stats.record(url, latency_ms, status, nbytes)
+        _global_stats.record(url, latency_ms, status, nbytes)
+
+
+def session() -> InstrumentedSession:
+    """Sesión nueva sobre el pool compartido del proceso."""
+    return InstrumentedSession()
+
+
+def close() -> None:
+    """Cierra las conexiones del pool (p. ej. al apagar el proceso)."""
+    global _adapter
+    with _lock:
+        if _adapter is not None:
+            _adapter._close_pool()
+            _adapter = None
@@ -0,0 +1,204 @@
+"""Lectura incremental de una respuesta JSON grande (estilo ijson, sin dependencias).
+
+`response.json()` / `json.loads(resp.text)` sobre un cuerpo de 500 MB mantiene a la
+vez los bytes, el texto y el grafo de objetos completo. `JsonArrayStream` recorre
+el documento por trozos (`response.iter_content`) hasta la lista de registros
+(`elements` de Overpass, `content_field` de REST: ruta con puntos) y entrega sus
+elementos de uno en uno, así que la memoria queda acotada por el tamaño del trozo
+y del elemento. Cada elemento se decodifica con `json.JSONDecoder.raw_decode` (en
+C); solo la estructura que rodea a la lista se recorre en Python.
+
+Lo que no es la lista (`remark` de Overpass, enlace o cursor de la página
+siguiente...) queda en `document` al terminar, con la lista vaciada. Si la ruta
+no existe o el documento no es lo esperado, `found` es False y `document` es el
+documento entero, para que quien llama siga por su camino de siempre.
+
+`wants_streaming(response, params)` decide por recurso: `stream_json` = auto
+(defecto: cuando Content-Length supera `stream_json_threshold_mb`, 32 por
+defecto) | true | false.
+"""
+import codecs
+import itertools
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+
+CHUNK_SIZE = 1 << 16
+_WS = " \t\n\r"
+_decoder = json.JSONDecoder()
+
+
+class JsonArrayStream:
+    """Itera los elementos de la lista en `path` de un JSON que llega por trozos."""
+
+    def __init__(self, chunks: Iterable[bytes], path: Optional[str] = None):
+        self._chunks = iter(chunks)
+        self._text = codecs.getincrementaldecoder("utf-8-sig")()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self.path: List[str] = [p for p in str(path or "").split(".") if p]
+        self.found = False
+        self.document: Any = None
+
+    @classmethod
+    def from_response(cls, response: requests.Response, path: Optional[str] = None,
+                      chunk_size: int = CHUNK_SIZE) -> "JsonArrayStream":
+        return cls(response.iter_content(chunk_size), path)
+
+    def __iter__(self) -> Iterator[Any]:
+        if not self._skip_ws():
+            return   # cuerpo vacío: document None
+        holder: Dict[str, Any] = {}
+        yield from self._value(self.path, holder, "doc")
+        self.document = holder["doc"]
+
+    # ── Recorrido ─────────────────────────────────────────────────────────────
+
+    def _value(self, path: List[str], parent: Dict[str, Any], key: str) -> Iterator[Any]:
+        """Recorre el valor en la posición actual y lo deja en parent[key]; si es la
+        lista buscada (ruta agotada) emite sus elementos en lugar de guardarlos."""
+        char = self._peek()
+        if not path and char == "[":
+            self.found = True
+            parent[key] = []
+            yield from self._items()
+        elif path and char == "{":
+            obj: Dict[str, Any] = {}
+            parent[key] = obj
+            yield from self._members(path, obj)
+        else:
+            parent[key] = self._decode()
+
+    def _members(self, path: List[str], obj: Dict[str, Any]) -> Iterator[Any]:
+        self._pos += 1   # {
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            self._skip_ws()
+            name = self._decode()
+            if not isinstance(name, str) or self._peek() != ":":
+                self._fail("se esperaba ':'")
+            self._pos += 1
+            self._skip_ws()
+            if name == path[0] and not self.found:
+                yield from self._value(path[1:], obj, name)
+            else:
+                obj[name] = self._decode()
+            char = self._peek()
+            self._pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                self._fail("se esperaba ',' o '}'")
+
+    def _items(self) -> Iterator[Any]:
+        self._pos += 1   # [
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            self._skip_ws()
+            yield self._decode()
+            char = self._peek()
+            self._pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                self._fail("se esperaba ',' o ']'")
+            if self._pos > CHUNK_SIZE:
+                self._buf, self._pos = self._buf[self._pos:], 0
+
+    # ── Búfer ─────────────────────────────────────────────────────────────────
+
+    def _fill(self, at_least: int = 1) -> bool:
+        """Lee trozos hasta tener `at_least` caracteres más (False si ya no hay)."""
+        target = len(self._buf) + at_least
+        while len(self._buf) < target and not self._eof:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._eof = True
+                self._buf += self._text.decode(b"", final=True)
+            elif chunk:
+                self._buf += self._text.decode(chunk)
+        return len(self._buf) >= target
+
+    def _skip_ws(self) -> bool:
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WS:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return True
+            if not self._fill():
+                return False
+
+    def _peek(self) -> str:
+        if not self._skip_ws():
+            self._fail("documento truncado")
+        return self._buf[self._pos]
+
+    def _decode(self) -> Any:
+        """Decodifica el valor completo en la posición actual. Un valor que acaba
+        justo en el final del búfer puede estar cortado: se lee más y se
+        reintenta, doblando lo leído para no volver a parsear mucho."""
+        need = CHUNK_SIZE
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+                if self._eof or self._complete(value, end):
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill(need)
+            need *= 2
+
+    def _complete(self, value: Any, end: int) -> bool:
+        """¿Es `value` el valor entero y no el prefijo de uno cortado? Un número
+        partido tras '.' o 'e' ("0." + "6") se decodifica como su prefijo (0):
+        solo vale si detrás viene un separador."""
+        if end >= len(self._buf):
+            return False
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return True
+        while end < len(self._buf) and self._buf[end] in _WS:
+            end += 1
+        return end < len(self._buf) and self._buf[end] in ",]}"
+
+    def _fail(self, message: str):
+        raise json.JSONDecodeError(message, self._buf, self._pos)
+
+
+def peek(chunks: Iterable[bytes]) -> Tuple[bytes, Iterator[bytes]]:
+    """(primer byte significativo, trozos intactos): lee lo justo para ver con qué
+    empieza el cuerpo (b"" si está vacío) sin perder nada de lo leído. Sirve para
+    descartar una página de error HTML servida con 200 antes de leerla como JSON."""
+    it = iter(chunks)
+    head = b""
+    for chunk in it:
+        head += chunk
+        body = head.lstrip(b" \t\r\n")
+        if body.startswith(codecs.BOM_UTF8):
+            body = body[len(codecs.BOM_UTF8):].lstrip(b" \t\r\n")
+        if body:
+            return body[:1], itertools.chain([head], it)
+    return b"", iter([head])
+
+
+def wants_streaming(response: requests.Response, params: Dict[str, Any],
+                    unknown_length: bool = False) -> bool:
+    """¿Leer `response` por trozos? `stream_json` = true | false | auto (según
+    Content-Length y `stream_json_threshold_mb`; sin Content-Length, `unknown_length`)."""
+    mode = str(params.get("stream_json", "auto") or "auto").strip().lower()
+    if mode in ("1", "true", "yes", "si", "sí"):
+        return True
+    if mode in ("0", "false", "no"):
+        return False
+    length = (getattr(response, "headers", None) or {}).get("Content-Length")
+    if not length or not str(length).isdigit():
+        return unknown_length
+    threshold = float(params.get("stream_json_threshold_mb", 32) or 32)
+    return int(length) > threshold * 1024 * 1024
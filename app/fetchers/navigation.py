@@ -2,17 +2,21 @@
 
 La categoría que REST no tiene: cómo se generan y enlazan las páginas a visitar.
 Aquí viven las partes PURAS y testeables —resolver valores de pivote, construir
-URLs por plantilla, detectar el enlace 'siguiente' en el HTML—. La orquestación que
+URLs por plantilla, detectar el enlace 'siguiente' en el HTML, extraer enlaces y
+normalizar/deduplicar URLs de un crawl—. La orquestación que
 hace HTTP (recorrido recursivo por niveles, árbol de directorios, pivote desde una
 consulta GraphQL de ODM) vive en el fetcher genérico, que se apoya en estos helpers.
 
 Las clases html / paginated_html / searchloop_html / url_loop_html comparten estos
 ladrillos hoy reimplementados de forma divergente.
 """
+import hashlib
 import json
-from typing import Any, Dict, List, Optional, Union
-from urllib.parse import urljoin
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import urljoin, urlsplit, urlunsplit
 from bs4 import BeautifulSoup
+from app.fetchers.html_extraction import css_to_xpath, supports_css
 
 
 def pivot_values(params: Dict[str, Any]) -> List[str]:
@@ -124,3 +128,99 @@ def form_next(soup_or_html: Union[BeautifulSoup, str],
     action = form.get("action") or ""
     destino = urljoin(base_url, action) if (base_url and action) else (action or base_url)
     return destino, inputs
+
+
+# ── Crawl: extracción de enlaces y URLs vistas ─────────────────────────────────
+
+# Selectores que se resuelven con XPath sobre lxml: `a[href]`, `[href]`, `area[href]`...
+_HREF_SELECTOR = re.compile(r"^\s*([a-zA-Z][a-zA-Z0-9]*)?\[href\]\s*$")
+
+
+def _lxml_root(html: str):
+    """Árbol lxml del documento, o None si lxml no está o el documento está vacío."""
+    try:
+        import lxml.html  # dependencia de zeep; si faltara, se usa BeautifulSoup
+        from lxml.etree import ParserError
+    except ImportError:
+        return None
+    try:
+        try:
+            return lxml.html.fromstring(html)
+        except ValueError:   # str con declaración de encoding (XHTML): se parsea en bytes
+            return lxml.html.fromstring(html.encode("utf-8"))
+    except ParserError:
+        return None
+
+
+def extract_links(html: str, base_url: str, selector: str = "a[href]",
+                  backend: str = "html.parser") -> List[Tuple[str, str]]:
+    """(URL absoluta, texto del ancla) de cada elemento con href que case con
+    `selector`, en orden de documento. El selector habitual `tag[href]` va por
+    lxml (XPath en C, un orden de magnitud más rápido que html.parser); con
+    `backend="lxml"` (param `html_parser`) también cualquier otro selector que
+    html_extraction sepa traducir a XPath. El resto, por BeautifulSoup."""
+    m = _HREF_SELECTOR.match(selector or "")
+    xpath = None
+    if m:
+        tag = (m.group(1) or "*").lower()
+        xpath = f"//{tag}[@href]"
+    elif backend == "lxml" and supports_css(selector):
+        xpath = css_to_xpath(selector, include_self=True)
+    root = _lxml_root(html or "") if xpath else None
+    if xpath and root is not None:
+        return [(urljoin(base_url, el.get("href")), " ".join(" ".join(el.itertext()).split()))
+                for el in root.xpath(xpath) if el.get("href")]
+    if xpath and not (html or "").strip():
+        return []
+    soup = BeautifulSoup(html or "", "html.parser")
+    links = []
+    for el in soup.select(selector):
+        href = el.get("href")
+        if href:
+            links.append((urljoin(base_url, href), " ".join(el.get_text(" ", strip=True).split())))
+    return links
+
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """Forma canónica para deduplicar: esquema y host en minúsculas, sin puerto
+    por defecto, sin fragmento (#...) y con path '/' si viene vacío. La query se
+    respeta tal cual (su orden puede importar al servidor)."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    host, _, port = netloc.rpartition(":")
+    if host and port.isdigit() and _DEFAULT_PORTS.get(scheme) == int(port):
+        netloc = host
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+
+class UrlSet:
+    """Conjunto compacto de URLs ya vistas: guarda un hash de 64 bits de la URL
+    normalizada (un int) en vez de la cadena. Con 10⁶ URLs la probabilidad de
+    colisión es ~3·10⁻⁸."""
+
+    def __init__(self, urls: Iterable[str] = ()):
+        self._hashes = set()
+        for url in urls:
+            self.add(url)
+
+    @staticmethod
+    def _h(url: str) -> int:
+        return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def add(self, url: str) -> bool:
+        """Añade la URL (ya normalizada); True si no estaba."""
+        h = self._h(url)
+        if h in self._hashes:
+            return False
+        self._hashes.add(h)
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        return self._h(url) in self._hashes
+
+    def __len__(self) -> int:
+        return len(self._hashes)
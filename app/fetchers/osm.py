@@ -31,16 +31,44 @@ Parámetros:
     timeout         Segundos de timeout Overpass (default: 60).
     max_elements    Límite de seguridad (default: 0 = sin límite).
     overpass_url    URL del servidor Overpass API.
+    tiling          off (default) | quadtree: divide el bbox en teselas (ver abajo).
+    tile_seed       bbox (default) o un tipo de demarcación (provincia, comunidad,
+                    isla...): las teselas de partida son las demarcaciones de ese
+                    tipo que cortan el bbox.
+    tile_max_deg    Lado máximo de una tesela de partida en grados (default: 1.0).
+    tile_min_deg    Lado mínimo al subdividir (default: 0.05).
+    batch_size      Elementos por lote de stream() sin teselado (default: 5000).
+    stream_json     auto (default) | true | false: leer la respuesta por trozos
+                    (auto: si no trae Content-Length o supera
+                    stream_json_threshold_mb, ver json_stream.py).
+
+Teselado (tiling=quadtree):
+  Una sola query para toda España con un preset amplio (HERITAGE_LOOSE) agota el
+  timeout de Overpass o devuelve cientos de miles de elementos de golpe. Con
+  teselado cada tesela es una query propia sobre su bbox; si Overpass la corta
+  (timeout / maxsize, timeout de lectura o 504 en todos los mirrors) se divide en
+  cuatro y se reintenta cada cuarto (quadtree adaptativo, hasta tile_min_deg).
+  Cualquier otro fallo (400/403: query rechazada) aborta sin dividir. Las teselas
+  van en paralelo (max_concurrent_requests) repartidas entre los mirrors, y
+  stream() emite los registros de cada tesela al terminarla. Los elementos que
+  caen en el borde de varias teselas se emiten una vez (type+id). current_state
+  guarda las teselas hechas y las pendientes para reanudar; tras una reanudación
+  los nodos siguen sin repetirse, pero un way/relation que cruce el borde entre
+  una tesela ya hecha y una pendiente puede salir otra vez.
 """
+import hashlib
+import itertools
 import json
 import logging
 import os
 import time
 import unicodedata
 import requests
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, Generator, Iterable, Iterator, List, Optional, Tuple
 
 from app.fetchers.base import BaseFetcher, RawData, ParsedData, DomainData
+from app.fetchers.concurrency import map_bounded
+from app.fetchers.json_stream import CHUNK_SIZE, JsonArrayStream, peek, wants_streaming
 
 logger = logging.getLogger(__name__)
 
@@ -400,6 +428,88 @@ def build_overpass_query(
     return "\n".join(lines)
 
 
+# ── Teselado ──────────────────────────────────────────────────────────────────
+# Una tesela es [sur, oeste, norte, este] en grados, como el bbox de Overpass.
+
+TILING_MODES = ("off", "quadtree")
+
+
+class OverpassQueryTooHeavy(RuntimeError):
+    """Overpass cortó la query (timeout o maxsize): el resultado está incompleto."""
+
+
+def _tile_too_heavy(exc: Exception) -> bool:
+    """¿El fallo de una tesela se arregla pidiéndola más pequeña? Solo los cortes
+    de Overpass y los timeouts (de lectura o 504 del proxy); un 400/403 o un
+    error de red fallarían igual en las subteselas."""
+    if isinstance(exc, (OverpassQueryTooHeavy, requests.exceptions.Timeout)):
+        return True
+    if isinstance(exc, requests.exceptions.HTTPError):
+        return getattr(exc.response, "status_code", None) == 504
+    # timeout a mitad de una respuesta leída por trozos
+    return isinstance(exc, requests.exceptions.ConnectionError) and "timed out" in str(exc).lower()
+
+
+def _parse_bbox(bbox: str) -> List[float]:
+    return [float(v) for v in bbox.split(",")]
+
+
+def _bbox_str(tile: List[float]) -> str:
+    return ",".join(f"{round(v, 7):g}" for v in tile)
+
+
+def _intersect(a: List[float], b: List[float]) -> Optional[List[float]]:
+    tile = [max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3])]
+    return tile if tile[0] < tile[2] and tile[1] < tile[3] else None
+
+
+def _split_tile(tile: List[float]) -> List[List[float]]:
+    """Los cuatro cuadrantes de una tesela."""
+    s, w, n, e = tile
+    mlat, mlon = (s + n) / 2, (w + e) / 2
+    return [[s, w, mlat, mlon], [s, mlon, mlat, e], [mlat, w, n, mlon], [mlat, mlon, n, e]]
+
+
+def _grid(tile: List[float], max_deg: float) -> List[List[float]]:
+    """La tesela partida en una rejilla regular de celdas de lado <= max_deg."""
+    s, w, n, e = tile
+    rows = max(1, -int(-(n - s) // max_deg))
+    cols = max(1, -int(-(e - w) // max_deg))
+    dlat, dlon = (n - s) / rows, (e - w) / cols
+    return [[s + r * dlat, w + c * dlon, s + (r + 1) * dlat, w + (c + 1) * dlon]
+            for r in range(rows) for c in range(cols)]
+
+
+def seed_tiles(bbox: str, seed: str = "bbox", max_deg: float = 1.0) -> List[List[float]]:
+    """Teselas de partida: el bbox, o las demarcaciones del tipo `seed` que lo
+    cortan (recortadas a él), partidas en rejilla hasta `max_deg` de lado."""
+    area = _parse_bbox(bbox)
+    if seed in ("", "bbox"):
+        seeds = [area]
+    else:
+        seeds = []
+        for entry in _load_demarcaciones().values():
+            if entry.get("tipo") == seed:
+                tile = _intersect(area, _parse_bbox(entry["bbox"]))
+                if tile:
+                    seeds.append(tile)
+        if not seeds:
+            raise ValueError(f"Ninguna demarcación de tipo '{seed}' corta el bbox {bbox}")
+    return [cell for tile in seeds for cell in _grid(tile, max_deg)]
+
+
+def _element_point(element: dict) -> Optional[Tuple[float, float]]:
+    if "lat" in element:
+        return element["lat"], element["lon"]
+    if "center" in element:
+        return element["center"].get("lat"), element["center"].get("lon")
+    return None
+
+
+def _in_tile(point: Tuple[float, float], tile: List[float]) -> bool:
+    return tile[0] <= point[0] <= tile[2] and tile[1] <= point[1] <= tile[3]
+
+
 # ── Normalización de output ───────────────────────────────────────────────────
 
 def _infer_use(element: dict, preset_keys: List[str]) -> Optional[str]:
@@ -473,7 +583,8 @@ class OSMFetcher(BaseFetcher):
     con semántica AND o OR según su tipo (pairs / pairs_or).
     """
 
-    def fetch(self) -> RawData:
+    def _spec(self) -> Dict[str, Any]:
+        """Lee y valida los parámetros: filtros, demarcación, límites y teselado."""
         # ── Filtros ───────────────────────────────────────────────────────────
         use_types_raw = self.params.get("use_types", self.params.get("use_type", "")).strip()
         preset_keys: List[str] = []
@@ -554,34 +665,159 @@ class OSMFetcher(BaseFetcher):
         # Si se usa sobre bbox grande sin max_elements, avisar en el log.
         _broad_presets = {k for k in preset_keys if k in ("HERITAGE_LOOSE",)}
         _spain_bbox = bbox and len(bbox.split(",")) == 4 and float(bbox.split(",")[2]) - float(bbox.split(",")[0]) > 10
-        if _broad_presets and _spain_bbox and not max_elems:
+        tiling = str(self.params.get("tiling", "off") or "off").strip().lower()
+        if tiling not in TILING_MODES:
+            raise ValueError(f"tiling debe ser uno de {TILING_MODES}, no '{tiling}'")
+        if tiling != "off" and not bbox:
+            logger.warning(f"tiling={tiling} necesita un bbox; el área '{area_name}' se consulta entera.")
+            tiling = "off"
+        if _broad_presets and _spain_bbox and not max_elems and tiling == "off":
             logger.warning(
                 f"Presets de cobertura amplia ({', '.join(_broad_presets)}) sobre área grande "
                 f"({bbox}). Considera acotar la demarcación o activar max_elements."
             )
 
-        # ── Construir y ejecutar query ─────────────────────────────────────────
-        query = build_overpass_query(
-            preset_keys=preset_keys,
-            inline_blocks=inline_blocks,
-            custom_pairs=custom_pairs,
-            element_types=element_types,
+        return {
+            "preset_keys": preset_keys, "inline_blocks": inline_blocks, "custom_pairs": custom_pairs,
+            "element_types": element_types, "bbox": bbox, "area_name": area_name,
+            "timeout": timeout, "max_elems": max_elems, "out_format": out_format,
+            "overpass_url": overpass_url, "tiling": tiling,
+            # preset_keys para la inferencia posterior en parse()
+            "all_keys": preset_keys + [b.get("preset") for b in inline_blocks if b.get("preset")],
+        }
+
+    def _build_query(self, spec: Dict[str, Any], bbox: Optional[str]) -> str:
+        return build_overpass_query(
+            preset_keys=spec["preset_keys"],
+            inline_blocks=spec["inline_blocks"],
+            custom_pairs=spec["custom_pairs"],
+            element_types=spec["element_types"],
             bbox=bbox,
-            area_name=area_name,
-            timeout=timeout,
-            out_format=out_format,
+            area_name=spec["area_name"],
+            timeout=spec["timeout"],
+            out_format=spec["out_format"],
         )
-        logger.info(f"Overpass query:\n{query}")
 
-        elements = self._execute_overpass(query, overpass_url, timeout)
+    def fetch(self) -> RawData:
+        spec = self._spec()
+        if spec["tiling"] != "off":
+            elements = [e for _, batch in self._tile_batches(spec) for e in batch]
+            return {"elements": elements, "preset_keys": spec["all_keys"]}
 
-        if max_elems and len(elements) > max_elems:
-            logger.warning(f"Limitando a {max_elems} de {len(elements)} elementos")
-            elements = elements[:max_elems]
+        elements = list(self._single_query(spec))
+        return {"elements": elements, "preset_keys": spec["all_keys"]}
 
-        # Adjuntar preset_keys para inferencia posterior en parse()
-        all_keys = preset_keys + [b.get("preset") for b in inline_blocks if b.get("preset")]
-        return {"elements": elements, "preset_keys": all_keys}
+    def _single_query(self, spec: Dict[str, Any]) -> Iterator[dict]:
+        """Elementos de la query única (sin teselado), hasta max_elements. Una
+        respuesta grande se lee por trozos (ver app/fetchers/json_stream.py)."""
+        # ── Construir y ejecutar query ─────────────────────────────────────────
+        query = self._build_query(spec, spec["bbox"])
+        logger.info(f"Overpass query:\n{query}")
+
+        elements = self._execute_overpass(query, spec["overpass_url"], spec["timeout"], lazy=True)
+
+        max_elems = spec["max_elems"]
+        for n, element in enumerate(elements):
+            if max_elems and n >= max_elems:
+                logger.warning(f"Limitando a {max_elems} elementos")
+                break
+            yield element
+
+    def stream(self) -> Generator[List[Any], None, None]:
+        """Sin teselado, lotes de `batch_size` elementos (def. 5000) según se leen
+        de la respuesta. Con teselado, un lote por tesela en cuanto termina;
+        current_state queda listo para reanudar."""
+        spec = self._spec()
+        if spec["tiling"] == "off":
+            batch_size = int(self.params.get("batch_size", 5000) or 5000)
+            source = self._single_query(spec)
+            while True:
+                elements = list(itertools.islice(source, batch_size))
+                if not elements:
+                    return
+                yield self.normalize(self.parse({"elements": elements, "preset_keys": spec["all_keys"]}))
+        for _, elements in self._tile_batches(spec):
+            yield self.normalize(self.parse({"elements": elements, "preset_keys": spec["all_keys"]}))
+
+    def _tile_batches(self, spec: Dict[str, Any]) -> Generator[Tuple[List[float], List[dict]], None, None]:
+        """(tesela, elementos nuevos) por cada tesela terminada.
+
+        Las teselas se piden por oleadas con map_bounded (max_concurrent_requests
+        a la vez); la que Overpass no consigue servir se divide en cuatro para la
+        oleada siguiente. Cada tesela arranca en un mirror distinto (reparto
+        circular) y _execute_overpass rota desde ahí si falla."""
+        seed = str(self.params.get("tile_seed", "bbox") or "bbox").strip().lower()
+        max_deg = float(self.params.get("tile_max_deg", 1.0) or 1.0)
+        min_deg = float(self.params.get("tile_min_deg", 0.05) or 0.05)
+        template = self._build_query(spec, "{bbox}")
+        key = hashlib.sha1(json.dumps([template, spec["bbox"], seed, max_deg],
+                                      sort_keys=True).encode("utf-8")).hexdigest()
+
+        resume = self.params.get("_resume_state") or {}
+        if isinstance(resume, str):
+            resume = json.loads(resume)
+        if resume.get("tiles_key") == key:
+            pending = [list(t) for t in resume.get("pending", [])]
+            done = [list(t) for t in resume.get("done", [])]
+            emitted = int(resume.get("elements", 0) or 0)
+            logger.info(f"OSM: reanudando teselado, {len(done)} tesela(s) hecha(s), {len(pending)} pendiente(s)")
+        else:
+            pending = seed_tiles(spec["bbox"], seed, max_deg)
+            done, emitted = [], 0
+        resumed_done = list(done)
+
+        servers = [spec["overpass_url"]] + [m for m in OVERPASS_MIRRORS if m != spec["overpass_url"]]
+        counter = itertools.count()
+        seen: set = set()
+        stats = {"tiles": 0, "splits": 0, "duplicates": 0, "elements": emitted}
+        self.profile_stats["tiles"] = stats
+        max_elems = spec["max_elems"]
+
+        def run_tile(tile):
+            server = servers[next(counter) % len(servers)]
+            query = template.replace("{bbox}", _bbox_str(tile))
+            try:
+                return list(self._execute_overpass(query, server, spec["timeout"], strict=True, lazy=True))
+            except Exception as exc:
+                return exc
+
+        while pending:
+            wave, pending = pending, []
+            remaining = [list(t) for t in wave]
+            for tile, result in map_bounded(run_tile, wave, self.max_concurrent_requests, ordered=False):
+                remaining.remove(list(tile))
+                if isinstance(result, Exception):
+                    if (not _tile_too_heavy(result)
+                            or max(tile[2] - tile[0], tile[3] - tile[1]) / 2 < min_deg):
+                        raise result
+                    logger.warning(f"OSM: tesela {_bbox_str(tile)} sin servir ({result}); se divide en 4")
+                    stats["splits"] += 1
+                    pending.extend(_split_tile(tile))
+                    continue
+                nuevos = []
+                for element in result:
+                    ident = (element.get("type"), element.get("id"))
+                    point = _element_point(element)
+                    if ident in seen or (element.get("type") == "node" and point is not None
+                                         and any(_in_tile(point, t) for t in resumed_done)):
+                        stats["duplicates"] += 1
+                        continue
+                    seen.add(ident)
+                    nuevos.append(element)
+                if max_elems:
+                    nuevos = nuevos[:max_elems - emitted]
+                emitted += len(nuevos)
+                done.append(list(tile))
+                stats["tiles"] += 1
+                stats["elements"] = emitted
+                self.current_state = {"tiles_key": key, "pending": remaining + pending,
+                                      "done": list(done), "elements": emitted}
+                logger.info(f"OSM: tesela {_bbox_str(tile)} → {len(nuevos)} elemento(s) "
+                            f"({stats['tiles']} hecha(s), {len(remaining) + len(pending)} pendiente(s))")
+                yield tile, nuevos
+                if max_elems and emitted >= max_elems:
+                    logger.warning(f"OSM: límite de {max_elems} elementos alcanzado")
+                    return
 
     def _execute_overpass(
         self,
@@ -590,10 +826,21 @@ class OSMFetcher(BaseFetcher):
         timeout: int,
         backoff: float = 30.0,
         retries_per_server: int = 2,
-    ) -> List[dict]:
+        strict: bool = False,
+        lazy: bool = False,
+    ) -> Iterable[dict]:
         """
         Ejecuta la query contra Overpass rotando por mirrors si falla.
 
+        Con strict=True (teselado), un resultado que Overpass cortó por timeout o
+        maxsize ("runtime error" en `remark`) lanza OverpassQueryTooHeavy en vez
+        de devolverse incompleto: quien llama divide la tesela.
+
+        Con lazy=True, una respuesta grande (ver json_stream.wants_streaming; sin
+        Content-Length, siempre) se devuelve como un iterador que la lee por
+        trozos en lugar de como lista. Un fallo a mitad de lectura ya no rota de
+        mirror: se propaga.
+
         Servidor local (OVERPASS_LOCAL_URL): 1 intento, sin backoff, rota inmediatamente.
         Mirrors públicos: retries_per_server intentos con backoff progresivo.
         - 429/503 → respeta Retry-After; reintenta mismo servidor.
@@ -616,11 +863,14 @@ class OSMFetcher(BaseFetcher):
             for attempt in range(1, max_attempts + 1):
                 try:
                     logger.info(f"Overpass → {server}" + ("" if is_local else f" (intento {attempt}/{max_attempts})"))
-                    response = requests.post(
+                    if self._rate_limiter is not None:
+                        self._rate_limiter.acquire(server)
+                    response = self.http.post(
                         server,
                         data={"data": query},
                         headers=req_headers,
                         timeout=http_timeout,
+                        stream=lazy,
                     )
 
                     # Rate-limited: respetar Retry-After (solo mirrors públicos)
@@ -638,6 +888,17 @@ class OSMFetcher(BaseFetcher):
 
                     response.raise_for_status()
 
+                    if lazy and wants_streaming(response, self.params, unknown_length=True):
+                        # Se mira el primer byte antes de comprometerse: una página
+                        # de error servida con 200 rota de mirror como siempre.
+                        first, chunks = peek(response.iter_content(CHUNK_SIZE))
+                        if first != b"{":
+                            response.close()
+                            logger.warning(f"{server} → respuesta vacía o no-JSON, rotando…")
+                            last_exc = RuntimeError(f"{server}: respuesta vacía o no-JSON")
+                            break
+                        return self._overpass_stream(response, chunks, server, strict)
+
                     # Respuesta vacía o no-JSON → tratar como fallo de servidor
                     raw_text = response.text.strip()
                     if not raw_text:
@@ -649,9 +910,14 @@ class OSMFetcher(BaseFetcher):
                     elements = data.get("elements", [])
                     if "remark" in data:
                         logger.warning(f"Overpass remark: {data['remark']}")
+                        if strict and "runtime error" in str(data["remark"]):
+                            raise OverpassQueryTooHeavy(f"{server}: {data['remark']}")
                     logger.info(f"OSM: {len(elements)} elementos desde {server}")
                     return elements
 
+                except OverpassQueryTooHeavy:
+                    raise
+
                 except requests.exceptions.HTTPError as exc:
                     last_exc = exc
                     wait = backoff * attempt
@@ -673,6 +939,27 @@ class OSMFetcher(BaseFetcher):
 
         raise last_exc
 
+    def _overpass_stream(self, response: requests.Response, chunks: Iterable[bytes],
+                         server: str, strict: bool) -> Iterator[dict]:
+        """Los `elements` de una respuesta Overpass según llegan (`chunks`, su
+        cuerpo); el `remark` (que Overpass escribe tras ellos) se comprueba al final."""
+        reader = JsonArrayStream(chunks, "elements")
+        n = 0
+        try:
+            for element in reader:
+                n += 1
+                yield element
+        finally:
+            response.close()
+        if reader.document is None:
+            raise RuntimeError(f"{server}: respuesta vacía")
+        remark = reader.document.get("remark") if isinstance(reader.document, dict) else None
+        if remark:
+            logger.warning(f"Overpass remark: {remark}")
+            if strict and "runtime error" in str(remark):
+                raise OverpassQueryTooHeavy(f"{server}: {remark}")
+        logger.info(f"OSM: {n} elementos desde {server} (lectura incremental)")
+
     def parse(self, raw: RawData) -> ParsedData:
         if isinstance(raw, dict):
             elements = raw.get("elements", [])
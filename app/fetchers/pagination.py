@@ -13,8 +13,13 @@ respuesta (p. ej. {"next_link": ...} para rel_next, {"next_cursor": ...} para cu
 
 El registro es PURO (no hace HTTP): decide qué pedir a continuación a partir del
 estado y de las señales de la última respuesta. Esto lo hace testeable y reusable.
+
+Para pausar/reanudar, cada estrategia traduce la siguiente petición a un savepoint
+JSON y de vuelta:
+  checkpoint(spec, pages_fetched) -> dict   (spec=None: recorrido terminado)
+  resume(state) -> RequestSpec | None       (primera petición al reanudar)
 """
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set
 
 RequestSpec = Dict[str, Any]
 
@@ -38,6 +43,18 @@ class PaginationStrategy:
     def following(self, *, last_batch_size: int, meta: Optional[Dict[str, Any]] = None) -> Optional[RequestSpec]:
         return None
 
+    def checkpoint(self, spec: Optional[RequestSpec], pages_fetched: int) -> Dict[str, Any]:
+        if spec is None:
+            return {"finished": True, "pages_fetched": pages_fetched}
+        return {"resume_url": spec["url"], "resume_query": dict(spec.get("query") or {}),
+                "pages_fetched": pages_fetched}
+
+    def resume(self, state: Dict[str, Any]) -> Optional[RequestSpec]:
+        if state.get("finished"):
+            return None
+        self._page = int(state.get("pages_fetched", 0)) + 1
+        return {"url": state.get("resume_url") or self.url, "query": dict(state.get("resume_query") or {})}
+
 
 class NoPagination(PaginationStrategy):
     name = "none"
@@ -69,6 +86,12 @@ class QueryOffset(PaginationStrategy):
         self._page += 1
         return {"url": self.url, "query": {self.start_param: self._offset, self.size_param: self.page_size}}
 
+    def resume(self, state):
+        spec = super().resume(state)
+        if spec is not None:
+            self._offset = int(spec["query"].get(self.start_param, 0))
+        return spec
+
 
 class PageNumber(PaginationStrategy):
     """Número de página incremental (page=N) hasta página vacía o `max_pages`."""
@@ -95,6 +118,18 @@ class PageNumber(PaginationStrategy):
         self._page += 1
         return {"url": self.url, "query": {self.page_param: self._n, self.size_param: self.page_size}}
 
+    def checkpoint(self, spec, pages_fetched):
+        state = super().checkpoint(spec, pages_fetched)
+        if spec is not None:
+            state["page"] = spec["query"][self.page_param]
+        return state
+
+    def resume(self, state):
+        spec = super().resume(state)
+        if spec is not None:
+            self._n = int(spec["query"].get(self.page_param, self._n))
+        return spec
+
 
 class RelNext(PaginationStrategy):
     """Sigue el enlace 'next' de la respuesta (rel=next en ATOM, o un campo 'next'
@@ -147,6 +182,9 @@ class PivotLoop(PaginationStrategy):
                 valores = [v.strip() for v in crudo.split(",") if v.strip()]
         self.valores: List[Any] = list(valores)
         self._i = 0
+        # Índices ya servidos por delante del savepoint (peticiones concurrentes
+        # con preserve_order=false): se guardan en el estado y se saltan al reanudar.
+        self.done: Set[int] = set()
 
     def first(self):
         self._i = 0
@@ -158,15 +196,38 @@ class PivotLoop(PaginationStrategy):
                 "pagination=pivot_loop requiere el parámetro 'pivot_values' "
                 "(lista de valores a iterar; p. ej. códigos de provincia)"
             )
-        v = self.valores[0]
-        return {"url": self.url, "query": {self.pivot_param: v}, "pivot": v}
+        return self._spec(0)
 
     def following(self, *, last_batch_size, meta=None):
         self._i += 1
+        while self._i in self.done:
+            self._i += 1
         if self._i >= len(self.valores):
             return None
-        v = self.valores[self._i]
-        return {"url": self.url, "query": {self.pivot_param: v}, "pivot": v}
+        return self._spec(self._i)
+
+    def _spec(self, i):
+        v = self.valores[i]
+        return {"url": self.url, "query": {self.pivot_param: v}, "pivot": v, "index": i}
+
+    def checkpoint(self, spec, pages_fetched):
+        if spec is None:
+            return {"finished": True, "pivot_index": len(self.valores)}
+        state = {"pivot_index": spec["index"]}
+        done = sorted(i for i in self.done if i > spec["index"])
+        if done:
+            state["pivots_done"] = done
+        return state
+
+    def resume(self, state):
+        self.done = {int(i) for i in state.get("pivots_done") or []}
+        i = int(state.get("pivot_index", 0))
+        while i in self.done:
+            i += 1
+        if state.get("finished") or i >= len(self.valores):
+            return None
+        self._i = i
+        return self._spec(i)
 
 
 REGISTRO = {
@@ -15,23 +15,25 @@ Params reconocidos:
 import os
 from typing import Any, Dict, List, Optional
 
-import requests
+from app.fetchers import http_client
 
 
 def fetch_odmgr_records(query_name: str, fields: List[str], *,
                         base_url: Optional[str] = None,
                         filter_field: str = "", filter_value: str = "",
-                        timeout: int = 30) -> List[Dict[str, Any]]:
+                        timeout: int = 30, session=None) -> List[Dict[str, Any]]:
     """Lee TODOS los registros (paginando) de una query de la API GraphQL de
     datos de ODM, seleccionando `fields`. Transporte común del pivote-desde-
-    dataset y del cruce de datasets."""
+    dataset y del cruce de datasets. `session` es la de la especie que pide
+    (por defecto una nueva sobre el pool compartido)."""
+    http = session if session is not None else http_client.session()
     base = base_url or os.environ.get("ODMGR_DATA_URL", "http://localhost:8000/graphql/data")
     sel = " ".join(fields)
     limit, offset, out = 5000, 0, []
     while True:
         farg = f', {filter_field}: "{filter_value}"' if filter_field and filter_value else ""
         gql = f"{{ {query_name}(limit: {limit}, offset: {offset}{farg}) {{ total items {{ {sel} }} }} }}"
-        body = requests.post(base, json={"query": gql}, timeout=timeout).json()
+        body = http.post(base, json={"query": gql}, timeout=timeout).json()
         if "errors" in body:
             raise ValueError(f"API de datos ODM ({query_name}): {body['errors'][0].get('message')}")
         page = body["data"][query_name]
@@ -42,7 +44,7 @@ def fetch_odmgr_records(query_name: str, fields: List[str], *,
     return out
 
 
-def pivots_from_odmgr(params: Dict[str, Any]) -> List[Any]:
+def pivots_from_odmgr(params: Dict[str, Any], session=None) -> List[Any]:
     """Devuelve la lista de valores (sin duplicados, en orden de aparición) del
     campo `pivot_source_field` del dataset fuente.
 
@@ -77,6 +79,7 @@ def pivots_from_odmgr(params: Dict[str, Any]) -> List[Any]:
         base_url=params.get("pivot_source_odmgr_url"),
         filter_field=params.get("pivot_source_filter_field", ""),
         filter_value=params.get("pivot_source_filter_value", ""),
+        session=session,
     )
     out = [r[field] for r in registros if r.get(field)]
     seen = set()
@@ -35,8 +35,6 @@ import logging
 import time
 from typing import Any, Dict, List
 
-import requests
-
 from app.fetchers.base import BaseFetcher, DomainData, ParsedData, RawData
 
 logger = logging.getLogger(__name__)
@@ -190,7 +188,7 @@ class PowerBIFetcher(BaseFetcher):
         timeout   = int(self.params.get("timeout", 60))
 
         headers  = self._build_headers()
-        session  = requests.Session()
+        session  = self.http
         all_rows: list[dict] = []
         restart_token: list | None = None
         page = 0
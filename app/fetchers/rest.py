@@ -1,7 +1,11 @@
 import requests
+import itertools
 import json
 import time
+from typing import Any, Dict, Generator, List
 from app.fetchers.base import BaseFetcher, RawData, ParsedData, DomainData
+from app.fetchers.concurrency import HostRateLimiter, map_bounded
+from app.fetchers.json_stream import JsonArrayStream, wants_streaming
 from app.fetchers.pagination import build as build_pagination
 from app.fetchers.request_building import build_request
 
@@ -19,6 +23,22 @@ def _dig(obj, path):
     return cur
 
 
+# Paginaciones cuyas peticiones se conocen sin esperar a la respuesta anterior
+# (todos los valores del pivote; páginas/offsets sucesivos) y que por tanto
+# pueden pedirse en paralelo con max_concurrent_requests > 1.
+CONCURRENT_PAGINATIONS = ("pivot_loop", "page_number", "query_offset", "query")
+
+
+def _specs_por_adelantado(strat, spec):
+    """Specs de todas las peticiones desde `spec` sin mirar las respuestas. En las
+    paginadas se supone cada página llena: el consumidor corta en la primera página
+    corta y descarta las pedidas de más (como mucho max_concurrent_requests - 1)."""
+    page_size = getattr(strat, "page_size", 1)
+    while spec:
+        yield spec
+        spec = strat.following(last_batch_size=page_size, meta={})
+
+
 def _extract_list(data, content_field):
     if content_field:
         val = _dig(data, content_field)
@@ -26,6 +46,22 @@ def _extract_list(data, content_field):
     return data if isinstance(data, list) else []
 
 
+def _nest(path, items):
+    """Inverso de _dig: {"a": {"b": items}} para la ruta "a.b" (items si no hay ruta)."""
+    for key in reversed([p for p in str(path or "").split(".") if p]):
+        items = {key: items}
+    return items
+
+
+def _por_lotes(items, size):
+    it = iter(items)
+    while True:
+        lote = list(itertools.islice(it, size))
+        if not lote:
+            return
+        yield lote
+
+
 class RESTFetcher(BaseFetcher):
     """Fetcher genérico para APIs REST/JSON sobre HTTP — la ESPECIE REST.
 
@@ -35,9 +71,32 @@ class RESTFetcher(BaseFetcher):
       - extracción (`extraction`): passthrough | field_map | timeseries_long | bindings
     Por defecto (request=query, pagination=none, extraction=passthrough) hace una
     sola petición GET y devuelve el JSON tal cual: comportamiento histórico.
+
+    Con paginación, `stream()` entrega un lote por respuesta en cuanto llega y
+    mantiene `current_state` (página, offset, cursor o índice de pivote) para
+    que el FetcherManager pueda pausar y reanudar; `fetch()` solo los concatena.
+
+    Con `max_concurrent_requests` > 1, pivot_loop y la paginación por página u
+    offset lanzan esas peticiones en paralelo (map_bounded) y reensamblan las
+    respuestas en orden, así que el resultado es el mismo que en serie.
+    `preserve_order=false` deja que pivot_loop procese las respuestas según
+    llegan (el savepoint lista los pivotes ya servidos por delante del primero
+    pendiente, `pivots_done`). `rate_limit_per_second` (y `delay`, como 1/delay peticiones/s)
+    limita el ritmo por host.
+
+    Respuestas grandes (`stream_json`, ver json_stream): en `stream()` el cuerpo
+    se lee por trozos y la lista de registros sale en lotes de `batch_size`
+    (5000) sin cargar el documento entero. Sin paginación solo aplica cuando el
+    resultado es esa lista (hay `extraction`, o la respuesta es un array); si no,
+    o si la lista no aparece, se sigue por el camino de siempre.
     """
 
-    def fetch(self) -> RawData:
+    def _pagination(self) -> str:
+        return (self.params.get("pagination") or "none").lower()
+
+    def _sender(self):
+        """(url, send): `send(url, extra_query, pivot=None, session=None)` hace la
+        petición con la estrategia de construcción y los headers/query fijos."""
         url = self.params.get("url")
         if not url:
             raise ValueError("El parámetro 'url' es obligatorio para RESTFetcher")
@@ -51,9 +110,8 @@ class RESTFetcher(BaseFetcher):
             query_params = json.loads(query_params) if query_params.strip() else {}
 
         request_strategy = self.params.get("request", "query")
-        pagination = (self.params.get("pagination") or "none").lower()
 
-        def _send(target_url, extra_query, pivot=None):
+        def _send(target_url, extra_query, pivot=None, session=None, stream=False):
             rq = build_request(request_strategy, self.params, pivot=pivot)
             merged_headers = {**headers, **rq.get("headers", {})}
             q = {**query_params, **(extra_query or {})}
@@ -62,21 +120,90 @@ class RESTFetcher(BaseFetcher):
                 kwargs["json"] = rq["json"]
             if rq.get("data") is not None:
                 kwargs["data"] = rq["data"]
-            resp = self._request(None, rq["method"], target_url, **kwargs)
+            if stream:
+                kwargs["stream"] = True
+            resp = self._request(session, rq["method"], target_url, **kwargs)
             resp.raise_for_status()
             return resp
 
+        return url, _send
+
+    def fetch(self) -> RawData:
         # Modo histórico: una sola petición, cuerpo según la estrategia, JSON sin tocar.
-        if pagination in ("", "none"):
-            return _send(url, {}).text
+        if self._pagination() in ("", "none"):
+            url, send = self._sender()
+            return send(url, {}).text
+        # Modo paginado: los registros de todas las páginas, sin normalizar.
+        return [rec for batch in self._pages() for rec in batch]
+
+    def stream(self) -> Generator[List[Dict[str, Any]], None, None]:
+        """Un lote normalizado por página/pivote en cuanto llega su respuesta, con
+        `current_state` apuntando a la siguiente petición (pausa/reanudación)."""
+        if self._pagination() in ("", "none"):
+            yield from self._single_stream()
+            return
+        for batch in self._pages():
+            yield self.normalize(batch)
+
+    def _batch_size(self) -> int:
+        return max(1, int(self.params.get("batch_size", 5000) or 5000))
 
-        # Modo paginado: recorre con la estrategia y acumula registros.
+    def _stream_path(self) -> str:
+        """Ruta de la lista de registros en la respuesta única ("" = array de
+        primer nivel). Si la respuesta no la trae, _single_stream devuelve el
+        documento entero."""
+        extraction = (self.params.get("extraction") or "").lower()
+        if not extraction:
+            return ""   # solo un array de primer nivel
+        if extraction == "bindings":
+            return self.params.get("bindings_path", "results.bindings")
+        return self.params.get("content_field") or ""
+
+    def _single_stream(self) -> Generator[List[Dict[str, Any]], None, None]:
+        """Petición única: si el cuerpo es grande, la lista de registros se lee
+        por trozos y se normaliza en lotes de `batch_size`."""
+        path = self._stream_path()
+        url, send = self._sender()
+        resp = send(url, {}, stream=True)
+        if not wants_streaming(resp, self.params):
+            yield from self._emit(self.normalize(self.parse(resp.text)))
+            return
+        reader = JsonArrayStream.from_response(resp, path)
+        try:
+            for lote in _por_lotes(reader, self._batch_size()):
+                batch = self.normalize(_nest(path, lote))
+                if batch:
+                    yield batch
+        finally:
+            resp.close()
+        if not reader.found:
+            # No es la lista esperada: el documento completo, como siempre.
+            yield from self._emit(self.normalize(self.parse(reader.document)))
+
+    @staticmethod
+    def _emit(result) -> Generator[List[Dict[str, Any]], None, None]:
+        if isinstance(result, list):
+            if result:
+                yield result
+        elif isinstance(result, dict):
+            yield [result]
+
+    def _pages(self) -> Generator[List[Any], None, None]:
+        """Recorre la paginación y emite los registros crudos de cada respuesta.
+        Antes de cada yield deja en `current_state` el savepoint de la siguiente
+        petición; con `_resume_state` retoma desde él."""
+        url, _send = self._sender()
+        pagination = self._pagination()
+        request_strategy = self.params.get("request", "query")
         content_field = self.params.get("content_field")
         next_link_field = self.params.get("next_link_field")
         cursor_field = self.params.get("cursor_field")
         max_records = int(self.params.get("max_records", 0) or 0)
         delay = float(self.params.get("delay", self.params.get("delay_between_pages", 0)) or 0)
         preview_limit = int(self.params.get("_preview_limit", 0) or 0)
+        resume_state = self.params.get("_resume_state") or {}
+        if isinstance(resume_state, str):
+            resume_state = json.loads(resume_state)
 
         strat_params = self.params
         if pagination == "pivot_loop" and (self.params.get("pivot_generate") or self.params.get("pivot_length")):
@@ -88,7 +215,7 @@ class RESTFetcher(BaseFetcher):
             # Los valores del pivote salen de un dataset ya cosechado en ODM
             # (p. ej. códigos DIR3 del catálogo oficial).
             from app.fetchers.pivot_sources import pivots_from_odmgr
-            strat_params = {**self.params, "pivot_values": pivots_from_odmgr(self.params)}
+            strat_params = {**self.params, "pivot_values": pivots_from_odmgr(self.params, session=self.http)}
         strat = build_pagination(pagination, url, strat_params)
         # Con pivot_loop + cuerpo (json_body/form) el pivote viaja en el payload via
         # '{pivot}'; no debe filtrarse también como parámetro de query.
@@ -98,6 +225,8 @@ class RESTFetcher(BaseFetcher):
         # puente DIR3→ids de BDNS).
         pivot_field_out = self.params.get("pivot_field_out") or None
         # Dedup entre iteraciones del pivote (fidelidad con el antiguo RestLoopFetcher).
+        # Al reanudar se pierde el conjunto de vistos: un id repetido entre pivotes
+        # de antes y de después de la pausa solo lo quita el staging con `dedup_key`.
         id_field = self.params.get("id_field") or None
         vistos = set()
         # Preview con pivot_loop: sin cap, un preview recorrería TODOS los valores
@@ -107,15 +236,25 @@ class RESTFetcher(BaseFetcher):
         max_pivot_requests = preview_limit if (preview_limit and pagination == "pivot_loop") else 0
         if max_pivot_requests:
             delay = min(delay, 0.2)
-        pivot_requests = 0
-        spec = strat.first()
-        all_records = []
-        while spec:
-            pivot_requests += 1
+
+        batch_size = self._batch_size()
+
+        def _respuesta(spec, session=None, stream=False):
             extra_q = {} if pivote_en_cuerpo else spec.get("query")
-            resp = _send(spec["url"], extra_q, pivot=spec.get("pivot"))
-            data = json.loads(resp.text) if resp.text and resp.text.strip() else {}
-            batch = _extract_list(data, content_field)
+            return _send(spec["url"], extra_q, pivot=spec.get("pivot"), session=session,
+                         stream=stream)
+
+        def _json(resp):
+            return json.loads(resp.text) if resp.text and resp.text.strip() else {}
+
+        def _pedir(spec, session=None):
+            return _json(_respuesta(spec, session))
+
+        def _lote(spec, data, batch=None):
+            """Registros de la respuesta `data` (o ya extraídos en `batch`, cuando
+            la página se lee por trozos) con pivote y dedup aplicados."""
+            if batch is None:
+                batch = _extract_list(data, content_field)
             if (not batch and pagination == "pivot_loop" and not content_field
                     and isinstance(data, dict) and data):
                 # Respuesta objeto por valor de pivote (p. ej. /organos/codigo de
@@ -134,22 +273,119 @@ class RESTFetcher(BaseFetcher):
                         vistos.add(clave)
                     nuevos.append(reg)
                 batch = nuevos
-            all_records.extend(batch)
-            if preview_limit and len(all_records) >= preview_limit:
-                break
-            if max_pivot_requests and pivot_requests >= max_pivot_requests:
-                break
-            if max_records and len(all_records) >= max_records:
-                break
-            meta = {
-                "next_link": _dig(data, next_link_field) if next_link_field else None,
-                "next_cursor": _dig(data, cursor_field) if cursor_field else None,
-            }
-            nxt = strat.following(last_batch_size=len(batch), meta=meta)
+            return batch
+
+        def _basta():
+            if preview_limit and total >= preview_limit:
+                return True
+            if max_pivot_requests and requests_done >= max_pivot_requests:
+                return True
+            return bool(max_records and total >= max_records)
+
+        # Páginas ya servidas antes de la pausa (para max_pages y el savepoint) y,
+        # si se pausó a mitad de una página grande, registros de ella ya entregados.
+        pages_done = int(resume_state.get("pages_fetched", 0)) if resume_state else 0
+        saltar = int(resume_state.get("page_records", 0)) if resume_state else 0
+        spec = strat.resume(resume_state) if resume_state else strat.first()
+        requests_done = 0
+        total = 0
+
+        if spec and self.max_concurrent_requests > 1 and pagination in CONCURRENT_PAGINATIONS:
+            if delay:
+                # La pausa fija entre peticiones se traduce a un ritmo por host.
+                rate = self._rate_limiter.rate if self._rate_limiter else 0
+                self._rate_limiter = HostRateLimiter(min(rate, 1 / delay) if rate else 1 / delay)
+            ordered = pagination != "pivot_loop" or str(
+                self.params.get("preserve_order", "true")).lower() not in ("false", "0", "no")
+            page_size = getattr(strat, "page_size", 0)
+            # Peticiones emitidas y aún no consumidas, en orden: la primera es el
+            # savepoint (lo anterior ya se ha entregado). Sin orden, los pivotes
+            # servidos por delante de ella van en el estado (`pivots_done`) y no se
+            # repiten al reanudar.
+            pendientes: Dict[int, Any] = {}
+
+            def _emitidas():
+                for seq, sp in enumerate(_specs_por_adelantado(strat, spec)):
+                    pendientes[seq] = sp
+                    yield seq, sp
+
+            for (seq, sp), data in map_bounded(lambda item: _pedir(item[1]),
+                                               _emitidas(), self.max_concurrent_requests,
+                                               ordered=ordered):
+                requests_done += 1
+                pages_done += 1
+                del pendientes[seq]
+                if pagination == "pivot_loop":
+                    strat.done.add(sp["index"])
+                # pausa a mitad de esta página en una ejecución en serie
+                ya = saltar if seq == 0 else 0
+                batch = (_lote(sp, data, _extract_list(data, content_field)[ya:])
+                         if ya else _lote(sp, data))
+                if preview_limit:
+                    batch = batch[:preview_limit - total]
+                total += len(batch)
+                fin = _basta() or (pagination != "pivot_loop" and ya + len(batch) < page_size)
+                nxt = None if fin or not pendientes else pendientes[min(pendientes)]
+                self.current_state = strat.checkpoint(nxt, pages_done)
+                if batch:
+                    yield batch
+                if fin:
+                    break
+            return
+
+        while spec:
+            requests_done += 1
+            pages_done += 1
+            en_pagina = saltar   # lo ya entregado cuenta para saber si la página viene llena
+            resp = _respuesta(spec, stream=True)
+            if wants_streaming(resp, self.params):
+                # Página grande: sus registros salen en lotes según se leen. El
+                # savepoint de cada lote es esta misma página más los registros
+                # ya leídos de ella (`page_records`), que se saltan al reanudar.
+                reader = JsonArrayStream.from_response(resp, content_field)
+                leidos = saltar
+                try:
+                    for trozo in _por_lotes(itertools.islice(reader, saltar, None), batch_size):
+                        leidos += len(trozo)
+                        batch = _lote(spec, None, trozo)
+                        if preview_limit:
+                            batch = batch[:preview_limit - total]
+                        total += len(batch)
+                        en_pagina += len(batch)
+                        self.current_state = {**strat.checkpoint(spec, pages_done - 1),
+                                              "page_records": leidos}
+                        if batch:
+                            yield batch
+                        if _basta():
+                            break
+                finally:
+                    resp.close()
+                # Lo que rodea a la lista (enlace, cursor) queda en reader.document.
+                data = reader.document if reader.document is not None else {}
+                batch = [] if reader.found else _lote(spec, data)
+            else:
+                data = _json(resp)
+                batch = (_lote(spec, data, _extract_list(data, content_field)[saltar:])
+                         if saltar else _lote(spec, data))
+            saltar = 0
+            if preview_limit:
+                batch = batch[:preview_limit - total]
+            total += len(batch)
+            en_pagina += len(batch)
+            nxt = None
+            if not _basta():
+                meta = {
+                    "next_link": _dig(data, next_link_field) if next_link_field else None,
+                    "next_cursor": _dig(data, cursor_field) if cursor_field else None,
+                }
+                nxt = strat.following(last_batch_size=en_pagina, meta=meta)
+            # Savepoint antes del yield: si el manager pausa aquí, no se vuelve.
+            self.current_state = strat.checkpoint(nxt, pages_done)
+            if batch:
+                yield batch
             if nxt and delay:
                 time.sleep(delay)
             spec = nxt
-        return all_records[:preview_limit] if preview_limit else all_records
 
     def parse(self, raw: RawData) -> ParsedData:
         if isinstance(raw, (list, dict)):
@@ -21,8 +21,6 @@ import logging
 import re
 from typing import Any, Dict, List
 
-import requests
-
 from app.fetchers.base import BaseDiscoverer
 
 logger = logging.getLogger(__name__)
@@ -70,8 +68,8 @@ class RestApiDiscovererFetcher(BaseDiscoverer):
     def propose(self) -> List[Dict[str, Any]]:
         cfg = self._cfg()
         logger.info(f"[rest-discover] Leyendo OpenAPI: {cfg['spec_url']}")
-        spec = requests.get(cfg["spec_url"], headers={"User-Agent": "Mozilla/5.0", "Accept": "application/json"},
-                            timeout=int(self.params.get("timeout", 30))).json()
+        spec = self.http.get(cfg["spec_url"], headers={"User-Agent": "Mozilla/5.0", "Accept": "application/json"},
+                             timeout=int(self.params.get("timeout", 30))).json()
         paths = spec.get("paths", {})
 
         # Datasets: paths /{name}/busqueda
@@ -102,7 +100,7 @@ class RestApiDiscovererFetcher(BaseDiscoverer):
         n_lookups = 0
         excluidos: List[str] = []
         if cfg["include_lookups"]:
-            sess = requests.Session()
+            sess = self.http
             ua = {"User-Agent": "Mozilla/5.0", "Accept": "application/json"}
             for path, ops in paths.items():
                 seg = path.strip("/").split("/")
@@ -40,17 +40,27 @@ SearchLoopHtmlFetcher - Fetcher para buscadores HTML con tres modos de operació
            // sin subpage_link_selector → nivel hoja
          }
        ]
+
+En los tres modos, `max_concurrent_requests` > 1 procesa varios valores de
+búsqueda a la vez (una sesión por trabajador, límite por host compartido) y
+`current_state` guarda los valores terminados para reanudar sin repetirlos.
 """
+import copy
+import hashlib
 import json
+import queue
 import re
 import time
 import logging
-import requests
 from urllib.parse import urljoin
 from bs4 import BeautifulSoup
 from typing import Dict, Generator, List, Any, Optional
 
+from app.fetchers import http_client
 from app.fetchers.base import BaseFetcher, RawData, ParsedData, DomainData
+from app.fetchers.concurrency import TokenBucket, map_bounded
+from app.fetchers.enrichment import DetailEnricher
+from app.fetchers.html_extraction import html_backend, make_soup
 
 logger = logging.getLogger(__name__)
 
@@ -59,12 +69,15 @@ class SearchLoopHtmlFetcher(BaseFetcher):
 
     def __init__(self, params):
         super().__init__(params)
-        self.session = requests.Session()
+        self.session = self.http
         # Estado del formulario (cacheado): hidden inputs y acción descubierta.
         self._form_state_loaded = False
         self._form_hidden: Dict[str, str] = {}
         self._discovered_action: Optional[str] = None
         self._form_soup: Optional[BeautifulSoup] = None
+        self._enricher: Optional[DetailEnricher] = None
+        # html.parser | lxml: constructor del árbol BeautifulSoup (ver html_extraction.py)
+        self._html_parser = html_backend(params)
 
     # ------------------------------------------------------------------
     # HTTP helpers
@@ -101,7 +114,7 @@ class SearchLoopHtmlFetcher(BaseFetcher):
             kwargs["data"] = data
             kwargs["params"] = params
         resp = self._request(self.session, method.upper(), url, **kwargs)
-        return BeautifulSoup(resp.text, "html.parser")
+        return make_soup(resp.text, self._html_parser)
 
     def _ensure_form_state(self) -> None:
         """Carga (una vez) la página del formulario: cachea sus inputs hidden y la
@@ -473,9 +486,11 @@ class SearchLoopHtmlFetcher(BaseFetcher):
         """Enriquecimiento opcional por página de detalle (patrón listado→detalle).
         Si `detail_level` está definido (mismo esquema que un nivel de `levels`),
         visita la URL capturada por fila (`row_link_field`, por defecto
-        `_detail_url`) y fusiona los campos extraídos en el registro."""
-        detail_cfg = _parse_json_param(self.params.get("detail_level", {}))
-        if not detail_cfg:
+        `_detail_url`) y fusiona los campos extraídos en el registro. Los detalles
+        se piden con la etapa común de app/fetchers/enrichment.py (concurrencia,
+        dedup entre pivotes y caché opcional en disco)."""
+        enricher = self._detail_enricher()
+        if enricher is None:
             return records
         preview = int(self.params.get("_preview_limit", 0) or 0)
         # En preview, el enriquecimiento por detalle (1 petición por fila) es caro
@@ -484,29 +499,24 @@ class SearchLoopHtmlFetcher(BaseFetcher):
         # (preview_detail_max, def. 5) sin esperas, salvo preview_detail=false.
         if preview and str(self.params.get("preview_detail", "true")).lower() in ("0", "false", "no"):
             return records
-        url_field = self.params.get("detail_url_field",
-                                    self.params.get("row_link_field", "_detail_url"))
-        delay = float(self.params.get("detail_delay", 1.0))
         if preview:
-            delay = 0.0
             records = records[:min(preview, int(self.params.get("preview_detail_max", 5)))]
-        total = len(records)
-        for i, rec in enumerate(records):
-            durl = rec.get(url_field)
-            if not durl:
-                continue
-            try:
-                soup = self._fetch(durl)
-                rec.update(self._apply_level_config(soup, detail_cfg))
-            except Exception as exc:
-                logger.error(f"[detalle {i + 1}/{total}] Error en {durl}: {exc}")
-                if self.params.get("stop_on_error", False):
-                    raise
-            if preview and i + 1 >= preview:
-                break
-            if delay > 0 and i < total - 1:
-                time.sleep(delay)
-        return records
+        return enricher.enrich(records, self._fetch_detail)
+
+    def _detail_enricher(self) -> Optional[DetailEnricher]:
+        """La etapa de detalle de esta ejecución (None sin `detail_level`). stream()
+        la crea antes de repartir pivotes para que los trabajadores la compartan."""
+        if self._enricher is None:
+            detail_cfg = _parse_json_param(self.params.get("detail_level", {}))
+            if detail_cfg:
+                self._enricher = DetailEnricher.from_params(
+                    self.params,
+                    lambda html: self._apply_level_config(make_soup(html, self._html_parser), detail_cfg),
+                    detail_cfg, max_workers=self.max_concurrent_requests)
+        return self._enricher
+
+    def _fetch_detail(self, url: str, headers: Dict[str, str]):
+        return self._request(self.session, "GET", url, headers={**self._get_headers(), **headers})
 
     def _resolve_search_mode(self):
         """Resuelve (method, enctype, use_multiselect, carry_hidden) a partir de
@@ -551,7 +561,16 @@ class SearchLoopHtmlFetcher(BaseFetcher):
         return self._discover_search_values()
 
     def stream(self) -> Generator[List[Dict], None, None]:
-        """Yields one batch of records per pivot value."""
+        """Yields one batch of records per pivot value.
+
+        Con `max_concurrent_requests` > 1 se procesan tantos valores a la vez,
+        cada uno en un trabajador con su propia sesión (cookies) y estado de
+        formulario; todos comparten el límite por host (`rate_limit_per_second`,
+        pausas 429/503) y los valores arrancan como mucho uno cada
+        `delay_between_searches` segundos. Los lotes salen según terminan.
+
+        `current_state` registra los valores terminados (por índice); al
+        reanudar con `_resume_state` se saltan, sea cual sea el modo."""
         url_template = self.params.get("url_template", "")
         if not url_template and not self.params.get("url"):
             raise ValueError("Se requiere 'url' o 'url_template'")
@@ -566,7 +585,6 @@ class SearchLoopHtmlFetcher(BaseFetcher):
 
         search_values = self._get_search_values()
         delay_between = float(self.params.get("delay_between_searches", 1.0))
-        field_tag = self.params.get("search_field_name", "search_value")
         preview_limit = int(self.params.get("_preview_limit", 0))
         if preview_limit:
             # En preview basta el primer pivote para validar el recurso; sin esperas.
@@ -574,30 +592,118 @@ class SearchLoopHtmlFetcher(BaseFetcher):
             delay_between = 0.0
         total_yielded = 0
 
-        for i, val in enumerate(search_values):
-            logger.info(f"[{i+1}/{len(search_values)}] Procesando: {val}")
-            try:
-                records = self._fetch_for_value(val)
-                logger.info(f"  → {len(records)} registros")
-                if records:
-                    if preview_limit:
-                        remaining = preview_limit - total_yielded
-                        records = records[:remaining]
-                    if records:
-                        yield records
-                        total_yielded += len(records)
-            except Exception as exc:
-                logger.error(f"  Error en valor '{val}': {exc}")
-                if self.params.get("stop_on_error", False):
-                    raise
+        key = _pivots_key(search_values)
+        done = self._resume_pivots(key)
+        pending = [i for i in range(len(search_values)) if i not in done]
+        if done:
+            logger.info(f"Reanudando: {len(done)} de {len(search_values)} valores ya procesados")
+        workers = min(self.max_concurrent_requests, len(pending))
+        if workers > 1 and not preview_limit:
+            results = self._pivots_in_pool(search_values, pending, workers, delay_between)
+        else:
+            results = self._pivots_in_series(search_values, pending, delay_between)
+        done_before = 0
+        enricher = self._detail_enricher()
 
-            if preview_limit and total_yielded >= preview_limit:
-                logger.info(f"  Preview limit {preview_limit} alcanzado — parando.")
-                break
+        try:
+            for i, records in results:
+                val = search_values[i]
+                if isinstance(records, Exception):
+                    logger.error(f"  Error en valor '{val}': {records}")
+                    if self.params.get("stop_on_error", False):
+                        raise records
+                    continue
+                logger.info(f"  {val} → {len(records)} registros")
+                done.add(i)
+                while done_before in done:
+                    done_before += 1
+                self.current_state = {
+                    "pivots_key": key,
+                    "pivots_done_before": done_before,
+                    "pivots_done": sorted(j for j in done if j > done_before),
+                }
+                if preview_limit:
+                    records = records[:preview_limit - total_yielded]
+                if records:
+                    yield records
+                    total_yielded += len(records)
 
-            if delay_between > 0 and i < len(search_values) - 1:
+                if preview_limit and total_yielded >= preview_limit:
+                    logger.info(f"  Preview limit {preview_limit} alcanzado — parando.")
+                    break
+        finally:
+            results.close()
+            if enricher is not None:
+                self.profile_stats["detail_enrichment"] = enricher.stats.as_dict()
+                logger.info(f"Detalle: {enricher.stats.summary()}")
+
+    def _pivots_in_series(self, values: List[str], pending: List[int],
+                          delay_between: float) -> Generator[tuple, None, None]:
+        """(índice, registros | excepción) de cada valor pendiente, uno tras otro."""
+        for n, i in enumerate(pending):
+            logger.info(f"[{i+1}/{len(values)}] Procesando: {values[i]}")
+            try:
+                records: Any = self._fetch_for_value(values[i])
+            except Exception as exc:
+                records = exc
+            yield i, records
+            if delay_between > 0 and n < len(pending) - 1:
                 time.sleep(delay_between)
 
+    def _pivots_in_pool(self, values: List[str], pending: List[int], workers: int,
+                        delay_between: float) -> Generator[tuple, None, None]:
+        """Como `_pivots_in_series`, con `workers` valores en vuelo; cada hilo toma
+        un trabajador libre (se crean según hacen falta) y lo devuelve al acabar."""
+        idle: "queue.SimpleQueue[Optional[SearchLoopHtmlFetcher]]" = queue.SimpleQueue()
+        for _ in range(workers):
+            idle.put(None)
+        pace = TokenBucket(1 / delay_between) if delay_between > 0 else None
+
+        def run(i: int):
+            worker = idle.get()
+            try:
+                if worker is None:
+                    worker = self._pivot_worker()
+                if pace is not None:
+                    pace.acquire()
+                logger.info(f"[{i+1}/{len(values)}] Procesando: {values[i]}")
+                return worker._fetch_for_value(values[i])
+            except Exception as exc:
+                return exc
+            finally:
+                idle.put(worker)
+
+        return map_bounded(run, pending, workers, ordered=False)
+
+    def _pivot_worker(self) -> "SearchLoopHtmlFetcher":
+        """Copia de la especie para un hilo del pool: sesión y estado de formulario
+        propios (Struts ata el formulario a la cookie de sesión); comparte params,
+        limitador por host y caché HTTP."""
+        worker = copy.copy(self)
+        worker._http = http_client.session()
+        worker.session = worker._http
+        worker._form_state_loaded = False
+        worker._form_hidden = {}
+        worker._discovered_action = None
+        worker._form_soup = None
+        session_init_url = self.params.get("session_init_url", "")
+        if session_init_url:
+            worker._fetch(session_init_url)
+        return worker
+
+    def _resume_pivots(self, key: str) -> set:
+        """Índices de pivote ya terminados según `_resume_state` (vacío si la lista
+        de valores no es la misma que la de la ejecución pausada)."""
+        state = self.params.get("_resume_state") or {}
+        if isinstance(state, str):
+            state = json.loads(state)
+        if not state:
+            return set()
+        if state.get("pivots_key") != key:
+            logger.warning("La lista de valores de búsqueda ha cambiado desde la pausa; se empieza de cero")
+            return set()
+        return set(range(int(state.get("pivots_done_before", 0)))) | set(state.get("pivots_done") or [])
+
     def fetch(self) -> RawData:
         all_records: List[Dict] = []
         for chunk in self.stream():
@@ -668,6 +774,11 @@ def _parse_json_param(value: Any) -> Any:
     return value or {}
 
 
+def _pivots_key(values: List[str]) -> str:
+    """Huella de la lista de valores de búsqueda (el savepoint guarda índices)."""
+    return hashlib.sha1("\x1f".join(values).encode("utf-8")).hexdigest()[:16]
+
+
 def _as_bool(value: Any) -> bool:
     """Interpreta un param como booleano (acepta bool, 'true'/'1'/'yes', etc.)."""
     if isinstance(value, bool):
@@ -15,6 +15,10 @@ Dos modos de operación, deducidos por el FetcherManager según
   cada URL en `_matched_urls` (inyectada por el FetcherManager desde la fila
   `ResourceCandidate` asociada) y enriquece cada registro con las
   `_dimensions` detectadas (year, month, etc.) como columnas adicionales.
+  Con `max_concurrent_requests` > 1 y/o `num_workers` > 1 descarga y parseo van
+  en tubería: descargas en un pool de hilos (cortesía por host de
+  `_request`) y parseo en un pool de procesos; los registros salen en el
+  orden de las URLs.
 
 FetcherParam visible al operador: SOLO `root_url`. Todo lo demás vive como
 defaults internos en `_DEFAULTS`.
@@ -22,19 +26,24 @@ defaults internos en `_DEFAULTS`.
 
 from __future__ import annotations
 
+import hashlib
 import logging
+import multiprocessing
+import os
 import re
 import time
 from collections import deque, defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, Generator, List, Tuple
-from urllib.parse import urljoin, urlparse
-
-import requests
-from bs4 import BeautifulSoup
+from urllib.parse import urlparse
 
 from app.fetchers.base import BaseFetcher, DomainData, ParsedData, RawData
+from app.fetchers.concurrency import HostRateLimiter, HostSlots, map_bounded
+from app.fetchers.crawl_state import MODES as CRAWL_MODES, CrawlState
 from app.fetchers.file_parsers import infer_file_format, parse_structured_file
+from app.fetchers.html_extraction import html_backend
+from app.fetchers.navigation import UrlSet, extract_links, normalize_url
 
 
 logger = logging.getLogger(__name__)
@@ -56,8 +65,15 @@ _DEFAULTS: Dict[str, Any] = {
     "navigation_link_selector": "a[href]",
     "file_link_selector": "a[href]",
     "batch_size": 500,
+    "incremental_crawl": "subtree",  # re-descubrimiento: subtree | pages | off (ver crawl_state.py)
+    "full_crawl_every_days": 30,     # cada cuánto se piden todas las páginas aunque la raíz no cambie
 }
 
+def _parse_file(content: bytes, fmt: str, url: str) -> List[Dict[str, Any]]:
+    """Parseo de un fichero descargado; a nivel de módulo para el pool de procesos."""
+    return parse_structured_file(content, fmt, {}, source_name=url)
+
+
 _FILENAME_YEAR_RE = re.compile(r"(?<![0-9])(?:19|20)\d{2}(?![0-9])")
 
 
@@ -121,7 +137,7 @@ class WebTreeFetcher(BaseFetcher):
 
     def __init__(self, params: Dict[str, Any]):
         super().__init__(params)
-        self.session = requests.Session()
+        self.session = self.http
         self._headers = {
             "User-Agent": (
                 "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -213,17 +229,6 @@ class WebTreeFetcher(BaseFetcher):
             return value
         return str(value).strip().lower() in {"1", "true", "yes", "si", "on"}
 
-    def _extract_links(self, soup: BeautifulSoup, base_url: str, selector: str) -> List[Tuple[str, str]]:
-        links: List[Tuple[str, str]] = []
-        for el in soup.select(selector):
-            href = el.get("href")
-            if not href:
-                continue
-            absolute = urljoin(base_url, href)
-            anchor = " ".join(el.get_text(" ", strip=True).split())
-            links.append((absolute, anchor))
-        return links
-
     # ───────────────────────────────────────────────────────────────────
     # DISCOVER mode (padre)
     # ───────────────────────────────────────────────────────────────────
@@ -234,8 +239,17 @@ class WebTreeFetcher(BaseFetcher):
         También calcula y almacena `self.profile_stats` con el histograma
         de segmentos, extensiones y profundidad.
         No descarga ficheros. No toca BD.
+
+        El BFS va por niveles: las páginas de un nivel se piden a la vez (hasta
+        `max_concurrent_requests` en vuelo por dominio, con la cortesía por host
+        de `_request`; `page_delay` pasa a ser un ritmo de 1/page_delay páginas/s)
+        y sus resultados se procesan en el orden de la cola, así que hojas,
+        profundidades y filtros salen igual que en el recorrido en serie.
+
+        Con `_crawl_state_path` (lo pone el manager por colección) el recorrido es
+        incremental: ver app/fetchers/crawl_state.py.
         """
-        root_url = self._root_url()
+        root_url = normalize_url(self._root_url())
         max_depth = int(self._opt("max_depth"))
         page_delay = float(self._opt("page_delay"))
         crawl_timeout = int(self._opt("crawl_timeout"))
@@ -247,85 +261,156 @@ class WebTreeFetcher(BaseFetcher):
         includes = self._patrones("include_patterns")  # filtra las hojas a conservar
         excludes = self._patrones("exclude_patterns")
 
+        per_host = self.max_concurrent_requests
+        if per_host > 1 and page_delay > 0:
+            rate = self._rate_limiter.rate if self._rate_limiter else 0
+            self._rate_limiter = HostRateLimiter(min(rate, 1 / page_delay) if rate else 1 / page_delay)
+        slots = HostSlots(per_host)
+
+        # Estado del crawl anterior (huellas por página) y el que se escribe ahora.
+        state_path = self.params.get("_crawl_state_path")
+        mode = str(self._opt("incremental_crawl")).strip().lower()
+        if mode not in CRAWL_MODES:
+            raise ValueError(f"incremental_crawl debe ser uno de {CRAWL_MODES}, no '{mode}'")
+        backend = html_backend(self.params)   # motor de los selectores de enlaces
+        state_key = CrawlState.fingerprint(root_url, file_selector, nav_selector, backend)
+        previous = (CrawlState.load(state_path, state_key) if state_path and mode != "off"
+                    else CrawlState(key=state_key))
+        if mode == "subtree" and previous.needs_full_crawl(float(self._opt("full_crawl_every_days"))):
+            mode = "pages"
+        current = CrawlState(full_crawl_at=time.time() if mode != "subtree" else previous.full_crawl_at,
+                             key=state_key)
+        crawl_stats = {"requested": 0, "not_modified": 0, "same_content": 0, "changed": 0, "pruned": 0}
+
         root_netloc = urlparse(root_url).netloc
-        queue: deque = deque([(root_url, 0)])
-        visited_pages: set = set()
-        visited_files: set = set()
+        seen_pages = UrlSet([root_url])     # encoladas o visitadas
+        seen_files = UrlSet()
         leaves: List[Dict[str, Any]] = []
-
-        while queue:
-            page_url, depth = queue.popleft()
-            if page_url in visited_pages:
-                continue
-            if depth > max_depth:
-                continue
-            if not self._page_allowed(page_url, root_netloc, same_domain_only):
-                continue
-
-            visited_pages.add(page_url)
-            logger.info("[WebTree.discover] depth=%s %s", depth, page_url)
-
+        pages_done = 0
+
+        def fetch_page(item: Tuple[str, int, bool]):
+            """(estado, entrada) de una página: 'pruned' (no se pide: se reproduce
+            del crawl anterior), 'not_modified' / 'same_content' (se pidió, sin
+            cambios) o 'changed' (parseada). None si no es HTML, o la excepción."""
+            page_url, _, pruned = item
+            entry = previous.page(page_url)
+            if pruned and entry is not None:
+                return "pruned", entry
             try:
-                response = self._request(
-                    self.session, "GET", page_url,
-                    headers=self._headers, timeout=crawl_timeout,
-                )
+                with slots.slot(page_url):
+                    response = self._request(
+                        self.session, "GET", page_url,
+                        headers={**self._headers, **CrawlState.conditional_headers(entry)},
+                        timeout=crawl_timeout,
+                    )
+                if response.status_code == 304 and entry is not None:
+                    return "not_modified", entry
+                content_type = (response.headers.get("Content-Type") or "").lower()
+                if "html" not in content_type and "xml" not in content_type:
+                    return None
+                sha = hashlib.sha256(response.content).hexdigest()
+                if entry is not None and entry.get("sha256") == sha:
+                    return "same_content", {**entry, **CrawlState.entry(response, sha, entry["files"], entry["links"])}
+                html = response.text
+                files = extract_links(html, page_url, file_selector, backend)
+                nav = files if nav_selector == file_selector else extract_links(html, page_url, nav_selector, backend)
+                return "changed", CrawlState.entry(response, sha, [list(f) for f in files],
+                                                   [normalize_url(u) for u, _ in nav])
             except Exception as exc:
-                logger.warning("[WebTree.discover] error en %s: %s", page_url, exc)
-                continue
-
-            content_type = (response.headers.get("Content-Type") or "").lower()
-            if "html" not in content_type and "xml" not in content_type:
-                continue
-
-            soup = BeautifulSoup(response.text, "html.parser")
-
-            for file_url, anchor in self._extract_links(soup, page_url, file_selector):
-                if file_url in visited_files:
-                    continue
-                if not self._file_allowed(file_url, allowed_ext):
-                    continue
-                if self._excluida(file_url, excludes) or not self._incluida(file_url, includes):
-                    continue
-                visited_files.add(file_url)
-                if max_files and len(visited_files) >= max_files:
-                    queue.clear()
-                    break
-                leaves.append({
-                    "url": file_url,
-                    "file_type": self._resolve_format(file_url),
-                    "source_page": page_url,
-                    "depth": depth,
-                    "anchor_text": anchor,
-                })
-
-            if depth < max_depth:
-                for next_url, _ in self._extract_links(soup, page_url, nav_selector):
-                    if next_url in visited_pages:
-                        continue
-                    if not self._page_allowed(next_url, root_netloc, same_domain_only):
-                        continue
-                    if not self._en_subrama(next_url, nav_prefix):
+                return exc
+
+        def in_series(level):
+            for item in level:
+                result = fetch_page(item)
+                yield item, result
+                if (page_delay > 0 and isinstance(result, tuple) and result[0] != "pruned"):
+                    time.sleep(page_delay)
+
+        level: List[Tuple[str, int, bool]] = [(root_url, 0, False)]
+        stop = False
+        while level and not stop:
+            if per_host > 1:
+                hosts = len({urlparse(u).netloc for u, _, _ in level})
+                results = map_bounded(fetch_page, level, min(64, per_host * hosts))
+            else:
+                results = in_series(level)
+            next_level: List[Tuple[str, int, bool]] = []
+            try:
+                for (page_url, depth, _), result in results:
+                    pages_done += 1
+                    if isinstance(result, Exception):
+                        logger.warning("[WebTree.discover] error en %s: %s", page_url, result)
                         continue
-                    if self._excluida(next_url, excludes):
+                    if result is None:
                         continue
-                    queue.append((next_url, depth + 1))
-
-            self.current_state = {
-                "last_page_url": page_url,
-                "last_depth": depth,
-                "pages_seen": len(visited_pages),
-                "files_seen": len(visited_files),
-            }
-
-            if page_delay > 0:
-                time.sleep(page_delay)
+                    status, entry = result
+                    crawl_stats[status] += 1
+                    if status != "pruned":
+                        crawl_stats["requested"] += 1
+                        logger.info("[WebTree.discover] depth=%s %s (%s)", depth, page_url, status)
+                    current.pages[page_url] = entry
+                    # Los hijos de una página sin cambios se podan (modo subtree).
+                    prune_children = mode == "subtree" and status != "changed"
+
+                    for file_url, anchor in entry["files"]:
+                        file_url = normalize_url(file_url)
+                        if file_url in seen_files:
+                            continue
+                        if not self._file_allowed(file_url, allowed_ext):
+                            continue
+                        if self._excluida(file_url, excludes) or not self._incluida(file_url, includes):
+                            continue
+                        seen_files.add(file_url)
+                        leaves.append({
+                            "url": file_url,
+                            "file_type": self._resolve_format(file_url),
+                            "source_page": page_url,
+                            "depth": depth,
+                            "anchor_text": anchor,
+                        })
+                        if max_files and len(leaves) >= max_files:
+                            stop = True
+                            break
+                    if stop:
+                        break
+
+                    for next_url in (entry["links"] if depth < max_depth else []):
+                        if next_url in seen_pages:
+                            continue
+                        if self._resolve_format(next_url):
+                            continue   # fichero de datos, no página: no se descarga
+                        if not self._page_allowed(next_url, root_netloc, same_domain_only):
+                            continue
+                        if not self._en_subrama(next_url, nav_prefix):
+                            continue
+                        if self._excluida(next_url, excludes):
+                            continue
+                        seen_pages.add(next_url)
+                        next_level.append((next_url, depth + 1, prune_children))
+
+                    self.current_state = {
+                        "last_page_url": page_url,
+                        "last_depth": depth,
+                        "pages_seen": pages_done,
+                        "files_seen": len(seen_files),
+                    }
+            finally:
+                results.close()
+            level = next_level
 
         # Calcular y almacenar histograma (función pura)
         self.profile_stats = _build_profile_stats(leaves)
+        current.files = {leaf["url"] for leaf in leaves}
+        if state_path and mode != "off":
+            crawl_stats["mode"] = mode
+            crawl_stats["new_files"] = len(current.files - previous.files) if previous.pages else None
+            self.profile_stats["crawl"] = crawl_stats
+            if not max_files:   # una cata (preview) no sustituye al estado completo
+                current.save(state_path)
+            logger.info("[WebTree.discover] crawl %s: %s", mode, crawl_stats)
         logger.info(
             "[WebTree.discover] %s ficheros hoja en %s páginas | stats: %s ext, depth dominante %s",
-            len(leaves), len(visited_pages),
+            len(leaves), pages_done,
             list(self.profile_stats.get("file_extensions", {}).keys()),
             self.profile_stats.get("dominant_depth"),
         )
@@ -413,8 +498,81 @@ class WebTreeFetcher(BaseFetcher):
 
     def _download_and_parse(self, url: str) -> List[Dict[str, Any]]:
         content = self._download_bytes(url)
-        fmt = self._resolve_format(url)
-        return parse_structured_file(content, fmt, {}, source_name=url)
+        return _parse_file(content, self._resolve_format(url), url)
+
+    def _files_in_series(self, urls: List[str], start: int, file_delay: float):
+        """(i, url, registros | None si falló) de cada fichero, uno tras otro."""
+        for i in range(start, len(urls)):
+            url = urls[i]
+            try:
+                records = self._download_and_parse(url)
+            except Exception as exc:
+                logger.warning("[WebTree.stream] error descargando %s: %s", url, exc)
+                yield i, url, None
+                continue
+            yield i, url, records
+            if file_delay > 0:
+                time.sleep(file_delay)
+
+    def _files_pipelined(self, urls: List[str], start: int, file_delay: float):
+        """Igual que _files_in_series, en tubería: hasta `max_concurrent_requests`
+        descargas en vuelo (hilos sobre el pool HTTP compartido, con el límite por
+        host de _request) y, con `num_workers` > 1, el parseo (CPU: Excel/PDF) en
+        un pool de procesos (como mucho uno por núcleo). Sale en el orden de las URLs; la memoria queda acotada
+        por las dos ventanas."""
+        if file_delay > 0:
+            # La pausa entre ficheros se traduce a un ritmo por host.
+            rate = self._rate_limiter.rate if self._rate_limiter else 0
+            self._rate_limiter = HostRateLimiter(min(rate, 1 / file_delay) if rate else 1 / file_delay)
+        # Más procesos que núcleos solo añade arranque y copias entre procesos.
+        workers = min(self.num_workers, os.cpu_count() or 1)
+        pool = None
+        if workers > 1:
+            # spawn: el proceso tiene hilos vivos (pool HTTP) y fork no es seguro con ellos.
+            pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        window = max(2, 2 * workers)
+
+        def descargar(i: int):
+            try:
+                return self._download_bytes(urls[i])
+            except Exception as exc:
+                return exc
+
+        def resultado(i: int, url: str, parsed):
+            if isinstance(parsed, Future):
+                try:
+                    parsed = parsed.result()
+                except Exception as exc:
+                    parsed = exc
+            if isinstance(parsed, Exception):
+                logger.warning("[WebTree.stream] error descargando %s: %s", url, parsed)
+                return i, url, None
+            return i, url, parsed
+
+        pendientes: deque = deque()
+        descargas = map_bounded(descargar, range(start, len(urls)), self.max_concurrent_requests)
+        try:
+            for i, content in descargas:
+                url = urls[i]
+                if isinstance(content, Exception):
+                    parsed = content
+                elif pool is not None:
+                    parsed = pool.submit(_parse_file, content, self._resolve_format(url), url)
+                else:
+                    try:
+                        parsed = _parse_file(content, self._resolve_format(url), url)
+                    except Exception as exc:
+                        parsed = exc
+                pendientes.append((i, url, parsed))
+                while pendientes and (len(pendientes) > window or not isinstance(pendientes[0][2], Future)
+                                      or pendientes[0][2].done()):
+                    yield resultado(*pendientes.popleft())
+            while pendientes:
+                yield resultado(*pendientes.popleft())
+        finally:
+            descargas.close()
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
 
     def _fila_de_receta(self, url: str) -> Dict[str, Any]:
         """Modo receta: descarga el fichero, lo reduce a rejilla y aplica la
@@ -459,6 +617,10 @@ class WebTreeFetcher(BaseFetcher):
 
         producidas = 0
         buffer: List[Dict[str, Any]] = []
+        # Reanudación: `files_done` cuenta los ficheros contiguos ya entregados.
+        start = int((self.params.get("_resume_state") or {}).get("files_done", 0) or 0)
+        if start:
+            logger.info("[WebTree.stream] reanudando tras %d/%d ficheros", start, len(matched_urls))
 
         modo = str(self._opt("extract_mode") or "datos").strip().lower()
         if self.params.get("_matched_urls") is None and matched_urls:
@@ -466,7 +628,7 @@ class WebTreeFetcher(BaseFetcher):
 
         # ── Modo RECETA: extracción dirigida — una fila limpia por fichero ──
         if modo == "receta":
-            for i, url in enumerate(matched_urls):
+            for i, url in enumerate(matched_urls[start:], start):
                 try:
                     fila = self._fila_de_receta(url)
                 except Exception as exc:
@@ -504,7 +666,7 @@ class WebTreeFetcher(BaseFetcher):
                 segs = [s for s in urlparse(u).path.split("/") if s][:-1]
                 comunes = segs if comunes is None else [a for a, b in zip(comunes, segs) if a == b]
             n_pref = len(comunes or [])
-            for i, url in enumerate(matched_urls):
+            for i, url in enumerate(matched_urls[start:], start):
                 segs = [s for s in urlparse(url).path.split("/") if s]
                 # ancla preferente: el primer segmento tipo 'a-...' (raíz temática del
                 # portal); si no existe, el tronco común del lote
@@ -531,41 +693,53 @@ class WebTreeFetcher(BaseFetcher):
                 yield buffer
             return
 
-        for i, url in enumerate(matched_urls):
-            try:
-                records = self._download_and_parse(url)
-            except Exception as exc:
-                logger.warning("[WebTree.stream] error descargando %s: %s", url, exc)
-                continue
-
-            dim_values = self._extract_dim_values(url, dimensions)
-            metadata = {
-                **dim_values,
-                "_source_file_url": url,
-                "_source_file_name": Path(urlparse(url).path).name,
-                "_source_format": self._resolve_format(url),
-            }
-            for record in records:
-                record.update(metadata)
-            buffer.extend(records)
-
+        pipelined = self.max_concurrent_requests > 1 or self.num_workers > 1
+        files = (self._files_pipelined(matched_urls, start, file_delay) if pipelined
+                 else self._files_in_series(matched_urls, start, file_delay))
+        # (registros acumulados al terminar el fichero i, i + 1): el savepoint es
+        # el último fichero cuyos registros ya han salido enteros en algún lote.
+        fronteras: deque = deque()
+        acumuladas = 0
+
+        def savepoint(hasta: int) -> None:
+            done = self.current_state.get("files_done", start)
+            while fronteras and fronteras[0][0] <= hasta:
+                done = fronteras.popleft()[1]
             self.current_state = {
-                "files_done": i + 1,
+                "files_done": done,
                 "files_total": len(matched_urls),
-                "last_url": url,
+                "last_url": matched_urls[done - 1] if done else None,
             }
 
-            while len(buffer) >= batch_size:
-                yield buffer[:batch_size]
-                producidas += batch_size
-                buffer = buffer[batch_size:]
+        try:
+            for i, url, records in files:
+                if records is not None:
+                    dim_values = self._extract_dim_values(url, dimensions)
+                    metadata = {
+                        **dim_values,
+                        "_source_file_url": url,
+                        "_source_file_name": Path(urlparse(url).path).name,
+                        "_source_format": self._resolve_format(url),
+                    }
+                    for record in records:
+                        record.update(metadata)
+                    buffer.extend(records)
+                    acumuladas += len(records)
+                fronteras.append((acumuladas, i + 1))
 
-            if preview_limit is not None and producidas + len(buffer) >= preview_limit:
-                break
+                while len(buffer) >= batch_size:
+                    producidas += batch_size
+                    savepoint(producidas)
+                    yield buffer[:batch_size]
+                    buffer = buffer[batch_size:]
 
-            if file_delay > 0:
-                time.sleep(file_delay)
+                if preview_limit is not None and producidas + len(buffer) >= preview_limit:
+                    break
+        finally:
+            files.close()
 
+        producidas += len(buffer)
+        savepoint(producidas)
         if buffer:
             yield buffer
 
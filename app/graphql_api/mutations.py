@@ -545,6 +545,13 @@ class Mutation:
                                 shutil.rmtree(p)
                         except OSError:
                             pass
+                    from app.fetchers.http_cache import remove_scope
+                    remove_scope(rid)
+                    from app.utils import blob_store
+                    from app.utils.dataset_io import codec_of
+                    for ds in datasets:
+                        if ds.data_path:
+                            blob_store.release(ds.checksum, codec_of(ds.data_path))
                     db.query(Dataset).filter(Dataset.resource_id == res.id).delete(synchronize_session=False)
                     db.query(ResourceExecution).filter(ResourceExecution.resource_id == res.id).delete(synchronize_session=False)
                     db.delete(res)
@@ -261,6 +261,9 @@ def map_resource_execution(re: ResourceExecution) -> ResourceExecutionType:
         status=re.status,
         total_records=re.total_records,
         records_loaded=re.records_loaded,
+        records_inserted=re.records_inserted,
+        records_updated=re.records_updated,
+        records_deleted=re.records_deleted,
         staging_path=re.staging_path,
         error_message=re.error_message,
         execution_params=re.execution_params,
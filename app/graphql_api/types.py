@@ -241,6 +241,9 @@ class ResourceExecutionType:
     status: str
     total_records: Optional[int] = strawberry.field(default=None, name="totalRecords")
     records_loaded: Optional[int] = strawberry.field(default=None, name="recordsLoaded")
+    records_inserted: Optional[int] = strawberry.field(default=None, name="recordsInserted")
+    records_updated: Optional[int] = strawberry.field(default=None, name="recordsUpdated")
+    records_deleted: Optional[int] = strawberry.field(default=None, name="recordsDeleted")
     staging_path: Optional[str] = strawberry.field(default=None, name="stagingPath")
     error_message: Optional[str] = strawberry.field(default=None, name="errorMessage")
     execution_params: Optional[strawberry.scalars.JSON] = strawberry.field(default=None, name="executionParams")
@@ -12,14 +12,15 @@ Uso típico:
     # Al arrancar la app — construye el schema con los datasets actuales en BD
     await engine.rebuild(db)
 
-    # Al completar una ejecución — actualiza el schema con los nuevos datos
-    engine.rebuild(db)
+    # Al completar una ejecución — rebuild diferido y agrupado en segundo plano
+    engine.request_rebuild()
 
     # Para ejecutar una query GraphQL
     result = engine.execute(query_string, variables)
 """
 
 import threading
+import time
 from typing import Optional
 
 from graphql import GraphQLSchema, graphql_sync
@@ -27,13 +28,38 @@ from graphql import GraphQLSchema, graphql_sync
 from app.graphql_data.schema_builder import build_schema
 
 
+# Ventana de agrupación de peticiones de rebuild: las ejecuciones que terminan
+# dentro de ella se resuelven con un único rebuild.
+DEBOUNCE_SECONDS = 2.0
+
+
 # ── Estado global (module-level singleton) ────────────────────────────────────
 
 _schema: Optional[GraphQLSchema] = None
 _registry: list[dict] = []
-_lock = threading.Lock()           # Para rebuild() concurrente (poco probable pero seguro)
+_lock = threading.Lock()           # Serializa los rebuilds (comparten la caché de tipos)
 _schema_version: int = 0           # Incrementa en cada rebuild; útil para debug
 
+# Caché de definiciones por dataset (dataset_id → {"key", "entry"}); ver build_schema.
+_type_cache: dict[str, dict] = {}
+
+# Rebuild diferido (request_rebuild)
+_pending_lock = threading.Lock()
+_pending = False
+_worker: Optional[threading.Thread] = None
+
+_metrics = {
+    "rebuilds": 0,
+    "requests": 0,
+    "coalesced": 0,
+    "failures": 0,
+    "last_duration_ms": None,
+    "total_duration_ms": 0.0,
+    "last_types_reused": 0,
+    "last_types_built": 0,
+    "last_rebuild_at": None,
+}
+
 
 # ── API pública ───────────────────────────────────────────────────────────────
 
@@ -41,9 +67,11 @@ def rebuild(db) -> int:
     """
     Reconstruye el schema leyendo los datasets actuales de la BD.
 
-    Llama a `schema_builder.build_schema(db)`, que:
+    Llama a `schema_builder.build_schema(db, cache)`, que:
       - Consulta el Dataset más reciente por resource con data_path válido.
-      - Lee los primeros 200 registros de cada JSONL para inferir campos.
+      - Reutiliza el tipo GraphQL de los datasets que no han cambiado (misma
+        clave dataset_id + checksum en la caché) y solo lee los primeros 200
+        registros del JSONL de los nuevos.
       - Genera un GraphQLObjectType + resolver por dataset.
 
     Returns:
@@ -55,19 +83,89 @@ def rebuild(db) -> int:
     """
     global _schema, _registry, _schema_version
 
-    new_schema, new_registry = build_schema(db)
-
     with _lock:
+        t0 = time.perf_counter()
+        new_schema, new_registry, stats = build_schema(db, _type_cache)
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+
         _schema = new_schema
         _registry = new_registry
         _schema_version += 1
         version = _schema_version
 
+        _metrics["rebuilds"] += 1
+        _metrics["last_duration_ms"] = round(elapsed_ms, 1)
+        _metrics["total_duration_ms"] = round(_metrics["total_duration_ms"] + elapsed_ms, 1)
+        _metrics["last_types_reused"] = stats["reused"]
+        _metrics["last_types_built"] = stats["built"]
+        _metrics["last_rebuild_at"] = time.time()
+
     count = len(new_registry)
-    print(f"[graphql_data] Schema v{version} built — {count} dataset(s) exposed.")
+    print(
+        f"[graphql_data] Schema v{version} built — {count} dataset(s) exposed "
+        f"({stats['built']} rebuilt, {stats['reused']} cached) in {elapsed_ms:.0f} ms."
+    )
     return count
 
 
+def request_rebuild(session_factory=None, delay: float = DEBOUNCE_SECONDS) -> bool:
+    """
+    Pide un rebuild diferido y agrupado (lo usa FetcherManager al completar una
+    ejecución, para no bloquear el pipeline).
+
+    El rebuild corre en un hilo de fondo tras `delay` segundos con su propia
+    sesión; las peticiones que llegan mientras tanto (o mientras un rebuild está
+    en curso) se agrupan en el siguiente. Nunca hay más de un hilo.
+
+    Returns:
+        True si arranca un hilo nuevo; False si la petición se agrupó con uno pendiente.
+    """
+    global _pending, _worker
+
+    with _pending_lock:
+        _metrics["requests"] += 1
+        _pending = True
+        if _worker is not None and _worker.is_alive():
+            _metrics["coalesced"] += 1
+            return False
+        _worker = threading.Thread(
+            target=_rebuild_loop, args=(session_factory, delay),
+            name="graphql-data-rebuild", daemon=True,
+        )
+        _worker.start()
+        return True
+
+
+def _rebuild_loop(session_factory, delay: float) -> None:
+    global _pending, _worker
+
+    if session_factory is None:
+        from app.database import SessionLocal as session_factory
+    while True:
+        time.sleep(delay)
+        with _pending_lock:
+            _pending = False
+        try:
+            db = session_factory()
+            try:
+                rebuild(db)
+            finally:
+                db.close()
+        except Exception as e:  # noqa: BLE001 — el schema anterior sigue sirviendo
+            _metrics["failures"] += 1
+            print(f"[graphql_data] WARN: rebuild diferido fallido: {e}")
+        with _pending_lock:
+            if not _pending:
+                _worker = None
+                return
+
+
+def get_metrics() -> dict:
+    """Métricas de rebuild: nº de rebuilds y peticiones (agrupadas), duración
+    última/acumulada y tipos reutilizados/reconstruidos en el último."""
+    return {**_metrics, "schema_version": _schema_version, "cached_types": len(_type_cache)}
+
+
 def get_schema() -> Optional[GraphQLSchema]:
     """Devuelve el schema actual (None si aún no se ha llamado rebuild)."""
     return _schema
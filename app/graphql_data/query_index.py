@@ -0,0 +1,339 @@
+"""
+query_index.py — Índice columnar en disco para los resolvers de /graphql/data.
+
+Sin índice, cada petición GraphQL relee y parsea el JSONL entero, acumula todas
+las coincidencias y solo entonces pagina: O(dataset) en tiempo y memoria. Con el
+índice, una consulta filtrada se resuelve por búsqueda en el directorio de
+claves y `total` sale de la cardinalidad de la lista de filas (postings).
+
+Estructura (junto al data.jsonl de cada versión, que es inmutable):
+
+    data/datasets/{resource_id}/{dataset_id}/_qindex/
+        meta.json   — nº de filas, campos indexados y huella del JSONL origen
+        c{j}.col    — columna j: valor proyectado (str) de cada fila
+        k{j}.idx    — índice de igualdad del campo j (se crea la primera vez que
+                      se filtra por ese campo, no en el build)
+
+Formatos binarios (little-endian, mapeados con mmap):
+
+    .col  cabecera "ODMC" + pad + N(u64) + len_datos(u64) | datos utf-8 |
+          relleno a 8 | offsets u64 × (N+1)
+    .idx  cabecera "ODMK" + pad + K(u64) + N(u64) | offsets de clave u64 × (K+1) |
+          inicio de postings u64 × (K+1) | filas u32 × N | claves utf-8 ordenadas
+
+Las claves son el valor en minúsculas (mismo criterio case-insensitive que el
+filtro por recorrido) ordenadas por bytes UTF-8, que coincide con el orden de
+code points: la búsqueda es binaria sobre el fichero mapeado, sin cargarlo.
+Las filas de cada posting van en orden de aparición, así que paginar es un slice.
+
+Semántica idéntica al recorrido línea a línea de `schema_builder`: las líneas
+vacías o con JSON inválido no cuentan como fila y el valor de un campo es
+`str(record.get(campo) or "")`.
+"""
+
+import json
+import mmap
+import os
+import shutil
+import struct
+import threading
+import uuid
+from array import array
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from app.utils.dataset_io import open_text
+
+INDEX_DIRNAME = "_qindex"
+FORMAT_VERSION = 1
+
+# Índices abiertos por proceso (mmaps). LRU: los datasets consultados a menudo
+# quedan calientes sin acumular descriptores de todos los que existen.
+MAX_OPEN_INDEXES = 32
+
+_COL_HEADER = struct.Struct("<4s4xQQ")
+_IDX_HEADER = struct.Struct("<4s4xQQ")
+_FLUSH_EVERY = 65536
+
+_open: "OrderedDict[str, DatasetIndex]" = OrderedDict()
+_open_lock = threading.Lock()
+_build_locks: dict[str, threading.Lock] = {}
+
+
+def index_dir(data_path: str) -> str:
+    return os.path.join(os.path.dirname(data_path), INDEX_DIRNAME)
+
+
+def _source_fingerprint(data_path: str) -> dict:
+    st = os.stat(data_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _build_lock(key: str) -> threading.Lock:
+    with _open_lock:
+        return _build_locks.setdefault(key, threading.Lock())
+
+
+def _map(path: str):
+    """mmap de solo lectura (un fichero vacío no se puede mapear → b"")."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+# ── Build ─────────────────────────────────────────────────────────────────────
+
+def build(data_path: str, fields: list[str]) -> str:
+    """Construye las columnas de `fields` en una pasada sobre el JSONL y publica
+    el directorio de índice con un rename atómico. Devuelve su ruta."""
+    target = index_dir(data_path)
+    tmp = f"{target}.tmp-{uuid.uuid4().hex[:8]}"
+    os.makedirs(tmp)
+    try:
+        fingerprint = _source_fingerprint(data_path)
+        datas = [open(os.path.join(tmp, f"c{j}.col"), "wb") for j in range(len(fields))]
+        offs = [open(os.path.join(tmp, f"c{j}.off"), "wb") for j in range(len(fields))]
+        pend = [array("Q", [0]) for _ in fields]
+        pos = [0] * len(fields)
+        for f in datas:
+            f.write(_COL_HEADER.pack(b"ODMC", 0, 0))
+        rows = 0
+        with open_text(data_path) as src:
+            for line in src:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if not isinstance(record, dict):
+                    continue
+                for j, name in enumerate(fields):
+                    value = str(record.get(name) or "").encode("utf-8")
+                    datas[j].write(value)
+                    pos[j] += len(value)
+                    pend[j].append(pos[j])
+                    if len(pend[j]) >= _FLUSH_EVERY:
+                        pend[j].tofile(offs[j])
+                        pend[j] = array("Q")
+                rows += 1
+
+        for j in range(len(fields)):
+            pend[j].tofile(offs[j])
+            offs[j].close()
+            col = datas[j]
+            col.write(b"\0" * (-pos[j] % 8))
+            with open(os.path.join(tmp, f"c{j}.off"), "rb") as o:
+                shutil.copyfileobj(o, col)
+            col.seek(0)
+            col.write(_COL_HEADER.pack(b"ODMC", rows, pos[j]))
+            col.close()
+            os.remove(os.path.join(tmp, f"c{j}.off"))
+
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"format": FORMAT_VERSION, "rows": rows, "fields": fields,
+                       "source": fingerprint}, f, ensure_ascii=False)
+
+        if os.path.isdir(target):
+            shutil.rmtree(target, ignore_errors=True)
+        try:
+            os.rename(tmp, target)
+        except OSError:
+            # Otro proceso lo publicó a la vez: nos quedamos con el suyo.
+            shutil.rmtree(tmp, ignore_errors=True)
+        return target
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def _build_key_index(col: "_Column", path: str) -> None:
+    """Índice de igualdad de una columna: claves en minúsculas ordenadas → filas."""
+    n = col.rows
+    keys = [col.value(i).lower() for i in range(n)]
+    order = sorted(range(n), key=keys.__getitem__)   # estable: filas en orden de aparición
+    distinct = bytearray()
+    key_offs = array("Q", [0])
+    starts = array("Q")
+    postings = array("I", order)
+    prev = None
+    for rank, row in enumerate(order):
+        k = keys[row]
+        if k != prev:
+            starts.append(rank)
+            distinct += k.encode("utf-8")
+            key_offs.append(len(distinct))
+            prev = k
+    starts.append(n)
+    tmp = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+    with open(tmp, "wb") as f:
+        f.write(_IDX_HEADER.pack(b"ODMK", len(starts) - 1, n))
+        key_offs.tofile(f)
+        starts.tofile(f)
+        postings.tofile(f)
+        f.write(distinct)
+    os.replace(tmp, path)
+
+
+# ── Lectura ───────────────────────────────────────────────────────────────────
+
+class _Column:
+    def __init__(self, path: str):
+        self._mm = _map(path)
+        _, self.rows, data_len = _COL_HEADER.unpack_from(self._mm, 0)
+        self._base = _COL_HEADER.size
+        off_start = self._base + data_len + (-data_len % 8)
+        self._offs = memoryview(self._mm)[off_start:off_start + 8 * (self.rows + 1)].cast("Q")
+
+    def value(self, row: int) -> str:
+        a, b = self._offs[row], self._offs[row + 1]
+        return self._mm[self._base + a:self._base + b].decode("utf-8")
+
+
+class _KeyIndex:
+    def __init__(self, path: str):
+        self._mm = _map(path)
+        _, self.keys, rows = _IDX_HEADER.unpack_from(self._mm, 0)
+        mv = memoryview(self._mm)
+        p = _IDX_HEADER.size
+        self._key_offs = mv[p:p + 8 * (self.keys + 1)].cast("Q")
+        p += 8 * (self.keys + 1)
+        self._starts = mv[p:p + 8 * (self.keys + 1)].cast("Q")
+        p += 8 * (self.keys + 1)
+        self._postings = mv[p:p + 4 * rows].cast("I")
+        self._key_base = p + 4 * rows
+
+    def _key(self, k: int) -> bytes:
+        return self._mm[self._key_base + self._key_offs[k]:self._key_base + self._key_offs[k + 1]]
+
+    def lookup(self, key: str) -> memoryview:
+        """Filas (en orden de aparición) cuyo valor en minúsculas es `key`."""
+        target = key.encode("utf-8")
+        lo, hi = 0, self.keys
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.keys and self._key(lo) == target:
+            return self._postings[self._starts[lo]:self._starts[lo + 1]]
+        return self._postings[0:0]
+
+
+class DatasetIndex:
+    """Vista de consulta sobre el índice de un dataset (abre columnas e índices
+    de igualdad bajo demanda)."""
+
+    def __init__(self, directory: str, meta: dict):
+        self.directory = directory
+        self.rows: int = meta["rows"]
+        self.fields: list[str] = meta["fields"]
+        self.source: dict = meta.get("source") or {}
+        self._pos = {name: j for j, name in enumerate(self.fields)}
+        self._columns: dict[int, _Column] = {}
+        self._keys: dict[int, _KeyIndex] = {}
+        self._lock = threading.RLock()
+
+    def _column(self, j: int) -> _Column:
+        col = self._columns.get(j)
+        if col is None:
+            with self._lock:
+                col = self._columns.get(j)
+                if col is None:
+                    col = self._columns[j] = _Column(os.path.join(self.directory, f"c{j}.col"))
+        return col
+
+    def _key_index(self, j: int) -> _KeyIndex:
+        idx = self._keys.get(j)
+        if idx is None:
+            with self._lock:
+                idx = self._keys.get(j)
+                if idx is None:
+                    path = os.path.join(self.directory, f"k{j}.idx")
+                    if not os.path.exists(path):
+                        _build_key_index(self._column(j), path)
+                    idx = self._keys[j] = _KeyIndex(path)
+        return idx
+
+    def query(self, filters: dict[str, str], offset: int, limit: int) -> tuple[int, list[int]]:
+        """Filtros de igualdad {campo original: valor en minúsculas} → (total, filas
+        de la página). Sin filtros, las filas son un rango directo."""
+        if not filters:
+            return self.rows, list(range(min(offset, self.rows), min(offset + limit, self.rows)))
+        postings = sorted(
+            (self._key_index(self._pos[k]).lookup(v) for k, v in filters.items()),
+            key=len,
+        )
+        if len(postings) == 1 or not len(postings[0]):
+            rows = postings[0]
+            return len(rows), rows[offset:offset + limit].tolist()
+        # Varios filtros: intersección de postings ordenados. Se parte de la más
+        # corta y se busca cada fila en las demás (coste m·log n, sin recorrer
+        # las listas largas).
+        rows = np.frombuffer(postings[0], dtype=np.uint32)
+        for other in postings[1:]:
+            other = np.frombuffer(other, dtype=np.uint32)
+            pos = np.searchsorted(other, rows)
+            pos[pos == len(other)] = 0
+            rows = rows[other[pos] == rows]
+            if not len(rows):
+                break
+        return len(rows), rows[offset:offset + limit].tolist()
+
+    def row(self, row: int, fields: list[str]) -> dict[str, str]:
+        return {name: self._column(self._pos[name]).value(row) for name in fields}
+
+
+def _load_meta(directory: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_current(meta: Optional[dict], data_path: str, fields: list[str]) -> bool:
+    return bool(
+        meta
+        and meta.get("format") == FORMAT_VERSION
+        and meta.get("source") == _source_fingerprint(data_path)
+        and set(fields) <= set(meta.get("fields") or [])
+    )
+
+
+def get_index(data_path: str, fields: list[str]) -> DatasetIndex:
+    """Devuelve el índice del dataset, construyéndolo si no existe, si el JSONL
+    cambió o si faltan campos. Lanza OSError si no se puede leer/escribir."""
+    cached = _open.get(data_path)
+    # La entrada en memoria solo vale para el JSONL del que se construyó: una
+    # nueva versión del Dataset en la misma ruta cambia la huella.
+    if (cached is not None and set(fields) <= set(cached.fields)
+            and cached.source == _source_fingerprint(data_path)):
+        with _open_lock:
+            if data_path in _open:
+                _open.move_to_end(data_path)
+        return cached
+
+    with _build_lock(data_path):
+        directory = index_dir(data_path)
+        meta = _load_meta(directory)
+        if not _is_current(meta, data_path, fields):
+            # Si solo faltan campos (el schema creció), se reconstruye conservando
+            # los ya indexados; si cambió el JSONL, desde cero.
+            same_source = bool(meta) and meta.get("source") == _source_fingerprint(data_path)
+            keep = meta.get("fields", []) if same_source else []
+            build(data_path, list(dict.fromkeys([*keep, *fields])))
+            meta = _load_meta(directory)
+        index = DatasetIndex(directory, meta)
+
+    with _open_lock:
+        _open[data_path] = index
+        _open.move_to_end(data_path)
+        while len(_open) > MAX_OPEN_INDEXES:
+            _open.popitem(last=False)
+    return index
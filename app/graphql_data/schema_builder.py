@@ -3,7 +3,8 @@ schema_builder.py — Construye el schema GraphQL dinámico a partir de los data
 
 Flujo:
     1. Se consultan todos los datasets con data_path válido (uno por resource: el más reciente).
-    2. Por cada dataset se leen los primeros SAMPLE_SIZE registros del JSONL para inferir campos.
+    2. Por cada dataset se leen los primeros SAMPLE_SIZE registros del JSONL para inferir campos
+       (solo si su definición no está ya en la caché del engine con el mismo checksum).
     3. Se genera un GraphQLObjectType por dataset y una query raíz con filtros y paginación.
     4. El schema resultante se pasa al engine para servir las peticiones GraphQL.
 
@@ -23,6 +24,9 @@ import re
 import os
 from typing import Optional
 
+from app.graphql_data import query_index
+from app.utils.dataset_io import open_text
+
 from graphql import (
     GraphQLSchema,
     GraphQLObjectType,
@@ -129,7 +133,7 @@ def infer_fields(data_path: str) -> list[str]:
     seen: dict[str, None] = {}  # dict mantiene orden de inserción (Python 3.7+)
     count = 0
     try:
-        with open(data_path, "r", encoding="utf-8") as f:
+        with open_text(data_path) as f:
             for line in f:
                 line = line.strip()
                 if not line:
@@ -183,11 +187,12 @@ def _make_resolver(data_path: str, fields: list[str], field_map: dict[str, str]
     Devuelve un resolver GraphQL para un dataset concreto.
 
     El resolver:
-      1. Lee línea a línea el JSONL (sin cargarlo entero en memoria).
-      2. Aplica filtros de igualdad (case-insensitive) para cada campo que
-         se haya pasado como argumento en la query.
-      3. Pagina con limit/offset.
-      4. Devuelve un dict con {items, total, limit, offset}.
+      1. Resuelve los filtros de igualdad (case-insensitive) contra el índice
+         columnar del dataset (`query_index`); `total` es la cardinalidad de la
+         lista de filas, sin recorrer el JSONL. Si el índice no está disponible,
+         recorre el JSONL línea a línea (`_scan`).
+      2. Pagina con limit/offset.
+      3. Devuelve un dict con {items, total, limit, offset}.
 
     Argumentos GraphQL disponibles:
         limit  : Int  (default 100, máximo 1000)
@@ -198,6 +203,7 @@ def _make_resolver(data_path: str, fields: list[str], field_map: dict[str, str]
     _field_map: dict[str, str] = field_map or {f: f for f in fields}
     # Conjunto de nombres originales para filtrar
     _orig_field_set = set(_field_map.values())
+    _orig_fields = list(dict.fromkeys(_field_map.values()))
 
     def resolver(root, info, limit=100, offset=0, **filters):
         # Clamp limit para evitar respuestas gigantes
@@ -213,33 +219,22 @@ def _make_resolver(data_path: str, fields: list[str], field_map: dict[str, str]
             if orig_k in _orig_field_set:
                 active_filters[orig_k] = v.lower()
 
-        matched = []
+        # Camino rápido: índice columnar del dataset (se construye una vez por
+        # versión). Si no se puede construir (p. ej. disco de solo lectura), se
+        # cae al recorrido línea a línea.
         try:
-            with open(data_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        record = json.loads(line)
-                    except json.JSONDecodeError:
-                        continue
-
-                    # Aplicar filtros
-                    if active_filters:
-                        match = all(
-                            str(record.get(k, "") or "").lower() == v
-                            for k, v in active_filters.items()
-                        )
-                        if not match:
-                            continue
-
-                    matched.append(record)
-        except OSError:
-            pass
-
-        total = len(matched)
-        page_items = matched[offset: offset + limit]
+            index = query_index.get_index(data_path, _orig_fields)
+        except (OSError, ValueError):
+            index = None
+        if index is not None:
+            total, rows = index.query(active_filters, offset, limit)
+            projected = []
+            for row in rows:
+                values = index.row(row, _orig_fields)
+                projected.append({gql_k: values[orig_k] for gql_k, orig_k in _field_map.items()})
+            return {"items": projected, "total": total, "limit": limit, "offset": offset}
+
+        total, page_items = _scan(data_path, active_filters, offset, limit)
 
         # Proyectar con nombres GraphQL (sanitizados), leyendo los originales del JSONL
         projected = [
@@ -252,6 +247,41 @@ def _make_resolver(data_path: str, fields: list[str], field_map: dict[str, str]
     return resolver
 
 
+def _scan(data_path: str, active_filters: dict[str, str], offset: int, limit: int) -> tuple[int, list[dict]]:
+    """
+    Recorrido línea a línea del JSONL (camino sin índice). Cuenta todas las
+    coincidencias pero solo retiene las de la página pedida.
+    """
+    total = 0
+    page_items = []
+    try:
+        with open_text(data_path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+                # Aplicar filtros
+                if active_filters:
+                    match = all(
+                        str(record.get(k, "") or "").lower() == v
+                        for k, v in active_filters.items()
+                    )
+                    if not match:
+                        continue
+
+                if offset <= total < offset + limit:
+                    page_items.append(record)
+                total += 1
+    except OSError:
+        pass
+    return total, page_items
+
+
 def _build_dataset_info_type() -> GraphQLObjectType:
     """
     Tipo auxiliar DatasetInfo que expone metadatos de cada dataset disponible.
@@ -289,128 +319,193 @@ def _build_dataset_info_type() -> GraphQLObjectType:
     )
 
 
-def build_schema(db) -> tuple[GraphQLSchema, list[dict]]:
+def _latest_datasets(db) -> list[tuple]:
+    """
+    Dataset más reciente (con data_path, no borrado) de cada resource, junto con
+    el nombre del resource y los execution_params de su ejecución, en UNA sola
+    consulta (row_number por resource_id). Orden: más reciente primero.
+    """
+    from sqlalchemy import func
+    from app.models import Dataset, Resource, ResourceExecution
+
+    ranked = (
+        db.query(
+            Dataset.id.label("id"),
+            func.row_number().over(
+                partition_by=Dataset.resource_id,
+                order_by=Dataset.created_at.desc(),
+            ).label("rn"),
+        )
+        .filter(Dataset.data_path.isnot(None))
+        .filter(Dataset.deleted_at == None)
+        .subquery()
+    )
+    rows = (
+        db.query(Dataset, Resource.name, ResourceExecution.execution_params)
+        .join(ranked, ranked.c.id == Dataset.id)
+        .join(Resource, Resource.id == Dataset.resource_id)
+        .outerjoin(ResourceExecution, ResourceExecution.id == Dataset.execution_id)
+        .filter(ranked.c.rn == 1)
+        .all()
+    )
+    rows.sort(key=lambda r: r[0].created_at, reverse=True)
+    return rows
+
+
+def _cache_key(dataset, resource_name: str) -> tuple:
+    """Qué invalida la definición de tipo cacheada de un dataset: otro contenido
+    (checksum) o renombrar el resource (cambia el nombre del tipo y de la query)."""
+    return (dataset.checksum, dataset.data_path, resource_name)
+
+
+def build_dataset_entry(dataset, resource_name: str) -> Optional[dict]:
+    """
+    Construye la parte del schema de un dataset: infiere sus campos del JSONL y
+    genera tipo de item, tipo página, resolver y el GraphQLField de su query.
+
+    Returns:
+        dict con queryName, typeName, field_map y query_field, o None si el dataset
+        no tiene campos o el nombre del resource no produce un identificador válido.
+    """
+    fields = infer_fields(dataset.data_path)
+    if not fields:
+        return None
+
+    type_name = dataset_type_name(resource_name)
+    query_name = dataset_query_name(resource_name)
+    if not type_name or not query_name:
+        return None
+
+    # Mapeo gql_name → original_name (sanitizar nombres con caracteres especiales)
+    field_map: dict[str, str] = {}
+    for orig in fields:
+        gql = _sanitize_field_name(orig)
+        # Evitar colisiones: si gql ya existe, añadir sufijo numérico
+        base, n = gql, 1
+        while gql in field_map:
+            gql = f"{base}_{n}"
+            n += 1
+        field_map[gql] = orig
+
+    # Tipo de item (todos los campos como String)
+    item_type = GraphQLObjectType(
+        name=type_name,
+        description=f"Registro de '{resource_name}'.",
+        fields={
+            gql_name: GraphQLField(
+                GraphQLString,
+                description=f"Campo '{orig_name}' del dataset.",
+            )
+            for gql_name, orig_name in field_map.items()
+        },
+    )
+
+    page_type = _make_page_type(item_type)
+    resolver = _make_resolver(dataset.data_path, list(field_map.keys()), field_map)
+
+    # Argumentos de la query: limit, offset + un filtro por cada campo
+    args = {
+        "limit": GraphQLArgument(
+            GraphQLInt,
+            default_value=100,
+            description="Número máximo de registros a devolver (máx. 1000).",
+        ),
+        "offset": GraphQLArgument(
+            GraphQLInt,
+            default_value=0,
+            description="Número de registros a saltar (para paginación).",
+        ),
+    }
+    for gql_name, orig_name in field_map.items():
+        args[gql_name] = GraphQLArgument(
+            GraphQLString,
+            default_value=None,
+            description=f"Filtro exacto (case-insensitive) por '{orig_name}'.",
+        )
+
+    query_field = GraphQLField(
+        GraphQLNonNull(page_type),
+        args=args,
+        resolve=resolver,
+        description=(
+            f"Consulta los registros de '{resource_name}'. "
+            f"Filtra combinando cualquier campo como argumento."
+        ),
+    )
+    return {
+        "queryName": query_name,
+        "typeName": type_name,
+        "field_map": field_map,
+        "query_field": query_field,
+    }
+
+
+def build_schema(db, cache: Optional[dict] = None) -> tuple[GraphQLSchema, list[dict], dict]:
     """
     Construye el GraphQLSchema completo a partir de los datasets en BD.
 
     Algoritmo:
-      - Para cada resource con al menos un dataset completado, toma el más reciente.
-      - Infiere los campos del JSONL.
-      - Genera un GraphQLObjectType + tipo paginación + resolver.
+      - Para cada resource con al menos un dataset completado, toma el más reciente
+        (una sola consulta, sin N+1).
+      - Si `cache` trae la definición de ese dataset con la misma clave (checksum,
+        ruta, nombre del resource), la reutiliza; si no, infiere los campos del
+        JSONL y genera tipo + tipo paginación + resolver (`build_dataset_entry`).
       - Añade la query raíz con todos los datasets + la query `datasets` de descubrimiento.
 
+    Args:
+        db    — Sesión SQLAlchemy.
+        cache — dict dataset_id → {"key", "entry"} que se actualiza in situ: entra
+                lo construido y salen los datasets que ya no son los vigentes.
+
     Returns:
-        (schema, dataset_registry)
+        (schema, dataset_registry, stats)
         schema           — GraphQLSchema listo para ejecutar queries.
         dataset_registry — Lista de dicts con metadatos de cada dataset expuesto.
                           Se usa para servir la query `datasets`.
+        stats            — {"reused": n, "built": n} tipos reutilizados/construidos.
 
     Si no hay datasets disponibles devuelve un schema mínimo con solo la query `datasets`.
     """
-    from app.models import Dataset, Resource
-
-    # Un dataset por resource: el más reciente con data_path válido
-    latest_by_resource: dict[str, Dataset] = {}
-    all_datasets = (
-        db.query(Dataset)
-        .filter(Dataset.data_path.isnot(None))
-        .filter(Dataset.deleted_at == None)
-        .order_by(Dataset.created_at.desc())
-        .all()
-    )
-    for ds in all_datasets:
-        rid = str(ds.resource_id)
-        if rid not in latest_by_resource:
-            latest_by_resource[rid] = ds
+    if cache is None:
+        cache = {}
 
     dataset_info_type = _build_dataset_info_type()
     query_fields: dict[str, GraphQLField] = {}
     registry: list[dict] = []
-
-    for rid, dataset in latest_by_resource.items():
-        resource = db.query(Resource).filter(Resource.id == dataset.resource_id).first()
-        if not resource:
-            continue
-
-        fields = infer_fields(dataset.data_path)
-        if not fields:
-            continue
-
-        type_name = dataset_type_name(resource.name)
-        query_name = dataset_query_name(resource.name)
-        if not type_name or not query_name:
+    stats = {"reused": 0, "built": 0}
+    vigentes: set[str] = set()
+
+    for dataset, resource_name, exec_params in _latest_datasets(db):
+        did = str(dataset.id)
+        vigentes.add(did)
+        key = _cache_key(dataset, resource_name)
+        cached = cache.get(did)
+        if cached is not None and cached["key"] == key:
+            entry = cached["entry"]
+            stats["reused"] += 1
+        else:
+            entry = build_dataset_entry(dataset, resource_name)
+            cache[did] = {"key": key, "entry": entry}
+            stats["built"] += 1
+        if entry is None:
             continue
 
-        # Mapeo gql_name → original_name (sanitizar nombres con caracteres especiales)
-        field_map: dict[str, str] = {}
-        for orig in fields:
-            gql = _sanitize_field_name(orig)
-            # Evitar colisiones: si gql ya existe, añadir sufijo numérico
-            base, n = gql, 1
-            while gql in field_map:
-                gql = f"{base}_{n}"
-                n += 1
-            field_map[gql] = orig
-
-        # Tipo de item (todos los campos como String)
-        item_type = GraphQLObjectType(
-            name=type_name,
-            description=f"Registro de '{resource.name}'.",
-            fields={
-                gql_name: GraphQLField(
-                    GraphQLString,
-                    description=f"Campo '{orig_name}' del dataset.",
-                )
-                for gql_name, orig_name in field_map.items()
-            },
-        )
-
-        page_type = _make_page_type(item_type)
-        resolver = _make_resolver(dataset.data_path, list(field_map.keys()), field_map)
-
-        # Argumentos de la query: limit, offset + un filtro por cada campo
-        args = {
-            "limit": GraphQLArgument(
-                GraphQLInt,
-                default_value=100,
-                description="Número máximo de registros a devolver (máx. 1000).",
-            ),
-            "offset": GraphQLArgument(
-                GraphQLInt,
-                default_value=0,
-                description="Número de registros a saltar (para paginación).",
-            ),
-        }
-        for gql_name, orig_name in field_map.items():
-            args[gql_name] = GraphQLArgument(
-                GraphQLString,
-                default_value=None,
-                description=f"Filtro exacto (case-insensitive) por '{orig_name}'.",
-            )
-
-        query_fields[query_name] = GraphQLField(
-            GraphQLNonNull(page_type),
-            args=args,
-            resolve=resolver,
-            description=(
-                f"Consulta los registros de '{resource.name}'. "
-                f"Filtra combinando cualquier campo como argumento."
-            ),
-        )
-
-        exec_params = getattr(dataset.execution, 'execution_params', None) if dataset.execution else None
+        query_fields[entry["queryName"]] = entry["query_field"]
         registry.append({
-            "datasetId": str(dataset.id),
-            "queryName": query_name,
-            "typeName": type_name,
-            "resourceName": resource.name,
+            "datasetId": did,
+            "queryName": entry["queryName"],
+            "typeName": entry["typeName"],
+            "resourceName": resource_name,
             "recordCount": dataset.record_count,
-            "fields": list(field_map.keys()),
+            "fields": list(entry["field_map"].keys()),
             "dataPath": dataset.data_path,
             "label": dataset.label,
             "executionParams": exec_params,
         })
 
+    for did in [d for d in cache if d not in vigentes]:
+        del cache[did]
+
     # Query de descubrimiento: lista todos los datasets disponibles
     registry_snapshot = list(registry)  # captura para el closure del resolver
     query_fields["datasets"] = GraphQLField(
@@ -430,4 +525,4 @@ def build_schema(db) -> tuple[GraphQLSchema, list[dict]]:
         )
     )
 
-    return schema, registry
+    return schema, registry, stats
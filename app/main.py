@@ -6,9 +6,10 @@ Ejecutar con:
 """
 import os
 import json
+import shutil
 import asyncio
 from datetime import datetime, timedelta
-from fastapi import FastAPI, HTTPException, Query, Depends
+from fastapi import FastAPI, HTTPException, Header, Query, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from strawberry.fastapi import GraphQLRouter
@@ -19,6 +20,11 @@ from app.services.scheduler_service import SchedulerService
 from app.manager.fetcher_manager import LOG_DIR
 from app.graphql_data import engine as data_engine
 from app.graphql_data.router import router as data_router
+from app.graphql_data.query_index import INDEX_DIRNAME
+from app.utils import blob_store
+from app.services.dataset_diff import DELTA_FILENAME
+from app.utils.dataset_io import CONTENT_ENCODINGS, codec_of, frames_path, open_binary
+from app.utils.line_index import index_path as line_index_path, iter_lines_from
 
 # Crear aplicación FastAPI
 app = FastAPI(
@@ -139,6 +145,13 @@ async def graphql_data_registry():
     return data_engine.get_registry()
 
 
+@app.get("/api/graphql-data/metrics")
+async def graphql_data_metrics():
+    """Métricas de reconstrucción del schema de /graphql/data (duración, tipos
+    reutilizados/reconstruidos, peticiones agrupadas)."""
+    return data_engine.get_metrics()
+
+
 @app.get("/api/datasets/health")
 async def datasets_health():
     """Salud/frescura por recurso (PÚBLICO, solo lectura).
@@ -229,20 +242,28 @@ async def datasets_tree():
         session.close()
 
 
-def _hard_delete_dataset_files(data_path: str) -> None:
-    """Borra el JSONL y schema.json del dataset si existen."""
+def _hard_delete_dataset_files(data_path: str, checksum: str | None = None) -> None:
+    """Borra el JSONL (y su tabla de frames si está comprimido), schema.json, el
+    delta.jsonl y los índices (consulta y líneas) del dataset si existen. El blob de contenido que
+    enlazaba solo se borra si ya no lo comparte ninguna otra versión."""
     if data_path and os.path.exists(data_path):
-        try:
-            os.remove(data_path)
-        except OSError:
-            pass
-        dataset_dir = os.path.dirname(data_path)
-        schema_path = os.path.join(dataset_dir, "schema.json")
-        if os.path.exists(schema_path):
+        for path in (data_path, line_index_path(data_path), frames_path(data_path)):
             try:
-                os.remove(schema_path)
+                os.remove(path)
             except OSError:
                 pass
+        dataset_dir = os.path.dirname(data_path)
+        for name in ("schema.json", DELTA_FILENAME):
+            path = os.path.join(dataset_dir, name)
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        index_path = os.path.join(dataset_dir, INDEX_DIRNAME)
+        if os.path.isdir(index_path):
+            shutil.rmtree(index_path, ignore_errors=True)
+        blob_store.release(checksum, codec_of(data_path))
 
 
 def _rebuild_data_api() -> None:
@@ -265,11 +286,11 @@ async def delete_dataset(dataset_id: str, hard: bool = False):
         dataset = session.query(Dataset).filter(Dataset.id == dataset_id).first()
         if not dataset:
             raise HTTPException(status_code=404, detail="Dataset not found")
-        data_path = dataset.data_path
+        data_path, checksum = dataset.data_path, dataset.checksum
         if hard:
             session.delete(dataset)
             session.commit()
-            _hard_delete_dataset_files(data_path)
+            _hard_delete_dataset_files(data_path, checksum)
         else:
             dataset.deleted_at = datetime.utcnow()
             session.commit()
@@ -320,12 +341,16 @@ async def resource_datasets_summary(resource_id: str):
             .all()
         )
         total_bytes = 0
+        seen = set()  # versiones idénticas comparten blob: cada fichero cuenta una vez
         for ds in rows:
             if ds.data_path and os.path.exists(ds.data_path):
                 try:
-                    total_bytes += os.path.getsize(ds.data_path)
+                    st = os.stat(ds.data_path)
                 except OSError:
-                    pass
+                    continue
+                if (st.st_dev, st.st_ino) not in seen:
+                    seen.add((st.st_dev, st.st_ino))
+                    total_bytes += st.st_size
         return {
             "count": len(rows),
             "totalRecords": sum((ds.record_count or 0) for ds in rows),
@@ -352,12 +377,12 @@ async def delete_resource_datasets(resource_id: str, hard: bool = False):
         )
         affected = len(rows)
         if hard:
-            paths = [ds.data_path for ds in rows]
+            paths = [(ds.data_path, ds.checksum) for ds in rows]
             for ds in rows:
                 session.delete(ds)
             session.commit()
-            for p in paths:
-                _hard_delete_dataset_files(p)
+            for p, checksum in paths:
+                _hard_delete_dataset_files(p, checksum)
         else:
             now = datetime.utcnow()
             for ds in rows:
@@ -486,7 +511,8 @@ def liberar_mi_lease(lease_id: str, request: _Request, db=Depends(get_db)):
 @app.get("/api/datasets/{dataset_id}/records")
 async def dataset_records(dataset_id: str, limit: int = 50, offset: int = 0):
     """Registros del dataset como JSON paginado (para el visor del Data Explorer).
-    Lee el JSONL en streaming: solo parsea la ventana pedida."""
+    Lee el JSONL en streaming: solo parsea la ventana pedida y, si existe el
+    índice de líneas (data.jsonl.idx), salta directamente al offset."""
     limit = max(1, min(limit, 500))
     offset = max(0, offset)
     session = SessionLocal()
@@ -504,19 +530,16 @@ async def dataset_records(dataset_id: str, limit: int = 50, offset: int = 0):
         except Exception:
             session.rollback()
         records, invalid = [], 0
-        with open(dataset.data_path, "r", encoding="utf-8") as f:
-            for i, line in enumerate(f):
-                if i < offset:
-                    continue
-                if len(records) >= limit:
-                    break
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    records.append(json.loads(line))
-                except ValueError:
-                    invalid += 1
+        for line in iter_lines_from(dataset.data_path, offset):
+            if len(records) >= limit:
+                break
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                invalid += 1
         return {
             "dataset_id": str(dataset.id),
             "version": f"{dataset.major_version}.{dataset.minor_version}.{dataset.patch_version}",
@@ -532,7 +555,7 @@ async def dataset_records(dataset_id: str, limit: int = 50, offset: int = 0):
 
 
 @app.get("/api/datasets/{dataset_id}/data.jsonl")
-async def download_dataset_data(dataset_id: str):
+async def download_dataset_data(dataset_id: str, accept_encoding: str = Header(default="")):
     session = SessionLocal()
     try:
         dataset = session.query(Dataset).filter(Dataset.id == dataset_id).first()
@@ -540,11 +563,38 @@ async def download_dataset_data(dataset_id: str):
             raise HTTPException(status_code=404, detail="Dataset not found")
         if not os.path.exists(dataset.data_path):
             raise HTTPException(status_code=404, detail="Data file not found")
-        return FileResponse(dataset.data_path, media_type="application/x-ndjson")
+        codec = codec_of(dataset.data_path)
+        if codec == "none":
+            return FileResponse(dataset.data_path, media_type="application/x-ndjson")
+        # Dataset comprimido: si el cliente acepta la codificación se sirven los
+        # bytes en disco tal cual; si no, se descomprime al vuelo.
+        encoding = CONTENT_ENCODINGS[codec]
+        if _accepts_encoding(accept_encoding, encoding):
+            return FileResponse(dataset.data_path, media_type="application/x-ndjson",
+                                headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"})
+
+        def _chunks(path=dataset.data_path):
+            with open_binary(path) as f:
+                while chunk := f.read(1 << 16):
+                    yield chunk
+
+        return StreamingResponse(_chunks(), media_type="application/x-ndjson",
+                                 headers={"Vary": "Accept-Encoding"})
     finally:
         session.close()
 
 
+def _accepts_encoding(accept_encoding: str, encoding: str) -> bool:
+    """True si la cabecera Accept-Encoding admite `encoding` (sin q=0)."""
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() not in (encoding, "*"):
+            continue
+        q = params.strip().replace(" ", "")
+        return not (q.startswith("q=") and q[2:] in ("0", "0.0", "0.00", "0.000"))
+    return False
+
+
 @app.get("/api/datasets/{dataset_id}/schema.json")
 async def download_dataset_schema(dataset_id: str):
     session = SessionLocal()
@@ -561,6 +611,22 @@ async def download_dataset_schema(dataset_id: str):
         session.close()
 
 
+@app.get("/api/datasets/{dataset_id}/delta.jsonl")
+async def download_dataset_delta(dataset_id: str):
+    """Cambios respecto a la versión anterior (ver app/services/dataset_diff.py)."""
+    session = SessionLocal()
+    try:
+        dataset = session.query(Dataset).filter(Dataset.id == dataset_id).first()
+        if not dataset:
+            raise HTTPException(status_code=404, detail="Dataset not found")
+        delta_path = os.path.join(os.path.dirname(dataset.data_path), DELTA_FILENAME)
+        if not os.path.exists(delta_path):
+            raise HTTPException(status_code=404, detail="Delta file not found")
+        return FileResponse(delta_path, media_type="application/x-ndjson")
+    finally:
+        session.close()
+
+
 @app.get("/api/datasets/{dataset_id}/models.py")
 async def download_dataset_models(dataset_id: str):
     session = SessionLocal()
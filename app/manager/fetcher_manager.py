@@ -9,18 +9,24 @@ from typing import Optional
 from sqlalchemy.orm import Session
 from app.models import Resource, ResourceCandidate, ResourceExecution, Dataset, DerivedDatasetConfig, DerivedDatasetEntry
 from app.fetchers.factory import FetcherFactory
+from app.fetchers.http_cache import SourceUnchanged
 from app.builders.dataset_builder import DatasetBuilder
+from app.builders.staging_writer import StagingWriter
 from app.services.notification_service import NotificationService
-from app.services.data_loader_service import DataLoaderService
+from app.services.data_loader_service import DataLoaderService, BULK_LOAD_MODES, REPLACE_LOAD_MODES
+from app.services.dataset_diff import compute_delta
+from app.services.typed_columns import parse_index_spec, wants_typed_columns
 from app.services.grouping import infer
+from app.utils.dataset_io import normalize_codec, open_text
 
 LOG_DIR = "data/logs"
+CRAWL_STATE_DIR = "data/crawl_state"
 
 # Claves internas que no deben mostrarse en el título de ejecución
 _INTERNAL_PARAM_KEYS = frozenset({
     "_resume_state", "_matched_urls", "_dimensions", "_path_template",
     "_staging_path", "_preview_limit", "_discover_mode",
-    "_dataset_type",
+    "_dataset_type", "_crawl_state_path", "_resource_id", "_latest_dataset_id",
 })
 
 
@@ -158,6 +164,18 @@ class FetcherManager:
             runtime_params["_staging_path"] = staging_path
             if saved_state:
                 runtime_params["_resume_state"] = saved_state
+            # Caché HTTP (http_cache=true): propia del recurso, y una respuesta solo
+            # cuenta como "sin cambios" si la última versión se construyó con ella.
+            runtime_params["_resource_id"] = str(resource.id)
+            _ultima = (
+                session.query(Dataset)
+                .filter(Dataset.resource_id == resource.id)
+                .order_by(Dataset.major_version.desc(), Dataset.minor_version.desc(),
+                          Dataset.patch_version.desc())
+                .first()
+            )
+            runtime_params["_latest_dataset_id"] = (
+                str(_ultima.id) if _ultima is not None and _ultima.deleted_at is None else "")
 
             is_child = resource.parent_resource_id is not None
 
@@ -178,6 +196,9 @@ class FetcherManager:
                 runtime_params["_matched_urls"] = list(candidate.matched_urls or [])
                 runtime_params["_dimensions"] = list(candidate.dimensions or [])
                 runtime_params["_path_template"] = candidate.path_template
+            else:
+                # Huellas del último crawl de la colección (re-descubrimiento incremental).
+                runtime_params["_crawl_state_path"] = os.path.join(CRAWL_STATE_DIR, f"{resource_id}.json")
 
             # Marca de agua incremental: si el recurso pide `desde=auto`, fijamos el
             # suelo temporal a partir de la última ejecución completada (con un día
@@ -227,6 +248,10 @@ class FetcherManager:
                 #    con su especie-destino y params. No se infiere agrupación.
                 #  · discover()+infer(): crawler de árbol de ficheros; las URLs hoja
                 #    se agrupan por patrón de ruta en dimensiones/path_template.
+                # Descubrir siempre necesita el documento aunque no haya cambiado,
+                # y no deja copias en la caché HTTP.
+                fetcher.single_source = False
+                fetcher.params["_discover_mode"] = True
                 if hasattr(fetcher, "propose"):
                     logger.log("[1/1] DISCOVER — Consultando catálogo (propose)...")
                     raw_proposals = fetcher.propose()
@@ -244,6 +269,13 @@ class FetcherManager:
                             f"ext: {list(profile_stats.get('file_extensions', {}).keys())} | "
                             f"profundidad dominante: {profile_stats.get('dominant_depth')}"
                         )
+                    crawl = (profile_stats or {}).get("crawl")
+                    if crawl:
+                        logger.log(
+                            f"  Crawl {crawl['mode']}: {crawl['requested']} página(s) pedidas "
+                            f"({crawl['not_modified']} 304, {crawl['same_content']} sin cambios, "
+                            f"{crawl['changed']} cambiadas), {crawl['pruned']} podadas"
+                        )
                     resource_params = {p.key: p.value for p in resource.params}
                     path_root = resource_params.get("path_root") or None
                     raw_proposals = infer(leaf_urls, path_root=path_root)
@@ -326,22 +358,50 @@ class FetcherManager:
                 )
                 logger.log(f"  RESUME — continuing from {hint}")
 
-            file_mode = "a" if is_resume else "w"
             total_records = int(execution.total_records or 0) if is_resume else 0
             paused = False
             _STAGING_EXCLUDE = {"raw_xml_content", "raw_html", "_raw"}
 
+            # Dedup opcional del staging: si el recurso define 'dedup_key', el JSONL
+            # final conserva una sola fila por clave — la de mayor 'dedup_order_field'
+            # (default: 'fecha'), o la última emitida si no hay campo de orden. Caso
+            # típico: PLACSP, donde cada cambio de estado del expediente es una foto
+            # nueva y el consumidor quiere la más reciente.
+            _fp = getattr(fetcher, "params", {}) or {}
+            _dedup_key = str(_fp.get("dedup_key") or "").strip()
+            _orden = str(_fp.get("dedup_order_field") or "fecha").strip()
+            # Codec de almacenamiento del dataset ('storage_codec': zstd|gzip|none);
+            # se valida aquí para no descubrir un valor erróneo tras la extracción.
+            _codec = normalize_codec(_fp.get("storage_codec"))
+            # Igual con la carga en columnas tipadas ('load_columns') y sus índices.
+            _typed = wants_typed_columns(_fp.get("load_columns"))
+            parse_index_spec(_fp.get("load_indexes"))
+
+            # Una sola pasada: el StagingWriter calcula checksum, schema completo,
+            # índice de líneas y estado de dedup mientras escribe, y el dataset se
+            # publica renombrando el staging en vez de releerlo y copiarlo.
             _PAUSE_CHECK_EVERY = 50  # records dentro de un chunk
-            with open(staging_path, file_mode, encoding="utf-8") as f:
-                for chunk in fetcher.stream():
+
+            # Caché HTTP (http_cache=true): una fuente de un solo documento sin
+            # cambios corta el stream antes de parsear (SourceUnchanged).
+            sin_cambios = []
+
+            def _chunks():
+                try:
+                    yield from fetcher.stream()
+                except SourceUnchanged as e:
+                    sin_cambios.append(str(e))
+
+            with StagingWriter(staging_path, resume=is_resume,
+                               dedup_key=_dedup_key, dedup_order_field=_orden) as staging:
+                for chunk in _chunks():
                     written_in_chunk = 0
                     for record in chunk:
                         clean = {k: v for k, v in record.items() if k not in _STAGING_EXCLUDE}
-                        serializable = FetcherManager._make_serializable(clean)
-                        f.write(json.dumps(serializable, ensure_ascii=False) + "\n")
+                        staging.write(FetcherManager._make_serializable(clean))
                         written_in_chunk += 1
                         if written_in_chunk % _PAUSE_CHECK_EVERY == 0:
-                            f.flush()
+                            staging.flush()
                             session.refresh(execution)
                             if execution.pause_requested:
                                 total_records += written_in_chunk
@@ -364,6 +424,7 @@ class FetcherManager:
                         break
 
             if paused:
+                staging.discard()
                 execution.active_seconds = (execution.active_seconds or 0) + int((datetime.utcnow() - period_start).total_seconds())
                 resume_state = getattr(fetcher, "current_state", {})
                 current_params = {
@@ -379,9 +440,45 @@ class FetcherManager:
                 logger.close()
                 return None
 
+            _http = getattr(fetcher, "_http", None)
+            _cache = getattr(fetcher, "_http_cache", None)
+            if _cache is not None:
+                logger.log(f"  HTTP cache: {_cache.stats.summary()}")
+                current_params = dict(execution.execution_params or {})
+                current_params["_profile_stats"] = {
+                    **(current_params.get("_profile_stats") or {}), "http_cache": _cache.stats.as_dict()}
+                execution.execution_params = current_params
+                # Todas las respuestas iguales a la ejecución anterior: no hay
+                # versión nueva que crear (salvo al reanudar, con parte ya staged).
+                if not sin_cambios and not is_resume and _cache.stats.run_unchanged():
+                    sin_cambios.append("todas las respuestas sin cambios desde la última ejecución")
+
+            _detalle = (getattr(fetcher, "profile_stats", None) or {}).get("detail_enrichment")
+            if _detalle:
+                current_params = dict(execution.execution_params or {})
+                current_params["_profile_stats"] = {
+                    **(current_params.get("_profile_stats") or {}), "detail_enrichment": _detalle}
+                execution.execution_params = current_params
+
+            if sin_cambios:
+                staging.delete()
+                if _http is not None:
+                    for linea in _http.stats.summary():
+                        logger.log(f"  HTTP {linea}")
+                execution.active_seconds = (execution.active_seconds or 0) + int((datetime.utcnow() - period_start).total_seconds())
+                execution.status = "completed"
+                execution.completed_at = datetime.utcnow()
+                logger.log(f"UNCHANGED — {sin_cambios[0]}; no se crea versión nueva del dataset.")
+                session.commit()
+                logger.close()
+                return None
+
             execution.staging_path = staging_path
             session.commit()
             logger.log(f"  Done: {total_records} records → {staging_path}")
+            if _http is not None:
+                for linea in _http.stats.summary():
+                    logger.log(f"  HTTP {linea}")
 
             # Linaje de derivados: si el fetcher resolvió recursos fuente
             # (CruceDatasets), sincronizamos resource_dependency. Idempotente:
@@ -401,17 +498,9 @@ class FetcherManager:
                 logger.log(f"  Linaje: {sum(len(v) for v in deps.values())} dependencia(s) registradas "
                            + str({k: len(v) for k, v in deps.items()}))
 
-            # Dedup opcional del staging: si el recurso define 'dedup_key', el JSONL
-            # final conserva una sola fila por clave — la de mayor 'dedup_order_field'
-            # (default: 'fecha'), o la última emitida si no hay campo de orden. Caso
-            # típico: PLACSP, donde cada cambio de estado del expediente es una foto
-            # nueva y el consumidor quiere la más reciente.
-            _fp = getattr(fetcher, "params", {}) or {}
-            _dedup_key = str(_fp.get("dedup_key") or "").strip()
             if _dedup_key:
-                _orden = str(_fp.get("dedup_order_field") or "fecha").strip()
                 _antes = total_records
-                total_records = FetcherManager._dedup_staging(staging_path, _dedup_key, _orden)
+                total_records = staging.dedup()
                 if total_records != _antes:
                     execution.total_records = total_records
                     session.commit()
@@ -421,9 +510,12 @@ class FetcherManager:
             dataset_builder = DatasetBuilder()
             dataset = dataset_builder.build(
                 session=session, resource=resource, execution=execution,
+                staging=staging, codec=_codec,
             )
             session.add(dataset)
             logger.log(f"  Dataset created: {dataset.version_string}")
+            if _cache is not None:
+                _cache.mark_built(str(dataset.id))
 
             derived_configs = session.query(DerivedDatasetConfig).filter(
                 DerivedDatasetConfig.source_resource_id == resource_id,
@@ -432,33 +524,108 @@ class FetcherManager:
             if derived_configs:
                 logger.log(f"[3/5] DERIVE - Processing {len(derived_configs)} derived dataset(s)...")
                 for cfg in derived_configs:
-                    FetcherManager._derive_dataset(session, cfg, staging_path, logger)
+                    FetcherManager._derive_dataset(session, cfg, dataset.data_path, logger)
             else:
                 logger.log("[3/5] DERIVE - Skipped")
 
-            if resource.enable_load:
+            # Contenido idéntico a la versión anterior (mismo checksum): si esa
+            # versión ya quedó cargada, la tabla destino ya tiene estos datos.
+            _previo = dataset_builder.unchanged_from
+            _exec_previa = _previo.execution if _previo is not None else None
+            _ya_cargado = FetcherManager._version_cargada(_previo)
+
+            # Si no, diff por clave + hash de fila contra la versión anterior:
+            # la carga aplica solo lo que cambió (desactivable con delta=false).
+            _base = dataset_builder.previous
+            _delta = None
+            if _previo is not None:
+                execution.records_inserted = execution.records_updated = execution.records_deleted = 0
+            elif (_base is not None and _base.deleted_at is None and _base.data_path
+                    and os.path.exists(_base.data_path)
+                    and str(_fp.get("delta", "true")).strip().lower() not in ("false", "0", "no")):
+                try:
+                    _delta = compute_delta(
+                        _base.data_path, dataset.data_path, os.path.dirname(dataset.data_path),
+                        base_version=_base.version_string,
+                        expected_rows=max(_base.record_count or 0, total_records or 0),
+                    )
+                    execution.records_inserted = _delta.inserted
+                    execution.records_updated = _delta.updated
+                    execution.records_deleted = _delta.deleted
+                    session.commit()
+                    logger.log(f"  Delta vs {_base.version_string}: +{_delta.inserted} altas, "
+                               f"{_delta.updated} cambios, -{_delta.deleted} bajas ({_delta.unchanged} sin cambios)")
+                except Exception as e:
+                    _delta = None
+                    logger.log(f"  WARNING: delta no calculado, se hará carga completa: {e}")
+
+            if resource.enable_load and _ya_cargado:
+                execution.records_loaded = _exec_previa.records_loaded
+                logger.log(f"[4/5] LOAD - Skipped (sin cambios desde {_previo.version_string}, ya cargada)")
+            elif resource.enable_load:
                 logger.log(f"[4/5] LOAD - Loading data to core.{resource.target_table}...")
                 data_loader = DataLoaderService()
+                load_mode = resource.load_mode or "upsert"
+                bulk = load_mode in BULK_LOAD_MODES
+                # El delta solo vale si la tabla tiene cargada la versión base; en
+                # los modos replace, además, sin filas sin id (no se pueden borrar
+                # por clave, solo con el TRUNCATE de la carga completa).
+                _usar_delta = bool(
+                    _delta is not None and FetcherManager._version_cargada(_base)
+                    and (load_mode not in REPLACE_LOAD_MODES or _delta.keyless == 0)
+                )
+
+                # El staging se consume en streaming y por lotes: la memoria no
+                # depende del tamaño del dataset. En modo masivo la carga va en su
+                # propia conexión, así que el avance se confirma lote a lote; en los
+                # modos por fila comparte transacción con la sesión y solo se anota.
+                def _progreso(n: int) -> None:
+                    execution.records_loaded = n
+                    if bulk:
+                        session.commit()
+                    logger.log(f"  Loaded {n} records so far...")
+
                 try:
-                    with open(staging_path, "r", encoding="utf-8") as f:
-                        data_for_load = [json.loads(line) for line in f]
-                    loaded_count = data_loader.load_data(
-                        session=session, dataset=dataset,
-                        normalized_data=data_for_load,
-                        load_mode=resource.load_mode or "upsert",
-                        table_name=f"core.{resource.target_table}",
-                    )
-                    execution.records_loaded = loaded_count
-                    logger.log(f"  Loaded {loaded_count} records")
+                    applied = None
+                    if _usar_delta:
+                        applied = data_loader.apply_delta(
+                            session=session, dataset=dataset, delta_path=_delta.path,
+                            load_mode=load_mode,
+                            table_name=f"core.{resource.target_table}",
+                            batch_size=int(_fp.get("load_batch_size") or 0) or None,
+                            on_progress=_progreso,
+                            typed_columns=_typed, indexes=_fp.get("load_indexes"),
+                        )
+                    if applied is not None:
+                        # La tabla queda con la versión completa: records_loaded
+                        # refleja el dataset, no solo las filas escritas.
+                        execution.records_loaded = dataset.record_count
+                        logger.log(f"  Delta aplicado: {applied} filas escritas "
+                                   f"(de {dataset.record_count} registros)")
+                    else:
+                        loaded_count = data_loader.load_data(
+                            session=session, dataset=dataset,
+                            normalized_data=FetcherManager._iter_staging(dataset.data_path),
+                            load_mode=load_mode,
+                            table_name=f"core.{resource.target_table}",
+                            batch_size=int(_fp.get("load_batch_size") or 0) or None,
+                            on_progress=_progreso,
+                            typed_columns=_typed, indexes=_fp.get("load_indexes"),
+                        )
+                        execution.records_loaded = loaded_count
+                        logger.log(f"  Loaded {loaded_count} records")
                 except Exception as e:
                     execution.error_message = f"Load failed: {str(e)}"
                     logger.log(f"  WARNING: Load failed: {e}")
             else:
                 logger.log("[4/5] LOAD - Skipped")
 
-            logger.log("[5/5] NOTIFY - Sending notifications...")
-            notification_service = NotificationService()
-            notification_service.notify_subscribers(session, dataset)
+            if _previo is not None:
+                logger.log(f"[5/5] NOTIFY - Skipped (sin cambios desde {_previo.version_string})")
+            else:
+                logger.log("[5/5] NOTIFY - Sending notifications...")
+                notification_service = NotificationService()
+                notification_service.notify_subscribers(session, dataset, delta=_delta)
 
             execution.active_seconds = (execution.active_seconds or 0) + int((datetime.utcnow() - period_start).total_seconds())
             execution.status = "completed"
@@ -474,11 +641,13 @@ class FetcherManager:
             except OSError:
                 pass
 
+            # El schema de /graphql/data se reconstruye en segundo plano, de forma
+            # incremental y agrupando las ejecuciones que terminan a la vez.
             try:
                 from app.graphql_data import engine as data_engine
-                session.flush()
-                count = data_engine.rebuild(session)
-                logger.log(f"  GraphQL data schema rebuilt — {count} dataset(s).")
+                session.commit()
+                data_engine.request_rebuild()
+                logger.log("  GraphQL data schema rebuild scheduled.")
             except Exception as rebuild_err:
                 logger.log(f"  WARNING: GraphQL rebuild failed: {rebuild_err}")
 
@@ -497,41 +666,23 @@ class FetcherManager:
         return dataset
 
     @staticmethod
-    def _dedup_staging(staging_path: str, key_field: str, order_field: str) -> int:
-        """Reescribe el JSONL de staging dejando una fila por valor de `key_field`:
-        gana la de mayor `order_field` (comparación lexicográfica — válida para
-        fechas ISO); a igualdad o sin campo de orden, la última emitida. Las filas
-        sin clave se conservan tal cual. Dos pasadas por offsets de byte para no
-        cargar el fichero en memoria. Devuelve el nº de registros resultante."""
-        ganadores: dict = {}   # clave -> (orden, offset, longitud)
-        sin_clave: list = []   # [(offset, longitud)]
-        with open(staging_path, "rb") as f:
-            offset = f.tell()
-            for linea in f:
-                longitud = len(linea)
-                try:
-                    reg = json.loads(linea)
-                    clave = reg.get(key_field)
-                except (ValueError, AttributeError):
-                    clave = None
-                if clave is None or clave == "":
-                    sin_clave.append((offset, longitud))
-                else:
-                    orden = str(reg.get(order_field) or "")
-                    previo = ganadores.get(clave)
-                    if previo is None or orden >= previo[0]:
-                        ganadores[clave] = (orden, offset, longitud)
-                offset += longitud
-        seleccion = sorted(
-            [(o, l) for (_, o, l) in ganadores.values()] + sin_clave
-        )  # orden de aparición original
-        tmp_path = staging_path + ".dedup"
-        with open(staging_path, "rb") as src, open(tmp_path, "wb") as dst:
-            for offset, longitud in seleccion:
-                src.seek(offset)
-                dst.write(src.read(longitud))
-        os.replace(tmp_path, staging_path)
-        return len(seleccion)
+    def _version_cargada(dataset) -> bool:
+        """True si la ejecución que produjo `dataset` lo cargó completo y sin error."""
+        exec_ = dataset.execution if dataset is not None else None
+        return bool(
+            exec_ is not None and not exec_.error_message
+            and exec_.records_loaded is not None
+            and exec_.records_loaded == dataset.record_count
+        )
+
+    @staticmethod
+    def _iter_staging(staging_path: str):
+        """Genera los registros del JSONL de staging uno a uno (sin cargarlo entero).
+        Acepta también el data.jsonl publicado, comprimido o no."""
+        with open_text(staging_path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
 
     @staticmethod
     def _derive_dataset(session: Session, config: DerivedDatasetConfig, staging_path: str, logger: ExecutionLogger) -> int:
@@ -543,7 +694,7 @@ class FetcherManager:
         extract_fields: list = config.extract_fields or []
         extracted: dict[str, dict] = {}
 
-        with open(staging_path, "r", encoding="utf-8") as f:
+        with open_text(staging_path) as f:
             for line in f:
                 record = json.loads(line)
                 key_val = record.get(key_field)
@@ -415,6 +415,10 @@ class ResourceExecution(AuditMixin, Base):
     # Results
     total_records = Column(Integer)
     records_loaded = Column(Integer)
+    # Delta respecto a la versión anterior (ver app/services/dataset_diff.py)
+    records_inserted = Column(Integer, nullable=True)
+    records_updated = Column(Integer, nullable=True)
+    records_deleted = Column(Integer, nullable=True)
     staging_path = Column(String(500))
     error_message = Column(Text)
     deleted_at = Column(DateTime, nullable=True)
@@ -1,17 +1,36 @@
+import csv
+import io
+import itertools
 import json
 import os
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
 
 from sqlalchemy.orm import Session
-from sqlalchemy import text, create_engine, MetaData, Table, Column, String, Integer, DateTime
+from sqlalchemy import text, create_engine, inspect, MetaData, Table, Column, String, Integer, DateTime
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.dialects.postgresql import insert
 
 from app.models import Dataset, Resource
 from app.database import DATABASE_URL
+from app.services.dataset_diff import iter_delta
+from app.services.typed_columns import (
+    PG_TYPES, TypedColumn, backfill_expr, column_name, csv_field, index_name,
+    parse_index_spec, plan_columns,
+)
 import uuid
 
+# Modos de carga masiva: COPY FROM STDIN a una tabla temporal + un único
+# INSERT ... SELECT ... ON CONFLICT por lote. Valor = truncar antes de cargar.
+BULK_LOAD_MODES = {"copy": False, "copy_replace": True}
+DEFAULT_COPY_BATCH_SIZE = 50_000
+# Modos por fila (upsert/replace): un executemany por lote.
+DEFAULT_UPSERT_BATCH_SIZE = 1_000
+# Modos en los que la tabla refleja exactamente la última versión cargada: solo
+# en ellos las bajas de un delta se aplican como DELETE.
+REPLACE_LOAD_MODES = ("replace", "copy_replace")
+
+
 class DataLoaderService:
     """Service for loading normalized data into the PostgreSQL database."""
 
@@ -24,9 +43,13 @@ class DataLoaderService:
         self,
         session: Session,
         dataset: Dataset,
-        normalized_data: List[Dict[str, Any]],
+        normalized_data: Iterable[Dict[str, Any]],
         load_mode: str = "upsert",
         table_name: str = None,
+        batch_size: Optional[int] = None,
+        on_progress: Optional[Callable[[int], None]] = None,
+        typed_columns: bool = False,
+        indexes: Any = None,
     ) -> int:
         """
         Loads normalized data into the database.
@@ -34,18 +57,30 @@ class DataLoaderService:
         Args:
             session: SQLAlchemy session.
             dataset: The Dataset object associated with the data.
-            normalized_data: A list of dictionaries, where each dictionary is a record.
+            normalized_data: An iterable of dictionaries (list or generator), one per record.
+                             It is consumed in batches of `batch_size`, so a generator over the
+                             staging file keeps memory bounded regardless of dataset size.
             load_mode: 'upsert' to update existing records or insert new ones, 'replace' to delete all existing data and insert new ones.
+                       'copy' / 'copy_replace' do the same through the bulk COPY path (see _copy_merge).
             table_name: Fully-qualified table name (e.g. 'core.bdns_concesiones'). If not
                         provided it is derived from the resource's target_table via the dataset
                         relationship — prefer passing it explicitly to avoid lazy-load issues.
+            batch_size: Records per batch. Defaults to DEFAULT_COPY_BATCH_SIZE for the bulk
+                        modes and DEFAULT_UPSERT_BATCH_SIZE otherwise.
+            on_progress: Called with the cumulative loaded count after each batch.
+            typed_columns: Also materialize the top-level fields of dataset.schema_json as
+                           typed columns next to `data` (see app/services/typed_columns.py).
+            indexes: Declared field indexes ('fecha, tags:gin'), created after loading.
 
         Returns:
             The number of records loaded.
         """
-        if not normalized_data:
+        records = iter(normalized_data)
+        first = next(records, None)
+        if first is None:
             print("  [LOAD] No data to load.")
             return 0
+        records = itertools.chain([first], records)
 
         if not table_name:
             table_name = f"core.{dataset.resource.target_table}"
@@ -53,15 +88,104 @@ class DataLoaderService:
 
         # Ensure table exists and matches schema
         self._ensure_table_schema(session, table_name, dataset.schema_json)
+        columns = self._ensure_typed_columns(table_name, dataset.schema_json) if typed_columns else None
+
+        if load_mode in BULK_LOAD_MODES:
+            loaded_count = self._copy_merge(
+                table_name, records,
+                truncate=BULK_LOAD_MODES[load_mode],
+                batch_size=batch_size or DEFAULT_COPY_BATCH_SIZE, on_progress=on_progress,
+                columns=columns,
+            )
+        else:
+            if load_mode == "replace":
+                self._replace_data(session, table_name)
 
-        if load_mode == "replace":
-            self._replace_data(session, table_name)
-        
-        loaded_count = self._upsert_data(session, table_name, normalized_data)
-        session.commit()
+            loaded_count = self._upsert_data(
+                session, table_name, records,
+                batch_size=batch_size or DEFAULT_UPSERT_BATCH_SIZE, on_progress=on_progress,
+                columns=columns,
+            )
+            session.commit()
+        if indexes:
+            self._ensure_indexes(table_name, indexes, columns)
         print(f"  [LOAD] Loaded {loaded_count} records into {table_name}.")
         return loaded_count
 
+    def apply_delta(
+        self,
+        session: Session,
+        dataset: Dataset,
+        delta_path: str,
+        load_mode: str = "upsert",
+        table_name: str = None,
+        batch_size: Optional[int] = None,
+        on_progress: Optional[Callable[[int], None]] = None,
+        typed_columns: bool = False,
+        indexes: Any = None,
+    ) -> Optional[int]:
+        """
+        Applies only the changes against the previous version (see
+        app/services/dataset_diff.py) instead of rewriting every row.
+
+        Inserts and updates go through the same path as load_data (upsert or COPY
+        merge, without truncating). Deletes are applied only in the replace modes:
+        in 'upsert' / 'copy' the table accumulates rows across versions, so a row
+        missing from the new version is kept, exactly as a full load would.
+
+        `typed_columns` / `indexes` work as in load_data (new fields are added as
+        columns and backfilled from `data` for the rows the delta doesn't touch).
+
+        Returns the number of rows written (upserted + deleted), or None when the
+        target table does not exist yet — the caller must then do a full load.
+        """
+        if not table_name:
+            table_name = f"core.{dataset.resource.target_table}"
+        schema_name, simple_table_name = table_name.split('.')
+        if not inspect(self.engine).has_table(simple_table_name, schema=schema_name):
+            return None
+        print(f"  [LOAD] Applying delta to table: {table_name} with mode: {load_mode}")
+        columns = self._ensure_typed_columns(table_name, dataset.schema_json) if typed_columns else None
+
+        deletes = iter_delta(delta_path, "delete") if load_mode in REPLACE_LOAD_MODES else ()
+        upserts = iter_delta(delta_path, "upsert")
+
+        if load_mode in BULK_LOAD_MODES:
+            size = batch_size or DEFAULT_COPY_BATCH_SIZE
+            deleted = [0]
+
+            def _count_deletes(ids):
+                for record_id in ids:
+                    deleted[0] += 1
+                    yield record_id
+
+            loaded_count = self._copy_merge(
+                table_name, upserts, truncate=False, batch_size=size,
+                on_progress=on_progress, delete_ids=_count_deletes(deletes), columns=columns,
+            )
+            deleted_count = deleted[0]
+        else:
+            size = batch_size or DEFAULT_UPSERT_BATCH_SIZE
+            deleted_count = self._delete_ids(session, table_name, deletes, size)
+            loaded_count = self._upsert_data(
+                session, table_name, upserts, batch_size=size, on_progress=on_progress,
+                columns=columns,
+            )
+            session.commit()
+        if indexes:
+            self._ensure_indexes(table_name, indexes, columns)
+        print(f"  [LOAD] Delta applied to {table_name}: {loaded_count} upserted, {deleted_count} deleted.")
+        return loaded_count + deleted_count
+
+    def _delete_ids(self, session: Session, table_name: str, ids: Iterable[str], batch_size: int) -> int:
+        """Deletes the given ids in batches (one DELETE ... = ANY per batch)."""
+        target = _quote_table(table_name)
+        deleted = 0
+        for batch in _batched(ids, batch_size):
+            session.execute(text(f"DELETE FROM {target} WHERE id = ANY(:ids)"), {"ids": batch})
+            deleted += len(batch)
+        return deleted
+
     def _ensure_table_schema(self, session: Session, table_name: str, schema_json: Dict):
         """
         Ensures the target table exists and its schema matches the dataset's schema.
@@ -74,10 +198,10 @@ class DataLoaderService:
             conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema_name}"'))
             conn.commit()
 
-        # Reflect metadata to check for table existence
+        # Reflect metadata to check for table existence (keys are schema-qualified)
         self.metadata.reflect(bind=self.engine, schema=schema_name)
 
-        if simple_table_name not in self.metadata.tables:
+        if table_name not in self.metadata.tables:
             print(f"  [LOAD] Table {table_name} does not exist. Creating it...")
             columns = [
                 Column('id', String, primary_key=True),
@@ -93,8 +217,97 @@ class DataLoaderService:
             print(f"  [LOAD] Table {table_name} created.")
         else:
             print(f"  [LOAD] Table {table_name} already exists. Skipping creation.")
-            # TODO: Implement schema alteration if schema_json dictates changes
-            # For now, we assume schema is compatible or data is stored in JSONB
+            # Typed columns (load_columns=typed) evolve in _ensure_typed_columns;
+            # otherwise everything lives in the `data` JSONB column.
+
+    def _ensure_typed_columns(self, table_name: str, schema_json: Dict) -> List[TypedColumn]:
+        """
+        Adds a typed column for each top-level schema field that doesn't have one yet
+        (ALTER TABLE ADD COLUMN) and backfills it from `data` for the existing rows.
+        Existing columns keep their type: if the field's type changed (major version),
+        values that don't fit are loaded as NULL. Returns the columns to write.
+        """
+        schema_name, simple_table_name = table_name.split('.')
+        target = _quote_table(table_name)
+        raw = self.engine.raw_connection()
+        try:
+            cur = raw.cursor()
+            cur.execute(
+                "SELECT column_name, data_type FROM information_schema.columns "
+                "WHERE table_schema = %s AND table_name = %s",
+                (schema_name, simple_table_name),
+            )
+            existing = dict(cur.fetchall())
+            columns, added = [], []
+            for col in plan_columns(schema_json):
+                actual = existing.get(col.name)
+                if actual is None:
+                    cur.execute(f'ALTER TABLE {target} ADD COLUMN IF NOT EXISTS "{col.name}" {col.pg_type}')
+                    added.append(col)
+                    columns.append(col)
+                elif actual in PG_TYPES.values():
+                    if actual != col.pg_type:
+                        print(f"  [LOAD] Column {col.name} is {actual}, field is now {col.pg_type}: "
+                              "values that don't fit are loaded as NULL.")
+                    columns.append(TypedColumn(col.field, col.name, actual))
+                else:
+                    print(f"  [LOAD] Column {col.name} has unsupported type {actual}; skipping it.")
+            if added:
+                print(f"  [LOAD] Added {len(added)} typed column(s) to {table_name}: "
+                      + ", ".join(c.name for c in added))
+                # One pass over the existing rows (empty on a freshly created table)
+                cur.execute(f"UPDATE {target} SET " + ", ".join(
+                    f'"{c.name}" = {backfill_expr(c.field, c.pg_type)}' for c in added
+                ))
+            raw.commit()
+            return columns
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+
+    def _ensure_indexes(self, table_name: str, indexes: Any, columns: Optional[List[TypedColumn]]):
+        """
+        Creates the declared indexes if missing. With typed columns they go on the
+        column (btree, or gin for jsonb); without them, on an expression over `data`.
+        """
+        simple_table_name = table_name.split('.')[1]
+        target = _quote_table(table_name)
+        by_field = {c.field: c for c in columns or []}
+        statements = []
+        for field, method in parse_index_spec(indexes):
+            if field == "data":
+                method = method or "gin"
+                expr, suffix = "data", "data"
+            elif field in by_field:
+                col = by_field[field]
+                method = method or ("gin" if col.pg_type == "jsonb" else "btree")
+                if method == "gin" and col.pg_type != "jsonb":
+                    raise ValueError(f"load_indexes: gin needs a jsonb column; '{field}' is {col.pg_type}")
+                expr, suffix = f'"{col.name}"', col.name
+            elif columns is None:
+                method = method or "btree"
+                key = "'" + field.replace("'", "''") + "'"
+                expr = f"(data->>{key})" if method == "btree" else f"(data->{key})"
+                suffix = column_name(field)
+            else:
+                print(f"  [LOAD] Index on '{field}' skipped: not a field of the dataset schema.")
+                continue
+            name = index_name(simple_table_name, suffix, method)
+            statements.append(f'CREATE INDEX IF NOT EXISTS "{name}" ON {target} USING {method} ({expr})')
+
+        raw = self.engine.raw_connection()
+        try:
+            cur = raw.cursor()
+            for stmt in statements:
+                cur.execute(stmt)
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
 
     def _replace_data(self, session: Session, table_name: str):
         """
@@ -104,30 +317,163 @@ class DataLoaderService:
         session.execute(text(f"TRUNCATE TABLE {table_name} RESTART IDENTITY;"))
         print(f"  [LOAD] All data deleted from {table_name}.")
 
-    def _upsert_data(self, session: Session, table_name: str, data: List[Dict[str, Any]]) -> int:
+    def _upsert_data(
+        self,
+        session: Session,
+        table_name: str,
+        data: Iterable[Dict[str, Any]],
+        batch_size: int = DEFAULT_UPSERT_BATCH_SIZE,
+        on_progress: Optional[Callable[[int], None]] = None,
+        columns: Optional[List[TypedColumn]] = None,
+    ) -> int:
         """
-        Performs an upsert operation (insert or update) for the given data.
+        Performs an upsert operation (insert or update) for the given data, one
+        executemany per batch. Within a batch the last record for a given id wins.
+        `columns` are typed columns filled from each record alongside `data`.
         """
+        columns = columns or []
         schema_name, simple_table_name = table_name.split('.')
-        target_table = Table(simple_table_name, self.metadata, schema=schema_name, autoload_with=self.engine)
+        target_table = self._target_table(schema_name, simple_table_name)
 
-        loaded_count = 0
-        for record in data:
-            # Assuming 'id' is present in each record for upserting
-            record_id = record.get('id') or str(uuid.uuid4()) # Generate UUID if no ID is present
-            
-            insert_stmt = insert(target_table).values(
-                id=record_id,
-                data=record
+        insert_stmt = insert(target_table)
+        on_conflict_stmt = insert_stmt.on_conflict_do_update(
+            index_elements=['id'],
+            set_=dict(
+                data=insert_stmt.excluded.data, updated_at=insert_stmt.excluded.updated_at,
+                **{c.name: insert_stmt.excluded[c.name] for c in columns},
             )
-            on_conflict_stmt = insert_stmt.on_conflict_do_update(
-                index_elements=['id'],
-                set_=dict(data=record, updated_at=datetime.utcnow())
-            )
-            session.execute(on_conflict_stmt)
-            loaded_count += 1
+        )
+
+        loaded_count = 0
+        for batch in _batched(data, batch_size):
+            now = datetime.utcnow()
+            rows: Dict[str, Dict[str, Any]] = {}
+            for record in batch:
+                # Assuming 'id' is present in each record for upserting
+                record_id = record.get('id') or str(uuid.uuid4()) # Generate UUID if no ID is present
+                rows[str(record_id)] = dict(id=str(record_id), data=record, created_at=now, updated_at=now,
+                                            **{c.name: c.coerce(record) for c in columns})
+            session.execute(on_conflict_stmt, list(rows.values()))
+            loaded_count += len(batch)
+            if on_progress:
+                on_progress(loaded_count)
         return loaded_count
 
+    def _target_table(self, schema_name: str, simple_table_name: str) -> Table:
+        # extend_existing: re-reflect, so columns added by _ensure_typed_columns are seen
+        return Table(simple_table_name, self.metadata, schema=schema_name,
+                     autoload_with=self.engine, extend_existing=True)
+
+    def _copy_merge(
+        self,
+        table_name: str,
+        data: Iterable[Dict[str, Any]],
+        truncate: bool = False,
+        batch_size: int = DEFAULT_COPY_BATCH_SIZE,
+        on_progress: Optional[Callable[[int], None]] = None,
+        delete_ids: Iterable[str] = (),
+        columns: Optional[List[TypedColumn]] = None,
+    ) -> int:
+        """
+        Bulk upsert: streams each batch into a temp table with COPY FROM STDIN and
+        merges it into the target with one set-based INSERT ... SELECT ... ON CONFLICT.
+
+        Runs on its own DBAPI connection in a single transaction, so a failure leaves
+        the target table untouched (same guarantee as the per-row path). Within a batch
+        the last record emitted for a given id wins, as in _upsert_data. `delete_ids`
+        (from a delta) are removed first, in the same transaction. `columns` are
+        typed columns filled from each record alongside `data`.
+        """
+        target = _quote_table(table_name)
+        batch_size = max(1, int(batch_size or DEFAULT_COPY_BATCH_SIZE))
+
+        raw = self.engine.raw_connection()
+        try:
+            cur = raw.cursor()
+            cur.execute(
+                "CREATE TEMP TABLE _odm_load (seq bigint, id text, data jsonb"
+                + "".join(f', "{c.name}" {c.pg_type}' for c in columns or ())
+                + ") ON COMMIT DROP"
+            )
+            if truncate:
+                print(f"  [LOAD] Deleting all existing data from {table_name}...")
+                cur.execute(f"TRUNCATE TABLE {target} RESTART IDENTITY")
+            for ids in _batched(delete_ids, batch_size):
+                cur.execute(f"DELETE FROM {target} WHERE id = ANY(%s)", (ids,))
+
+            loaded_count = 0
+            for batch in _batched(data, batch_size):
+                loaded_count += self._copy_batch(cur, target, batch, loaded_count, columns)
+                if on_progress:
+                    on_progress(loaded_count)
+
+            raw.commit()
+            return loaded_count
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+
+    @staticmethod
+    def _copy_batch(
+        cur, target: str, batch: List[Dict[str, Any]], seq_start: int,
+        columns: Optional[List[TypedColumn]] = None,
+    ) -> int:
+        """COPY one batch into _odm_load, merge it into `target` and empty the temp table."""
+        typed = "".join(f', "{c.name}"' for c in columns or ())
+        cur.copy_expert(
+            f"COPY _odm_load (seq, id, data{typed}) FROM STDIN WITH (FORMAT csv)",
+            _csv_buffer(batch, seq_start, columns),
+        )
+        cur.execute(
+            f"INSERT INTO {target} (id, data, created_at, updated_at{typed}) "
+            f"SELECT DISTINCT ON (id) id, data, now() AT TIME ZONE 'utc', now() AT TIME ZONE 'utc'{typed} "
+            "FROM _odm_load ORDER BY id, seq DESC "
+            "ON CONFLICT (id) DO UPDATE SET data = EXCLUDED.data, updated_at = EXCLUDED.updated_at"
+            + "".join(f', "{c.name}" = EXCLUDED."{c.name}"' for c in columns or ())
+        )
+        cur.execute("TRUNCATE _odm_load")
+        return len(batch)
+
+
+def _batched(data: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Groups an iterable of records into lists of at most `size` (the last may be shorter)."""
+    it = iter(data)
+    while True:
+        batch = list(itertools.islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _quote_table(table_name: str) -> str:
+    """'core.foo' → '"core"."foo"' (identifiers come from Resource.target_table)."""
+    return ".".join('"' + part.replace('"', '""') + '"' for part in table_name.split("."))
+
+
+def _csv_buffer(
+    batch: List[Dict[str, Any]], seq_start: int = 0, columns: Optional[List[TypedColumn]] = None,
+) -> io.StringIO:
+    """Serializes a batch as CSV rows (seq, id, data[, typed columns]) ready for
+    COPY ... FORMAT csv. Records without 'id' get a fresh UUID, as in the per-row path."""
+    buf = io.StringIO()
+    if columns:
+        # csv.writer can't tell NULL from '' (both empty); typed columns need both.
+        for offset, record in enumerate(batch):
+            record_id = record.get("id") or str(uuid.uuid4())
+            fields = [str(seq_start + offset), csv_field(str(record_id)), csv_field(record)]
+            fields += [c.csv(record) for c in columns]
+            buf.write(",".join(fields) + "\n")
+        buf.seek(0)
+        return buf
+    writer = csv.writer(buf, lineterminator="\n")
+    for offset, record in enumerate(batch):
+        record_id = record.get("id") or str(uuid.uuid4())
+        writer.writerow((seq_start + offset, record_id, json.dumps(record, ensure_ascii=False)))
+    buf.seek(0)
+    return buf
+
 
 # Helper function for staging data (writing to JSONL)
 def stage_data(data: List[Dict[str, Any]], staging_path: str, execution_id: str):
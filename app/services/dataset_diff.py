@@ -0,0 +1,184 @@
+"""
+Diff entre dos versiones de un dataset (por clave + hash de fila).
+
+La fase LOAD reescribía todas las filas de core.{target_table} en cada ejecución
+aunque solo cambiase un pequeño porcentaje. `compute_delta` compara el JSONL
+nuevo con el de la versión anterior y deja junto al dataset un `delta.jsonl`
+con solo lo que cambió:
+
+    {"op": "delete", "id": "..."}               (primero todas las bajas)
+    {"op": "insert", "record": {...}}
+    {"op": "update", "record": {...}}
+
+La clave es la misma que usa el loader (`id` del registro); el hash, el de la
+línea serializada. Para no depender de la RAM con datasets grandes, las claves
+de ambas versiones se reparten primero en cubos en disco (por hash de la clave)
+y cada cubo se compara en memoria. Dentro de una versión, a igualdad de clave
+gana la última fila, como en la carga.
+
+Las filas sin `id` reciben un UUID nuevo en cada carga: no se pueden emparejar,
+así que las del fichero nuevo cuentan siempre como altas. `keyless` suma las de
+ambas versiones: con alguna, un delta no puede reproducir un reemplazo completo
+de la tabla (las antiguas no se pueden borrar por clave).
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import zlib
+from array import array
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from app.utils.dataset_io import open_text
+
+DELTA_FILENAME = "delta.jsonl"
+ROWS_PER_BUCKET = 500_000
+
+
+@dataclass
+class DatasetDelta:
+    path: str
+    base_version: Optional[str] = None
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    keyless: int = 0
+
+    @property
+    def changed(self) -> int:
+        return self.inserted + self.updated + self.deleted
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = asdict(self)
+        d.pop("path")
+        return d
+
+
+def _rows(path: str) -> Iterator[Tuple[int, Optional[str], str, Any]]:
+    """(nº de línea, clave, hash, registro) de cada fila válida del JSONL."""
+    with open_text(path) as f:
+        for lineno, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            key = record.get("id")
+            digest = hashlib.blake2b(line.encode("utf-8"), digest_size=12).hexdigest()
+            yield lineno, (str(key) if key else None), digest, record
+
+
+def _partition(path: str, workdir: str, tag: str, buckets: int) -> int:
+    """Reparte (clave, hash, línea) en `buckets` ficheros. Devuelve las filas sin clave."""
+    files = [open(os.path.join(workdir, f"{tag}{b}"), "w", encoding="utf-8") for b in range(buckets)]
+    keyless = 0
+    try:
+        for lineno, key, digest, _ in _rows(path):
+            if key is None:
+                keyless += 1
+                continue
+            b = zlib.crc32(key.encode("utf-8")) % buckets
+            files[b].write(json.dumps([key, digest, lineno], ensure_ascii=False) + "\n")
+    finally:
+        for f in files:
+            f.close()
+    return keyless
+
+
+def _load_bucket(path: str) -> Dict[str, Tuple[str, int]]:
+    rows: Dict[str, Tuple[str, int]] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            key, digest, lineno = json.loads(line)
+            rows[key] = (digest, lineno)  # la última fila de cada clave gana
+    return rows
+
+
+def compute_delta(
+    previous_path: str,
+    new_path: str,
+    out_dir: str,
+    base_version: Optional[str] = None,
+    expected_rows: int = 0,
+) -> DatasetDelta:
+    """
+    Compara `new_path` con `previous_path` y escribe `out_dir/delta.jsonl`.
+
+    `expected_rows` (el mayor record_count de las dos versiones) solo sirve para
+    dimensionar los cubos. Devuelve los recuentos del diff.
+    """
+    buckets = max(1, -(-int(expected_rows or 0) // ROWS_PER_BUCKET))
+    workdir = tempfile.mkdtemp(prefix="odm_delta_", dir=out_dir)
+    delta = DatasetDelta(path=os.path.join(out_dir, DELTA_FILENAME), base_version=base_version)
+    tmp_path = delta.path + ".tmp"
+    try:
+        delta.keyless = (_partition(previous_path, workdir, "p", buckets)
+                         + _partition(new_path, workdir, "n", buckets))
+
+        # Líneas del fichero nuevo que hay que cargar, codificadas como
+        # 2·línea + (0 alta | 1 cambio) para ordenarlas en un solo array
+        changed = array("Q")
+        with open(tmp_path, "w", encoding="utf-8") as out:
+            for b in range(buckets):
+                prev = _load_bucket(os.path.join(workdir, f"p{b}"))
+                new = _load_bucket(os.path.join(workdir, f"n{b}"))
+                for key, (digest, lineno) in new.items():
+                    before = prev.pop(key, None)
+                    if before is None:
+                        changed.append(2 * lineno)
+                    elif before[0] != digest:
+                        changed.append(2 * lineno + 1)
+                    else:
+                        delta.unchanged += 1
+                for key in prev:
+                    out.write(json.dumps({"op": "delete", "id": key}, ensure_ascii=False) + "\n")
+                    delta.deleted += 1
+
+            # Las altas/cambios se escriben en el orden del fichero nuevo
+            pending = np.sort(np.frombuffer(changed, dtype=np.uint64)) if changed else ()
+            i = 0
+            for lineno, key, _, record in _rows(new_path):
+                if key is None:
+                    out.write(json.dumps({"op": "insert", "record": record}, ensure_ascii=False) + "\n")
+                    delta.inserted += 1
+                    continue
+                while i < len(pending) and int(pending[i]) >> 1 < lineno:
+                    i += 1
+                if i < len(pending) and int(pending[i]) >> 1 == lineno:
+                    op = "update" if int(pending[i]) & 1 else "insert"
+                    out.write(json.dumps({"op": op, "record": record}, ensure_ascii=False) + "\n")
+                    if op == "insert":
+                        delta.inserted += 1
+                    else:
+                        delta.updated += 1
+        os.replace(tmp_path, delta.path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return delta
+
+
+def iter_delta(path: str, op: str) -> Iterator[Any]:
+    """Ids (op='delete') o registros (op='upsert': altas y cambios) del delta.jsonl."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            if op == "delete":
+                if entry["op"] == "delete":
+                    yield entry["id"]
+            elif entry["op"] != "delete":
+                yield entry["record"]
@@ -22,11 +22,11 @@ Diseño deliberadamente NO invasivo y sin inventar comportamiento por fuente:
 Este módulo expone el cálculo del watermark. La inyección en el manager es el
 único punto de integración y se activa solo cuando ambos params están presentes.
 """
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Optional
 
 
-def max_watermark(records: List[Dict[str, Any]], field: str) -> Optional[Any]:
-    """Máximo valor (no nulo) de `field` sobre una lista de registros.
+def max_watermark(records: Iterable[Dict[str, Any]], field: str) -> Optional[Any]:
+    """Máximo valor (no nulo) de `field` sobre una secuencia de registros.
 
     Función pura y testeable. Devuelve None si no hay valores.
     """
@@ -78,12 +78,11 @@ def compute_watermark(session, resource) -> Optional[Any]:
         )
         if not latest or not latest.data_path:
             return None
-        records: List[Dict[str, Any]] = []
-        with open(latest.data_path, "r", encoding="utf-8") as fh:
-            for line in fh:
-                line = line.strip()
-                if line:
-                    records.append(json.loads(line))
-        return max_watermark(records, cfg["field"])
+        from app.utils.dataset_io import open_text
+
+        # En streaming: el dataset puede estar comprimido y no cabe cargarlo entero.
+        with open_text(latest.data_path) as fh:
+            records = (json.loads(line) for line in fh if line.strip())
+            return max_watermark(records, cfg["field"])
     except Exception:
         return None
@@ -10,10 +10,13 @@ El cálculo del plazo concedible en función del disco y la acumulación program
 (simulador de capacidad) es la siguiente capa; aquí queda el gancho `plazo_concedible`
 con política estática.
 """
+import os
 from datetime import datetime, timedelta
 from typing import List, Optional
 
 from app.models import Dataset, DatasetLease, ResourceSubscription, Resource
+from app.utils.blob_store import blob_path
+from app.utils.dataset_io import codec_of
 
 ESTADO_ACTIVO = "activo"
 ESTADO_LIBERADO = "liberado"
@@ -97,6 +100,10 @@ def datasets_desalojables(session, ahora: Optional[datetime] = None) -> List[Dat
     re-derivables y no permanentes, conservando siempre las `retencion_min_versiones`
     más nuevas, y excluyendo los que tengan lease activo o versión fijada.
 
+    Las versiones con contenido idéntico comparten blob (app/utils/blob_store.py):
+    un candidato cuyo fichero enlaza también una versión retenida no libera disco
+    y se excluye.
+
     El orden de prioridad de desalojo (demanda, coste de rehacer) lo aplicará el
     recolector sobre esta lista en la siguiente capa.
     """
@@ -117,4 +124,26 @@ def datasets_desalojables(session, ahora: Optional[datetime] = None) -> List[Dat
             if leases_activos(session, d.id, ahora):
                 continue
             candidatos.append(d)
-    return candidatos
+    return _liberan_disco(candidatos)
+
+
+def _liberan_disco(candidatos: List[Dataset]) -> List[Dataset]:
+    """Filtra los candidatos cuyo fichero de datos comparten datasets retenidos.
+    Un blob solo se libera si se desalojan todas las versiones que lo enlazan."""
+    por_fichero: dict = {}
+    for d in candidatos:
+        try:
+            st = os.stat(d.data_path)
+        except (OSError, TypeError):
+            continue  # sin fichero: nada que compartir
+        por_fichero.setdefault((st.st_dev, st.st_ino), []).append(d)
+    excluidos = set()
+    for grupo in por_fichero.values():
+        d = grupo[0]
+        st = os.stat(d.data_path)
+        blob = blob_path(d.checksum or "", codec_of(d.data_path))
+        en_blob = d.checksum and os.path.exists(blob) and os.path.samefile(blob, d.data_path)
+        enlaces_de_datasets = st.st_nlink - (1 if en_blob else 0)
+        if len(grupo) < enlaces_de_datasets:
+            excluidos.update(id(x) for x in grupo)
+    return [d for d in candidatos if id(d) not in excluidos]
@@ -16,13 +16,15 @@ from app.utils.versioning import compute_schema_diff
 class NotificationService:
     """Service for sending webhook notifications to applications"""
 
-    def notify_subscribers(self, session: Session, dataset: Dataset):
+    def notify_subscribers(self, session: Session, dataset: Dataset, delta=None):
         """
         Send notifications to all subscribed applications.
 
         Args:
             session: SQLAlchemy session
             dataset: Newly created Dataset
+            delta: DatasetDelta against the previous version (app/services/dataset_diff.py),
+                   if one was computed; its counts and URL go in the payload.
         """
         print(f"  [5/5] NOTIFY - Sending notifications for dataset {dataset.version_string}...")
 
@@ -53,6 +55,8 @@ class NotificationService:
             else:
                 # webhook / both: payload completo con URLs de descarga JSONL
                 payload = self._build_payload(session, dataset, subscription)
+            if delta is not None:
+                payload["delta"] = self._delta_payload(dataset, delta)
 
             # Version pinning: si la suscripción fija una versión y la nueva no la
             # satisface, no se notifica (el consumidor eligió quedarse anclado).
@@ -243,6 +247,18 @@ class NotificationService:
             }
         }
 
+    @staticmethod
+    def _delta_payload(dataset: Dataset, delta) -> Dict:
+        """Cambios respecto a la versión anterior: el consumidor que ya tiene
+        `base_version` puede aplicar solo el delta.jsonl en vez de descargarlo todo."""
+        return {
+            "base_version": delta.base_version,
+            "inserted": delta.inserted,
+            "updated": delta.updated,
+            "deleted": delta.deleted,
+            "url": f"/api/datasets/{dataset.id}/delta.jsonl",
+        }
+
     def _version_type(self, schema_diff: Dict) -> str:
         """Determina el tipo de versión a partir del diff de esquema."""
         if not schema_diff:
@@ -0,0 +1,190 @@
+"""
+Columnas tipadas en las tablas core.* (opt-in por recurso).
+
+Por defecto la carga guarda cada registro entero en `data JSONB`: cualquier
+consulta analítica tiene que extraer del JSONB y no puede usar índices tipados.
+Con el ResourceParam `load_columns=typed` el loader materializa además cada campo
+de primer nivel del esquema inferido (`dataset.schema_json`) como columna:
+
+    string → text, integer → bigint, number → double precision,
+    boolean → boolean, array/object → jsonb
+
+`data` se mantiene (es la fuente de verdad y lo que leen los consumidores
+actuales); las columnas son una proyección. El esquema evoluciona con
+`ALTER TABLE ADD COLUMN` cuando aparecen campos nuevos (versión minor); un
+cambio de tipo (major) no altera la columna existente: los valores que no
+encajan en su tipo se guardan como NULL (siguen en `data`).
+
+`load_indexes` declara índices sobre campos, p. ej. "fecha, importe:btree,
+etiquetas:gin". Por defecto btree, o gin si la columna es jsonb; sin columnas
+tipadas se crean como índices de expresión sobre `data`. El campo especial
+`data` indexa el JSONB completo (gin).
+"""
+import json
+import re
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+PG_TYPES = {
+    "string": "text",
+    "integer": "bigint",
+    "number": "double precision",
+    "boolean": "boolean",
+    "array": "jsonb",
+    "object": "jsonb",
+}
+BASE_COLUMNS = ("id", "created_at", "updated_at", "data")
+LOAD_COLUMNS = ("jsonb", "typed")
+INDEX_METHODS = ("btree", "gin")
+_MAX_IDENT = 63
+_BIGINT = 1 << 63
+
+
+@dataclass(frozen=True)
+class TypedColumn:
+    field: str      # clave en el registro
+    name: str       # columna en la tabla
+    pg_type: str
+
+    def coerce(self, record: Dict[str, Any]) -> Any:
+        return coerce(record.get(self.field), self.pg_type)
+
+    def csv(self, record: Dict[str, Any]) -> str:
+        value = self.coerce(record)
+        if value is not None and self.pg_type == "jsonb":
+            value = json.dumps(value, ensure_ascii=False)
+        return csv_field(value)
+
+
+def wants_typed_columns(value: Optional[str]) -> bool:
+    """Valor del ResourceParam `load_columns` ('jsonb' por defecto o 'typed')."""
+    mode = str(value or "jsonb").strip().lower()
+    if mode not in LOAD_COLUMNS:
+        raise ValueError(f"load_columns no soportado: {value!r} (válidos: {', '.join(LOAD_COLUMNS)})")
+    return mode == "typed"
+
+
+def column_name(field: str) -> str:
+    """Identificador SQL seguro para un campo: minúsculas, [a-z0-9_], sin chocar
+    con las columnas base (`f_` delante) y truncado a 63 caracteres."""
+    name = re.sub(r"[^a-z0-9_]", "_", str(field).strip().lower()) or "f"
+    if name[0].isdigit() or name in BASE_COLUMNS:
+        name = "f_" + name
+    return name[:_MAX_IDENT]
+
+
+def plan_columns(schema_json: Dict) -> List[TypedColumn]:
+    """Columnas para los campos de primer nivel del esquema, en su orden. Si dos
+    campos dan el mismo identificador solo se materializa el primero."""
+    columns, used = [], set(BASE_COLUMNS)
+    for field, spec in ((schema_json or {}).get("properties") or {}).items():
+        if field == "id":
+            continue
+        name = column_name(field)
+        if name in used:
+            continue
+        used.add(name)
+        columns.append(TypedColumn(field, name, PG_TYPES.get((spec or {}).get("type"), "text")))
+    return columns
+
+
+def coerce(value: Any, pg_type: str) -> Any:
+    """Convierte el valor al tipo de la columna, o None si no encaja."""
+    if value is None:
+        return None
+    if pg_type == "jsonb":
+        return value
+    if pg_type == "text":
+        if isinstance(value, str):
+            return value
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii=False)
+        return str(value)
+    if pg_type == "boolean":
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+            return value.strip().lower() == "true"
+        return None
+    if isinstance(value, bool) or isinstance(value, (dict, list)):
+        return None
+    try:
+        if pg_type == "bigint":
+            if isinstance(value, float):
+                if not value.is_integer():
+                    return None
+                value = int(value)
+            n = int(value)
+            return n if -_BIGINT <= n < _BIGINT else None
+        if pg_type == "double precision":
+            return float(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return None
+
+
+def backfill_expr(field: str, pg_type: str) -> str:
+    """Expresión SQL que extrae `field` de `data` con el tipo de la columna sin
+    fallar en valores que no encajan (NULL), para rellenar columnas añadidas a
+    una tabla que ya tenía filas."""
+    key = "'" + field.replace("'", "''") + "'"
+    if pg_type == "jsonb":
+        return f"data->{key}"
+    if pg_type == "text":
+        return f"data->>{key}"
+    if pg_type == "boolean":
+        return f"CASE WHEN jsonb_typeof(data->{key}) = 'boolean' THEN (data->>{key})::boolean END"
+    if pg_type == "bigint":
+        return f"CASE WHEN (data->>{key}) ~ '^-?[0-9]{{1,18}}$' THEN (data->>{key})::bigint END"
+    if pg_type == "double precision":
+        return f"CASE WHEN jsonb_typeof(data->{key}) = 'number' THEN (data->>{key})::double precision END"
+    return "NULL"
+
+
+def parse_index_spec(spec: Any) -> List[Tuple[str, Optional[str]]]:
+    """'fecha, importe:btree, tags:gin' (o lista, o {"campo": "metodo"}) →
+    [(campo, metodo|None)]. Sin método, lo decide el tipo de la columna."""
+    if not spec:
+        return []
+    if isinstance(spec, str):
+        spec = spec.strip()
+        if spec.startswith(("[", "{")):
+            spec = json.loads(spec)
+        else:
+            spec = [part for part in spec.split(",") if part.strip()]
+    items: Iterable = spec.items() if isinstance(spec, dict) else (
+        (item.split(":", 1) + [None])[:2] for item in spec
+    )
+    out = []
+    for field, method in items:
+        field = str(field).strip()
+        method = str(method).strip().lower() if method else None
+        if method and method not in INDEX_METHODS:
+            raise ValueError(f"load_indexes: método no soportado {method!r} para '{field}' "
+                             f"(válidos: {', '.join(INDEX_METHODS)})")
+        if field:
+            out.append((field, method))
+    return out
+
+
+def index_name(table: str, column: str, method: str) -> str:
+    name = f"ix_{table}_{column}_{method}"
+    if len(name) > _MAX_IDENT:
+        name = f"{name[:_MAX_IDENT - 9]}_{zlib.crc32(name.encode()):08x}"
+    return name
+
+
+def csv_field(value: Any) -> str:
+    """Campo CSV para COPY distinguiendo NULL (vacío sin comillas) de ''."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False)
+    return '"' + value.replace('"', '""') + '"'
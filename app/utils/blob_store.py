@@ -0,0 +1,117 @@
+"""
+Almacén de contenido direccionado por checksum para los ficheros de datos.
+
+Muchas ejecuciones (crons diarios sobre fuentes estáticas) producen exactamente
+el mismo contenido que la versión anterior. En vez de guardar otra copia, el
+fichero de datos de cada versión es un enlace duro a un blob común:
+
+    data/blobs/{sha[:2]}/{sha}.jsonl[.zst|.gz]   (+ .idx / .frames derivados)
+
+El recuento de referencias es el del propio sistema de ficheros: cada dataset
+que comparte el blob es un enlace más (`st_nlink - 1` referencias). Borrar un
+dataset solo quita su enlace; `release()` elimina el blob cuando ya no lo
+referencia ningún dataset. Si el volumen no admite enlaces duros se copia, como
+antes, y el almacén simplemente no ahorra disco.
+"""
+import os
+import shutil
+from typing import Iterator
+
+from app.utils.dataset_io import EXTENSIONS, FRAMES_SUFFIX
+from app.utils.line_index import SUFFIX as LINE_INDEX_SUFFIX
+
+BLOB_ROOT = "data/blobs"
+SIDECARS = (LINE_INDEX_SUFFIX, FRAMES_SUFFIX)
+
+
+def blob_path(checksum: str, codec: str = "none") -> str:
+    return os.path.join(BLOB_ROOT, checksum[:2], f"{checksum}.jsonl{EXTENSIONS.get(codec, '')}")
+
+
+def _link(src: str, dst: str) -> None:
+    """Enlace duro `dst` → `src` (reemplazando `dst` de forma atómica si existe);
+    copia con metadatos si el volumen no admite enlaces."""
+    tmp = f"{dst}.link-tmp"
+    try:
+        os.remove(tmp)
+    except OSError:
+        pass
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+def refcount(checksum: str, codec: str = "none") -> int:
+    """Nº de datasets que referencian el blob (0 si no existe)."""
+    try:
+        return max(os.stat(blob_path(checksum, codec)).st_nlink - 1, 0)
+    except OSError:
+        return 0
+
+
+def materialize(checksum: str, codec: str, data_path: str) -> bool:
+    """Si ya existe un blob con este contenido, crea `data_path` (y sus ficheros
+    derivados) como enlaces a él y devuelve True. Si no, False."""
+    blob = blob_path(checksum, codec)
+    if not os.path.exists(blob):
+        return False
+    _link(blob, data_path)
+    for suffix in SIDECARS:
+        if os.path.exists(blob + suffix):
+            _link(blob + suffix, data_path + suffix)
+    return True
+
+
+def adopt(data_path: str, checksum: str, codec: str = "none") -> bool:
+    """Registra el fichero recién publicado como blob de su checksum. Si otro
+    dataset ya lo había registrado, `data_path` pasa a enlazar ese blob (y se
+    libera la copia). Devuelve True si se reutilizó un blob existente."""
+    blob = blob_path(checksum, codec)
+    os.makedirs(os.path.dirname(blob), exist_ok=True)
+    try:
+        os.link(data_path, blob)
+    except FileExistsError:
+        if not os.path.samefile(data_path, blob):
+            materialize(checksum, codec, data_path)
+            return True
+        return False
+    except OSError:
+        return False  # sin enlaces duros: el dataset queda como copia independiente
+    for suffix in SIDECARS:
+        if os.path.exists(data_path + suffix):
+            _link(data_path + suffix, blob + suffix)
+    return False
+
+
+def release(checksum: str, codec: str = "none") -> bool:
+    """Borra el blob (y sus derivados) si ya ningún dataset lo enlaza.
+    Llamar después de borrar el fichero de datos del dataset. True si se borró."""
+    if not checksum:
+        return False
+    blob = blob_path(checksum, codec)
+    if not os.path.exists(blob) or refcount(checksum, codec) > 0:
+        return False
+    for path in (blob,) + tuple(blob + s for s in SIDECARS):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return True
+
+
+def orphan_blobs(root: str = BLOB_ROOT) -> Iterator[str]:
+    """Blobs que ya no enlaza ningún dataset (solo los ficheros de datos)."""
+    if not os.path.isdir(root):
+        return
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.endswith(SIDECARS) or ".link-tmp" in name:
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                if os.stat(path).st_nlink <= 1:
+                    yield path
+            except OSError:
+                pass
@@ -0,0 +1,198 @@
+"""
+Lectura y escritura de los JSONL de datasets con compresión opcional.
+
+Un recurso puede guardar sus versiones comprimidas declarando el parámetro
+`storage_codec` ("zstd" o "gzip"; por defecto sin comprimir). El fichero queda
+como `data.jsonl.zst` / `data.jsonl.gz` y el codec se deduce de la extensión, así
+que todos los lectores pasan por `open_text()` sin saber cómo está guardado.
+
+El fichero comprimido es una concatenación de frames (zstd) o miembros (gzip)
+independientes de ~1 MiB sin comprimir, cortados en fin de línea: cualquier
+descompresor estándar lo lee entero como un solo flujo, y con la tabla de frames
+(`<fichero>.frames`: pares u64 offset sin comprimir → offset comprimido) se puede
+saltar a un offset sin descomprimir lo anterior (`open_text_at()`).
+"""
+import gzip
+import io
+import os
+import struct
+from array import array
+from bisect import bisect_right
+from typing import IO, Optional
+
+try:
+    from compression import zstd as _zstd  # Python 3.14+
+except ImportError:  # pragma: no cover - depende de la versión de Python
+    try:
+        from backports import zstd as _zstd
+    except ImportError:
+        _zstd = None
+
+CODECS = ("none", "gzip", "zstd")
+EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+CONTENT_ENCODINGS = {"gzip": "gzip", "zstd": "zstd"}
+FRAMES_SUFFIX = ".frames"
+FRAME_BYTES = 1 << 20
+_ALIASES = {"": "none", "none": "none", "gzip": "gzip", "gz": "gzip", "zstd": "zstd", "zst": "zstd"}
+_HEADER = struct.Struct("<4s4xQ")
+_MAGIC = b"ODMF"
+
+
+def normalize_codec(value: Optional[str]) -> str:
+    """Normaliza el valor de `storage_codec` ('zst' → 'zstd', vacío → 'none')."""
+    codec = _ALIASES.get(str(value or "").strip().lower())
+    if codec is None:
+        raise ValueError(f"storage_codec no soportado: {value!r} (válidos: {', '.join(CODECS)})")
+    if codec == "zstd" and _zstd is None:
+        raise ValueError("storage_codec 'zstd' requiere Python 3.14+ o el paquete backports.zstd")
+    return codec
+
+
+def codec_of(path: str) -> str:
+    for codec, ext in EXTENSIONS.items():
+        if path.endswith(ext):
+            return codec
+    return "none"
+
+
+def data_filename(codec: str) -> str:
+    return "data.jsonl" + EXTENSIONS.get(codec, "")
+
+
+def frames_path(path: str) -> str:
+    return path + FRAMES_SUFFIX
+
+
+class _OwnedStream(io.RawIOBase):
+    """Descompresor sobre un fichero ya posicionado que, al cerrarse, cierra
+    también el fichero (GzipFile/ZstdFile no lo hacen con fileobj ajeno)."""
+
+    def __init__(self, codec: str, raw: IO[bytes]):
+        self._raw = raw
+        if codec == "gzip":
+            self._stream = gzip.GzipFile(fileobj=raw, mode="rb")
+        else:
+            self._stream = _zstd.ZstdFile(raw, mode="rb")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        return self._stream.readinto(b)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stream.close()
+            self._raw.close()
+        super().close()
+
+
+def _compress(codec: str, data: bytes, level: Optional[int]) -> bytes:
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=6 if level is None else level, mtime=0)
+    return _zstd.compress(data, level=3 if level is None else level)
+
+
+# ── Lectura ───────────────────────────────────────────────────────────────────
+
+def open_binary(path: str) -> IO[bytes]:
+    """Abre el dataset devolviendo siempre los bytes sin comprimir."""
+    codec = codec_of(path)
+    if codec == "gzip":
+        return gzip.open(path, "rb")
+    if codec == "zstd":
+        return _zstd.open(path, "rb")
+    return open(path, "rb")
+
+
+def open_text(path: str) -> IO[str]:
+    """Abre el dataset en modo texto UTF-8, descomprimiendo si hace falta."""
+    return io.TextIOWrapper(open_binary(path), encoding="utf-8")
+
+
+def _read_frames(path: str) -> Optional[tuple]:
+    """(offsets sin comprimir, offsets comprimidos) o None si falta o está desfasada."""
+    try:
+        with open(frames_path(path), "rb") as f:
+            header = f.read(_HEADER.size)
+            pairs = array("Q")
+            pairs.frombytes(f.read())
+    except (OSError, ValueError):
+        return None
+    if len(header) != _HEADER.size:
+        return None
+    magic, size = _HEADER.unpack(header)
+    try:
+        current = os.path.getsize(path)
+    except OSError:
+        return None
+    if magic != _MAGIC or size != current:
+        return None
+    return pairs[0::2], pairs[1::2]
+
+
+def open_text_at(path: str, offset: int) -> IO[str]:
+    """Como open_text() pero posicionado en el byte `offset` del contenido sin
+    comprimir. Con tabla de frames solo se descomprime desde el frame que lo
+    contiene; sin ella, se descomprime y descarta el prefijo."""
+    codec = codec_of(path)
+    if codec == "none":
+        f = open(path, "r", encoding="utf-8")
+        f.seek(offset)
+        return f
+    raw = open(path, "rb")
+    skip = offset
+    frames = _read_frames(path)
+    if frames is not None:
+        starts, cstarts = frames
+        i = bisect_right(starts, offset) - 1
+        if i >= 0:
+            raw.seek(cstarts[i])
+            skip = offset - starts[i]
+    stream = io.BufferedReader(_OwnedStream(codec, raw), buffer_size=1 << 16)
+    while skip > 0:
+        chunk = stream.read(min(skip, FRAME_BYTES))
+        if not chunk:
+            break
+        skip -= len(chunk)
+    return io.TextIOWrapper(stream, encoding="utf-8")
+
+
+# ── Escritura ─────────────────────────────────────────────────────────────────
+
+def compress_file(src_path: str, dst_path: str, codec: str, level: Optional[int] = None) -> int:
+    """Comprime `src_path` (JSONL sin comprimir) en `dst_path` como frames
+    independientes cortados en fin de línea y escribe su tabla de frames.
+    Publica ambos con rename atómico. Devuelve el tamaño comprimido."""
+    codec = normalize_codec(codec)
+    if codec == "none":
+        raise ValueError("compress_file requiere un codec de compresión")
+    tmp, tmp_frames = f"{dst_path}.tmp", f"{frames_path(dst_path)}.tmp"
+    pairs = array("Q")
+    try:
+        with open(src_path, "rb") as src, open(tmp, "wb") as dst:
+            upos = cpos = 0
+            while True:
+                chunk = src.read(FRAME_BYTES)
+                if not chunk and pairs:
+                    break  # un fichero vacío lleva un frame vacío: 0 bytes no es zstd válido
+                if chunk and not chunk.endswith(b"\n"):
+                    chunk += src.readline()
+                pairs.extend((upos, cpos))
+                frame = _compress(codec, chunk, level)
+                dst.write(frame)
+                upos += len(chunk)
+                cpos += len(frame)
+        with open(tmp_frames, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, cpos))
+            pairs.tofile(f)
+        os.replace(tmp, dst_path)
+        os.replace(tmp_frames, frames_path(dst_path))
+    except BaseException:
+        for path in (tmp, tmp_frames):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        raise
+    return cpos
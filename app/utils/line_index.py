@@ -0,0 +1,150 @@
+"""
+Índice de líneas por offset de byte para los JSONL de datasets.
+
+Junto a cada `data.jsonl` se guarda `data.jsonl.idx`: una cabecera de 16 bytes
+("ODML" + relleno + tamaño en bytes del JSONL indexado, u64) seguida de un array
+de u64 con el offset de inicio de cada línea (en el contenido sin comprimir si el
+dataset está comprimido, ver app/utils/dataset_io.py). Es de ancho fijo, así que la línea
+N está en la posición 16 + 8·N y se lee con mmap sin cargar el fichero: saltar a
+la página 10.000 del visor cuesta un seek en vez de leer todo el prefijo.
+
+El índice cuenta LÍNEAS (incluidas vacías o inválidas), que es la unidad que usan
+los lectores por offset (`/api/datasets/{id}/records`). Si el JSONL no coincide en
+tamaño con el indexado, el índice se considera ausente y el lector recorre el
+fichero como antes.
+"""
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from typing import Iterator, Optional
+
+from app.utils.dataset_io import open_binary, open_text, open_text_at
+
+SUFFIX = ".idx"
+_HEADER = struct.Struct("<4s4xQ")
+_MAGIC = b"ODML"
+_FLUSH_EVERY = 65536
+
+
+def index_path(data_path: str) -> str:
+    return data_path + SUFFIX
+
+
+class LineIndexWriter:
+    """Acumula offsets de inicio de línea mientras se escribe (o recorre) un JSONL
+    y los vuelca al fichero de índice por bloques, con memoria acotada."""
+
+    def __init__(self, path: str):
+        self.path = path
+        # Temporal con nombre único en el mismo directorio: dos escritores del
+        # mismo índice no se pisan y el os.replace final sigue siendo atómico.
+        fd, self._tmp = tempfile.mkstemp(prefix=f"{os.path.basename(path)}.", suffix=".tmp",
+                                         dir=os.path.dirname(path) or ".")
+        self._f = os.fdopen(fd, "wb")
+        self._f.write(_HEADER.pack(_MAGIC, 0))
+        self._pend = array("Q")
+        self.lines = 0
+
+    def add(self, offset: int) -> None:
+        self._pend.append(offset)
+        self.lines += 1
+        if len(self._pend) >= _FLUSH_EVERY:
+            self._pend.tofile(self._f)
+            self._pend = array("Q")
+
+    def close(self, data_size: int) -> None:
+        """Cierra y publica el índice (rename atómico) para un fichero de datos de
+        `data_size` bytes en disco (comprimido o no)."""
+        self._pend.tofile(self._f)
+        self._f.seek(0)
+        self._f.write(_HEADER.pack(_MAGIC, data_size))
+        self._f.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self) -> None:
+        self._f.close()
+        try:
+            os.remove(self._tmp)
+        except OSError:
+            pass
+
+
+def build_line_index(data_path: str) -> int:
+    """Recorre el JSONL una vez y escribe su índice de líneas. Devuelve el nº de líneas."""
+    writer = LineIndexWriter(index_path(data_path))
+    try:
+        pos = 0
+        with open_binary(data_path) as f:
+            for line in f:
+                writer.add(pos)
+                pos += len(line)
+        writer.close(os.path.getsize(data_path))
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.lines
+
+
+class LineIndex:
+    """Índice mapeado en memoria: `offset(n)` da el byte de inicio de la línea n.
+    Se cierra con `close()` o usándolo como context manager."""
+
+    def __init__(self, mm: mmap.mmap, lines: int):
+        self._mm = mm
+        self.lines = lines
+        self._offs = memoryview(mm)[_HEADER.size:_HEADER.size + 8 * lines].cast("Q")
+
+    def offset(self, line: int) -> int:
+        return self._offs[line]
+
+    def close(self) -> None:
+        self._offs.release()
+        self._mm.close()
+
+    def __enter__(self) -> "LineIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_line_index(data_path: str) -> Optional[LineIndex]:
+    """Abre el índice de `data_path` si existe y corresponde al JSONL actual."""
+    path = index_path(data_path)
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size or (size - _HEADER.size) % 8:
+                return None
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    magic, data_size = _HEADER.unpack_from(mm, 0)
+    try:
+        current = os.path.getsize(data_path)
+    except OSError:
+        current = -1
+    if magic != _MAGIC or data_size != current:
+        mm.close()
+        return None
+    return LineIndex(mm, (size - _HEADER.size) // 8)
+
+
+def iter_lines_from(data_path: str, start_line: int) -> Iterator[str]:
+    """Líneas del JSONL a partir de la línea `start_line` (0-based). Con índice,
+    salta directamente; sin él, recorre y descarta el prefijo."""
+    index = open_line_index(data_path)
+    if index is not None:
+        with index:
+            if start_line >= index.lines:
+                return
+            offset = index.offset(start_line)
+        with open_text_at(data_path, offset) as f:
+            yield from f
+        return
+    with open_text(data_path) as f:
+        for i, line in enumerate(f):
+            if i >= start_line:
+                yield line
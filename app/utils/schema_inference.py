@@ -15,32 +15,41 @@ def infer_schema(data: List[Dict[str, Any]]) -> Dict:
     Returns:
         JSON Schema dict with type, properties, and required fields
     """
-    if not data:
-        return {"type": "object", "properties": {}, "required": []}
+    acc = SchemaAccumulator()
+    for record in data:
+        acc.add(record)
+    return acc.schema()
 
-    schema = {
-        "type": "object",
-        "properties": {},
-        "required": []
-    }
 
-    # Analyze all records to build schema
-    for record in data:
-        for key, value in record.items():
-            if key not in schema["properties"]:
-                schema["properties"][key] = infer_field_type(value)
+class SchemaAccumulator:
+    """
+    Incremental version of infer_schema: records are added one at a time, so the
+    schema can cover a whole dataset while it is being streamed to disk instead
+    of a sample. Same rules: the first value seen for a field sets its type, and
+    a field is required when it is present in every record.
+    """
 
-    # Determine required fields (present in ALL records)
-    if data:
-        all_keys = set()
-        for record in data:
-            all_keys.update(record.keys())
+    def __init__(self):
+        self.count = 0
+        self._properties: Dict[str, Dict] = {}
+        self._seen: Dict[str, int] = {}  # field -> number of records containing it
 
-        for key in all_keys:
-            if all(key in record for record in data):
-                schema["required"].append(key)
+    def add(self, record: Dict[str, Any]) -> None:
+        self.count += 1
+        for key, value in record.items():
+            seen = self._seen.get(key)
+            if seen is None:
+                self._properties[key] = infer_field_type(value)
+                self._seen[key] = 1
+            else:
+                self._seen[key] = seen + 1
 
-    return schema
+    def schema(self) -> Dict:
+        return {
+            "type": "object",
+            "properties": dict(self._properties),
+            "required": [k for k, seen in self._seen.items() if seen == self.count],
+        }
 
 
 def infer_field_type(value: Any) -> Dict:
@@ -0,0 +1,56 @@
+"""
+Genera el índice de líneas (data.jsonl.idx) de los datasets ya publicados.
+
+Los datasets nuevos lo reciben del DatasetBuilder; este script cubre los
+anteriores. Recorre data/datasets/{resource_id}/{dataset_id}/data.jsonl[.zst|.gz] y
+crea el índice de los que no lo tienen o lo tienen desfasado.
+
+Uso (en el contenedor app):
+    docker exec -it odmgr_app python scripts/backfill_line_index.py
+    docker exec -it odmgr_app python scripts/backfill_line_index.py --force
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from app.utils.dataset_io import EXTENSIONS, data_filename
+from app.utils.line_index import build_line_index, open_line_index
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--root", default=os.path.join(BASE_DIR, "data", "datasets"))
+    ap.add_argument("--force", action="store_true", help="Regenerar también los índices vigentes")
+    args = ap.parse_args()
+
+    creados = vigentes = errores = 0
+    nombres = ["data.jsonl"] + [data_filename(c) for c in EXTENSIONS]
+    rutas = [p for n in nombres for p in glob.glob(os.path.join(args.root, "*", "*", n))]
+    for data_path in sorted(rutas):
+        if not args.force:
+            vigente = open_line_index(data_path)
+            if vigente is not None:
+                vigente.close()
+                vigentes += 1
+                continue
+        t0 = time.perf_counter()
+        try:
+            lineas = build_line_index(data_path)
+        except OSError as e:
+            errores += 1
+            print(f"  ❌ {data_path}: {e}")
+            continue
+        creados += 1
+        print(f"  ✓ {data_path}: {lineas} líneas en {time.perf_counter() - t0:.2f}s")
+
+    print(f"\nÍndices creados: {creados} | ya vigentes: {vigentes} | errores: {errores}")
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
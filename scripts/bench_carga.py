@@ -0,0 +1,82 @@
+"""Benchmark de la fase LOAD: upsert fila a fila vs carga masiva COPY.
+
+Genera registros sintéticos con la forma de BDNS (id + una docena de campos),
+los carga en una tabla desechable `core._bench_carga` con cada modo y reporta
+filas/segundo. El modo fila a fila se mide sobre una muestra (--n-upsert) y se
+extrapola linealmente: cargar 1M de filas así lleva horas.
+
+Uso:
+    DATABASE_URL=... python scripts/bench_carga.py [--n 1000000] [--n-upsert 20000] [--batch 50000]
+
+Al final borra la tabla de benchmark.
+"""
+import argparse
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, str(__import__("pathlib").Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text  # noqa: E402
+
+from app.database import SessionLocal  # noqa: E402
+from app.services.data_loader_service import DataLoaderService  # noqa: E402
+
+TABLA = "core._bench_carga"
+
+
+def registros(n: int):
+    for i in range(n):
+        yield {
+            "id": f"B{i:09d}",
+            "codigo_bdns": str(700000 + i),
+            "fecha_concesion": f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            "beneficiario": f"ASOCIACIÓN CULTURAL Nº {i % 50000}",
+            "nif": f"G{i % 99999999:08d}",
+            "importe": round((i % 10000) * 13.37, 2),
+            "instrumento": "SUBVENCIÓN Y ENTREGA DINERARIA SIN CONTRAPRESTACIÓN",
+            "organo": {"nivel1": "ANDALUCÍA", "nivel2": f"CONSEJERÍA {i % 17}"},
+            "convocatoria": f"Ayudas a entidades sin ánimo de lucro {i % 300}",
+            "region": "ES61 - Andalucía",
+        }
+
+
+def medir(loader, session, modo: str, n: int, batch: int) -> float:
+    session.execute(text(f"DROP TABLE IF EXISTS {TABLA}"))
+    session.commit()
+    loader.metadata.clear()
+    dataset = SimpleNamespace(schema_json={})
+    t0 = time.perf_counter()
+    cargados = loader.load_data(session, dataset, registros(n) if modo.startswith("copy") else list(registros(n)),
+                                load_mode=modo, table_name=TABLA, batch_size=batch)
+    dt = time.perf_counter() - t0
+    assert cargados == n, (cargados, n)
+    print(f"  {modo:<8} {n:>9} filas en {dt:8.2f}s → {n / dt:>10.0f} filas/s")
+    return n / dt
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=1_000_000, help="filas para el modo COPY")
+    ap.add_argument("--n-upsert", type=int, default=20_000, help="muestra para el modo fila a fila")
+    ap.add_argument("--batch", type=int, default=50_000)
+    args = ap.parse_args()
+    if SessionLocal is None:
+        print("❌ Error: DATABASE_URL no configurado en .env")
+        return 1
+
+    loader = DataLoaderService()
+    with SessionLocal() as session:
+        try:
+            lento = medir(loader, session, "upsert", args.n_upsert, args.batch)
+            rapido = medir(loader, session, "copy", args.n, args.batch)
+            print(f"  upsert extrapolado a {args.n} filas: {args.n / lento:,.0f}s")
+            print(f"  aceleración COPY: x{rapido / lento:.1f}")
+        finally:
+            session.execute(text(f"DROP TABLE IF EXISTS {TABLA}"))
+            session.commit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""Benchmark de consultas sobre core.*: columnas tipadas (load_columns=typed) vs JSONB.
+
+Carga los mismos registros sintéticos (forma BDNS) en dos tablas desechables,
+`core._bench_jsonb` (solo `data JSONB`, con índices de expresión) y
+`core._bench_tipada` (columnas tipadas + índices B-tree), ambas por el camino
+COPY del loader y con los mismos campos indexados (--indices). Después mide la
+mediana de varias ejecuciones de consultas analíticas típicas:
+
+  - igualdad selectiva sobre un campo indexado (nif),
+  - rango numérico + agregado (importe entre dos valores),
+  - agrupación con media (region → avg(importe)),
+
+y el tamaño en disco de cada tabla con sus índices.
+
+Uso:
+    DATABASE_URL=... python scripts/bench_columnas_tipadas.py [--n 500000] [--repeticiones 5]
+
+Al final borra las tablas de benchmark.
+"""
+import argparse
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, str(__import__("pathlib").Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text  # noqa: E402
+
+from app.database import SessionLocal  # noqa: E402
+from app.services.data_loader_service import DataLoaderService  # noqa: E402
+from app.utils.schema_inference import SchemaAccumulator  # noqa: E402
+
+JSONB = "core._bench_jsonb"
+TIPADA = "core._bench_tipada"
+
+CONSULTAS = {
+    "igualdad nif": (
+        "SELECT count(*) FROM {t} WHERE data->>'nif' = 'G00001234'",
+        "SELECT count(*) FROM {t} WHERE nif = 'G00001234'",
+    ),
+    "rango importe": (
+        "SELECT count(*), sum((data->>'importe')::double precision) FROM {t} "
+        "WHERE (data->>'importe')::double precision BETWEEN 1000 AND 1100",
+        "SELECT count(*), sum(importe) FROM {t} WHERE importe BETWEEN 1000 AND 1100",
+    ),
+    "group by region": (
+        "SELECT data->>'region', count(*), avg((data->>'importe')::double precision) FROM {t} "
+        "GROUP BY 1",
+        "SELECT region, count(*), avg(importe) FROM {t} GROUP BY 1",
+    ),
+}
+
+
+def registros(n: int):
+    for i in range(n):
+        yield {
+            "id": f"B{i:09d}",
+            "codigo_bdns": str(700000 + i),
+            "fecha_concesion": f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            "beneficiario": f"ASOCIACIÓN CULTURAL Nº {i % 50000}",
+            "nif": f"G{i % 99999999:08d}",
+            "importe": round((i % 10000) * 13.37, 2),
+            "ejercicio": 2015 + i % 10,
+            "instrumento": "SUBVENCIÓN Y ENTREGA DINERARIA SIN CONTRAPRESTACIÓN",
+            "organo": {"nivel1": "ANDALUCÍA", "nivel2": f"CONSEJERÍA {i % 17}"},
+            "region": f"ES6{i % 8} - Región {i % 8}",
+        }
+
+
+def cargar(loader, session, tabla: str, n: int, tipada: bool, indices: str) -> float:
+    session.execute(text(f"DROP TABLE IF EXISTS {tabla}"))
+    session.commit()
+    loader.metadata.clear()
+    acc = SchemaAccumulator()
+    for r in registros(min(n, 1000)):
+        acc.add(r)
+    dataset = SimpleNamespace(schema_json=acc.schema())
+    t0 = time.perf_counter()
+    loader.load_data(session, dataset, registros(n), load_mode="copy", table_name=tabla,
+                     typed_columns=tipada, indexes=indices)
+    dt = time.perf_counter() - t0
+    session.execute(text(f"ANALYZE {tabla}"))
+    session.commit()
+    return dt
+
+
+def mediana_ms(session, sql: str, repeticiones: int) -> float:
+    session.execute(text(sql)).all()  # calentamiento (caché de páginas)
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        session.execute(text(sql)).all()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tiempos)
+
+
+def tamano_mb(session, tabla: str) -> float:
+    return session.execute(text(f"SELECT pg_total_relation_size('{tabla}')")).scalar() / 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=500_000)
+    ap.add_argument("--repeticiones", type=int, default=5)
+    ap.add_argument("--indices", default="nif, importe, region")
+    args = ap.parse_args()
+    if SessionLocal is None:
+        print("❌ Error: DATABASE_URL no configurado en .env")
+        return 1
+
+    loader = DataLoaderService()
+    with SessionLocal() as session:
+        try:
+            for tabla, tipada in ((JSONB, False), (TIPADA, True)):
+                dt = cargar(loader, session, tabla, args.n, tipada, args.indices)
+                print(f"  carga {tabla:<20} {args.n:>9} filas en {dt:7.2f}s  "
+                      f"({tamano_mb(session, tabla):8.1f} MB con índices)")
+            print(f"\n  {'consulta':<18} {'jsonb (ms)':>12} {'tipada (ms)':>12} {'aceleración':>12}")
+            for nombre, (sql_jsonb, sql_tipada) in CONSULTAS.items():
+                a = mediana_ms(session, sql_jsonb.format(t=JSONB), args.repeticiones)
+                b = mediana_ms(session, sql_tipada.format(t=TIPADA), args.repeticiones)
+                print(f"  {nombre:<18} {a:>12.2f} {b:>12.2f} {a / b:>11.1f}x")
+        finally:
+            for tabla in (JSONB, TIPADA):
+                session.execute(text(f"DROP TABLE IF EXISTS {tabla}"))
+            session.commit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Benchmark del almacenamiento comprimido de datasets (storage_codec).
+
+Genera datasets sintéticos con la forma de los reales (concesiones BDNS,
+licitaciones PLACSP, puntos OSM), los comprime con cada codec y mide:
+
+  - ratio de tamaño frente al JSONL sin comprimir,
+  - tiempo de compresión (publicación del dataset),
+  - throughput de recorrido completo (open_text + json.loads, lo que hacen
+    LOAD, el índice de /graphql/data o el watermark incremental),
+  - latencia de una página de /records al final del fichero (índice de líneas
+    + tabla de frames).
+
+Uso:
+    python scripts/bench_compresion.py [--n 300000]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from itertools import islice
+
+sys.path.insert(0, str(__import__("pathlib").Path(__file__).resolve().parent.parent))
+
+from app.utils.dataset_io import compress_file, data_filename, open_text  # noqa: E402
+from app.utils.line_index import build_line_index, iter_lines_from  # noqa: E402
+
+CODECS = ["none", "gzip", "zstd"]
+
+
+def concesiones(i: int, rnd: random.Random) -> dict:
+    return {
+        "id": str(1_000_000 + i), "codConcesion": f"SB{i:08d}",
+        "fechaConcesion": f"20{15 + i % 10}-{1 + i % 12:02d}-{1 + i % 28:02d}",
+        "beneficiario": f"B{rnd.randrange(10**8):08d} ASOCIACION CULTURAL {rnd.randrange(50000)}",
+        "instrumento": "SUBVENCIÓN Y ENTREGA DINERARIA SIN CONTRAPRESTACIÓN ",
+        "importe": round(rnd.uniform(100, 250000), 2), "ayudaEquivalente": None,
+        "convocatoria": f"Convocatoria de ayudas para actividades {i % 700}",
+        "nivel1": "LOCAL", "nivel2": f"AYUNTAMIENTO DE MUNICIPIO {i % 8100}",
+    }
+
+
+def licitaciones(i: int, rnd: random.Random) -> dict:
+    return {
+        "expediente": f"{i % 90000}/20{20 + i % 5}", "fecha": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}T10:00:00",
+        "estado": rnd.choice(["PUB", "EV", "ADJ", "RES"]), "organo": f"Órgano de contratación {i % 4000}",
+        "objeto": f"Servicio de mantenimiento de instalaciones municipales lote {i % 9}",
+        "importe_sin_iva": round(rnd.uniform(1000, 2_000_000), 2), "cpv": f"{rnd.randrange(10**7, 10**8)}",
+        "url": f"https://contrataciondelestado.es/wps/poc?uri=deeplink:detalle_licitacion&idEvl={i:x}",
+    }
+
+
+def osm(i: int, rnd: random.Random) -> dict:
+    return {
+        "id": f"node/{rnd.randrange(10**10)}", "lat": round(rnd.uniform(36, 43.8), 7),
+        "lon": round(rnd.uniform(-9.3, 3.3), 7), "amenity": rnd.choice(["place_of_worship", "school", "pharmacy"]),
+        "name": f"Iglesia de San {rnd.choice(['Juan', 'Pedro', 'Miguel', 'Andrés'])} {i % 500}",
+        "religion": "christian", "denomination": "catholic",
+    }
+
+
+def generar(path: str, forma, n: int) -> None:
+    rnd = random.Random(7)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(json.dumps(forma(i, rnd), ensure_ascii=False) + "\n")
+
+
+def recorrer(path: str) -> float:
+    t0 = time.perf_counter()
+    with open_text(path) as f:
+        for line in f:
+            json.loads(line)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=300_000)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_comp_")
+    try:
+        for forma in (concesiones, licitaciones, osm):
+            src = os.path.join(tmp, f"{forma.__name__}.jsonl")
+            generar(src, forma, args.n)
+            base = os.path.getsize(src)
+            print(f"\n  {forma.__name__}: {args.n} registros, {base / 2**20:.1f} MiB sin comprimir")
+            print(f"  {'codec':<6} {'tamaño':>10} {'ratio':>7} {'comprimir':>10} {'recorrido':>12} {'pág. final':>11}")
+            for codec in CODECS:
+                dst = os.path.join(tmp, f"{forma.__name__}-{data_filename(codec)}")
+                t0 = time.perf_counter()
+                if codec == "none":
+                    shutil.copy(src, dst)
+                else:
+                    compress_file(src, dst, codec)
+                t_comp = time.perf_counter() - t0
+                build_line_index(dst)
+                t_scan = recorrer(dst)
+                t0 = time.perf_counter()
+                [json.loads(line) for line in islice(iter_lines_from(dst, args.n - 50), 50)]
+                t_pag = (time.perf_counter() - t0) * 1000
+                size = os.path.getsize(dst)
+                print(f"  {codec:<6} {size / 2**20:8.1f}MB {base / size:6.1f}x {t_comp:9.2f}s "
+                      f"{base / 2**20 / t_scan:8.0f} MB/s {t_pag:8.2f} ms")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Benchmark de los resolvers de /graphql/data: recorrido del JSONL vs índice columnar.
+
+Genera un dataset sintético (1M filas por defecto) con campos de cardinalidad
+variada, construye su índice y mide la latencia (p50/p95) de consultas
+filtradas y de paginación con cada camino. No necesita base de datos.
+
+Uso:
+    python scripts/bench_graphql_data.py [--n 1000000] [--consultas 50] [--scan-consultas 3]
+
+El recorrido se mide con menos consultas (--scan-consultas): cada una lee el
+fichero entero.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(__import__("pathlib").Path(__file__).resolve().parent.parent))
+
+from app.graphql_data import query_index  # noqa: E402
+from app.graphql_data.schema_builder import _scan  # noqa: E402
+
+CAMPOS = ["id", "provincia", "municipio", "tipo", "nif", "importe", "fecha"]
+PROVINCIAS = [f"Provincia {i}" for i in range(52)]
+
+
+def generar(path: str, n: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(json.dumps({
+                "id": str(i),
+                "provincia": PROVINCIAS[i % 52],
+                "municipio": f"Municipio {i % 8100}",
+                "tipo": ("Asociación", "Fundación", "Cooperativa")[i % 3],
+                "nif": f"G{i:08d}",
+                "importe": str((i * 37) % 100000),
+                "fecha": f"20{10 + i % 15}-{1 + i % 12:02d}-01",
+            }, ensure_ascii=False) + "\n")
+
+
+def consultas(n: int, k: int):
+    rnd = random.Random(42)
+    out = []
+    for _ in range(k):
+        caso = rnd.choice(("municipio", "nif", "provincia_tipo", "pagina"))
+        if caso == "municipio":
+            out.append((caso, {"municipio": f"municipio {rnd.randrange(8100)}"}, 0, 100))
+        elif caso == "nif":
+            out.append((caso, {"nif": f"g{rnd.randrange(n):08d}"}, 0, 100))
+        elif caso == "provincia_tipo":
+            out.append((caso, {"provincia": f"provincia {rnd.randrange(52)}", "tipo": "fundación"}, 0, 100))
+        else:
+            out.append((caso, {}, rnd.randrange(n), 100))
+    return out
+
+
+def percentiles(ms: list[float]) -> str:
+    ms = sorted(ms)
+    p95 = ms[min(len(ms) - 1, int(round(0.95 * (len(ms) - 1))))]
+    return f"p50 {statistics.median(ms):8.2f} ms | p95 {p95:8.2f} ms"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=1_000_000)
+    ap.add_argument("--consultas", type=int, default=50)
+    ap.add_argument("--scan-consultas", type=int, default=3)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_gql_")
+    try:
+        path = os.path.join(tmp, "data.jsonl")
+        generar(path, args.n)
+        print(f"  dataset: {args.n} filas, {os.path.getsize(path) / 2**20:.0f} MiB")
+
+        t0 = time.perf_counter()
+        index = query_index.get_index(path, CAMPOS)
+        print(f"  build columnas: {time.perf_counter() - t0:.1f}s")
+        for campo in ("municipio", "nif", "provincia", "tipo"):
+            t0 = time.perf_counter()
+            index.query({campo: "__calentar__"}, 0, 1)
+            print(f"  build índice '{campo}': {time.perf_counter() - t0:.1f}s")
+
+        qs = consultas(args.n, args.consultas)
+        por_caso: dict[str, list[float]] = {}
+        for caso, filtros, offset, limit in qs:
+            t0 = time.perf_counter()
+            _, filas = index.query(filtros, offset, limit)
+            [index.row(r, CAMPOS) for r in filas]
+            por_caso.setdefault(caso, []).append((time.perf_counter() - t0) * 1000)
+        todos = [x for v in por_caso.values() for x in v]
+        print(f"  índice    todas           {percentiles(todos)}")
+        for caso, ms in sorted(por_caso.items()):
+            print(f"  índice    {caso:<15} {percentiles(ms)}")
+
+        scan_ms = []
+        for caso, filtros, offset, limit in qs[:args.scan_consultas]:
+            t0 = time.perf_counter()
+            _scan(path, filtros, offset, limit)
+            scan_ms.append((time.perf_counter() - t0) * 1000)
+        print(f"  recorrido todas           {percentiles(scan_ms)}")
+        print(f"  aceleración (p50): x{statistics.median(scan_ms) / statistics.median(todos):,.0f}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Benchmark de los motores de parseo HTML (param `html_parser` de los recursos).
+
+Extrae registros de las páginas capturadas en tests/fixtures/html con cada motor
+(html.parser y lxml) y reporta páginas por segundo. Para acercarse a un listado
+real, la tabla de resultados se replica hasta --filas filas; el portal de datos
+se mide con la extracción de enlaces del WebTreeFetcher. Antes de medir comprueba
+que los dos motores devuelven lo mismo.
+
+Uso:
+    python scripts/bench_html_parsers.py [--filas 300] [--segundos 2]
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.fetchers.html_extraction import BACKENDS, extract_html  # noqa: E402
+from app.fetchers.navigation import extract_links  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "html"
+
+LISTADO = {
+    "rows_selector": "table.resultados > tr.fila",
+    "field_selectors": {"expediente": "td:first-child a", "beneficiario": "td:nth-child(2)",
+                        "importe": "td.importe", "fecha": "td:last-child"},
+    "field_attr_selectors": {"_detail_url": {"selector": "a[href]", "attr": "href"}},
+    "field_attrs": {"id": "data-id"},
+}
+FICHA = {
+    "field_selectors": {"nombre": "h2.titulo", "organo": "dl.datos dd:nth-of-type(1)"},
+    "field_all_selectors": {"etiquetas": "ul.etiquetas .tag"},
+    "field_label_selectors": {"email": {"container": "#ficha", "label": "email"}},
+}
+
+
+def listado(filas: int) -> str:
+    """El listado capturado con sus filas repetidas hasta `filas`."""
+    html = (FIXTURES / "listado_ayudas.html").read_text(encoding="utf-8")
+    filas_capturadas = list(re.finditer(r"<tr class=\"fila.*?</tr>", html, re.S))
+    plantilla = [m.group(0) for m in filas_capturadas]
+    cuerpo = "\n".join(plantilla[i % len(plantilla)] for i in range(filas))
+    return html[:filas_capturadas[0].start()] + cuerpo + html[filas_capturadas[-1].end():]
+
+
+def medir(fn, segundos: float) -> float:
+    """Páginas por segundo de `fn` durante ~`segundos`."""
+    fn()
+    n, t0 = 0, time.perf_counter()
+    while time.perf_counter() - t0 < segundos:
+        fn()
+        n += 1
+    return n / (time.perf_counter() - t0)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--filas", type=int, default=300, help="filas del listado (def. 300)")
+    ap.add_argument("--segundos", type=float, default=2.0, help="duración de cada medida")
+    args = ap.parse_args()
+
+    portal = (FIXTURES / "portal_datos.html").read_text(encoding="utf-8")
+    base = "https://datos.example.org/estadistica/poblacion/"
+    casos = {
+        f"listado ({args.filas} filas)": (
+            lambda b, h=listado(args.filas): extract_html("fields", h, {**LISTADO, "html_parser": b})),
+        "ficha de detalle": (
+            lambda b, h=(FIXTURES / "ficha_detalle.html").read_text(encoding="utf-8"):
+                extract_html("fields", h, {**FICHA, "html_parser": b})),
+        "enlaces del portal": lambda b: extract_links(portal, base, "ul.ficheros a.descarga", backend=b),
+    }
+
+    print(f"{'caso':<24}" + "".join(f"{b:>16}" for b in BACKENDS) + f"{'mejora':>10}")
+    for nombre, caso in casos.items():
+        resultados = {b: caso(b) for b in BACKENDS}
+        if len({repr(r) for r in resultados.values()}) != 1:
+            sys.exit(f"{nombre}: los motores no devuelven lo mismo")
+        ritmo = {b: medir(lambda: caso(b), args.segundos) for b in BACKENDS}
+        print(f"{nombre:<24}" + "".join(f"{ritmo[b]:>11.1f} pág/s" for b in BACKENDS)
+              + f"{ritmo['lxml'] / ritmo['html.parser']:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
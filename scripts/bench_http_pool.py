@@ -0,0 +1,105 @@
+"""Benchmark de la capa HTTP compartida: conexión nueva por petición vs pool keep-alive.
+
+Levanta en local un servidor HTTPS (certificado autofirmado generado con el
+CLI `openssl`) o usa --url, y hace N peticiones pequeñas como las de una API
+paginada:
+
+  - `requests.request` de módulo (lo que hacía BaseSpecies._request sin sesión:
+    TCP + TLS nuevos en cada petición),
+  - la sesión de una especie sobre el pool compartido (app/fetchers/http_client).
+
+Reporta peticiones/s, latencia media y las estadísticas por host de la capa.
+
+Uso:
+    python scripts/bench_http_pool.py [--n 500] [--url https://...]
+"""
+import argparse
+import os
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, str(__import__("pathlib").Path(__file__).resolve().parent.parent))
+
+import requests  # noqa: E402
+
+from app.fetchers import http_client  # noqa: E402
+
+
+class _Api(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = 1 << 16
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        cuerpo = b'{"items": [{"id": 1, "nombre": "registro"}], "total": 1}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+
+def servidor_https(tmp: str):
+    cert, key = os.path.join(tmp, "cert.pem"), os.path.join(tmp, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                    "-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+                   check=True, capture_output=True)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Api)
+    server.daemon_threads = True
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.load_cert_chain(cert, key)
+    server.socket = ctx.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"https://127.0.0.1:{server.server_address[1]}/api"
+
+
+def medir(nombre: str, hacer, n: int, url: str) -> float:
+    t0 = time.perf_counter()
+    for i in range(n):
+        hacer(url, params={"page": i}, timeout=30, verify=False).raise_for_status()
+    dt = time.perf_counter() - t0
+    print(f"  {nombre:<26} {dt:7.2f}s  {n / dt:8.1f} pet/s  {dt / n * 1000:7.2f} ms/pet")
+    return dt
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=500)
+    ap.add_argument("--url", default=None, help="endpoint real (por defecto, servidor HTTPS local)")
+    args = ap.parse_args()
+    warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+
+    tmp = tempfile.mkdtemp(prefix="odm_bench_http_")
+    server = None
+    try:
+        if args.url:
+            url = args.url
+        else:
+            server, url = servidor_https(tmp)
+        print(f"{args.n} peticiones GET a {url}")
+        a = medir("conexión nueva (módulo)", requests.get, args.n, url)
+        sesion = http_client.session()
+        b = medir("pool compartido", sesion.get, args.n, url)
+        print(f"  aceleración x{a / b:.1f}")
+        for linea in sesion.stats.summary():
+            print(f"  {linea}")
+    finally:
+        if server is not None:
+            server.shutdown()
+        http_client.close()
+        shutil.rmtree(tmp, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
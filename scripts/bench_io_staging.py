@@ -0,0 +1,124 @@
+"""Benchmark de bytes de E/S de una ejecución: staging clásico vs StagingWriter.
+
+Reproduce sin base de datos el recorrido del fichero de datos de una ejecución
+(EXTRACT+STAGE → dedup → DATASET → LOAD) con los dos caminos y mide los bytes
+leídos y escritos por el proceso (rchar/wchar de /proc/self/io, Linux):
+
+  clásico: escribir staging, dedup en dos pasadas, muestra de 500 líneas para el
+           schema, copia a data/datasets, checksum e índice de líneas releyendo
+           la copia, y lectura de la fase LOAD.
+  una pasada: StagingWriter (checksum, schema, índice y dedup al escribir),
+           rename al publicar y lectura de la fase LOAD.
+
+Uso:
+    python scripts/bench_io_staging.py [--n 500000] [--duplicados 0.1]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(__import__("pathlib").Path(__file__).resolve().parent.parent))
+
+from app.builders.staging_writer import StagingWriter  # noqa: E402
+from app.manager.fetcher_manager import FetcherManager  # noqa: E402
+from app.utils.line_index import build_line_index  # noqa: E402
+from app.utils.schema_inference import infer_schema  # noqa: E402
+
+
+def io_bytes() -> tuple[int, int]:
+    with open("/proc/self/io") as f:
+        campos = dict(line.split(": ") for line in f.read().splitlines())
+    return int(campos["rchar"]), int(campos["wchar"])
+
+
+def registros(n: int, duplicados: float):
+    distintos = max(1, int(n * (1 - duplicados)))
+    for i in range(n):
+        yield {"id": f"EXP-{i % distintos:09d}", "organo": f"Ayuntamiento {i % 8000}",
+               "objeto": "Suministro de material de oficina " * 3,
+               "importe": round((i % 50000) * 7.31, 2), "fecha": f"2025-{1 + i % 12:02d}-01"}
+
+
+def clasico(tmp: str, n: int, duplicados: float) -> None:
+    staging = os.path.join(tmp, "staging.jsonl")
+    with open(staging, "w", encoding="utf-8") as f:
+        for reg in registros(n, duplicados):
+            f.write(json.dumps(reg, ensure_ascii=False) + "\n")
+    # dedup: pasada completa para elegir ganadores + relectura de los elegidos
+    ganadores = {}
+    with open(staging, "rb") as f:
+        offset = 0
+        for linea in f:
+            reg = json.loads(linea)
+            previo = ganadores.get(reg["id"])
+            if previo is None or reg["fecha"] >= previo[0]:
+                ganadores[reg["id"]] = (reg["fecha"], offset, len(linea))
+            offset += len(linea)
+    with open(staging, "rb") as src, open(staging + ".dedup", "wb") as dst:
+        for _, o, l in sorted(ganadores.values(), key=lambda g: g[1]):
+            src.seek(o)
+            dst.write(src.read(l))
+    os.replace(staging + ".dedup", staging)
+    # DatasetBuilder: muestra, copia, checksum e índice
+    with open(staging, encoding="utf-8") as f:
+        infer_schema([json.loads(line) for _, line in zip(range(500), f)])
+    data = os.path.join(tmp, "data.jsonl")
+    shutil.copy(staging, data)
+    sha = hashlib.sha256()
+    with open(data, "rb") as f:
+        for bloque in iter(lambda: f.read(8192), b""):
+            sha.update(bloque)
+    build_line_index(data)
+    os.remove(staging)
+    # LOAD
+    for _ in FetcherManager._iter_staging(data):
+        pass
+
+
+def una_pasada(tmp: str, n: int, duplicados: float) -> None:
+    with StagingWriter(os.path.join(tmp, "staging.jsonl"), dedup_key="id") as staging:
+        for reg in registros(n, duplicados):
+            staging.write(reg)
+    staging.dedup()
+    staging.schema()
+    data = os.path.join(tmp, "data.jsonl")
+    staging.publish(data)
+    for _ in FetcherManager._iter_staging(data):
+        pass
+
+
+def medir(nombre, fn, n, duplicados):
+    tmp = tempfile.mkdtemp(prefix="bench_io_")
+    try:
+        r0, w0 = io_bytes()
+        t0 = time.perf_counter()
+        fn(tmp, n, duplicados)
+        dt = time.perf_counter() - t0
+        r1, w1 = io_bytes()
+        tam = os.path.getsize(os.path.join(tmp, "data.jsonl"))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    leidos, escritos = r1 - r0, w1 - w0
+    print(f"  {nombre:<11} leídos {leidos / 2**20:8.1f} MiB ({leidos / tam:4.1f}x) | "
+          f"escritos {escritos / 2**20:8.1f} MiB ({escritos / tam:4.1f}x) | {dt:6.1f}s")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=500_000)
+    ap.add_argument("--duplicados", type=float, default=0.1,
+                    help="Fracción de registros que repiten clave (0 = sin dedup efectivo)")
+    args = ap.parse_args()
+    print(f"  {args.n} registros, {args.duplicados:.0%} duplicados "
+          f"(múltiplos sobre el tamaño del data.jsonl final)")
+    medir("clásico", clasico, args.n, args.duplicados)
+    medir("una pasada", una_pasada, args.n, args.duplicados)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Benchmark de memoria de la fase LOAD en streaming.
+
+Escribe un staging JSONL sintético (2M registros por defecto), lo carga en la
+tabla desechable `core._bench_memoria` leyéndolo con el mismo generador que usa
+el FetcherManager y comprueba que el RSS pico del proceso queda por debajo de un
+techo fijo, independiente del tamaño del fichero.
+
+Uso:
+    DATABASE_URL=... python scripts/bench_memoria_carga.py [--n 2000000] [--modo upsert|copy] [--techo-mb 300]
+
+Sale con código 1 si se supera el techo. Borra la tabla y el staging al acabar.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, str(__import__("pathlib").Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text  # noqa: E402
+
+from app.database import SessionLocal  # noqa: E402
+from app.manager.fetcher_manager import FetcherManager  # noqa: E402
+from app.services.data_loader_service import DataLoaderService  # noqa: E402
+
+TABLA = "core._bench_memoria"
+
+
+def rss_pico_mb() -> float:
+    # ru_maxrss va en KiB en Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def escribir_staging(path: str, n: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(json.dumps({
+                "id": f"EXP-{i:09d}",
+                "expediente": f"{i}/2025",
+                "organo": f"Ayuntamiento {i % 8000}",
+                "objeto": "Suministro de material de oficina y consumibles informáticos " * 2,
+                "importe": round((i % 50000) * 7.31, 2),
+                "fecha": f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            }, ensure_ascii=False) + "\n")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=2_000_000)
+    ap.add_argument("--modo", default="upsert")
+    ap.add_argument("--techo-mb", type=float, default=300.0)
+    args = ap.parse_args()
+    if SessionLocal is None:
+        print("❌ Error: DATABASE_URL no configurado en .env")
+        return 1
+
+    fd, staging = tempfile.mkstemp(suffix=".jsonl")
+    os.close(fd)
+    try:
+        escribir_staging(staging, args.n)
+        print(f"  staging: {args.n} registros, {os.path.getsize(staging) / 2**20:.0f} MiB")
+        base = rss_pico_mb()
+        loader = DataLoaderService()
+        with SessionLocal() as session:
+            try:
+                t0 = time.perf_counter()
+                cargados = loader.load_data(
+                    session, SimpleNamespace(schema_json={}), FetcherManager._iter_staging(staging),
+                    load_mode=args.modo, table_name=TABLA,
+                )
+                dt = time.perf_counter() - t0
+            finally:
+                session.execute(text(f"DROP TABLE IF EXISTS {TABLA}"))
+                session.commit()
+        pico = rss_pico_mb()
+        print(f"  {cargados} registros en {dt:.1f}s | RSS pico {pico:.0f} MiB (antes de cargar {base:.0f} MiB)")
+        if pico > args.techo_mb:
+            print(f"❌ RSS pico {pico:.0f} MiB supera el techo de {args.techo_mb:.0f} MiB")
+            return 1
+        print(f"✅ Dentro del techo de {args.techo_mb:.0f} MiB")
+        return 0
+    finally:
+        os.remove(staging)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
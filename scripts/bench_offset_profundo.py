@@ -0,0 +1,72 @@
+"""Benchmark de paginación profunda de /api/datasets/{id}/records.
+
+Genera un JSONL sintético (1M líneas por defecto) y mide la latencia de leer una
+página de 50 registros a distintos offsets, recorriendo el prefijo (sin índice)
+y saltando con el índice de líneas. No necesita base de datos.
+
+Uso:
+    python scripts/bench_offset_profundo.py [--n 1000000] [--limit 50] [--repeticiones 5]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from itertools import islice
+
+sys.path.insert(0, str(__import__("pathlib").Path(__file__).resolve().parent.parent))
+
+from app.utils.line_index import build_line_index, index_path, iter_lines_from  # noqa: E402
+
+
+def generar(path: str, n: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(json.dumps({"id": str(i), "nombre": f"Entidad {i}",
+                                "municipio": f"Municipio {i % 8100}", "importe": i * 3.5},
+                               ensure_ascii=False) + "\n")
+
+
+def pagina_ms(path: str, offset: int, limit: int, reps: int) -> float:
+    ms = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        filas = [json.loads(line) for line in islice(iter_lines_from(path, offset), limit)]
+        ms.append((time.perf_counter() - t0) * 1000)
+        assert not filas or filas[0]["id"] == str(offset)
+    return statistics.median(ms)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=1_000_000)
+    ap.add_argument("--limit", type=int, default=50)
+    ap.add_argument("--repeticiones", type=int, default=5)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_offset_")
+    try:
+        path = os.path.join(tmp, "data.jsonl")
+        generar(path, args.n)
+        print(f"  dataset: {args.n} líneas, {os.path.getsize(path) / 2**20:.0f} MiB")
+        offsets = [0, args.n // 100, args.n // 10, args.n // 2, args.n - args.limit]
+
+        sin = {o: pagina_ms(path, o, args.limit, args.repeticiones) for o in offsets}
+        t0 = time.perf_counter()
+        build_line_index(path)
+        print(f"  build índice: {time.perf_counter() - t0:.2f}s "
+              f"({os.path.getsize(index_path(path)) / 2**20:.1f} MiB)")
+        con = {o: pagina_ms(path, o, args.limit, args.repeticiones) for o in offsets}
+
+        print(f"  {'offset':>10} | {'sin índice':>12} | {'con índice':>12}")
+        for o in offsets:
+            print(f"  {o:>10} | {sin[o]:9.2f} ms | {con[o]:9.2f} ms")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Benchmark del parseo en streaming de CSV (FileDownloadFetcher).
+
+Genera un CSV sintético del tamaño pedido (por defecto 5 GB) en un directorio
+temporal, lo sirve por HTTP en local y lo consume con FileDownloadFetcher.stream()
+como lo hace el manager, lote a lote. Reporta la memoria residente (RSS) a cada
+10 % del fichero: con la vía en streaming debe quedar plana. Con --legacy-mb
+mide además la vía anterior (response.content + parse_structured_file) sobre un
+fichero más pequeño, para comparar.
+
+Uso:
+    python scripts/bench_parseo_streaming.py [--gb 5] [--legacy-mb 200] [--dir /tmp]
+
+Necesita espacio libre en disco para el fichero generado; se borra al final.
+"""
+import argparse
+import functools
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, str(__import__("pathlib").Path(__file__).resolve().parent.parent))
+
+import requests  # noqa: E402
+
+from app.fetchers.file_download import FileDownloadFetcher  # noqa: E402
+from app.fetchers.file_parsers import parse_structured_file  # noqa: E402
+
+CABECERA = "id;codigo_bdns;fecha_concesion;beneficiario;nif;importe;instrumento;region\n"
+
+
+def fila(i: int) -> str:
+    return (f"B{i:09d};{700000 + i};2025-{1 + i % 12:02d}-{1 + i % 28:02d};"
+            f"ASOCIACIÓN CULTURAL Nº {i % 50000};G{i % 99999999:08d};{(i % 10000) * 13.37:.2f};"
+            f"SUBVENCIÓN Y ENTREGA DINERARIA SIN CONTRAPRESTACIÓN;ES61 - Andalucía\n")
+
+
+def generar(path: str, tamano: int) -> int:
+    """Escribe filas hasta alcanzar `tamano` bytes. Devuelve el nº de filas."""
+    n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(CABECERA)
+        escrito = len(CABECERA)
+        while escrito < tamano:
+            bloque = "".join(fila(i) for i in range(n, n + 10_000))
+            f.write(bloque)
+            escrito += len(bloque.encode("utf-8"))
+            n += 10_000
+    return n
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for linea in f:
+            if linea.startswith("VmRSS:"):
+                return int(linea.split()[1]) / 1024
+    return 0.0
+
+
+class _Silencioso(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def servir(directorio: str):
+    handler = functools.partial(_Silencioso, directory=directorio)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def streaming(url: str, filas: int) -> None:
+    fetcher = FileDownloadFetcher({"url": url, "format": "csv", "batch_size": "1000", "timeout": "600"})
+    base = rss_mb()
+    pico, total, hito = base, 0, 0.1
+    t0 = time.perf_counter()
+    for lote in fetcher.stream():
+        total += len(lote)
+        if total >= filas * hito:
+            actual = rss_mb()
+            pico = max(pico, actual)
+            print(f"  {hito:>4.0%}  {total:>11,} filas  RSS {actual:8.1f} MB")
+            hito += 0.1
+    dt = time.perf_counter() - t0
+    pico = max(pico, rss_mb())
+    print(f"  streaming: {total:,} filas en {dt:.1f}s ({total / dt:,.0f} filas/s), "
+          f"RSS inicial {base:.1f} MB, pico {pico:.1f} MB")
+
+
+def legacy(url: str) -> None:
+    base = rss_mb()
+    t0 = time.perf_counter()
+    contenido = requests.get(url, timeout=600).content
+    registros = parse_structured_file(contenido, "csv", {})
+    dt = time.perf_counter() - t0
+    print(f"  completo:  {len(registros):,} filas en {dt:.1f}s, "
+          f"RSS inicial {base:.1f} MB, final {rss_mb():.1f} MB")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--gb", type=float, default=5.0, help="tamaño del CSV para la vía en streaming")
+    ap.add_argument("--legacy-mb", type=float, default=0, help="si > 0, mide también la vía completa")
+    ap.add_argument("--dir", default=None, help="directorio para el fichero generado")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="odm_bench_csv_", dir=args.dir)
+    server = servir(tmp)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        print(f"Generando CSV de {args.gb:g} GB en {tmp}...")
+        filas = generar(os.path.join(tmp, "grande.csv"), int(args.gb * 1e9))
+        streaming(f"{base_url}/grande.csv", filas)
+        if args.legacy_mb:
+            os.remove(os.path.join(tmp, "grande.csv"))
+            filas = generar(os.path.join(tmp, "legacy.csv"), int(args.legacy_mb * 1e6))
+            streaming(f"{base_url}/legacy.csv", filas)
+            legacy(f"{base_url}/legacy.csv")
+    finally:
+        server.shutdown()
+        shutil.rmtree(tmp, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
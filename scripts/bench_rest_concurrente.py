@@ -0,0 +1,114 @@
+"""Benchmark de RESTFetcher con peticiones concurrentes (pivot_loop y page_number).
+
+Levanta en local un servidor HTTP que simula la latencia de una API remota
+(--latencia-ms por petición) y recorre con RESTFetcher:
+
+  - un pivot_loop de --pivotes valores (forma del puente DIR3 → BDNS),
+  - una paginación page_number de --paginas páginas,
+
+con max_concurrent_requests = 1 (la vía en serie de siempre) y con cada valor
+de --concurrencia. Verifica que el resultado es idéntico al de la vía en serie
+y reporta tiempo, peticiones/s y aceleración. --rate aplica además
+rate_limit_per_second para ver el techo que impone el token bucket.
+
+Uso:
+    python scripts/bench_rest_concurrente.py [--pivotes 2000] [--paginas 300]
+        [--latencia-ms 80] [--concurrencia 4,16,32] [--rate 0]
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, str(__import__("pathlib").Path(__file__).resolve().parent.parent))
+
+from app.fetchers.rest import RESTFetcher  # noqa: E402
+
+PAGE_SIZE = 50
+
+
+class _ApiLenta(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive: una conexión por hilo cliente
+    wbufsize = 1 << 16              # cabeceras y cuerpo en un solo envío
+    disable_nagle_algorithm = True
+    latencia = 0.08
+    paginas = 300
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        q = {k: v[0] for k, v in parse_qs(urlsplit(self.path).query).items()}
+        time.sleep(self.latencia)
+        if "codigo" in q:
+            cuerpo = {"codigo": q["codigo"], "ids": [f"{q['codigo']}-{i}" for i in range(3)]}
+        else:
+            n = int(q["page"])
+            cuerpo = [{"id": f"{n}-{i}", "importe": i * 1.5} for i in range(PAGE_SIZE)] if n <= self.paginas else []
+        datos = json.dumps(cuerpo).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+
+def servir(latencia: float, paginas: int):
+    _ApiLenta.latencia = latencia
+    _ApiLenta.paginas = paginas
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ApiLenta)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def medir(params: dict):
+    t0 = time.perf_counter()
+    registros = RESTFetcher(params).fetch()
+    return registros, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pivotes", type=int, default=2000)
+    ap.add_argument("--paginas", type=int, default=300)
+    ap.add_argument("--latencia-ms", type=float, default=80)
+    ap.add_argument("--concurrencia", default="4,16,32")
+    ap.add_argument("--rate", type=float, default=0, help="rate_limit_per_second (0 = sin límite)")
+    args = ap.parse_args()
+
+    server = servir(args.latencia_ms / 1000, args.paginas)
+    url = f"http://127.0.0.1:{server.server_address[1]}/api"
+    escenarios = {
+        f"pivot_loop ({args.pivotes} valores)": (
+            {"url": url, "pagination": "pivot_loop", "pivot_param": "codigo",
+             "pivot_values": json.dumps([f"EA{i:07d}" for i in range(args.pivotes)])},
+            args.pivotes),
+        f"page_number ({args.paginas} páginas)": (
+            {"url": url, "pagination": "page_number", "page_size": str(PAGE_SIZE)},
+            args.paginas + 1),
+    }
+    niveles = [int(c) for c in args.concurrencia.split(",") if c.strip()]
+    try:
+        for nombre, (params, peticiones) in escenarios.items():
+            print(f"\n{nombre}, latencia {args.latencia_ms:g} ms")
+            base, t_base = medir(params)
+            print(f"  {'en serie':<14} {t_base:8.2f}s  {peticiones / t_base:8.1f} pet/s")
+            for n in niveles:
+                extra = {"max_concurrent_requests": str(n)}
+                if args.rate:
+                    extra["rate_limit_per_second"] = str(args.rate)
+                registros, dt = medir({**params, **extra})
+                igual = "idéntico" if registros == base else "¡DISTINTO!"
+                print(f"  {f'{n} en vuelo':<14} {dt:8.2f}s  {peticiones / dt:8.1f} pet/s  "
+                      f"x{t_base / dt:5.1f}  {igual}")
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
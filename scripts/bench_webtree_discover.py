@@ -0,0 +1,148 @@
+"""Benchmark de WebTreeFetcher.discover sobre un portal sintético de ~10k páginas.
+
+Levanta en local un servidor HTTP que genera al vuelo un árbol de secciones
+(--ramas hijos por página, --niveles de profundidad: 10 y 4 → 11.111 páginas),
+con páginas de tamaño realista (menú, migas, pie, enlaces de vuelta y con
+fragmento) y 3 ficheros enlazados por página, y mide:
+
+  1. Extracción de enlaces: BeautifulSoup(html.parser) + select (lo de antes)
+     frente a navigation.extract_links (lxml) sobre una muestra de páginas.
+  2. El crawl completo con max_concurrent_requests = 1 (en serie) y con cada
+     valor de --concurrencia (páginas en vuelo por dominio), con
+     --latencia-ms por página. Verifica que las hojas coinciden con la vía en
+     serie.
+
+Uso:
+    python scripts/bench_webtree_discover.py [--ramas 10] [--niveles 4]
+        [--latencia-ms 20] [--concurrencia 8,32] [--sin-serie]
+"""
+import argparse
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urljoin
+
+sys.path.insert(0, str(__import__("pathlib").Path(__file__).resolve().parent.parent))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from app.fetchers.navigation import extract_links  # noqa: E402
+from app.fetchers.web_tree_fetcher import WebTreeFetcher  # noqa: E402
+
+
+def pagina(path: str, ramas: int, niveles: int) -> bytes:
+    partes = [p for p in path.split("/") if p][1:]
+    menu = "".join(f'<li><a href="/portal/s{i}/">Área {i}</a></li>' for i in range(ramas))
+    migas = "".join(f'<a href="/portal/{"/".join(partes[:k + 1])}/">{p}</a> › ' for k, p in enumerate(partes))
+    hijos = ""
+    if len(partes) < niveles:
+        hijos = "".join(f'<li><a href="s{i}/">Sección {"-".join(partes + [str(i)])}</a></li>'
+                        for i in range(ramas))
+    nivel = "-".join(partes) or "raiz"
+    ficheros = "".join(f'<li><a href="datos_{nivel}_{y}.xlsx" title="Descargar">Datos {y} <span>(XLSX)</span></a></li>'
+                       for y in (2022, 2023, 2024))
+    texto = "".join(f"<p>Párrafo {i} de la sección {nivel}: información municipal, transparencia "
+                    f"y datos abiertos del ayuntamiento.</p>" for i in range(25))
+    return (f'<!DOCTYPE html><html lang="es"><head><meta charset="utf-8"><title>{nivel}</title></head>'
+            f'<body><header><nav><ul>{menu}</ul></nav></header><div class="migas">{migas}</div>'
+            f'<main><a href="#contenido">Saltar</a><a href="../">Subir</a><ul>{hijos}</ul>'
+            f'<ul class="ficheros">{ficheros}</ul>{texto}</main>'
+            f'<footer><a href="/aviso-legal">Aviso legal</a><a href="https://externo.example/">Externo</a>'
+            f'</footer></body></html>').encode()
+
+
+class _Portal(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = 1 << 16
+    disable_nagle_algorithm = True
+    latencia = 0.02
+    ramas = 10
+    niveles = 4
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(type(self).latencia)
+        if not self.path.endswith("/"):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        cuerpo = pagina(self.path, type(self).ramas, type(self).niveles)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+
+def bs4_links(html: str, base: str):
+    soup = BeautifulSoup(html, "html.parser")
+    return [(urljoin(base, a.get("href")), " ".join(a.get_text(" ", strip=True).split()))
+            for a in soup.select("a[href]") if a.get("href")]
+
+
+def bench_extraccion(ramas: int, niveles: int, n: int = 300):
+    muestras = [(f"/portal/s{i % ramas}/s{(i // ramas) % ramas}/", ) for i in range(n)]
+    htmls = [(pagina(p, ramas, niveles).decode(), f"http://portal.test{p}") for (p,) in muestras]
+    t0 = time.perf_counter()
+    antes = [bs4_links(h, b) for h, b in htmls]
+    t_bs4 = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    ahora = [extract_links(h, b) for h, b in htmls]
+    t_lxml = time.perf_counter() - t0
+    assert antes == ahora, "lxml y html.parser no extraen los mismos enlaces"
+    print(f"Extracción de enlaces ({n} páginas de {len(htmls[0][0]) // 1024} KB):")
+    print(f"  html.parser + select   {t_bs4 / n * 1000:6.2f} ms/página")
+    print(f"  extract_links (lxml)   {t_lxml / n * 1000:6.2f} ms/página   x{t_bs4 / t_lxml:.1f}")
+
+
+def crawl(root: str, conc: int):
+    fetcher = WebTreeFetcher({"root_url": root, "page_delay": "0", "max_depth": "10",
+                              "max_concurrent_requests": str(conc)})
+    t0 = time.perf_counter()
+    hojas = fetcher.discover()
+    dt = time.perf_counter() - t0
+    paginas = fetcher.current_state.get("pages_seen", 0)
+    print(f"  {conc:>3} en vuelo/dominio  {dt:8.1f}s  {paginas:>6} páginas  {paginas / dt:7.1f} pág/s  "
+          f"{len(hojas)} hojas")
+    return dt, hojas
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--ramas", type=int, default=10)
+    ap.add_argument("--niveles", type=int, default=4)
+    ap.add_argument("--latencia-ms", type=float, default=20)
+    ap.add_argument("--concurrencia", default="8,32")
+    ap.add_argument("--sin-serie", action="store_true", help="no medir el crawl en serie (lento)")
+    args = ap.parse_args()
+
+    bench_extraccion(args.ramas, args.niveles)
+
+    _Portal.latencia = args.latencia_ms / 1000
+    _Portal.ramas, _Portal.niveles = args.ramas, args.niveles
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Portal)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    root = f"http://127.0.0.1:{server.server_address[1]}/portal/"
+    total = sum(args.ramas ** k for k in range(args.niveles + 1))
+    print(f"Crawl de {total} páginas, {args.latencia_ms:.0f} ms de latencia por página:")
+    try:
+        base = None
+        if not args.sin_serie:
+            t_serie, base = crawl(root, 1)
+        for conc in [int(c) for c in args.concurrencia.split(",") if c.strip()]:
+            dt, hojas = crawl(root, conc)
+            if base is not None:
+                assert hojas == base, "las hojas no coinciden con el crawl en serie"
+                print(f"      aceleración x{t_serie / dt:.1f}")
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
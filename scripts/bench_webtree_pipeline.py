@@ -0,0 +1,106 @@
+"""Benchmark de WebTreeFetcher.stream: en serie vs en tubería (descarga + parseo).
+
+Levanta en local un servidor HTTP que sirve --ficheros XLSX de --filas filas
+con --latencia-ms por petición (forma de un hijo promovido de un portal grande)
+y recorre los ficheros con WebTreeFetcher:
+
+  - en serie (lo de siempre: descarga, parsea, siguiente),
+  - en tubería con max_concurrent_requests = --descargas (parseo en el hilo
+    principal mientras siguen las descargas),
+  - además con num_workers = --procesos (parseo en pool de procesos).
+
+Verifica que los registros (y su orden) coinciden con la vía en serie y reporta
+tiempos y aceleración. La ganancia del pool de procesos depende de los núcleos
+disponibles (os.cpu_count()).
+
+Uso:
+    python scripts/bench_webtree_pipeline.py [--ficheros 60] [--filas 3000]
+        [--latencia-ms 150] [--descargas 8] [--procesos 4]
+"""
+import argparse
+import io
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, str(__import__("pathlib").Path(__file__).resolve().parent.parent))
+
+from app.fetchers.web_tree_fetcher import WebTreeFetcher  # noqa: E402
+
+
+def xlsx(filas: int, semilla: int) -> bytes:
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(["id", "municipio", "importe", "fecha"])
+    for i in range(filas):
+        ws.append([i, f"Municipio {(i * 7 + semilla) % 500}", round(i * 1.37 + semilla, 2), f"2024-{i % 12 + 1:02d}-01"])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+class _Portal(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = 1 << 16
+    disable_nagle_algorithm = True
+    latencia = 0.15
+    ficheros = {}
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(type(self).latencia)
+        cuerpo = type(self).ficheros[self.path.rsplit("/", 1)[-1]]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+
+def medir(nombre: str, urls, **extra):
+    fetcher = WebTreeFetcher({"root_url": urls[0], "_matched_urls": urls, "batch_size": "1000", **extra})
+    t0 = time.perf_counter()
+    filas = [r for lote in fetcher.stream() for r in lote]
+    dt = time.perf_counter() - t0
+    print(f"  {nombre:<34} {dt:7.2f}s  {len(filas):>8} registros")
+    return dt, filas
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--ficheros", type=int, default=60)
+    ap.add_argument("--filas", type=int, default=3000)
+    ap.add_argument("--latencia-ms", type=float, default=150)
+    ap.add_argument("--descargas", type=int, default=8)
+    ap.add_argument("--procesos", type=int, default=4)
+    args = ap.parse_args()
+
+    print(f"Generando {args.ficheros} XLSX de {args.filas} filas...")
+    _Portal.ficheros = {f"serie_{i:03d}.xlsx": xlsx(args.filas, i) for i in range(args.ficheros)}
+    _Portal.latencia = args.latencia_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Portal)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}/portal"
+    urls = [f"{base}/{nombre}" for nombre in sorted(_Portal.ficheros)]
+    print(f"Latencia {args.latencia_ms:.0f} ms/fichero, {os.cpu_count()} CPU")
+    try:
+        t_serie, serie = medir("en serie", urls)
+        t_io, io_ = medir(f"tubería, {args.descargas} descargas", urls,
+                          max_concurrent_requests=str(args.descargas))
+        t_pp, pp = medir(f"tubería + {args.procesos} procesos de parseo", urls,
+                         max_concurrent_requests=str(args.descargas), num_workers=str(args.procesos))
+        assert io_ == serie and pp == serie, "la tubería no reproduce la vía en serie"
+        print(f"  aceleración: descargas x{t_serie / t_io:.1f}, descargas+procesos x{t_serie / t_pp:.1f}")
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
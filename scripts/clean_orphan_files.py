@@ -1,10 +1,12 @@
 """
 Detecta y elimina archivos huérfanos en data/ que no tienen referencia en BD.
 
-Tres categorías:
+Cuatro categorías:
   - data/datasets/{resource_id}/{dataset_id}/  → huérfano si dataset_id no está en BD
   - data/staging/{resource_id}/{execution_id}.jsonl → huérfano si execution_id no está en BD
   - data/logs/{execution_id}.log              → huérfano si execution_id no está en BD
+  - data/blobs/{sha[:2]}/{sha}.jsonl*         → huérfano si ningún dataset lo enlaza
+    (los que liberen los datasets borrados en esta pasada aparecen en la siguiente)
 
 Uso (en el contenedor app):
     docker exec -it odmgr_app python scripts/clean_orphan_files.py
@@ -20,6 +22,7 @@ sys.path.insert(0, BASE_DIR)
 
 from app.database import SessionLocal
 from app.models import Dataset, ResourceExecution
+from app.utils.blob_store import BLOB_ROOT, SIDECARS, orphan_blobs
 
 
 def _human(size: int) -> str:
@@ -47,7 +50,7 @@ def collect_orphans(db) -> dict:
     known_dataset_ids = {str(r[0]) for r in db.query(Dataset.id).all()}
     known_execution_ids = {str(r[0]) for r in db.query(ResourceExecution.id).all()}
 
-    orphans = {"datasets": [], "staging": [], "logs": []}
+    orphans = {"datasets": [], "staging": [], "logs": [], "blobs": []}
 
     # ── data/datasets/{resource_id}/{dataset_id}/ ───────────────────────────
     datasets_root = os.path.join(BASE_DIR, "data", "datasets")
@@ -92,6 +95,12 @@ def collect_orphans(db) -> dict:
                     size = entry.stat().st_size
                     orphans["logs"].append((entry.path, size))
 
+    # ── data/blobs/ (contenido compartido por versiones idénticas) ──────────
+    for blob in orphan_blobs(os.path.join(BASE_DIR, BLOB_ROOT)):
+        for path in (blob,) + tuple(blob + s for s in SIDECARS):
+            if os.path.exists(path):
+                orphans["blobs"].append((path, os.path.getsize(path)))
+
     return orphans
 
 
@@ -122,6 +131,7 @@ def main():
         "datasets": "Datasets sin registro en BD",
         "staging":  "Staging de ejecuciones eliminadas",
         "logs":     "Logs de ejecuciones eliminadas",
+        "blobs":    "Blobs de datos sin datasets que los enlacen",
     }
 
     for category, items in orphans.items():
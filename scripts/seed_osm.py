@@ -305,6 +305,55 @@ PARAMS_DEF = [
             "https://maps.mail.ru/osm/tools/overpass/api/interpreter"
         ),
     },
+    {
+        "param_name": "tiling",
+        "required": False,
+        "data_type": "enum",
+        "default_value": "off",
+        "enum_values": ["off", "quadtree"],
+        "description": (
+            "Teselado del bbox para áreas grandes. off = una sola query; "
+            "quadtree = una query por tesela, en paralelo (max_concurrent_requests) "
+            "entre los mirrors, dividiendo en cuatro la que Overpass corte. "
+            "Emite por tesela y reanuda desde las teselas pendientes."
+        ),
+    },
+    {
+        "param_name": "tile_seed",
+        "required": False,
+        "data_type": "string",
+        "default_value": "bbox",
+        "enum_values": None,
+        "description": (
+            "Teselas de partida con tiling=quadtree: 'bbox' (rejilla sobre el bbox) "
+            "o un tipo de demarcación ('provincia', 'comunidad', 'isla'...) que corte el bbox."
+        ),
+    },
+    {
+        "param_name": "tile_max_deg",
+        "required": False,
+        "data_type": "number",
+        "default_value": 1.0,
+        "enum_values": None,
+        "description": "Lado máximo en grados de una tesela de partida (default: 1.0).",
+    },
+    {
+        "param_name": "tile_min_deg",
+        "required": False,
+        "data_type": "number",
+        "default_value": 0.05,
+        "enum_values": None,
+        "description": "Lado mínimo en grados al subdividir una tesela (default: 0.05).",
+    },
+    {
+        "param_name": "stream_json",
+        "required": False,
+        "data_type": "enum",
+        "default_value": "auto",
+        "enum_values": ["auto", "true", "false"],
+        "description": "Leer la respuesta de Overpass por trozos (auto: sin Content-Length o "
+                       "por encima de stream_json_threshold_mb).",
+    },
 ]
 
 for pdef in PARAMS_DEF:
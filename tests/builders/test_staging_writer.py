@@ -0,0 +1,88 @@
+"""Tests del StagingWriter: checksum, schema, índice y dedup calculados en una
+sola pasada deben coincidir con releer el fichero publicado."""
+import hashlib
+import json
+
+from app.builders.staging_writer import StagingWriter
+from app.utils.line_index import index_path, iter_lines_from, open_line_index
+from app.utils.schema_inference import infer_schema
+
+
+def _registros(n):
+    for i in range(n):
+        reg = {"id": str(i % 7), "n": i, "fecha": f"2025-01-{1 + i % 28:02d}"}
+        if i % 3 == 0:
+            reg["extra"] = "solo algunos"
+        yield reg
+
+
+def _leer(path):
+    with open(path, "rb") as f:
+        datos = f.read()
+    return datos, [json.loads(l) for l in datos.splitlines() if l.strip()]
+
+
+def test_publica_por_rename_con_metadatos_del_fichero(tmp_path):
+    staging = tmp_path / "exec.jsonl"
+    destino = tmp_path / "data.jsonl"
+    with StagingWriter(str(staging)) as w:
+        for reg in _registros(100):
+            w.write(reg)
+    w.publish(str(destino))
+
+    datos, filas = _leer(destino)
+    assert not staging.exists()
+    assert w.count == 100 == len(filas)
+    assert w.checksum == hashlib.sha256(datos).hexdigest()
+    assert w.schema() == infer_schema(filas)
+    assert set(w.schema()["properties"]) == {"id", "n", "fecha", "extra"}
+    assert "extra" not in w.schema()["required"]
+    assert open_line_index(str(destino)).lines == 100
+    assert json.loads(next(iter_lines_from(str(destino), 42)))["n"] == 42
+
+
+def test_dedup_reescribe_solo_con_duplicados(tmp_path):
+    staging = tmp_path / "exec.jsonl"
+    with StagingWriter(str(staging), dedup_key="id") as w:
+        for reg in _registros(50):
+            w.write(reg)
+        w.write({"n": -1})                       # sin clave: se conserva
+    assert w.dedup() == 8
+    destino = tmp_path / "data.jsonl"
+    w.publish(str(destino))
+
+    datos, filas = _leer(destino)
+    assert w.checksum == hashlib.sha256(datos).hexdigest()
+    assert w.schema() == infer_schema(filas)
+    por_id = {f.get("id"): f["n"] for f in filas}
+    # id "0": n ∈ {0,7,...,49}; la fecha máxima (día 22) la tienen n=21 y n=49 → gana la última
+    assert por_id["0"] == 49 and por_id["1"] == 22 and por_id[None] == -1
+    assert open_line_index(str(destino)).lines == 8
+
+    sin_duplicados = tmp_path / "b.jsonl"
+    with StagingWriter(str(sin_duplicados), dedup_key="id") as w2:
+        for i in range(5):
+            w2.write({"id": i})
+    mtime = sin_duplicados.stat().st_mtime_ns
+    assert w2.dedup() == 5 and sin_duplicados.stat().st_mtime_ns == mtime
+
+
+def test_reanudar_reconstruye_el_estado(tmp_path):
+    staging = tmp_path / "exec.jsonl"
+    pendiente = f"{index_path(staging.name)}.staging*"
+    with StagingWriter(str(staging)) as w:
+        for reg in _registros(30):
+            w.write(reg)
+    assert list(tmp_path.glob(pendiente))
+    w.discard()                                   # pausa
+    # ni el índice de staging ni su temporal quedan en disco
+    assert not list(tmp_path.glob(pendiente))
+
+    with StagingWriter(str(staging), resume=True) as w:
+        w.write({"id": "nuevo", "n": 30, "otro": True})
+    destino = tmp_path / "data.jsonl"
+    w.publish(str(destino))
+    datos, filas = _leer(destino)
+    assert w.count == 31 and w.checksum == hashlib.sha256(datos).hexdigest()
+    assert w.schema() == infer_schema(filas)
+    assert open_line_index(str(destino)).lines == 31
@@ -0,0 +1,54 @@
+"""Fixtures comunes de los tests de fetchers: servidor HTTP local y reloj
+simulado para app/fetchers/concurrency."""
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from app.fetchers import concurrency
+
+
+@pytest.fixture
+def local_server():
+    """`local_server(handler)` arranca un servidor HTTP en 127.0.0.1 con ese
+    handler y devuelve su URL base; se para al acabar el test."""
+    servidores = []
+
+    def arrancar(handler):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servidores.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield arrancar
+    for server in servidores:
+        server.shutdown()
+        server.server_close()
+
+
+class Reloj:
+    """Sustituye a `time` en concurrency: sleep() avanza el reloj en vez de dormir."""
+
+    def __init__(self):
+        self.t = 0.0
+        self.lock = threading.Lock()
+
+    def monotonic(self):
+        return self.t
+
+    def sleep(self, s):
+        # un mínimo de 1 ns: las esperas residuales por redondeo (1e-17 s) no
+        # moverían un reloj float y el bucle de acquire no avanzaría
+        with self.lock:
+            self.t += max(1e-9, s)
+        time.sleep(0)
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    """Reloj simulado instalado en app/fetchers/concurrency."""
+    r = Reloj()
+    monkeypatch.setattr(concurrency, "time", r)
+    return r
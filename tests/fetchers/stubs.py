@@ -0,0 +1,41 @@
+"""Respuesta HTTP falsa para los tests que sustituyen `_request` o `_http`."""
+import json
+
+import requests
+
+
+class FakeResponse:
+    """Lo que usan las especies de requests.Response: cuerpo (`content`, `text`,
+    `json()`), lectura por trozos, `raise_for_status` y `close`. Un `payload` que
+    no sea bytes ni str se serializa como JSON. Sin `content_length` no lleva
+    Content-Length (como las respuestas de Overpass)."""
+
+    def __init__(self, payload=b"", status_code=200, headers=None, content_length=True):
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        elif not isinstance(payload, bytes):
+            payload = json.dumps(payload).encode("utf-8")
+        self.content = payload
+        self.status_code = status_code
+        self.headers = dict(headers or {})
+        if content_length:
+            self.headers["Content-Length"] = str(len(payload))
+        self.leida_por_trozos = False
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code}", response=self)
+
+    def iter_content(self, n):
+        self.leida_por_trozos = True
+        yield from (self.content[i:i + n] for i in range(0, len(self.content), n))
+
+    def close(self):
+        pass
@@ -0,0 +1,144 @@
+"""Lectura de archivos comprimidos en streaming (app/fetchers/archives.py): selección
+de la entrada, recorrido perezoso de miembros y CompressedFileFetcher de punta a
+punta sin cargar el archivo ni la entrada en memoria."""
+import gzip
+import io
+import tarfile
+import tracemalloc
+import zipfile
+
+import pytest
+
+from app.fetchers.archives import (
+    infer_archive_format, iter_members, iter_zip_stream, list_members, open_member, spool_download,
+)
+from app.fetchers.compressed_file import CompressedFileFetcher
+
+CSV = b"a;b\n1;x\n2;y\n3;z\n"
+
+
+def _zip(miembros: dict) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for nombre, datos in miembros.items():
+            zf.writestr(nombre, datos)
+    return buf.getvalue()
+
+
+def _tar_gz(miembros: dict) -> bytes:
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tf:
+        for nombre, datos in miembros.items():
+            info = tarfile.TarInfo(nombre)
+            info.size = len(datos)
+            tf.addfile(info, io.BytesIO(datos))
+    return buf.getvalue()
+
+
+class _Respuesta:
+    def __init__(self, data: bytes):
+        self.raw = io.BytesIO(data)
+        self.headers = {"Content-Length": str(len(data))}
+        self.cerrada = False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        while True:
+            trozo = self.raw.read(chunk_size)
+            if not trozo:
+                return
+            yield trozo
+
+    def close(self):
+        self.cerrada = True
+
+
+def test_inferir_formato():
+    assert infer_archive_format("https://x.test/a.tar.gz?v=1") == "tar.gz"
+    assert infer_archive_format("https://x.test/a.7z") == "7z"
+    assert infer_archive_format("https://x.test/a.csv") == ""
+
+
+@pytest.mark.parametrize("fmt,empaquetar", [("zip", _zip), ("tar.gz", _tar_gz)])
+def test_open_member_selecciona_la_entrada(fmt, empaquetar):
+    archivo = io.BytesIO(empaquetar({"leeme.txt": b"hola", "dir/datos.csv": CSV}))
+    assert sorted(list_members(archivo, fmt)) == ["dir/datos.csv", "leeme.txt"]
+    with open_member(archivo, fmt, "dir/datos.csv") as (nombre, f):
+        assert nombre == "dir/datos.csv" and f.read() == CSV
+    archivo.seek(0)
+    with pytest.raises(ValueError, match="especifica 'entry'"):
+        with open_member(archivo, fmt):
+            pass
+    archivo.seek(0)
+    with pytest.raises(ValueError, match="no encontrada"):
+        with open_member(archivo, fmt, "otro.csv"):
+            pass
+
+
+def test_gz_y_7z():
+    with open_member(io.BytesIO(gzip.compress(CSV)), "gz") as (nombre, f):
+        assert (nombre, f.read()) == ("", CSV)
+    py7zr = pytest.importorskip("py7zr")
+    buf = io.BytesIO()
+    with py7zr.SevenZipFile(buf, "w") as z:
+        z.writestr(CSV, "datos.csv")
+        z.writestr(b"otro", "otro.txt")
+    buf.seek(0)
+    assert [(n, f.read()) for n, f in iter_members(buf, "7z")] == [("datos.csv", CSV), ("otro.txt", b"otro")]
+    buf.seek(0)
+    with open_member(buf, "7z", "otro.txt") as (_, f):
+        assert f.read() == b"otro"
+
+
+def test_iter_members_es_perezoso():
+    archivo = io.BytesIO(_tar_gz({"a.csv": b"1", "b.csv": b"2", "c.csv": b"3"}))
+    miembros = iter_members(archivo, "tar.gz", names=["a.csv", "c.csv"])
+    nombre, f = next(miembros)
+    assert (nombre, f.read()) == ("a.csv", b"1")
+    assert [n for n, _ in miembros] == ["c.csv"]
+
+
+def test_iter_zip_stream_lee_en_orden():
+    datos = _zip({"1.atom": b"<a/>", "2.atom": b"<b/>" * 1000})
+    assert [(n, len(c)) for n, c in iter_zip_stream(io.BytesIO(datos))] == [("1.atom", 4), ("2.atom", 4000)]
+
+
+def test_fetcher_zip_en_streaming():
+    respuesta = _Respuesta(_zip({"datos.csv": CSV}))
+    llamadas = []
+    fetcher = CompressedFileFetcher({"url": "https://x.test/datos.zip", "batch_size": "2"})
+    fetcher._request = lambda *a, **kw: llamadas.append(kw) or respuesta
+    lotes = list(fetcher.stream())
+    assert lotes == [[{"a": "1", "b": "x"}, {"a": "2", "b": "y"}], [{"a": "3", "b": "z"}]]
+    assert llamadas[0]["stream"] is True and respuesta.cerrada
+
+
+def test_fetcher_propose_lista_sin_descomprimir():
+    respuesta = _Respuesta(_tar_gz({"leeme.md": b"-", "datos.csv": CSV}))
+    fetcher = CompressedFileFetcher({"url": "https://x.test/pack.tar.gz"})
+    fetcher._request = lambda *a, **kw: respuesta
+    propuestas = fetcher.propose()
+    assert [p["target_params"]["entry"] for p in propuestas] == ["datos.csv"]
+    assert respuesta.cerrada
+
+
+def test_memoria_acotada_con_una_entrada_grande():
+    fila = b"1234567;registro de prueba bastante repetitivo;12.50;ES61\n"
+    crudo = b"id;texto;importe;region\n" + fila * 200_000           # ~11 MB descomprimido
+    respuesta = _Respuesta(_zip({"grande.csv": crudo}))
+    del crudo
+    fetcher = CompressedFileFetcher({"url": "https://x.test/grande.zip", "batch_size": "500"})
+    fetcher._request = lambda *a, **kw: respuesta
+    tracemalloc.start()
+    total = sum(len(lote) for lote in fetcher.stream())
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert total == 200_000
+    assert pico < 4 * 1024 * 1024
+
+
+def test_spool_download_vuelve_al_principio():
+    with spool_download(_Respuesta(b"x" * 10), chunk_size=3) as f:
+        assert f.read() == b"x" * 10
@@ -88,6 +88,8 @@ def test_modo_zip_con_ventana(monkeypatch):
         status_code = 200
         content = contenido
         def raise_for_status(self): pass
+        def iter_content(self, n): yield from (contenido[i:i + n] for i in range(0, len(contenido), n))
+        def close(self): pass
 
     f = AtomFetcher({"url": "https://x/contratos_2023.zip", "desde": "2023-01-01",
                      "hasta": "2023-12-31", "date_field": "updated"})
@@ -0,0 +1,109 @@
+"""AtomFetcher incremental: iterparse entrada a entrada (ATOM, RSS, entry_tag,
+link rel=next), memoria acotada, y stream() por páginas / lotes de miembro ZIP
+con savepoint reanudable."""
+import io
+import tracemalloc
+import xml.etree.ElementTree as ET
+import zipfile
+
+from app.fetchers.atom import AtomFetcher, _element_to_dict, _iter_entries
+
+from .stubs import FakeResponse
+
+
+def _atom(entradas, siguiente=None):
+    links = f"<link rel='next' href='{siguiente}'/>" if siguiente else ""
+    cuerpo = "".join(
+        f"<entry><id>{i}</id><title>{t}</title><updated>{u}</updated>"
+        f"<link rel='alternate' href='https://x/{i}'/>"
+        f"<cac:Lote xmlns:cac='urn:cac'><cac:Importe moneda='EUR'>{i}00</cac:Importe></cac:Lote></entry>"
+        for i, (t, u) in enumerate(entradas))
+    return (f"<?xml version='1.0' encoding='utf-8'?><feed xmlns='http://www.w3.org/2005/Atom'>"
+            f"<title>Feed</title><link rel='self' href='https://x/'/>{links}{cuerpo}</feed>").encode()
+
+
+def test_iter_entries_igual_que_el_arbol_completo():
+    xml = _atom([("Año ñ", "2024-01-02"), ("B", "2024-01-01")], siguiente="https://x/?p=2")
+    feed = {}
+    entradas = list(_iter_entries(io.BytesIO(xml), feed=feed))
+    ns = "{http://www.w3.org/2005/Atom}"
+    esperado = [_element_to_dict(e) for e in ET.fromstring(xml).findall(f"{ns}entry")]
+    assert entradas == esperado and entradas[0]["title"] == "Año ñ"
+    assert entradas[1]["Lote"]["Importe"] == "100"
+    assert feed["next"] == "https://x/?p=2"
+    planas = list(_iter_entries(io.BytesIO(xml), {"t": "title", "imp": "Lote/Importe@moneda"}))
+    assert planas == [{"t": "Año ñ", "imp": "EUR"}, {"t": "B", "imp": "EUR"}]
+
+
+def test_iter_entries_rss_y_entry_tag():
+    rss = (b"<rss><channel><title>C</title><item><title>uno</title></item>"
+           b"<item><title>dos</title></item></channel></rss>")
+    assert [e["title"] for e in _iter_entries(io.BytesIO(rss))] == ["uno", "dos"]
+    otro = b"<raiz><registro><n>1</n></registro><registro><n>2</n></registro></raiz>"
+    assert list(_iter_entries(io.BytesIO(otro), entry_tag="registro")) == [{"n": "1"}, {"n": "2"}]
+
+
+def test_memoria_no_crece_con_el_documento():
+    xml = _atom([(f"titulo {i} " * 5, "2024-01-01") for i in range(20000)])
+    tracemalloc.start()
+    n = sum(1 for _ in _iter_entries(io.BytesIO(xml)))
+    incremental = tracemalloc.get_traced_memory()[1]
+    tracemalloc.reset_peak()
+    arbol = ET.fromstring(xml)
+    completo = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert n == 20000 and len(arbol) > 20000
+    assert incremental < completo / 10
+
+
+def test_stream_rel_next_por_paginas_y_reanuda(monkeypatch):
+    paginas = {
+        "https://x/feed": _atom([("a", "2024-03-03"), ("b", "2024-03-02")], "https://x/feed?p=2"),
+        "https://x/feed?p=2": _atom([("c", "2024-03-01"), ("d", "2024-02-20")], "https://x/feed?p=3"),
+        "https://x/feed?p=3": _atom([("e", "2024-02-10")]),
+    }
+    pedidas = []
+
+    def _request(self, session, method, url, **kw):
+        pedidas.append(url)
+        return FakeResponse(paginas[url])
+
+    monkeypatch.setattr(AtomFetcher, "_request", _request)
+    params = {"url": "https://x/feed", "pagination": "rel_next", "field_map": '{"t": "title"}'}
+    f = AtomFetcher(params)
+    lotes = f.stream()
+    assert next(lotes) == [{"t": "a"}, {"t": "b"}]
+    assert f.current_state == {"next_url": "https://x/feed?p=2", "pages_done": 1}
+    lotes.close()
+    reanudado = AtomFetcher({**params, "_resume_state": f.current_state})
+    assert [r["t"] for b in reanudado.stream() for r in b] == ["c", "d", "e"]
+    assert pedidas == ["https://x/feed", "https://x/feed?p=2", "https://x/feed?p=3"]
+
+    # ventana temporal: la frontera corta la paginación
+    pedidas.clear()
+    recs = AtomFetcher({**params, "date_field": "u", "desde": "2024-03-01",
+                        "field_map": '{"t": "title", "u": "updated"}'}).fetch()
+    assert [r["t"] for r in recs] == ["a", "b", "c"] and len(pedidas) == 2
+
+
+def test_stream_zip_por_lotes_con_savepoint(monkeypatch):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        z.writestr("2023_01.atom", _atom([(f"enero-{i}", "2023-01-10") for i in range(5)]))
+        z.writestr("2023_02.atom", _atom([(f"febrero-{i}", "2023-02-10") for i in range(3)]))
+    monkeypatch.setattr(AtomFetcher, "_request", lambda self, s, m, u, **k: FakeResponse(buf.getvalue()))
+    params = {"url": "https://x/2023.zip", "batch_size": "2", "field_map": '{"t": "title"}'}
+
+    f = AtomFetcher(params)
+    lotes = f.stream()
+    vistos = [r["t"] for r in next(lotes)] + [r["t"] for r in next(lotes)]
+    assert vistos == ["febrero-0", "febrero-1", "febrero-2"]   # miembros en orden inverso
+    assert f.current_state == {"members_done": 1, "entries_done": 0}
+    vistos += [r["t"] for r in next(lotes)]
+    assert f.current_state == {"members_done": 1, "entries_done": 2}
+    lotes.close()
+
+    resto = AtomFetcher({**params, "_resume_state": f.current_state}).stream()
+    vistos += [r["t"] for b in resto for r in b]
+    assert vistos == [f"febrero-{i}" for i in range(3)] + [f"enero-{i}" for i in range(5)]
+    assert len(AtomFetcher(params).fetch()) == 8
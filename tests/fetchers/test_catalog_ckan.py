@@ -2,11 +2,7 @@
 Sin red: se mockea _request con páginas CKAN canónicas."""
 from app.fetchers.catalog import CatalogFetcher
 
-
-class _Resp:
-    def __init__(self, data): self._d = data
-    def raise_for_status(self): pass
-    def json(self): return self._d
+from .stubs import FakeResponse
 
 
 def _ckan_fetcher(pages):
@@ -23,7 +19,7 @@ def _ckan_fetcher(pages):
     seq = {"i": 0}
     def fake(_none, _method, _url, params=None, headers=None, timeout=None):
         i = seq["i"]; seq["i"] += 1
-        return _Resp(pages[i] if i < len(pages) else {"success": True, "result": {"results": []}})
+        return FakeResponse(pages[i] if i < len(pages) else {"success": True, "result": {"results": []}})
     f._request = fake
     return f
 
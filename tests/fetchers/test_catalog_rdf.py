@@ -2,6 +2,8 @@
 mismo filtro/contrato que datosgob y ckan. Sin red: _request mockeado."""
 from app.fetchers.catalog import CatalogFetcher
 
+from .stubs import FakeResponse
+
 RDF_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
 <rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
          xmlns:dcat="http://www.w3.org/ns/dcat#"
@@ -34,14 +36,10 @@ RDF_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
   </dcat:Dataset>
 </rdf:RDF>"""
 
-class _Resp:
-    content = RDF_XML
-    def raise_for_status(self): pass
-
 def _f():
     f = CatalogFetcher({"catalog_type": "dcat-rdf", "catalog_api": "https://portal/feed.rdf",
                         "formats": "csv", "child_fetcher": "File Download", "max_pages": "1"})
-    f._request = lambda *a, **k: _Resp()
+    f._request = lambda *a, **k: FakeResponse(RDF_XML)
     return f
 
 def test_rdf_extrae_asociaciones_y_filtra():
@@ -57,6 +55,6 @@ def test_rdf_excluye_no_asociaciones():
     # con formats=csv,json sigue habiendo 1 candidato tras prefer? sin prefer: 2 dists del mismo dataset
     f = CatalogFetcher({"catalog_type": "dcat-rdf", "catalog_api": "https://portal/feed.rdf",
                         "formats": "csv,json", "child_fetcher": "File Download", "max_pages": "1"})
-    f._request = lambda *a, **k: _Resp()
+    f._request = lambda *a, **k: FakeResponse(RDF_XML)
     urls = sorted(p["target_params"]["url"] for p in f.propose())
     assert urls == ["https://x/asociaciones.csv", "https://x/asociaciones.json"]
@@ -0,0 +1,173 @@
+"""Etapa de detalle (app/fetchers/enrichment.py): concurrencia, dedup de URLs
+entre filas y pivotes, caché en disco con revalidación condicional y uso desde
+SearchLoopHtmlFetcher y HTMLFetcher. Contra un portal listado→detalle local."""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from app.fetchers import enrichment
+from app.fetchers.html_generic import HTMLFetcher
+from app.fetchers.searchloop_html import SearchLoopHtmlFetcher
+
+
+class _Portal(BaseHTTPRequestHandler):
+    """/lista?valor=a (o /a/lista) → filas 1-3, valor=b → filas 3-5; /detalle/N
+    con ETag."""
+    latencia = 0.03
+    pedidas = []
+    version = {}
+    lock = threading.Lock()
+    en_vuelo = 0
+    pico = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _html(self, cuerpo, etag=None):
+        datos = f"<html><body>{cuerpo}</body></html>".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_GET(self):
+        cls = type(self)
+        partes = urlsplit(self.path)
+        if partes.path.endswith("/lista"):
+            valor = parse_qs(partes.query).get("valor", [partes.path.split("/")[1]])[0]
+            ids = range(1, 4) if valor == "a" else range(3, 6)
+            filas = "".join(f'<tr><td>{i}</td><td><a href="detalle/{i}">ver</a></td></tr>' for i in ids)
+            self._html(f"<table><tr><th>id</th><th>enlace</th></tr>{filas}</table>")
+            return
+        n = partes.path.rsplit("/", 1)[-1]
+        etag = f'"{n}-{cls.version.get(n, 0)}"'
+        if self.headers.get("If-None-Match") == etag:
+            cls.pedidas.append((n, 304))
+            self.send_response(304)
+            self.end_headers()
+            return
+        cls.pedidas.append((n, 200))
+        with cls.lock:
+            cls.en_vuelo += 1
+            cls.pico = max(cls.pico, cls.en_vuelo)
+        time.sleep(cls.latencia)
+        with cls.lock:
+            cls.en_vuelo -= 1
+        self._html(f'<p><strong>Titular:</strong> Entidad {n} v{cls.version.get(n, 0)}</p>'
+                   f'<span class="cif">B{n}</span>', etag=etag)
+
+
+@pytest.fixture
+def portal(tmp_path, monkeypatch, local_server):
+    monkeypatch.setattr(enrichment, "CACHE_ROOT", str(tmp_path / "detalle"))
+    _Portal.pedidas, _Portal.version, _Portal.pico = [], {}, 0
+    return local_server(_Portal)
+
+
+DETALLE = '{"field_selectors": {"cif": "span.cif"}, "field_label_selectors": {"titular": {"label": "Titular"}}}'
+
+
+def _searchloop(base, **extra):
+    return SearchLoopHtmlFetcher({
+        "url": f"{base}/lista", "search_field_name": "valor", "search_field_values": "a,b",
+        "search_action_url": f"{base}/lista", "rows_selector": "table tr", "row_link_selector": "a",
+        "delay_between_searches": "0", "detail_delay": "0", "detail_level": DETALLE, **extra})
+
+
+def test_detalle_dedup_entre_pivotes_y_concurrente(portal):
+    serie = _searchloop(portal).fetch()
+    assert _Portal.pico == 1
+    assert len(serie) == 6 and sorted(n for n, _ in _Portal.pedidas) == ["1", "2", "3", "4", "5"]
+    assert {r["id"]: r["titular"] for r in serie}["3"] == "Entidad 3 v0"
+    assert all(r["cif"] == f"B{r['id']}" for r in serie)
+
+    _Portal.pedidas, _Portal.pico = [], 0
+    f = _searchloop(portal, max_concurrent_requests="4")
+    paralelo = f.fetch()
+    assert 1 < _Portal.pico <= 4
+    assert sorted(serie, key=str) == sorted(paralelo, key=str)
+    assert len(_Portal.pedidas) == 5
+    assert f.profile_stats["detail_enrichment"]["deduped"] == 1
+
+
+def test_detalles_en_vuelo_acotados_entre_trabajadores():
+    """Varios trabajadores de pivote enriquecen a la vez: entre todos no pasan
+    de max_workers detalles en vuelo (no max_workers por trabajador)."""
+    lock, en_vuelo, pico = threading.Lock(), [0], [0]
+
+    class _R:
+        status_code = 200
+        headers = {}
+        content = b"<p>x</p>"
+        text = "<p>x</p>"
+
+    def fetch(url, headers):
+        with lock:
+            en_vuelo[0] += 1
+            pico[0] = max(pico[0], en_vuelo[0])
+        time.sleep(0.02)
+        with lock:
+            en_vuelo[0] -= 1
+        return _R()
+
+    enricher = enrichment.DetailEnricher(lambda html: {"ok": True}, {}, max_workers=3)
+    lotes = [[{"_detail_url": f"http://x/{w}/{i}"} for i in range(6)] for w in range(3)]
+    hilos = [threading.Thread(target=enricher.enrich, args=(lote, fetch)) for lote in lotes]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert all(r["ok"] for lote in lotes for r in lote)
+    assert 1 < pico[0] <= 3
+
+
+def test_cache_en_disco_revalida_y_solo_baja_lo_cambiado(portal):
+    _searchloop(portal, detail_cache="true").fetch()
+    _Portal.pedidas = []
+    _Portal.version = {"4": 1}
+    f = _searchloop(portal, detail_cache="true")
+    recs = f.fetch()
+    assert sorted(_Portal.pedidas) == [("1", 304), ("2", 304), ("3", 304), ("4", 200), ("5", 304)]
+    assert {r["id"]: r["titular"] for r in recs}["4"] == "Entidad 4 v1"
+    stats = f.profile_stats["detail_enrichment"]
+    assert (stats["fetched"], stats["revalidated"], stats["deduped"]) == (1, 4, 1)
+
+    # copia reciente con max_age: ni siquiera se pregunta
+    _Portal.pedidas = []
+    _searchloop(portal, detail_cache="true", detail_cache_max_age="1").fetch()
+    assert _Portal.pedidas == []
+
+    # otros selectores → otra caché
+    _Portal.pedidas = []
+    _searchloop(portal, detail_cache="true",
+                detail_level='{"field_selectors": {"cif": "span.cif"}}').fetch()
+    assert all(status == 200 for _, status in _Portal.pedidas) and len(_Portal.pedidas) == 5
+
+
+def test_htmlfetcher_detalle_con_enlaces_relativos(portal):
+    f = HTMLFetcher({
+        "url": f"{portal}/lista?valor=b", "extraction": "fields", "rows_selector": "tr:has(td)",
+        "field_selectors": '{"id": "td"}',
+        "field_attr_selectors": '{"_detail_url": {"selector": "a", "attr": "href"}}',
+        "detail_level": '{"field_selectors": {"cif": "span.cif"}}', "detail_delay": "0"})
+    recs = f.fetch()
+    assert [(r["id"], r["cif"]) for r in recs] == [("3", "B3"), ("4", "B4"), ("5", "B5")]
+    assert recs[0]["_detail_url"] == f"{portal}/detalle/3"
+
+
+def test_htmlfetcher_detalle_relativo_a_la_url_pedida_no_a_la_plantilla(portal):
+    f = HTMLFetcher({
+        "navigation": "pivot", "url_template": portal + "/{value}/lista", "pivot_values": "b",
+        "extraction": "fields", "rows_selector": "tr:has(td)", "field_selectors": '{"id": "td"}',
+        "field_attr_selectors": '{"_detail_url": {"selector": "a", "attr": "href"}}',
+        "detail_level": '{"field_selectors": {"cif": "span.cif"}}', "detail_delay": "0",
+        "delay_between_pages": "0"})
+    recs = f.fetch()
+    assert [r["_detail_url"] for r in recs] == [f"{portal}/b/detalle/{i}" for i in (3, 4, 5)]
+    assert [r["cif"] for r in recs] == ["B3", "B4", "B5"]
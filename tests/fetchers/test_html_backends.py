@@ -0,0 +1,100 @@
+"""Motores de parseo HTML (html_parser = html.parser | lxml): mismos registros y
+enlaces con los dos sobre páginas capturadas (tests/fixtures/html), y vuelta a
+html.parser cuando un selector queda fuera del subconjunto traducible a XPath."""
+from pathlib import Path
+
+import pytest
+
+from app.fetchers import html_extraction
+from app.fetchers.html_extraction import css_to_xpath, extract_html, supports_css
+from app.fetchers.navigation import extract_links
+
+FIXTURES = Path(__file__).resolve().parent.parent / "fixtures" / "html"
+
+CASOS = [
+    ("listado_ayudas.html", "table", {"rows_selector": "table#tabla tr"}),
+    ("listado_ayudas.html", "fields", {
+        "rows_selector": "table.resultados > tr.fila",
+        "field_selectors": {"expediente": "td:first-child a", "beneficiario": "td:nth-child(2)",
+                            "importe": "td.importe", "fecha": "td:last-child"},
+        "field_attr_selectors": {"_detail_url": {"selector": "a[href]", "attr": "href"},
+                                 "titulo": {"selector": "a[title]", "attr": "title"}},
+        "field_attrs": {"id": "data-id"},
+    }),
+    ("listado_ayudas.html", "fields", {
+        "rows_selector": "tr[data-id] td a[href$='.pdf'], tr.par a[href^=\"/ficha\"]",
+        "field_self_text": "nombre",
+        "field_attr_selectors": {"url": {"selector": "*", "attr": "href"}},
+    }),
+    ("listado_ayudas.html", "fields", {
+        "field_selectors": {"titulo": "#cabecera h1", "pagina": "form#paginacion input[name=pagina]",
+                            "script": "head script", "siguiente": ".paginador a.siguiente"},
+        "field_attr_selectors": {"token": {"selector": "input[name='token']", "attr": "value"}},
+    }),
+    ("ficha_detalle.html", "fields", {
+        "field_selectors": {"nombre": "h2.titulo", "organo": "dl.datos dd:nth-of-type(1)",
+                            "todo": "#ficha", "falta": "div.no-existe"},
+        "field_all_selectors": {"etiquetas": "ul.etiquetas .tag", "datos": "dl > *"},
+        "field_all_separator": "; ",
+        "field_label_selectors": {"email": {"container": "#ficha", "label": "email"},
+                                  "telefono": {"container": "p.contacto", "label": "Teléfono"},
+                                  "fecha": {"container": "dl", "label": "de resolución"}},
+        "field_attr_selectors": {"pdf": {"selector": "a[lang|=es]", "attr": "href"}},
+    }),
+    ("portal_datos.html", "fields", {
+        "rows_selector": "section.serie li",
+        "field_selectors": {"nombre": "a", "serie": "h3"},
+        "field_attr_selectors": {"url": {"selector": "a.descarga", "attr": "href"},
+                                 "icono": {"selector": "img[alt]", "attr": "src"}},
+    }),
+    ("portal_datos.html", "fields", {
+        "rows_selector": "li",
+        "field_selectors": {"menu": "nav#menu > ul > li > a", "fuera": "main li a",
+                            "clase": "[class~=descarga][class~=csv]", "contiene": "a[href*=padron]"},
+    }),
+]
+
+
+@pytest.mark.parametrize("fichero,nombre,params", CASOS)
+def test_lxml_mismos_registros_que_html_parser(fichero, nombre, params):
+    html = (FIXTURES / fichero).read_text(encoding="utf-8")
+    soup = extract_html(nombre, html, params)
+    assert html_extraction._dom_for(nombre, {**params, "html_parser": "lxml"}) is html_extraction._LxmlDom
+    assert extract_html(nombre, html, {**params, "html_parser": "lxml"}) == soup
+    assert soup and any(v for r in soup for v in r.values())
+
+
+def test_ejemplos_concretos():
+    ficha = (FIXTURES / "ficha_detalle.html").read_text(encoding="utf-8")
+    (rec,) = extract_html("fields", ficha, {**CASOS[4][2], "html_parser": "lxml"})
+    assert rec["email"] == "registro@cadiz.es" and rec["fecha"] == "2024-02-01"
+    assert rec["etiquetas"] == "cultura; patrimonio; municipal" and rec["falta"] is None
+    listado = (FIXTURES / "listado_ayudas.html").read_text(encoding="utf-8")
+    filas = extract_html("fields", listado, {**CASOS[1][2], "html_parser": "lxml"})
+    assert filas[2]["beneficiario"] == "Fundación Sevilla Activa" and filas[3]["importe"] == ""
+
+
+def test_selector_no_traducible_vuelve_a_html_parser():
+    assert not supports_css("li:not(.activo) a") and not supports_css("h3 + ul")
+    assert supports_css('a[title="Resolución, PDF"], b')
+    html = (FIXTURES / "portal_datos.html").read_text(encoding="utf-8")
+    params = {"rows_selector": "nav li:not(.activo)", "field_selectors": {"n": "a"}}
+    assert html_extraction._dom_for("fields", {**params, "html_parser": "lxml"}) is html_extraction._SoupDom
+    assert [r["n"] for r in extract_html("fields", html, {**params, "html_parser": "lxml"})] == \
+        ["Inicio", "Economía", "Empleo"]
+    with pytest.raises(ValueError):
+        extract_html("fields", html, {**params, "html_parser": "selectolax"})
+
+
+def test_xpath_evalua_el_selector_entero_hacia_arriba():
+    # como soupsieve: los compuestos de la izquierda se buscan fuera del ámbito
+    assert css_to_xpath("div > ul a") == "descendant::a[ancestor::ul[parent::div]]"
+
+
+@pytest.mark.parametrize("selector", ["a[href]", "ul.ficheros a.csv", "#menu li > a[href^='/']",
+                                      "section#natalidad a, nav a[rel]", "li:nth-child(2) a"])
+def test_extract_links_igual_con_lxml(selector):
+    html = (FIXTURES / "portal_datos.html").read_text(encoding="utf-8")
+    base = "https://datos.example.org/estadistica/poblacion/"
+    assert extract_links(html, base, selector, backend="lxml") == extract_links(html, base, selector)
+    assert extract_links("", base, selector, backend="lxml") == []
@@ -0,0 +1,189 @@
+"""Caché HTTP condicional (app/fetchers/http_cache.py): validadores ETag /
+Last-Modified, 304 con el cuerpo guardado, corte de fuentes de un solo documento
+sin cambios y detección por hash cuando el servidor no manda validadores. La
+caché es de cada recurso y solo corta contra la última versión construida; el
+manager se simula con `_resource_id`, `_latest_dataset_id` y `mark_built`."""
+import hashlib
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from app.fetchers import http_cache
+from app.fetchers.file_download import FileDownloadFetcher
+from app.fetchers.http_cache import SourceUnchanged
+from app.fetchers.rest import RESTFetcher
+
+
+class _Origen(BaseHTTPRequestHandler):
+    cuerpos = {}
+    validadores = True
+    peticiones = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        cuerpo = type(self).cuerpos[self.path.split("?")[0]]
+        if callable(cuerpo):
+            cuerpo = cuerpo(self.path)
+        etag = '"%s"' % hashlib.md5(cuerpo).hexdigest()
+        type(self).peticiones.append((self.path, self.headers.get("If-None-Match")))
+        if type(self).validadores and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv; charset=utf-8")
+        if type(self).validadores:
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", "Mon, 05 Oct 2026 10:00:00 GMT")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+
+CSV = "id;nombre\n" + "".join(f"{i};fila {i}\n" for i in range(500))
+
+
+@pytest.fixture
+def origen(tmp_path, monkeypatch, local_server):
+    monkeypatch.setattr(http_cache, "CACHE_ROOT", str(tmp_path / "cache"))
+    _Origen.cuerpos = {"/datos.csv": CSV.encode(), "/datos.json": b'[{"id": 1}, {"id": 2}]'}
+    _Origen.validadores = True
+    _Origen.peticiones = []
+    return local_server(_Origen)
+
+
+def _fichero(url, version="", recurso="r1", **extra):
+    """Especie como la crea el manager: recurso y última versión del Dataset."""
+    return FileDownloadFetcher({"url": url, "format": "csv", "delimiter": ";",
+                                "http_cache": "true", "_resource_id": recurso,
+                                "_latest_dataset_id": version, **extra})
+
+
+def _version(url, version="v1", **extra):
+    """Una ejecución que construye la versión `version` del Dataset."""
+    fetcher = _fichero(url, **extra)
+    filas = fetcher.fetch()
+    fetcher._http_cache.mark_built(version)
+    return filas
+
+
+def test_304_corta_la_fuente_sin_parsear(origen):
+    primera = _fichero(f"{origen}/datos.csv")
+    assert len(primera.fetch()) == 500
+    assert primera._http_cache.stats.as_dict() == {"hits": 0, "unchanged": 0, "misses": 1,
+                                                   "unbuilt": 0, "bytes_saved": 0}
+    primera._http_cache.mark_built("v1")
+
+    segunda = _fichero(f"{origen}/datos.csv", "v1")
+    with pytest.raises(SourceUnchanged):
+        list(segunda.stream())
+    assert _Origen.peticiones[-1][1] is not None               # petición condicional
+    assert segunda.profile_stats["http_cache"] == {"hits": 1, "unchanged": 0, "misses": 0, "unbuilt": 0,
+                                                   "bytes_saved": len(CSV.encode())}
+
+
+def test_sin_validadores_compara_el_hash(origen):
+    _Origen.validadores = False
+    url = f"{origen}/datos.json"
+    assert len(_version(url, format="json")) == 2
+    with pytest.raises(SourceUnchanged):
+        _fichero(url, "v1", format="json").fetch()
+    _Origen.cuerpos["/datos.json"] = b'[{"id": 1}, {"id": 2}, {"id": 3}]'
+    cambiado = _fichero(url, format="json")
+    assert len(cambiado.fetch()) == 3
+    assert cambiado._http_cache.stats.misses == 1
+
+
+def test_fuente_cambiada_se_descarga_y_parsea(origen):
+    url = f"{origen}/datos.csv"
+    _fichero(url).fetch()
+    _Origen.cuerpos["/datos.csv"] = (CSV + "500;fila nueva\n").encode()
+    assert len(_fichero(url).fetch()) == 501
+
+
+def test_preview_y_reanudacion_no_cortan(origen):
+    url = f"{origen}/datos.csv"
+    _version(url)
+    assert len(_fichero(url, "v1", _preview_limit=10).fetch()) == 500
+    assert len(_fichero(url, "v1", _resume_state={"page": 1}).fetch()) == 500
+
+
+def test_cata_y_descubrimiento_no_dejan_copia(origen, tmp_path):
+    url = f"{origen}/datos.csv"
+    assert len(_fichero(url, _preview_limit=10).fetch()) == 500
+    assert len(_fichero(url, _discover_mode=True).fetch()) == 500
+    assert not (tmp_path / "cache").exists()
+    # la primera ejecución real tras la cata descarga y construye su versión
+    real = _fichero(url)
+    assert len(real.fetch()) == 500
+    assert _Origen.peticiones[-1][1] is None and real._http_cache.stats.misses == 1
+
+
+def test_copia_sin_version_construida_no_corta(origen):
+    url = f"{origen}/datos.csv"
+    _fichero(url).fetch()                       # guardada, pero sin Dataset construido
+    segunda = _fichero(url)
+    assert len(segunda.fetch()) == 500
+    assert segunda._http_cache.stats.hits == 1 and segunda._http_cache.stats.unbuilt == 1
+    assert not segunda._http_cache.stats.run_unchanged()
+    # construida la v1, otra versión posterior (p. ej. de otra fuente) tampoco corta
+    segunda._http_cache.mark_built("v1")
+    with pytest.raises(SourceUnchanged):
+        _fichero(url, "v1").fetch()
+    assert len(_fichero(url, "v2").fetch()) == 500
+
+
+def test_dos_recursos_con_la_misma_url(origen):
+    url = f"{origen}/datos.csv"
+    _version(url, recurso="r1")
+    otro = _fichero(url, recurso="r2")
+    assert len(otro.fetch()) == 500
+    assert _Origen.peticiones[-1][1] is None            # sin validadores de r1
+    assert otro._http_cache.stats.misses == 1
+    with pytest.raises(SourceUnchanged):
+        _fichero(url, "v1", recurso="r1").fetch()
+
+
+def test_varias_peticiones_reproducen_la_cache(origen):
+    def pagina(path):
+        n = parse_qs(urlsplit(path).query)["page"][0]
+        return b'[{"id": "%s"}]' % n.encode() if n in ("1", "2") else b"[]"
+
+    _Origen.cuerpos["/api"] = pagina
+    params = {"url": f"{origen}/api", "pagination": "page_number", "page_size": "1",
+              "http_cache": "true", "_resource_id": "r1"}
+    primera = RESTFetcher(params)
+    filas = primera.fetch()
+    primera._http_cache.mark_built("v1")
+    segunda = RESTFetcher({**params, "_latest_dataset_id": "v1"})
+    assert segunda.fetch() == filas == [{"id": "1"}, {"id": "2"}]
+    stats = segunda._http_cache.stats
+    assert stats.hits == 3 and stats.misses == 0 and stats.run_unchanged()
+
+
+def test_lectura_incompleta_no_se_cachea(origen):
+    fetcher = _fichero(f"{origen}/datos.csv")
+    resp = fetcher._request(None, "GET", f"{origen}/datos.csv", stream=True)
+    resp.raw.read(10)
+    resp.close()
+    assert fetcher._http_cache.stats.requests == 0
+    assert len(_fichero(f"{origen}/datos.csv").fetch()) == 500
+
+
+def test_mark_built_borra_lo_que_la_ejecucion_no_pidio(origen, tmp_path):
+    def entradas(recurso="r1"):
+        return sorted(p.suffix for p in (tmp_path / "cache" / recurso).rglob("*.*"))
+
+    _version(f"{origen}/datos.csv?desde=2026-10-01")
+    assert entradas() == [".body", ".json"]
+    # la URL de la ejecución siguiente lleva otra fecha: la anterior sobra
+    _version(f"{origen}/datos.csv?desde=2026-10-02", "v2")
+    assert entradas() == [".body", ".json"]
+    assert _Origen.peticiones[-1][1] is None
+    _version(f"{origen}/datos.csv", recurso="r2")
+    http_cache.remove_scope("r1")
+    assert entradas() == [] and entradas("r2") == [".body", ".json"]
@@ -0,0 +1,134 @@
+"""Capa HTTP compartida (app/fetchers/http_client.py): reutilización de conexiones
+entre peticiones y especies, sesiones aisladas, estadísticas por host y caché DNS."""
+import socket
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from app.fetchers import http_client
+from app.fetchers.rest import RESTFetcher
+
+
+class _KeepAlive(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = 1 << 16
+    conexiones = set()
+    cortes = 0      # peticiones a /cortada que se cierran sin responder
+    cookies = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        cls = type(self)
+        cls.conexiones.add(self.client_address)
+        if self.path.startswith("/cortada"):
+            cls.cookies.append(self.headers.get("Cookie"))
+            if cls.cortes:
+                cls.cortes -= 1
+                self.close_connection = True
+                return
+        cuerpo = b'[{"id": 1}]'
+        self.send_response(200)
+        if self.path.startswith("/login"):
+            self.send_header("Set-Cookie", "sesion=abc; Path=/")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+
+@pytest.fixture
+def servidor(local_server):
+    _KeepAlive.conexiones, _KeepAlive.cortes, _KeepAlive.cookies = set(), 0, []
+    yield local_server(_KeepAlive)
+    http_client.close()
+
+
+def test_las_especies_reutilizan_las_conexiones_del_pool(servidor):
+    for _ in range(3):   # tres ejecuciones: cada una con su fetcher y su sesión
+        fetcher = RESTFetcher({"url": f"{servidor}/api", "pagination": "page_number",
+                               "page_size": "1", "max_pages": "10"})
+        assert len(fetcher.fetch()) == 10
+    assert len(_KeepAlive.conexiones) == 1
+
+
+def test_sesiones_aisladas_sobre_el_mismo_pool(servidor):
+    a, b = http_client.session(), http_client.session()
+    a.get(f"{servidor}/login")
+    assert a.cookies.get("sesion") == "abc" and not b.cookies
+    a.close()                                   # no cierra el pool compartido
+    b.get(f"{servidor}/x")
+    assert len(_KeepAlive.conexiones) == 1
+
+
+def test_reintento_tras_connection_error_conserva_la_sesion(servidor, monkeypatch):
+    # un formulario con sesión (JSESSIONID): el reintento debe llevar la cookie
+    monkeypatch.setattr("app.fetchers.base.time.sleep", lambda s: None)
+    fetcher = RESTFetcher({"url": f"{servidor}/api", "max_retries": "3"})
+    sesion = fetcher.http
+    sesion.headers["X-Form"] = "1"
+    sesion.get(f"{servidor}/login")
+    _KeepAlive.cortes = 2
+    resp = fetcher._request(sesion, "GET", f"{servidor}/cortada")
+    assert resp.status_code == 200
+    assert _KeepAlive.cookies == ["sesion=abc"] * 3
+    assert sesion.cookies.get("sesion") == "abc" and sesion.headers["X-Form"] == "1"
+
+
+def test_estadisticas_por_host(servidor):
+    s = http_client.session()
+    for _ in range(4):
+        s.get(f"{servidor}/x")
+    host = servidor.split("//")[1]
+    st = s.stats.snapshot()[host]
+    assert st["requests"] == 4 and st["status"] == {200: 4} and st["bytes"] == 4 * 11
+    assert sum(st["latency_histogram"].values()) == 4 and st["latency_ms_p95"] is not None
+    assert http_client.stats()[host]["requests"] >= 4
+    assert "4 peticiones" in s.stats.summary()[0]
+    with pytest.raises(Exception):
+        s.get("http://127.0.0.1:9/", timeout=1)    # puerto cerrado: error de red
+    assert s.stats.snapshot()["127.0.0.1:9"]["errors"] == 1
+
+
+def test_cache_dns(monkeypatch):
+    llamadas = []
+
+    def contar(*args):
+        llamadas.append(args[:2])
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", args[1]))]
+
+    monkeypatch.setattr(http_client, "_orig_getaddrinfo", contar)
+    cache = http_client.DnsCache(ttl=60)
+    for _ in range(5):
+        assert cache.getaddrinfo("datos.test", 443, 0, socket.SOCK_STREAM)[0][4] == ("127.0.0.1", 443)
+    assert llamadas == [("datos.test", 443)]
+    cache.ttl = 0
+    cache.clear()
+    cache.getaddrinfo("datos.test", 443)
+    cache.getaddrinfo("datos.test", 443)
+    assert len(llamadas) == 3
+
+
+def test_configure_rechaza_opciones_desconocidas():
+    with pytest.raises(ValueError):
+        http_client.configure(pool_size=3)
+
+
+def test_fuentes_de_pivote_usan_la_sesion_de_la_especie():
+    from app.fetchers.pivot_sources import pivots_from_odmgr
+
+    class _Sesion:
+        def __init__(self):
+            self.consultas = []
+
+        def post(self, url, json=None, timeout=None):
+            self.consultas.append(url)
+            items = [{"codigo": "A"}, {"codigo": "B"}, {"codigo": "A"}]
+            return type("R", (), {"json": lambda s: {"data": {"q": {"total": 3, "items": items}}}})()
+
+    sesion = _Sesion()
+    valores = pivots_from_odmgr({"pivot_source_odmgr_query": "q", "pivot_source_field": "codigo",
+                                 "pivot_source_odmgr_url": "http://odm.test/graphql/data"},
+                                session=sesion)
+    assert valores == ["A", "B"] and sesion.consultas == ["http://odm.test/graphql/data"]
@@ -0,0 +1,244 @@
+"""Lectura incremental de JSON (json_stream.JsonArrayStream) y su uso en
+RESTFetcher: la lista de registros sale por lotes sin cargar el documento
+entero, y lo que la rodea (cursor, remark) sigue disponible."""
+import json
+import random
+import tracemalloc
+
+import pytest
+
+from app.fetchers import json_stream
+from app.fetchers.json_stream import JsonArrayStream, wants_streaming
+from app.fetchers.rest import RESTFetcher
+
+from .stubs import FakeResponse
+
+DOC = {"version": 0.6, "osm3s": {"copyright": "ODbL"},
+       "elements": [{"type": "node", "id": i, "lat": 37.0 + i / 1e4, "tags": {"name": f"ñ\"{i}\\"}}
+                    for i in range(300)] + [1.5e-3, None, "x", [1, [2]], {}],
+       "remark": "runtime error: Query timed out"}
+
+
+def _trozos(doc, n):
+    raw = doc if isinstance(doc, bytes) else json.dumps(doc, ensure_ascii=False, indent=1).encode()
+    return [raw[i:i + n] for i in range(0, len(raw), n)]
+
+
+@pytest.mark.parametrize("n", [1, 7, 64, 1 << 20])
+def test_elementos_y_documento_con_cualquier_trozo(n):
+    reader = JsonArrayStream(_trozos(DOC, n), "elements")
+    assert list(reader) == DOC["elements"]
+    assert reader.found
+    assert reader.document == {**DOC, "elements": []}
+
+
+def test_rutas_anidadas_array_de_primer_nivel_y_ausentes():
+    doc = {"data": {"meta": [1], "items": [{"a": 1}, {"a": 2}]}, "next": "c2"}
+    reader = JsonArrayStream(_trozos(doc, 5), "data.items")
+    assert list(reader) == [{"a": 1}, {"a": 2}]
+    assert reader.document == {"data": {"meta": [1], "items": []}, "next": "c2"}
+
+    reader = JsonArrayStream(_trozos([3, 4], 1))
+    assert list(reader) == [3, 4] and reader.document == []
+
+    for path in ("data.otra", "next", "data.meta.x"):
+        reader = JsonArrayStream(_trozos(doc, 3), path)
+        assert list(reader) == [] and not reader.found and reader.document == doc
+
+    reader = JsonArrayStream([b"  "], "elements")
+    assert list(reader) == [] and reader.document is None
+
+
+def test_numeros_partidos_en_el_borde_del_trozo():
+    reader = JsonArrayStream([b'{"version":0.', b'6,"elements":[1]}'], "elements")
+    assert list(reader) == [1] and reader.document == {"version": 0.6, "elements": []}
+    assert list(JsonArrayStream([b"[1.", b"5, 2]"])) == [1.5, 2]
+    assert list(JsonArrayStream([b"[-1", b"e", b"-2 ", b" ,3", b"E+1]"])) == [-0.01, 30.0]
+
+
+def _valor(rnd, nivel=0):
+    tipo = rnd.randrange(8 if nivel < 3 else 5)
+    if tipo == 0:
+        return rnd.randint(-10**6, 10**6)
+    if tipo == 1:
+        return rnd.choice([0.6, -1.5e-7, 3.25e12, rnd.uniform(-1e3, 1e3)])
+    if tipo == 2:
+        return rnd.choice(["", "ñ\"\\/\n", "x" * rnd.randrange(50), "é😀"])
+    if tipo == 3:
+        return rnd.choice([True, False, None])
+    if tipo == 4:
+        return rnd.randrange(10)
+    if tipo in (5, 6):
+        return [_valor(rnd, nivel + 1) for _ in range(rnd.randrange(4))]
+    return {f"k{i}": _valor(rnd, nivel + 1) for i in range(rnd.randrange(4))}
+
+
+@pytest.mark.parametrize("semilla", range(40))
+def test_fuzz_trozos_aleatorios(semilla, monkeypatch):
+    # lecturas mínimas: cada reintento de _decode trae ~1 carácter más, así que
+    # los cortes aleatorios caen de verdad a mitad de número, cadena o literal
+    monkeypatch.setattr(json_stream, "CHUNK_SIZE", 1)
+    rnd = random.Random(semilla)
+    doc = {"version": _valor(rnd), "meta": {"n": _valor(rnd), "items": [_valor(rnd) for _ in range(20)]},
+           "tail": _valor(rnd)}
+    texto = json.dumps(doc, ensure_ascii=rnd.random() < 0.5,
+                       indent=rnd.choice([None, 0, 2]),
+                       separators=rnd.choice([None, (",", ":"), (" , ", " : ")]))
+    raw = texto.encode()
+    cortes = sorted(rnd.sample(range(1, len(raw)), rnd.randrange(1, len(raw) // 2)))
+    trozos = [raw[a:b] for a, b in zip([0] + cortes, cortes + [len(raw)])]
+    reader = JsonArrayStream(trozos, "meta.items")
+    assert list(reader) == doc["meta"]["items"]
+    assert reader.document == {**doc, "meta": {**doc["meta"], "items": []}}
+
+
+@pytest.mark.parametrize("raw", [b'{"elements": [1, 2', b'{"elements": [1 2]}',
+                                 b'{"elements" [1]}', b'{"elements": [1, }'])
+def test_json_invalido_o_truncado(raw):
+    with pytest.raises(json.JSONDecodeError):
+        list(JsonArrayStream(_trozos(raw, 3), "elements"))
+
+
+def test_memoria_acotada_por_el_trozo_no_por_el_documento():
+    fila = b'{"id": %d, "texto": "' + b"x" * 200 + b'"}'
+    cuerpo = b'{"elements": [' + b",".join(fila % i for i in range(50_000)) + b"]}"
+
+    def _generar():
+        for i in range(0, len(cuerpo), 1 << 16):
+            yield cuerpo[i:i + (1 << 16)]
+
+    tracemalloc.start()
+    n = sum(1 for _ in JsonArrayStream(_generar(), "elements"))
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert n == 50_000
+    assert pico < len(cuerpo) / 10
+
+
+def _fetcher(respuestas, **params):
+    f = RESTFetcher({"url": "https://api.test/x", "stream_json_threshold_mb": "0.001",
+                     "batch_size": "100", **params})
+    servidas = []
+
+    def _request(session, method, url, **kw):
+        resp = respuestas[len(servidas)] if isinstance(respuestas, list) else respuestas
+        servidas.append((kw.get("params"), kw.get("stream")))
+        return resp
+
+    f._request = _request
+    return f, servidas
+
+
+def test_peek_no_pierde_lo_leido():
+    primero, trozos = json_stream.peek([b"  ", b"\n", b'{"a"', b": [1]}"])
+    assert primero == b"{" and b"".join(trozos) == b'  \n{"a": [1]}'
+    assert json_stream.peek([b"\xef\xbb\xbf <html>"])[0] == b"<"
+    assert json_stream.peek([b" ", b""])[0] == b""
+
+
+def test_wants_streaming_por_tamano_y_parametro():
+    grande, pequena = FakeResponse(list(range(5000))), FakeResponse([1])
+    assert wants_streaming(grande, {"stream_json_threshold_mb": "0.01"})
+    assert not wants_streaming(pequena, {"stream_json_threshold_mb": "0.01"})
+    assert not wants_streaming(grande, {"stream_json": "false", "stream_json_threshold_mb": "0.01"})
+    assert wants_streaming(pequena, {"stream_json": "true"})
+    assert wants_streaming(FakeResponse([1], content_length=False), {}, unknown_length=True)
+
+
+def test_rest_sin_paginacion_emite_lotes_de_la_respuesta_grande():
+    filas = [{"id": i, "valor": str(i)} for i in range(1000)]
+    resp = FakeResponse({"total": 1000, "data": {"rows": filas}})
+    f, _ = _fetcher(resp, content_field="data.rows", extraction="field_map",
+                    field_map={"id": "id"})
+    lotes = list(f.stream())
+    assert resp.leida_por_trozos
+    assert [len(b) for b in lotes] == [100] * 10
+    assert [r for b in lotes for r in b] == [{"id": i} for i in range(1000)]
+
+    # bindings de SPARQL: la lista va en bindings_path
+    sparql = FakeResponse({"head": {"vars": ["s"]},
+                    "results": {"bindings": [{"s": {"type": "uri", "value": f"u{i}"}} for i in range(500)]}})
+    f, _ = _fetcher(sparql, extraction="bindings")
+    assert [r["s"] for b in f.stream() for r in b] == [f"u{i}" for i in range(500)]
+
+
+def test_rest_sin_paginacion_conserva_el_comportamiento_historico():
+    doc = {"total": 1000, "data": {"rows": [{"id": i} for i in range(1000)]}}
+    # sin extraction el resultado es el documento entero: no se trocea
+    f, _ = _fetcher(FakeResponse(doc), content_field="data.rows")
+    assert list(f.stream()) == [[doc]]
+    resp = FakeResponse(doc)
+    f, _ = _fetcher(resp, content_field="data.rows", extraction="passthrough", stream_json="false")
+    assert [r for b in f.stream() for r in b] == doc["data"]["rows"]
+    assert not resp.leida_por_trozos
+    # array de primer nivel: sí, y da lo mismo que el camino de siempre
+    filas = [{"id": i} for i in range(1000)]
+    f, _ = _fetcher(FakeResponse(filas))
+    assert [r for b in f.stream() for r in b] == filas
+    # la lista no está donde se esperaba: el documento pasa entero por extraction
+    f, _ = _fetcher(FakeResponse(doc), content_field="otra", extraction="passthrough")
+    assert list(f.stream()) == []
+
+
+def test_rest_paginado_trocea_paginas_grandes_y_sigue_el_cursor():
+    paginas = [FakeResponse({"items": [{"id": f"p{n}-{i}"} for i in range(250)],
+                      "next": f"c{n + 1}" if n < 3 else None}) for n in (1, 2, 3)]
+    f, servidas = _fetcher(paginas, content_field="items", pagination="cursor",
+                           cursor_field="next")
+    lotes = []
+    estados = []
+    for lote in f.stream():
+        lotes.append(lote)
+        estados.append(f.current_state)
+    assert [len(b) for b in lotes] == [100, 100, 50] * 3
+    assert [p.get("cursor") for p, _ in servidas] == [None, "c2", "c3"]
+    assert [r["id"] for b in lotes for r in b] == [f"p{n}-{i}" for n in (1, 2, 3) for i in range(250)]
+    # a mitad de página el savepoint repite la página; al acabarla apunta a la siguiente
+    assert [e["resume_query"].get("cursor") for e in estados[:4]] == [None, None, None, "c2"]
+    assert f.current_state.get("finished")
+
+
+def _pagina(n, paginas=3, por_pagina=250):
+    return FakeResponse({"items": [{"id": f"p{n}-{i}"} for i in range(por_pagina)],
+                  "next": f"c{n + 1}" if n < paginas else None})
+
+
+def test_pausa_a_mitad_de_pagina_no_repite_registros():
+    completo = [{"id": f"p{n}-{i}"} for n in (1, 2, 3) for i in range(250)]
+    params = {"content_field": "items", "pagination": "cursor", "cursor_field": "next"}
+    f, _ = _fetcher([_pagina(n) for n in (1, 2, 3)], **params)
+    it = f.stream()
+    primeros = [r for _ in range(4) for r in next(it)]       # página 1 y 100 de la 2
+    estado = json.loads(json.dumps(f.current_state))
+    it.close()
+    assert estado["resume_query"] == {"cursor": "c2"} and estado["page_records"] == 100
+
+    # al reanudar se pide la página 2 otra vez y se saltan sus 100 primeros
+    for extra in ({}, {"stream_json": "false"}):
+        f, servidas = _fetcher([_pagina(n) for n in (2, 3)], _resume_state=estado, **params, **extra)
+        resto = [r for b in f.stream() for r in b]
+        assert primeros + resto == completo
+        assert [p.get("cursor") for p, _ in servidas] == ["c2", "c3"]
+
+
+@pytest.mark.parametrize("concurrencia", ["1", "3"])
+def test_pausa_a_mitad_de_pagina_numerada(concurrencia):
+    params = {"content_field": "items", "pagination": "page_number", "page_size": "250",
+              "max_concurrent_requests": concurrencia}
+
+    def _crear(**extra):
+        f = RESTFetcher({"url": "https://api.test/x", "stream_json_threshold_mb": "0.001",
+                         "batch_size": "100", **params, **extra})
+        f._request = lambda session, method, url, **kw: _pagina(
+            int(kw["params"]["page"]), por_pagina=250 if int(kw["params"]["page"]) < 3 else 40)
+        return f
+
+    completo = [r for b in _crear(max_concurrent_requests="1").stream() for r in b]
+    f = _crear(max_concurrent_requests="1")
+    it = f.stream()
+    primeros = [r for _ in range(4) for r in next(it)]
+    estado = json.loads(json.dumps(f.current_state))
+    it.close()
+    assert estado["page"] == 2 and estado["page_records"] == 100
+    resto = [r for b in _crear(_resume_state=estado).stream() for r in b]
+    assert primeros + resto == completo and len(completo) == 540
@@ -0,0 +1,190 @@
+"""Teselado de OSMFetcher (tiling=quadtree): las teselas que Overpass corta se
+dividen, los elementos del borde salen una vez, stream() emite por tesela
+repartiendo los mirrors, y current_state reanuda sin repetir teselas. Contra un
+Overpass simulado que sirve un conjunto fijo de nodos y ways."""
+import random
+import re
+import threading
+import time
+
+import pytest
+import requests
+
+from app.fetchers import osm
+from app.fetchers.osm import OSMFetcher, seed_tiles
+
+from .stubs import FakeResponse
+
+random.seed(7)
+NODOS = [{"type": "node", "id": i, "lat": round(random.uniform(36.0, 38.0), 5),
+          "lon": round(random.uniform(-7.0, -3.0), 5), "tags": {"historic": "ruins"}}
+         for i in range(400)]
+# ways que cruzan las líneas de corte (lat 37, lon -5): Overpass los devuelve en
+# todas las teselas que tocan
+WAYS = [{"type": "way", "id": 9000 + i, "bounds": (36.9 + i * 0.01, -5.1, 37.1, -4.9),
+         "tags": {"historic": "castle"}} for i in range(5)]
+
+
+class _Overpass:
+    """Simula Overpass: devuelve lo que cae en el bbox de la query; si el bbox
+    tiene más de `limite` elementos responde como un timeout de Overpass."""
+
+    def __init__(self, limite=150, latencia=0.0):
+        self.limite = limite
+        self.latencia = latencia
+        self.consultas = []
+        self.lock = threading.Lock()
+        self.en_vuelo = 0
+        self.pico = 0
+
+    def post(self, server, data=None, headers=None, timeout=None, stream=False):
+        s, w, n, e = map(float, re.search(r"\(([-\d.,]+)\)", data["data"]).group(1).split(","))
+        with self.lock:
+            self.consultas.append((server, (s, w, n, e)))
+            self.en_vuelo += 1
+            self.pico = max(self.pico, self.en_vuelo)
+        time.sleep(self.latencia)
+        with self.lock:
+            self.en_vuelo -= 1
+        dentro = [dict(x) for x in NODOS if s <= x["lat"] <= n and w <= x["lon"] <= e]
+        for way in WAYS:
+            bs, bw, bn, be = way["bounds"]
+            if bs <= n and s <= bn and bw <= e and w <= be:
+                dentro.append({"type": "way", "id": way["id"], "tags": way["tags"],
+                               "center": {"lat": (bs + bn) / 2, "lon": (bw + be) / 2}})
+        cuerpo = {"elements": dentro}
+        if len(dentro) > self.limite:
+            cuerpo = {"elements": dentro[:self.limite],
+                      "remark": "runtime error: Query timed out in \"query\" at line 3 after 60 seconds."}
+        # sin Content-Length, como las de Overpass: se lee por trozos
+        return FakeResponse(cuerpo, content_length=False)
+
+
+def _fetcher(overpass, **extra):
+    f = OSMFetcher({"use_types": "HERITAGE_LOOSE", "bbox": "36,-7,38,-3", "tiling": "quadtree",
+                    "tile_max_deg": "2", "overpass_url": "http://local/api/interpreter", **extra})
+    f._http = overpass
+    return f
+
+
+def _ids(registros):
+    return [(r["osm_type"], r["osm_id"]) for r in registros]
+
+
+def test_seed_tiles_rejilla_y_demarcaciones():
+    assert seed_tiles("36,-7,38,-3", max_deg=2) == [[36, -7, 38, -5], [36, -5, 38, -3]]
+    provincias = seed_tiles("36,-7,38,-3", "provincia", max_deg=10)
+    assert len(provincias) > 1 and all(36 <= t[0] < t[2] <= 38 for t in provincias)
+    with pytest.raises(ValueError):
+        seed_tiles("36,-7,38,-3", "planeta")
+
+
+def test_quadtree_divide_lo_que_overpass_corta_y_deduplica_bordes():
+    overpass = _Overpass(limite=150)
+    f = _fetcher(overpass)
+    registros = f.execute()
+    assert sorted(_ids(registros)) == sorted([("node", n["id"]) for n in NODOS]
+                                             + [("way", w["id"]) for w in WAYS])
+    stats = f.profile_stats["tiles"]
+    assert stats["splits"] >= 2 and stats["duplicates"] > 0
+    # toda consulta que no se dividió devolvió su bbox completo
+    assert stats["tiles"] == len(overpass.consultas) - stats["splits"]
+    assert {r["inferred_use"] for r in registros} == {"HERITAGE_LOOSE"}
+
+
+def test_stream_por_tesela_en_paralelo_entre_mirrors():
+    overpass = _Overpass(limite=10_000, latencia=0.05)
+    assert len(list(_fetcher(overpass, tile_max_deg="0.5").stream())) == 32
+    assert overpass.pico == 1
+    overpass.consultas, overpass.pico = [], 0
+    lotes = list(_fetcher(overpass, tile_max_deg="0.5", max_concurrent_requests="4").stream())
+    assert 1 < overpass.pico <= 4
+    assert len(lotes) == 32 and sum(map(len, lotes)) == len(NODOS) + len(WAYS)
+    assert len({server for server, _ in overpass.consultas}) == len(osm.OVERPASS_MIRRORS) + 1
+
+
+def test_reanuda_desde_las_teselas_pendientes():
+    overpass = _Overpass(limite=150)
+    f = _fetcher(overpass)
+    lotes = f.stream()
+    primeros = [r for _ in range(3) for r in next(lotes)]
+    lotes.close()
+    estado = f.current_state
+    assert len(estado["done"]) == 3 and estado["pending"]
+
+    overpass.consultas = []
+    reanudado = _fetcher(overpass, _resume_state=estado)
+    resto = [r for lote in reanudado.stream() for r in lote]
+    pedidas = [bbox for _, bbox in overpass.consultas]
+    assert not any(list(bbox) in estado["done"] for bbox in pedidas)
+    nodos = [i for t, i in _ids(primeros + resto) if t == "node"]
+    assert sorted(nodos) == sorted(n["id"] for n in NODOS)
+    assert {i for t, i in _ids(primeros + resto) if t == "way"} == {w["id"] for w in WAYS}
+
+    # otro filtro: el savepoint no vale y se empieza de cero
+    otro = _fetcher(overpass, use_types="HERITAGE_STRICT", _resume_state=estado)
+    assert len(otro.execute()) == len(NODOS) + len(WAYS)
+
+
+def test_max_elements_corta_el_teselado():
+    f = _fetcher(_Overpass(limite=10_000), tile_max_deg="0.5", max_elements="30")
+    assert len(f.execute()) == 30
+
+
+def test_sin_teselado_la_respuesta_se_lee_por_trozos_en_lotes():
+    f = OSMFetcher({"use_types": "HERITAGE_LOOSE", "bbox": "36,-7,38,-3", "batch_size": "100",
+                    "overpass_url": "http://local/api/interpreter"})
+    f._http = _Overpass(limite=10_000)
+    lotes = list(f.stream())
+    assert [len(b) for b in lotes] == [100, 100, 100, 100, 5]
+    assert sorted(_ids(r for b in lotes for r in b)) == sorted(
+        [("node", n["id"]) for n in NODOS] + [("way", w["id"]) for w in WAYS])
+
+
+class _Rechazo(_Overpass):
+    """Todos los mirrors rechazan la query (400): dividir la tesela no lo arregla."""
+
+    def post(self, server, data=None, headers=None, timeout=None, stream=False):
+        with self.lock:
+            self.consultas.append((server, data["data"]))
+        return _respuesta_error(400)
+
+
+def _respuesta_error(status):
+    return FakeResponse(b"<html>Bad Request</html>", status_code=status, content_length=False)
+
+
+def test_query_rechazada_en_todos_los_mirrors_no_divide():
+    overpass = _Rechazo()
+    with pytest.raises(requests.exceptions.HTTPError):
+        _fetcher(overpass).execute()
+    # una pasada por los servidores para la primera tesela, ninguna subtesela
+    assert len(overpass.consultas) == len(osm.OVERPASS_MIRRORS) + 1
+
+
+def test_solo_cortes_y_timeouts_dividen_la_tesela():
+    assert osm._tile_too_heavy(osm.OverpassQueryTooHeavy("runtime error"))
+    assert osm._tile_too_heavy(requests.exceptions.ReadTimeout("Read timed out"))
+    assert osm._tile_too_heavy(requests.exceptions.HTTPError(response=_respuesta_error(504)))
+    assert not osm._tile_too_heavy(requests.exceptions.HTTPError(response=_respuesta_error(400)))
+    assert not osm._tile_too_heavy(requests.exceptions.HTTPError(response=_respuesta_error(403)))
+    assert not osm._tile_too_heavy(RuntimeError("respuesta vacía"))
+
+
+class _ErrorHtmlEnElPrimero(_Overpass):
+    """El primer mirror contesta 200 con una página de error HTML."""
+
+    def post(self, server, data=None, headers=None, timeout=None, stream=False):
+        if not self.consultas:
+            self.consultas.append((server, None))
+            return FakeResponse(b"\n<html><body>Server overloaded</body></html>", content_length=False)
+        return super().post(server, data, headers, timeout, stream)
+
+
+def test_200_no_json_rota_al_siguiente_mirror():
+    overpass = _ErrorHtmlEnElPrimero(limite=10_000)
+    f = OSMFetcher({"use_types": "HERITAGE_LOOSE", "bbox": "36,-7,38,-3",
+                    "overpass_url": "http://local/api/interpreter"})
+    f._http = overpass
+    assert len(f.execute()) == len(NODOS) + len(WAYS)
+    assert [s for s, _ in overpass.consultas[:2]] == ["http://local/api/interpreter", osm.OVERPASS_MIRRORS[0]]
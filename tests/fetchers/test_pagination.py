@@ -57,3 +57,15 @@ def test_pivot_loop_una_peticion_por_valor():
     s = build("pivot_loop", "http://x", {"pivot_param": "prov", "pivot_values": "A,B,C"})
     reqs = _drive(s, [5, 5, 5])
     assert [r["query"]["prov"] for r in reqs] == ["A", "B", "C"]
+
+
+def test_checkpoint_y_resume_de_rel_next():
+    s = build("rel_next", "http://x", {"max_pages": "3"})
+    s.first()
+    nxt = s.following(last_batch_size=5, meta={"next_link": "http://x?p=2"})
+    estado = s.checkpoint(nxt, pages_fetched=1)
+    r = build("rel_next", "http://x", {"max_pages": "3"})
+    assert r.resume(estado) == {"url": "http://x?p=2", "query": {}}
+    assert r.following(last_batch_size=5, meta={"next_link": "http://x?p=3"})["url"] == "http://x?p=3"
+    assert r.following(last_batch_size=5, meta={"next_link": "http://x?p=4"}) is None   # max_pages
+    assert r.resume(s.checkpoint(None, 3)) is None
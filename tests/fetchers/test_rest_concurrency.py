@@ -0,0 +1,173 @@
+"""Peticiones concurrentes en RESTFetcher (app/fetchers/concurrency.py): mismo
+resultado que en serie, corte en la última página, límite por host y pausa 429
+compartida entre hilos. Contra un servidor HTTP local con latencia simulada.
+
+Nada se mide con el reloj de pared: el servidor cuenta las peticiones en vuelo
+y los límites de ritmo se comprueban con el reloj simulado de conftest
+(fixture `reloj`), que solo avanza cuando alguien espera una ficha."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from app.fetchers.concurrency import TokenBucket, map_bounded
+from app.fetchers.rest import RESTFetcher
+
+
+class _Stub(BaseHTTPRequestHandler):
+    latencia = 0.05
+    total_paginas = 7
+    pendientes_429 = 0
+    lock = threading.Lock()
+    vistas = []
+    en_vuelo = 0
+    pico = 0
+    reloj = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        q = {k: v[0] for k, v in parse_qs(urlsplit(self.path).query).items()}
+        cls = type(self)
+        with cls.lock:
+            cls.vistas.append((cls.reloj.t if cls.reloj else 0.0, q))
+            throttle = cls.pendientes_429 > 0
+            if throttle:
+                cls.pendientes_429 -= 1
+        if throttle:
+            self.send_response(429)
+            self.send_header("Retry-After", "0.4")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        with cls.lock:
+            cls.en_vuelo += 1
+            cls.pico = max(cls.pico, cls.en_vuelo)
+        time.sleep(cls.latencia)
+        with cls.lock:
+            cls.en_vuelo -= 1
+        if "id" in q:
+            cuerpo = [{"id": f"{q['id']}-{i}", "n": i} for i in range(2)] + [{"id": "comun"}]
+        else:
+            pagina = int(q["page"])
+            cuerpo = [{"id": f"p{pagina}-{i}"} for i in range(3)] if pagina <= cls.total_paginas else []
+            if pagina == cls.total_paginas:
+                cuerpo = cuerpo[:1]
+        datos = json.dumps(cuerpo).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+
+@pytest.fixture
+def servidor(local_server):
+    _Stub.vistas = []
+    _Stub.pendientes_429 = 0
+    _Stub.pico = 0
+    _Stub.reloj = None
+    return local_server(_Stub) + "/api"
+
+
+def _pivotes(url, **extra):
+    return RESTFetcher({"url": url, "pagination": "pivot_loop", "pivot_param": "id",
+                        "pivot_values": json.dumps([f"V{i:02d}" for i in range(20)]),
+                        "pivot_field_out": "pivote", "id_field": "id", **extra})
+
+
+def test_pivot_loop_concurrente_igual_que_en_serie(servidor):
+    serie = _pivotes(servidor).fetch()
+    assert _Stub.pico == 1
+    _Stub.pico = 0
+    paralelo = _pivotes(servidor, max_concurrent_requests="10").fetch()
+    assert paralelo == serie
+    assert len(serie) == 41 and serie[2] == {"id": "comun", "pivote": "V00"}
+    assert 1 < _Stub.pico <= 10
+
+
+def test_paginas_especulativas_cortan_en_la_ultima(servidor):
+    params = {"url": servidor, "pagination": "page_number", "page_size": "3"}
+    serie = RESTFetcher(params).fetch()
+    _Stub.vistas = []
+    paralelo = RESTFetcher({**params, "max_concurrent_requests": "4"}).fetch()
+    assert paralelo == serie and len(serie) == 6 * 3 + 1
+    assert max(int(q["page"]) for _, q in _Stub.vistas) <= 7 + 3   # como mucho 3 de más
+
+
+def test_rate_limit_por_host(servidor, reloj):
+    _Stub.reloj = reloj
+    _Stub.latencia = 0
+    try:
+        recs = _pivotes(servidor, max_concurrent_requests="8", rate_limit_per_second="50").fetch()
+    finally:
+        _Stub.latencia = 0.05
+    assert len(recs) == 41
+    # cada petición salió con su ficha: la i-ésima (desde 0) no antes de i/50 s
+    llegadas = sorted(t for t, _ in _Stub.vistas)
+    assert len(llegadas) == 20
+    assert all(t >= i / 50 - 1e-6 for i, t in enumerate(llegadas))
+
+
+def test_429_pausa_el_host_para_todos_los_hilos(servidor, reloj):
+    _Stub.reloj = reloj
+    _Stub.pendientes_429 = 1
+    recs = _pivotes(servidor, max_concurrent_requests="4", retry_backoff="0.1").fetch()
+    assert len(recs) == 41
+    (t_429, rechazada), *resto = _Stub.vistas
+    assert t_429 == 0
+    # sin límite de ritmo el reloj solo avanza por la pausa: lo pedido antes del
+    # 429 sale en t=0 y todo lo demás, incluido el reintento, tras el Retry-After
+    assert all(t == 0 or t >= 0.4 for t, _ in resto)
+    assert [t for t, q in resto if q == rechazada] and min(t for t, q in resto if q == rechazada) >= 0.4
+    assert sum(t >= 0.4 for t, _ in resto) >= len(resto) - 4
+
+
+def test_map_bounded_ordena_y_acota_en_vuelo():
+    en_vuelo, pico, lock = [0], [0], threading.Lock()
+
+    def lento(i):
+        with lock:
+            en_vuelo[0] += 1
+            pico[0] = max(pico[0], en_vuelo[0])
+        time.sleep(0.02 * (5 - i % 5))
+        with lock:
+            en_vuelo[0] -= 1
+        return i * i
+
+    assert [r for _, r in map_bounded(lento, range(12), 3)] == [i * i for i in range(12)]
+    assert pico[0] <= 3
+    desordenado = sorted(r for _, r in map_bounded(lento, range(12), 3, ordered=False))
+    assert desordenado == [i * i for i in range(12)]
+
+
+def test_map_bounded_cerrar_no_consume_el_resto():
+    consumidos = []
+
+    def items():
+        for i in range(1000):
+            consumidos.append(i)
+            yield i
+
+    it = map_bounded(lambda i: i, items(), 4)
+    assert [next(it)[1] for _ in range(3)] == [0, 1, 2]
+    it.close()
+    assert len(consumidos) < 10
+
+
+def test_token_bucket(reloj):
+    bucket = TokenBucket(rate=40)
+    for _ in range(9):
+        bucket.acquire()
+    assert reloj.t == pytest.approx(8 / 40)
+    bucket.pause(1.0)
+    bucket.acquire()
+    assert reloj.t == pytest.approx(8 / 40 + 1.0)
+    reloj.t += 10                                  # ráfaga máxima de 1: no acumula
+    bucket.acquire()
+    bucket.acquire()
+    assert reloj.t == pytest.approx(8 / 40 + 11.0 + 1 / 40)
@@ -21,7 +21,7 @@ class TestRestFetcher:
 
         fetcher = RestFetcher(params)
 
-        with patch('requests.request') as mock_request:
+        with patch('requests.Session.request') as mock_request:
             mock_response = Mock()
             mock_response.text = '{"result": "success"}'
             mock_response.raise_for_status = Mock()
@@ -55,7 +55,7 @@ class TestRestFetcher:
 
         fetcher = RestFetcher(params)
 
-        with patch('requests.request') as mock_request:
+        with patch('requests.Session.request') as mock_request:
             mock_response = Mock()
             mock_response.text = '{"items": []}'
             mock_response.raise_for_status = Mock()
@@ -82,7 +82,7 @@ class TestRestFetcher:
 
         fetcher = RestFetcher(params)
 
-        with patch('requests.request') as mock_request:
+        with patch('requests.Session.request') as mock_request:
             mock_response = Mock()
             mock_response.text = '{"items": []}'
             mock_response.raise_for_status = Mock()
@@ -109,7 +109,7 @@ class TestRestFetcher:
 
         fetcher = RestFetcher(params)
 
-        with patch('requests.request') as mock_request:
+        with patch('requests.Session.request') as mock_request:
             mock_response = Mock()
             mock_response.text = '{"created": true}'
             mock_response.raise_for_status = Mock()
@@ -133,7 +133,7 @@ class TestRestFetcher:
 
         fetcher = RestFetcher(params)
 
-        with patch('requests.request') as mock_request:
+        with patch('requests.Session.request') as mock_request:
             mock_response = Mock()
             mock_response.text = '{"data": []}'
             mock_response.raise_for_status = Mock()
@@ -198,7 +198,7 @@ class TestRestFetcher:
 
         fetcher = RestFetcher(params)
 
-        with patch('requests.request') as mock_request:
+        with patch('requests.Session.request') as mock_request:
             mock_response = Mock()
             mock_response.text = '{"result": "ok"}'
             mock_response.raise_for_status = Mock()
@@ -218,7 +218,7 @@ class TestRestFetcher:
 
         fetcher = RestFetcher(params)
 
-        with patch('requests.request') as mock_request:
+        with patch('requests.Session.request') as mock_request:
             mock_response = Mock()
             mock_response.text = '{"result": "ok"}'
             mock_response.raise_for_status = Mock()
@@ -239,7 +239,7 @@ class TestRestFetcher:
 
         fetcher = RestFetcher(params)
 
-        with patch('requests.request') as mock_request:
+        with patch('requests.Session.request') as mock_request:
             mock_response = Mock()
             mock_response.text = '{"created": true}'
             mock_response.raise_for_status = Mock()
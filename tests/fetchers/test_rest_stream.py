@@ -0,0 +1,115 @@
+"""RESTFetcher.stream(): un lote por respuesta en cuanto llega y savepoint en
+`current_state` para pausar y reanudar (en serie y con peticiones concurrentes)."""
+import json
+import threading
+
+import pytest
+
+from app.fetchers.rest import RESTFetcher
+
+from .stubs import FakeResponse
+
+
+class _Api:
+    """Páginas de 2 registros (la 4ª corta) y un cursor 'c<n>' por página. Los
+    pivotes de `lentos` no responden hasta `soltar`."""
+
+    def __init__(self, lentos=()):
+        self.peticiones = []
+        self.lock = threading.Lock()
+        self.lentos = lentos
+        self.soltar = threading.Event()
+
+    def __call__(self, session, method, url, **kw):
+        q = kw.get("params") or {}
+        with self.lock:
+            self.peticiones.append(dict(q))
+        if "prov" in q:
+            if q["prov"] in self.lentos:
+                self.soltar.wait(5)
+            return FakeResponse([{"id": f"{q['prov']}-1"}])
+        n = int(q.get("page") or q.get("cursor", "c1")[1:] or 1)
+        if "start" in q:
+            n = q["start"] // 2 + 1
+        filas = [{"id": f"r{n}-{i}"} for i in range(2 if n < 4 else 1)] if n <= 4 else []
+        return FakeResponse({"items": filas, "next": f"c{n + 1}" if n < 4 else None})
+
+
+def _fetcher(api, **params):
+    f = RESTFetcher({"url": "https://api.test/x", "content_field": "items", **params})
+    f._request = api
+    return f
+
+
+PAGINAS = {"pagination": "page_number", "page_size": "2"}
+CURSOR = {"pagination": "cursor", "cursor_field": "next"}
+OFFSET = {"pagination": "query_offset", "start_param": "start", "page_size_param": "size",
+          "page_size": "2"}
+PIVOTES = {"pagination": "pivot_loop", "pivot_param": "prov", "pivot_values": "A,B,C,D,E",
+           "content_field": ""}
+SIN_ORDEN = {**PIVOTES, "preserve_order": "false"}
+
+
+def test_un_lote_por_pagina_sin_esperar_al_resto():
+    api = _Api()
+    it = _fetcher(api, **PAGINAS).stream()
+    assert next(it) == [{"id": "r1-0"}, {"id": "r1-1"}]
+    assert len(api.peticiones) == 1
+    assert [len(b) for b in it] == [2, 2, 1]
+    assert _fetcher(_Api(), **PAGINAS).fetch() == [
+        {"id": f"r{n}-{i}"} for n in range(1, 5) for i in range(2 if n < 4 else 1)]
+
+
+@pytest.mark.parametrize("params", [PAGINAS, CURSOR, OFFSET, PIVOTES, SIN_ORDEN],
+                         ids=["page_number", "cursor", "query_offset", "pivot_loop",
+                              "pivot_loop_sin_orden"])
+@pytest.mark.parametrize("concurrencia", ["1", "3"])
+def test_pausa_y_reanudacion_no_pierden_ni_repiten(params, concurrencia):
+    # sin orden y en paralelo, A (y lo que va tras C) se retiene: B y C se
+    # entregan antes que A
+    lento = params is SIN_ORDEN and concurrencia != "1"
+    params = {**params, "max_concurrent_requests": concurrencia}
+    completo = _fetcher(_Api(), **params).fetch()
+
+    primera = _Api(("A", "D", "E") if lento else ())
+    f = _fetcher(primera, **params)
+    it = f.stream()
+    primeros = next(it) + next(it)
+    estado = json.loads(json.dumps(f.current_state))       # se guarda como JSON
+    primera.soltar.set()
+    it.close()
+    if lento:
+        assert sorted(primeros, key=str) == [{"id": "B-1"}, {"id": "C-1"}]
+        assert estado == {"pivot_index": 0, "pivots_done": [1, 2]}
+
+    api = _Api()
+    reanudado = _fetcher(api, _resume_state=estado, **params)
+    resto = [r for b in reanudado.stream() for r in b]
+    if lento:
+        assert sorted(primeros + resto, key=str) == sorted(completo, key=str)
+        assert len(api.peticiones) == 3
+    else:
+        assert primeros + resto == completo
+    assert reanudado.current_state.get("finished")
+    assert list(_fetcher(_Api(), _resume_state=reanudado.current_state, **params).stream()) == []
+
+
+def test_savepoint_legible_para_el_manager():
+    f = _fetcher(_Api(), **PIVOTES)
+    it = f.stream()
+    next(it)
+    assert f.current_state == {"pivot_index": 1}
+    f = _fetcher(_Api(), **PAGINAS)
+    it = f.stream()
+    next(it)
+    assert f.current_state["page"] == 2 and f.current_state["pages_fetched"] == 1
+
+
+def test_extraction_se_aplica_por_lote():
+    f = _fetcher(_Api(), extraction="field_map", field_map='{"clave": "id"}', **PAGINAS)
+    assert next(f.stream()) == [{"clave": "r1-0"}, {"clave": "r1-1"}]
+
+
+def test_preview_recorta_el_ultimo_lote():
+    lotes = list(_fetcher(_Api(), _preview_limit="3", **PAGINAS).stream())
+    assert [len(b) for b in lotes] == [2, 1]
@@ -0,0 +1,129 @@
+"""Pivotes en paralelo del SearchLoopHtmlFetcher: mismos registros que en serie,
+una sesión Struts (cookie + token del formulario) por trabajador, ritmo de
+arranque de delay_between_searches y reanudación que salta los valores hechos.
+Contra un buscador HTML local con latencia simulada; el paralelismo se mide
+por búsquedas en vuelo y el ritmo con un reloj simulado, no con el de pared."""
+import itertools
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs
+
+import pytest
+
+from app.fetchers.searchloop_html import SearchLoopHtmlFetcher
+
+
+class _Buscador(BaseHTTPRequestHandler):
+    """GET /form abre sesión (cookie + token oculto ligado a ella); POST /buscar
+    exige la pareja y devuelve una tabla con dos filas por valor."""
+    latencia = 0.05
+    sesiones = {}
+    busquedas = []
+    contador = itertools.count()
+    lock = threading.Lock()
+    en_vuelo = 0
+    pico = 0
+    reloj = None
+
+    def log_message(self, *args):
+        pass
+
+    def _html(self, cuerpo, cookie=None):
+        datos = f"<html><body>{cuerpo}</body></html>".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if cookie:
+            self.send_header("Set-Cookie", f"JSESSIONID={cookie}; Path=/")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            sid = f"S{next(cls.contador)}"
+            cls.sesiones[sid] = f"T-{sid}"
+        self._html(f'<form action="/buscar" method="post">'
+                   f'<input type="hidden" name="token" value="T-{sid}"/>'
+                   f'<select name="provincia"><option value="01">A</option></select></form>', cookie=sid)
+
+    def do_POST(self):
+        cls = type(self)
+        campos = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+        sid = (self.headers.get("Cookie") or "").replace("JSESSIONID=", "")
+        valor = campos["provincia"][0]
+        if cls.sesiones.get(sid) != campos.get("token", [None])[0]:
+            self.send_error(403)
+            return
+        with cls.lock:
+            cls.busquedas.append((valor, sid, cls.reloj.t if cls.reloj else 0.0))
+            cls.en_vuelo += 1
+            cls.pico = max(cls.pico, cls.en_vuelo)
+        time.sleep(cls.latencia)
+        with cls.lock:
+            cls.en_vuelo -= 1
+        filas = "".join(f"<tr><td>{valor}</td><td>{n}</td></tr>" for n in range(2))
+        self._html(f"<table><tr><th>prov</th><th>n</th></tr>{filas}</table>")
+
+
+@pytest.fixture
+def buscador(local_server):
+    _Buscador.sesiones, _Buscador.busquedas = {}, []
+    _Buscador.pico, _Buscador.reloj = 0, None
+    return local_server(_Buscador) + "/form"
+
+
+VALORES = [f"{i:02d}" for i in range(12)]
+
+
+def _fetcher(url, **extra):
+    return SearchLoopHtmlFetcher({
+        "url": url, "search_field_name": "provincia", "search_field_values": ",".join(VALORES),
+        "search_mode": "POST_formulario", "carry_hidden_fields": "true",
+        "delay_between_searches": "0", **extra})
+
+
+def _claves(registros):
+    return sorted((r["prov"], r["n"]) for r in registros)
+
+
+def test_pool_mismos_registros_con_sesion_por_trabajador(buscador):
+    serie = _fetcher(buscador).fetch()
+    assert len({sid for _, sid, _ in _Buscador.busquedas}) == 1
+    assert _Buscador.pico == 1
+
+    _Buscador.busquedas, _Buscador.pico = [], 0
+    paralelo = _fetcher(buscador, max_concurrent_requests="4").fetch()
+    assert _claves(paralelo) == _claves(serie) and len(serie) == 24
+    assert len({sid for _, sid, _ in _Buscador.busquedas}) == 4
+    assert 1 < _Buscador.pico <= 4
+
+
+def test_delay_between_searches_marca_el_ritmo_de_arranque(buscador, reloj):
+    _Buscador.reloj = reloj
+    _fetcher(buscador, max_concurrent_requests="4", delay_between_searches="0.05").fetch()
+    # la i-ésima búsqueda (desde 0) no arranca antes de i · 0.05 s
+    arranques = sorted(t for _, _, t in _Buscador.busquedas)
+    assert len(arranques) == len(VALORES)
+    assert all(t >= i * 0.05 - 1e-6 for i, t in enumerate(arranques))
+
+
+@pytest.mark.parametrize("concurrencia", ["1", "4"])
+def test_reanudar_salta_los_valores_hechos(buscador, concurrencia):
+    f = _fetcher(buscador, max_concurrent_requests=concurrencia)
+    lotes = f.stream()
+    primeros = [r for _ in range(5) for r in next(lotes)]
+    lotes.close()
+    estado = f.current_state
+    hechos = set(range(estado["pivots_done_before"])) | set(estado["pivots_done"])
+    assert len(hechos) == 5 and {r["prov"] for r in primeros} == {VALORES[i] for i in hechos}
+
+    _Buscador.busquedas = []
+    resto = _fetcher(buscador, max_concurrent_requests=concurrencia, _resume_state=estado).fetch()
+    assert {v for v, _, _ in _Buscador.busquedas} == set(VALORES) - {VALORES[i] for i in hechos}
+    assert _claves(primeros + resto) == _claves(_fetcher(buscador).fetch())
+
+    # otra lista de valores: el savepoint no vale y se empieza de cero
+    otra = _fetcher(buscador, search_field_values="01,02", _resume_state=estado).fetch()
+    assert len(otra) == 4
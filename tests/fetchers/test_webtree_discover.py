@@ -0,0 +1,89 @@
+"""WebTreeFetcher.discover con frontera concurrente: mismas hojas que en serie,
+max_depth / subrama / include / exclude intactos, URLs normalizadas y
+deduplicadas. Contra un portal HTML sintético servido en local."""
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from app.fetchers.navigation import UrlSet, extract_links, normalize_url
+from app.fetchers.web_tree_fetcher import WebTreeFetcher
+
+
+class _Portal(BaseHTTPRequestHandler):
+    """/portal/s{a}/s{b}/... : 3 subsecciones por página hasta profundidad 3, dos
+    ficheros por página y enlaces de vuelta (raíz, padre, fragmentos)."""
+    latencia = 0.01
+    pedidas = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        type(self).pedidas.append(self.path)
+        time.sleep(type(self).latencia)
+        path = self.path.split("?")[0]
+        if not path.endswith("/"):
+            self.send_error(404)
+            return
+        partes = [p for p in path.split("/") if p][1:]
+        enlaces = ['<a href="/portal/">Inicio</a>', '<a href="../">Subir</a>',
+                   '<a href="#contenido">Saltar</a>', '<a href="/otra-rama/x/">Fuera</a>',
+                   '<a href="http://externo.example/">Externo</a>']
+        if len(partes) < 3:
+            enlaces += [f'<a href="s{i}/">Sección <b>{i}</b></a>' for i in range(3)]
+            enlaces.append(f'<a href="s0/#arriba">Sección 0 otra vez</a>')
+        nivel = "-".join(partes) or "raiz"
+        enlaces += [f'<a href="datos_{nivel}_{y}.xlsx">Datos {y}</a>' for y in (2023, 2024)]
+        enlaces.append(f'<a href="borrador_{nivel}.pdf">Borrador</a>')
+        cuerpo = f"<html><body>{''.join(enlaces)}</body></html>".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+
+@pytest.fixture
+def portal(local_server):
+    _Portal.pedidas = []
+    return local_server(_Portal) + "/portal/"
+
+
+def _discover(root, **extra):
+    return WebTreeFetcher({"root_url": root, "page_delay": "0", **extra}).discover()
+
+
+def test_concurrente_igual_que_en_serie(portal):
+    serie = _discover(portal)
+    pedidas_serie = len(_Portal.pedidas)
+    concurrente = _discover(portal, max_concurrent_requests="8")
+    assert concurrente == serie
+    assert len(serie) == 40 * 3                      # 1 + 3 + 9 + 27 páginas, 3 ficheros cada una
+    assert pedidas_serie == 40                        # cada página una sola vez
+    assert len({h["url"] for h in serie}) == len(serie)
+
+
+def test_max_depth_include_exclude(portal):
+    hojas = _discover(portal, max_concurrent_requests="4", max_depth="1",
+                      include_patterns=r"\.xlsx$", exclude_patterns="/s2/")
+    assert {h["depth"] for h in hojas} == {0, 1}
+    assert all(h["url"].endswith(".xlsx") and "/s2/" not in h["url"] for h in hojas)
+    assert len(hojas) == 3 * 2                        # raíz + s0 + s1
+
+
+def test_subrama_y_max_files(portal):
+    hojas = _discover(portal + "s1/", max_concurrent_requests="4")
+    assert hojas and all("/portal/s1/" in h["url"] for h in hojas)
+    assert len(WebTreeFetcher({"root_url": portal, "page_delay": "0",
+                               "max_concurrent_requests": "4"}).discover(max_files=5)) == 5
+
+
+def test_extract_links_y_normalizacion():
+    html = '<a href="/a.pdf">Informe <b>2024</b></a><a href="">vacío</a><div class="m"><a href="b#x">b</a></div>'
+    assert extract_links(html, "http://h/p/") == [("http://h/a.pdf", "Informe 2024"), ("http://h/p/b#x", "b")]
+    assert extract_links(html, "http://h/p/", "div.m a[href]") == [("http://h/p/b#x", "b")]
+    assert normalize_url("HTTP://Ex.ES:80/p/b#x") == "http://ex.es/p/b"
+    vistas = UrlSet(["http://ex.es/"])
+    assert "http://ex.es/" in vistas and not vistas.add("http://ex.es/") and vistas.add("http://ex.es/x")
+    assert len(vistas) == 2
@@ -0,0 +1,97 @@
+"""WebTreeFetcher.stream en tubería (max_concurrent_requests / num_workers):
+mismo resultado y orden que en serie, ficheros caídos omitidos y savepoint por
+ficheros contiguos entregados. Contra un servidor HTTP local con latencia."""
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from app.fetchers.web_tree_fetcher import WebTreeFetcher
+
+FILAS = 7
+
+
+class _Portal(BaseHTTPRequestHandler):
+    """Cuenta las descargas en vuelo a la vez (`pico`)."""
+    latencia = 0.05
+    lock = threading.Lock()
+    en_vuelo = 0
+    pico = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.en_vuelo += 1
+            cls.pico = max(cls.pico, cls.en_vuelo)
+        time.sleep(cls.latencia)
+        with cls.lock:
+            cls.en_vuelo -= 1
+        nombre = self.path.rsplit("/", 1)[-1]
+        if nombre.startswith("roto"):
+            self.send_error(404)
+            return
+        cuerpo = ("id,fichero\n" + "".join(f"{i},{nombre}\n" for i in range(FILAS))).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+
+@pytest.fixture
+def portal(local_server):
+    _Portal.pico = 0
+    base = local_server(_Portal) + "/datos"
+    return [f"{base}/{y}/fichero_{i}.csv" for y in (2023, 2024) for i in range(6)]
+
+
+def _fetcher(urls, **extra):
+    return WebTreeFetcher({"root_url": urls[0], "_matched_urls": urls,
+                           "_path_template": urls[0].rsplit("/", 2)[0] + "/{year}/{*}",
+                           "_dimensions": [{"name": "year"}], "batch_size": "5",
+                           "max_retries": "0", **extra})
+
+
+def _filas(fetcher):
+    return [r for lote in fetcher.stream() for r in lote]
+
+
+def test_tuberia_igual_que_en_serie_y_en_paralelo(portal):
+    serie = _filas(_fetcher(portal))
+    assert _Portal.pico == 1
+    _Portal.pico = 0
+    tuberia = _filas(_fetcher(portal, max_concurrent_requests="6"))
+    assert tuberia == serie and len(serie) == 12 * FILAS
+    assert serie[0]["year"] == "2023" and serie[-1]["_source_file_name"] == "fichero_5.csv"
+    assert 1 < _Portal.pico <= 6
+
+
+def test_parseo_en_pool_de_procesos(portal, monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)   # el pool se limita a los núcleos
+    assert _filas(_fetcher(portal, max_concurrent_requests="4", num_workers="2")) == _filas(_fetcher(portal))
+
+
+def test_ficheros_caidos_se_omiten(portal):
+    urls = portal[:3] + [portal[3].replace("fichero_", "roto_")] + portal[4:]
+    filas = _filas(_fetcher(urls, max_concurrent_requests="4"))
+    assert len(filas) == 11 * FILAS
+    assert not any(r["_source_file_name"].startswith("roto") for r in filas)
+
+
+@pytest.mark.parametrize("extra", [{}, {"max_concurrent_requests": "4"}])
+def test_savepoint_por_ficheros_entregados(portal, extra):
+    completas = _filas(_fetcher(portal, **extra))
+    fetcher = _fetcher(portal, **extra)
+    lotes = fetcher.stream()
+    for _ in range(4):            # 20 filas: 2 ficheros enteros y parte del tercero
+        next(lotes)
+    estado = dict(fetcher.current_state)
+    lotes.close()
+    assert estado["files_done"] == 2 and estado["last_url"] == portal[1]
+    resto = _filas(_fetcher(portal, _resume_state=estado, **extra))
+    assert resto == completas[2 * FILAS:]
@@ -0,0 +1,145 @@
+"""Re-descubrimiento incremental de WebTreeFetcher (app/fetchers/crawl_state.py):
+un portal sin cambios cuesta una petición condicional, un cambio en una página
+se detecta (o espera al refresco si cuelga de una página sin cambios), y los
+modos pages / off y el refresco completo periódico. Contra un portal HTML local
+con ETag."""
+import hashlib
+import json
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from app.fetchers.web_tree_fetcher import WebTreeFetcher
+
+
+class _Portal(BaseHTTPRequestHandler):
+    """/portal/ → s0..s2/ → t0..t1/ con un fichero por página. `extra` añade
+    ficheros a una página concreta; `sin_etag` apaga los validadores."""
+    pedidas = []
+    extra = {}
+    sin_etag = False
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        cls = type(self)
+        partes = [p for p in self.path.split("/") if p][1:]
+        enlaces = [f'<a href="{s}{i}/">{s}{i}</a>' for s in ("s", "t")[len(partes):len(partes) + 1]
+                   for i in range(3 if not partes else 2)] if len(partes) < 2 else []
+        nombre = "-".join(partes) or "raiz"
+        enlaces.append(f'<a href="datos_{nombre}.csv">datos</a>')
+        enlaces += [f'<a href="{f}">{f}</a>' for f in cls.extra.get(self.path, [])]
+        cuerpo = f"<html><body>{''.join(enlaces)}</body></html>".encode()
+        etag = f'"{hashlib.md5(cuerpo).hexdigest()}"'
+        if not cls.sin_etag and self.headers.get("If-None-Match") == etag:
+            cls.pedidas.append((self.path, 304))
+            self.send_response(304)
+            self.end_headers()
+            return
+        cls.pedidas.append((self.path, 200))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if not cls.sin_etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+
+@pytest.fixture
+def portal(local_server):
+    _Portal.pedidas, _Portal.extra, _Portal.sin_etag = [], {}, False
+    return local_server(_Portal) + "/portal/"
+
+
+def _discover(root, state_path, **extra):
+    _Portal.pedidas = []
+    fetcher = WebTreeFetcher({"root_url": root, "page_delay": "0",
+                              "_crawl_state_path": str(state_path), **extra})
+    return sorted(leaf["url"] for leaf in fetcher.discover()), fetcher.profile_stats
+
+
+def test_portal_sin_cambios_cuesta_una_peticion(portal, tmp_path):
+    estado = tmp_path / "crawl.json"
+    hojas, stats = _discover(portal, estado)
+    assert len(hojas) == 1 + 3 + 6 and len(_Portal.pedidas) == 10
+    assert stats["crawl"]["changed"] == 10 and stats["crawl"]["new_files"] is None
+
+    hojas2, stats2 = _discover(portal, estado, max_concurrent_requests="4")
+    assert hojas2 == hojas
+    assert _Portal.pedidas == [("/portal/", 304)]
+    assert stats2["crawl"]["pruned"] == 9 and stats2["crawl"]["new_files"] == 0
+    assert len(json.loads(estado.read_text())["pages"]) == 10
+
+
+def test_cambio_en_la_raiz_se_propaga_a_las_paginas_que_cambian(portal, tmp_path):
+    estado = tmp_path / "crawl.json"
+    _discover(portal, estado)
+    _Portal.extra = {"/portal/": ["nuevo.csv"], "/portal/s1/t0/": ["otro.csv"]}
+    hojas, stats = _discover(portal, estado)
+    assert portal + "nuevo.csv" in hojas
+    # raíz cambiada → se revisitan sus hijas; s1 no cambia → su subárbol se poda
+    # y el cambio de s1/t0 espera al modo pages (o al refresco completo)
+    assert portal + "s1/t0/otro.csv" not in hojas
+    assert stats["crawl"]["changed"] == 1 and stats["crawl"]["not_modified"] == 3
+    assert stats["crawl"]["pruned"] == 6 and stats["crawl"]["new_files"] == 1
+
+
+def test_modo_pages_revisita_todo_y_detecta_cambios_profundos(portal, tmp_path):
+    estado = tmp_path / "crawl.json"
+    _discover(portal, estado)
+    _Portal.extra = {"/portal/s1/t0/": ["otro.csv"]}
+    hojas, stats = _discover(portal, estado, incremental_crawl="pages")
+    assert portal + "s1/t0/otro.csv" in hojas
+    assert len(_Portal.pedidas) == 10 and stats["crawl"]["changed"] == 1
+    assert sum(1 for _, status in _Portal.pedidas if status == 304) == 9
+
+
+def test_sin_validadores_compara_el_hash(portal, tmp_path):
+    estado = tmp_path / "crawl.json"
+    _Portal.sin_etag = True
+    hojas, _ = _discover(portal, estado)
+    hojas2, stats = _discover(portal, estado)
+    assert hojas2 == hojas and stats["crawl"]["same_content"] == 1 and stats["crawl"]["pruned"] == 9
+
+
+def test_refresco_completo_periodico_y_modo_off(portal, tmp_path):
+    estado = tmp_path / "crawl.json"
+    _discover(portal, estado)
+    datos = json.loads(estado.read_text())
+    datos["full_crawl_at"] -= 31 * 86400
+    estado.write_text(json.dumps(datos))
+    _, stats = _discover(portal, estado)
+    assert stats["crawl"]["mode"] == "pages" and len(_Portal.pedidas) == 10
+
+    _, stats = _discover(portal, estado, incremental_crawl="off")
+    assert "crawl" not in stats and all(status == 200 for _, status in _Portal.pedidas)
+
+
+def test_una_cata_no_sobrescribe_el_estado(portal, tmp_path):
+    estado = tmp_path / "crawl.json"
+    _discover(portal, estado)
+    antes = estado.read_text()
+    _Portal.pedidas = []
+    WebTreeFetcher({"root_url": portal, "page_delay": "0",
+                    "_crawl_state_path": str(estado)}).discover(max_files=2)
+    assert estado.read_text() == antes
+
+
+def test_cambiar_raiz_selectores_o_motor_descarta_el_estado(portal, tmp_path):
+    estado = tmp_path / "crawl.json"
+    hojas, _ = _discover(portal, estado)
+    # otro selector de ficheros: los enlaces guardados ya no valen, se recorre de cero
+    hojas2, stats = _discover(portal, estado, file_link_selector='a[href$=".csv"]')
+    assert hojas2 == hojas
+    assert len(_Portal.pedidas) == 10 and all(status == 200 for _, status in _Portal.pedidas)
+    assert stats["crawl"]["pruned"] == 0 and stats["crawl"]["new_files"] is None
+    # con la misma configuración el estado nuevo sí se reutiliza
+    _discover(portal, estado, file_link_selector='a[href$=".csv"]')
+    assert _Portal.pedidas == [("/portal/", 304)]
+    # cambiar la raíz o el motor HTML también lo invalida
+    _discover(portal + "s1/", estado, file_link_selector='a[href$=".csv"]')
+    assert all(status == 200 for _, status in _Portal.pedidas)
+    _discover(portal, estado, file_link_selector='a[href$=".csv"]', html_parser="lxml")
+    assert len(_Portal.pedidas) == 10 and all(status == 200 for _, status in _Portal.pedidas)
@@ -0,0 +1,76 @@
+"""Tests del rebuild incremental de /graphql/data: caché de tipos por dataset
+(checksum) y agrupación de peticiones de rebuild diferido."""
+import json
+import threading
+from datetime import datetime, timedelta
+from types import SimpleNamespace as NS
+
+from graphql import graphql_sync
+
+from app.graphql_data import engine, schema_builder
+
+
+def _dataset(tmp_path, did, checksum, minutos=0):
+    path = tmp_path / f"{did}.jsonl"
+    path.write_text(json.dumps({"id": did, "nombre": f"n-{did}"}) + "\n", encoding="utf-8")
+    return NS(id=did, checksum=checksum, data_path=str(path), record_count=1, label=None,
+              created_at=datetime(2026, 1, 1) + timedelta(minutes=minutos))
+
+
+def test_build_schema_reutiliza_tipos_sin_cambios(tmp_path, monkeypatch):
+    filas = [
+        (_dataset(tmp_path, "a", "c1", 2), "Concesiones", None),
+        (_dataset(tmp_path, "b", "c1", 1), "Licitaciones", {"anio": "2025"}),
+    ]
+    monkeypatch.setattr(schema_builder, "_latest_datasets", lambda db: filas)
+    inferidos = []
+    real = schema_builder.infer_fields
+    monkeypatch.setattr(schema_builder, "infer_fields", lambda p: inferidos.append(p) or real(p))
+
+    cache = {}
+    schema, registry, stats = schema_builder.build_schema(None, cache)
+    assert stats == {"reused": 0, "built": 2} and len(inferidos) == 2
+    assert [r["queryName"] for r in registry] == ["concesiones", "licitaciones"]
+
+    schema, registry, stats = schema_builder.build_schema(None, cache)
+    assert stats == {"reused": 2, "built": 0} and len(inferidos) == 2
+    res = graphql_sync(schema, '{ concesiones(nombre: "N-A") { total items { id } } }')
+    assert res.errors is None and res.data["concesiones"]["total"] == 1
+
+    # Nueva versión de 'b' (otro dataset_id) y 'a' desaparece → solo se construye 'b2'
+    filas[:] = [(_dataset(tmp_path, "b2", "c2", 3), "Licitaciones", None)]
+    _, registry, stats = schema_builder.build_schema(None, cache)
+    assert stats == {"reused": 0, "built": 1}
+    assert set(cache) == {"b2"} and registry[0]["datasetId"] == "b2"
+
+
+def test_request_rebuild_agrupa_peticiones(monkeypatch):
+    llamadas = []
+    hecho = threading.Event()
+
+    def fake_build(db, cache):
+        llamadas.append(db)
+        hecho.set()
+        return None, [], {"reused": 0, "built": 0}
+
+    monkeypatch.setattr(engine, "build_schema", fake_build)
+    # el rebuild publica en los globales del motor: se restauran al acabar
+    monkeypatch.setattr(engine, "_schema", engine._schema)
+    monkeypatch.setattr(engine, "_registry", engine._registry)
+    monkeypatch.setattr(engine, "_schema_version", engine._schema_version)
+    monkeypatch.setattr(engine, "_type_cache", {})
+    monkeypatch.setattr(engine, "_metrics", dict(engine._metrics))
+    factory = lambda: NS(close=lambda: None)  # noqa: E731
+    antes = engine.get_metrics()
+
+    assert engine.request_rebuild(factory, delay=0.2) is True
+    for _ in range(5):
+        assert engine.request_rebuild(factory, delay=0.2) is False
+    assert hecho.wait(5)
+    engine._worker.join(5) if engine._worker else None
+
+    assert len(llamadas) == 1
+    despues = engine.get_metrics()
+    assert despues["coalesced"] - antes["coalesced"] == 5
+    assert despues["rebuilds"] - antes["rebuilds"] == 1
+    assert despues["last_duration_ms"] is not None
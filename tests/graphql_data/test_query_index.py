@@ -0,0 +1,73 @@
+"""Tests del índice columnar de /graphql/data: mismas respuestas que el recorrido
+línea a línea (filtros case-insensitive, paginación, líneas inválidas)."""
+import json
+
+import pytest
+
+from app.graphql_data import query_index
+from app.graphql_data.schema_builder import _make_resolver, _scan
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    ds_dir = tmp_path / "datasets" / "r1" / "d1"
+    ds_dir.mkdir(parents=True)
+    path = ds_dir / "data.jsonl"
+    lineas = []
+    for i in range(50):
+        lineas.append(json.dumps({
+            "id": i, "provincia": ["Sevilla", "CÁDIZ", "Huelva"][i % 3],
+            "tipo": "A" if i % 2 else "b", "importe": 0 if i % 5 == 0 else i * 10,
+            "nombre": f"Entidad Ñ{i}",
+        }, ensure_ascii=False))
+        if i == 10:
+            lineas += ["", "{no es json"]
+    path.write_text("\n".join(lineas) + "\n", encoding="utf-8")
+    query_index._open.clear()
+    return str(path)
+
+
+CAMPOS = ["id", "provincia", "tipo", "importe", "nombre"]
+
+
+@pytest.mark.parametrize("filtros", [
+    {}, {"provincia": "cádiz"}, {"tipo": "a"}, {"provincia": "sevilla", "tipo": "b"},
+    {"importe": ""}, {"provincia": "madrid"}, {"nombre": "entidad ñ7"},
+])
+@pytest.mark.parametrize("offset,limit", [(0, 100), (3, 4), (40, 100)])
+def test_indice_equivale_al_recorrido(dataset, filtros, offset, limit):
+    total_scan, items = _scan(dataset, filtros, offset, limit)
+    index = query_index.get_index(dataset, CAMPOS)
+    total, filas = index.query(filtros, offset, limit)
+    assert total == total_scan
+    assert [index.row(r, CAMPOS) for r in filas] == [
+        {k: str(it.get(k) or "") for k in CAMPOS} for it in items
+    ]
+
+
+def test_resolver_usa_indice_y_lo_reutiliza(dataset):
+    resolver = _make_resolver(dataset, CAMPOS)
+    res = resolver(None, None, limit=2, offset=1, provincia="HUELVA")
+    assert res["total"] == 16
+    assert [it["id"] for it in res["items"]] == ["5", "8"]
+    meta = json.load(open(query_index.index_dir(dataset) + "/meta.json"))
+    assert meta["rows"] == 50 and meta["fields"] == CAMPOS
+    assert query_index.get_index(dataset, CAMPOS) is query_index.get_index(dataset, ["tipo"])
+
+
+def test_indice_se_reconstruye_si_faltan_campos(dataset):
+    query_index.get_index(dataset, ["id"])
+    query_index._open.clear()
+    index = query_index.get_index(dataset, ["nombre"])
+    assert set(index.fields) == {"id", "nombre"}
+    assert index.row(0, ["nombre"]) == {"nombre": "Entidad Ñ0"}
+
+
+def test_indice_en_memoria_se_invalida_si_cambia_el_jsonl(dataset):
+    index = query_index.get_index(dataset, CAMPOS)
+    assert index.rows == 50
+    with open(dataset, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"id": 50, "provincia": "Jaén"}, ensure_ascii=False) + "\n")
+    nuevo = query_index.get_index(dataset, CAMPOS)
+    assert nuevo is not index and nuevo.rows == 51
+    assert nuevo.query({"provincia": "jaén"}, 0, 10) == (1, [50])
@@ -0,0 +1,89 @@
+"""Tests de la carga masiva COPY del DataLoaderService (sin BD): serialización
+CSV, lotes, progreso y transacción, con una conexión DBAPI falsa."""
+import csv
+import json
+
+import pytest
+
+from app.services.data_loader_service import DataLoaderService, _csv_buffer, _quote_table
+
+
+class _FakeCursor:
+    def __init__(self, log):
+        self.log = log
+
+    def execute(self, sql):
+        self.log.append(("sql", sql))
+
+    def copy_expert(self, sql, buf):
+        self.log.append(("copy", list(csv.reader(buf))))
+
+
+class _FakeRaw:
+    def __init__(self, fail_on=None):
+        self.log = []
+        self.fail_on = fail_on
+        self.committed = self.rolled_back = self.closed = False
+
+    def cursor(self):
+        raw = self
+
+        class _C(_FakeCursor):
+            def execute(self, sql):
+                if raw.fail_on and raw.fail_on in sql:
+                    raise RuntimeError("boom")
+                super().execute(sql)
+        return _C(self.log)
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        self.rolled_back = True
+
+    def close(self):
+        self.closed = True
+
+
+def _loader(raw):
+    loader = DataLoaderService.__new__(DataLoaderService)
+    loader.engine = type("E", (), {"raw_connection": lambda self: raw})()
+    return loader
+
+
+def test_csv_buffer_escapa_json_y_genera_id():
+    rows = list(csv.reader(_csv_buffer([
+        {"id": "a", "txt": 'comillas " y, comas\ny saltos \\ barra'},
+        {"nombre": "sin id"},
+    ], seq_start=10)))
+    assert rows[0][0] == "10" and rows[0][1] == "a"
+    assert json.loads(rows[0][2])["txt"] == 'comillas " y, comas\ny saltos \\ barra'
+    assert rows[1][0] == "11" and len(rows[1][1]) == 36          # uuid4 generado
+
+
+def test_quote_table():
+    assert _quote_table("core.bdns") == '"core"."bdns"'
+
+
+def test_copy_merge_por_lotes_con_progreso():
+    raw = _FakeRaw()
+    progreso = []
+    n = _loader(raw)._copy_merge(
+        "core.t", ({"id": str(i)} for i in range(5)), truncate=True,
+        batch_size=2, on_progress=progreso.append,
+    )
+    assert n == 5 and progreso == [2, 4, 5]
+    copias = [e for e in raw.log if e[0] == "copy"]
+    assert [len(c[1]) for c in copias] == [2, 2, 1]
+    assert [r[0] for r in copias[2][1]] == ["4"]                 # seq continúa entre lotes
+    sqls = [e[1] for e in raw.log if e[0] == "sql"]
+    assert sqls[0].startswith("CREATE TEMP TABLE") and sqls[1].startswith('TRUNCATE TABLE "core"."t"')
+    assert sum("ON CONFLICT (id)" in s for s in sqls) == 3
+    assert raw.committed and raw.closed and not raw.rolled_back
+
+
+def test_copy_merge_revierte_si_falla():
+    raw = _FakeRaw(fail_on="INSERT INTO")
+    with pytest.raises(RuntimeError):
+        _loader(raw)._copy_merge("core.t", [{"id": "1"}], batch_size=10)
+    assert raw.rolled_back and raw.closed and not raw.committed
@@ -0,0 +1,126 @@
+"""Tests del diff entre versiones (app/services/dataset_diff.py) y de su
+aplicación en la fase LOAD (solo filas cambiadas, bajas solo en modo replace)."""
+import json
+from types import SimpleNamespace as NS
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.services import data_loader_service, dataset_diff
+from app.services.data_loader_service import DataLoaderService
+from app.services.dataset_diff import compute_delta, iter_delta
+from app.utils.dataset_io import compress_file
+
+
+def _jsonl(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for r in records:
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    return str(path)
+
+
+def _leer(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_altas_cambios_y_bajas(tmp_path):
+    prev = _jsonl(tmp_path / "v1.jsonl", [{"id": str(i), "v": i} for i in range(10)])
+    nuevos = [{"id": str(i), "v": i} for i in range(2, 10)]        # bajas: 0 y 1
+    nuevos[3] = {"id": "5", "v": 500}                               # cambio
+    nuevos += [{"id": "10", "v": 10}, {"id": "11", "v": 11}]        # altas
+    new = _jsonl(tmp_path / "v2.jsonl", nuevos)
+
+    delta = compute_delta(prev, new, str(tmp_path), base_version="1.0.0")
+
+    assert (delta.inserted, delta.updated, delta.deleted, delta.unchanged) == (2, 1, 2, 7)
+    assert delta.keyless == 0 and delta.changed == 5
+    entradas = _leer(delta.path)
+    assert [e["op"] for e in entradas[:2]] == ["delete", "delete"]  # bajas primero
+    assert sorted(e["id"] for e in entradas[:2]) == ["0", "1"]
+    assert [(e["op"], e["record"]["id"]) for e in entradas[2:]] == [
+        ("update", "5"), ("insert", "10"), ("insert", "11"),         # orden del fichero nuevo
+    ]
+    assert delta.to_dict()["base_version"] == "1.0.0" and "path" not in delta.to_dict()
+    assert sorted(iter_delta(delta.path, "delete")) == ["0", "1"]
+    assert [r["id"] for r in iter_delta(delta.path, "upsert")] == ["5", "10", "11"]
+    assert not [p for p in tmp_path.iterdir() if p.name.startswith("odm_delta_")]
+
+
+def test_cubos_en_disco_dan_el_mismo_resultado(tmp_path, monkeypatch):
+    prev = _jsonl(tmp_path / "v1.jsonl", [{"id": str(i), "v": i % 7} for i in range(3000)])
+    new = _jsonl(tmp_path / "v2.jsonl", [{"id": str(i), "v": i % 5} for i in range(500, 3500)])
+    uno = compute_delta(prev, new, str(tmp_path)).to_dict()
+    monkeypatch.setattr(dataset_diff, "ROWS_PER_BUCKET", 100)
+    varios = compute_delta(prev, new, str(tmp_path), expected_rows=3500).to_dict()
+    assert uno == varios
+    assert uno["deleted"] == 500 and uno["inserted"] == 500
+
+
+def test_sin_id_siempre_altas_y_comprimido(tmp_path):
+    prev = _jsonl(tmp_path / "v1.jsonl", [{"id": "a", "v": 1}, {"v": "sin id"}])
+    src = _jsonl(tmp_path / "v2.src", [{"id": "a", "v": 1}, {"v": "sin id"}])
+    compress_file(src, str(tmp_path / "v2.jsonl.gz"), "gzip")
+    delta = compute_delta(prev, str(tmp_path / "v2.jsonl.gz"), str(tmp_path))
+    assert (delta.inserted, delta.updated, delta.deleted, delta.unchanged) == (1, 0, 0, 1)
+    assert delta.keyless == 2
+
+
+# ── apply_delta ───────────────────────────────────────────────────────────────
+
+class _FakeSession:
+    def __init__(self):
+        self.borrados = []
+        self.lotes = []
+        self.commits = 0
+
+    def execute(self, stmt, params=None):
+        if isinstance(params, dict) and "ids" in params:
+            self.borrados.extend(params["ids"])
+        elif isinstance(params, list):
+            self.lotes.append(sorted(p["id"] for p in params))
+
+    def commit(self):
+        self.commits += 1
+
+
+def _loader(monkeypatch, existe=True):
+    loader = DataLoaderService.__new__(DataLoaderService)
+    loader.engine = None
+    tabla = Table("t", MetaData(), Column("id", String, primary_key=True),
+                  Column("created_at", DateTime), Column("updated_at", DateTime),
+                  Column("data", JSONB), schema="core")
+    loader._target_table = lambda schema, name: tabla
+    monkeypatch.setattr(data_loader_service, "inspect",
+                        lambda engine: NS(has_table=lambda name, schema=None: existe))
+    return loader
+
+
+def _delta(tmp_path):
+    prev = _jsonl(tmp_path / "v1.jsonl", [{"id": "1"}, {"id": "2"}, {"id": "3"}])
+    new = _jsonl(tmp_path / "v2.jsonl", [{"id": "2"}, {"id": "3", "x": 1}, {"id": "4"}])
+    return compute_delta(prev, new, str(tmp_path))
+
+
+def test_apply_delta_replace_borra_y_solo_escribe_lo_cambiado(tmp_path, monkeypatch):
+    session = _FakeSession()
+    n = _loader(monkeypatch).apply_delta(session, NS(), _delta(tmp_path).path,
+                                         load_mode="replace", table_name="core.t")
+    assert n == 3
+    assert session.borrados == ["1"]
+    assert session.lotes == [["3", "4"]]
+    assert session.commits == 1
+
+
+def test_apply_delta_upsert_conserva_las_bajas(tmp_path, monkeypatch):
+    session = _FakeSession()
+    n = _loader(monkeypatch).apply_delta(session, NS(), _delta(tmp_path).path,
+                                         load_mode="upsert", table_name="core.t")
+    assert n == 2 and session.borrados == []
+
+
+def test_apply_delta_sin_tabla_pide_carga_completa(tmp_path, monkeypatch):
+    session = _FakeSession()
+    loader = _loader(monkeypatch, existe=False)
+    assert loader.apply_delta(session, NS(), _delta(tmp_path).path, table_name="core.t") is None
+    assert session.lotes == [] and session.commits == 0
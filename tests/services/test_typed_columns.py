@@ -0,0 +1,101 @@
+"""Tests de la carga en columnas tipadas (app/services/typed_columns.py): plan de
+columnas desde el esquema inferido, conversión de valores y filas que escribe el
+loader por los dos caminos (upsert y COPY)."""
+import csv
+import io
+import json
+
+import pytest
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Float, MetaData, String, Table
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.services.data_loader_service import DataLoaderService, _csv_buffer
+from app.services.typed_columns import (
+    TypedColumn, coerce, column_name, index_name, parse_index_spec, plan_columns,
+    wants_typed_columns,
+)
+from app.utils.schema_inference import infer_schema
+
+
+def test_plan_desde_el_esquema_inferido():
+    schema = infer_schema([{"id": "1", "Fecha Alta": "2024-01-01", "importe": 1.5, "n": 3,
+                            "activo": True, "tags": ["a"], "data": {"x": 1}, "2025": "y"}])
+    cols = {c.field: (c.name, c.pg_type) for c in plan_columns(schema)}
+    assert "id" not in cols
+    assert cols == {
+        "Fecha Alta": ("fecha_alta", "text"),
+        "importe": ("importe", "double precision"),
+        "n": ("n", "bigint"),
+        "activo": ("activo", "boolean"),
+        "tags": ("tags", "jsonb"),
+        "data": ("f_data", "jsonb"),          # no pisa la columna base
+        "2025": ("f_2025", "text"),
+    }
+
+
+def test_campos_que_colisionan_solo_materializan_el_primero():
+    schema = {"properties": {"a-b": {"type": "string"}, "a b": {"type": "integer"}}}
+    assert [c.field for c in plan_columns(schema)] == ["a-b"]
+    assert len(column_name("x" * 100)) == 63
+
+
+@pytest.mark.parametrize("value,pg_type,expected", [
+    (5, "bigint", 5), (5.0, "bigint", 5), (5.5, "bigint", None), ("12", "bigint", 12),
+    (True, "bigint", None), (1 << 70, "bigint", None), ("x", "double precision", None),
+    (3, "double precision", 3.0), ("true", "boolean", True), (1, "boolean", None),
+    (7, "text", "7"), ({"a": 1}, "text", '{"a": 1}'), ("s", "jsonb", "s"), (None, "text", None),
+])
+def test_coerce(value, pg_type, expected):
+    assert coerce(value, pg_type) == expected
+
+
+def test_parse_index_spec_y_nombres():
+    assert parse_index_spec("fecha, importe:btree ,tags:GIN") == [
+        ("fecha", None), ("importe", "btree"), ("tags", "gin")]
+    assert parse_index_spec('{"fecha": "btree"}') == [("fecha", "btree")]
+    assert parse_index_spec(None) == []
+    with pytest.raises(ValueError):
+        parse_index_spec("fecha:hash")
+    assert len(index_name("t" * 60, "c" * 60, "btree")) == 63
+    assert wants_typed_columns("Typed") and not wants_typed_columns(None)
+    with pytest.raises(ValueError):
+        wants_typed_columns("columnar")
+
+
+def test_csv_distingue_null_de_cadena_vacia():
+    cols = [TypedColumn("nombre", "nombre", "text"), TypedColumn("n", "n", "bigint"),
+            TypedColumn("tags", "tags", "jsonb")]
+    buf = _csv_buffer([{"id": "1", "nombre": "", "n": "x", "tags": "solo"},
+                       {"id": "2", "nombre": 'di "hola"', "tags": [1]}], columns=cols)
+    lineas = buf.getvalue().splitlines()
+    assert lineas[0].endswith(',"",,"""solo"""')       # '' entre comillas, NULL vacío
+    filas = list(csv.reader(io.StringIO(buf.getvalue())))
+    assert filas[1][3] == 'di "hola"' and json.loads(filas[1][5]) == [1]
+    assert json.loads(filas[0][2]) == {"id": "1", "nombre": "", "n": "x", "tags": "solo"}
+
+
+class _FakeSession:
+    def __init__(self):
+        self.filas = []
+
+    def execute(self, stmt, params=None):
+        self.filas.extend(params)
+
+    def commit(self):
+        pass
+
+
+def test_upsert_rellena_las_columnas_tipadas():
+    loader = DataLoaderService.__new__(DataLoaderService)
+    tabla = Table("t", MetaData(), Column("id", String, primary_key=True),
+                  Column("created_at", DateTime), Column("updated_at", DateTime),
+                  Column("data", JSONB), Column("importe", Float), Column("n", BigInteger),
+                  Column("activo", Boolean), schema="core")
+    loader._target_table = lambda schema, name: tabla
+    cols = [TypedColumn("importe", "importe", "double precision"),
+            TypedColumn("n", "n", "bigint"), TypedColumn("activo", "activo", "boolean")]
+    session = _FakeSession()
+    loader._upsert_data(session, "core.t", [{"id": "a", "importe": 2, "n": "x"}], columns=cols)
+    fila = session.filas[0]
+    assert (fila["importe"], fila["n"], fila["activo"]) == (2.0, None, None)
+    assert fila["data"] == {"id": "a", "importe": 2, "n": "x"}
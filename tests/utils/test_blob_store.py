@@ -0,0 +1,99 @@
+"""Tests del almacén de blobs por checksum: versiones idénticas comparten fichero,
+el recuento de referencias es el de enlaces y el desalojo respeta lo compartido."""
+import os
+from types import SimpleNamespace as NS
+
+import pytest
+
+from app.builders.dataset_builder import DatasetBuilder
+from app.builders.staging_writer import StagingWriter
+from app.services.leases import _liberan_disco
+from app.utils import blob_store
+
+
+class _Query:
+    def __init__(self, resultado):
+        self._resultado = resultado
+
+    def filter(self, *a):
+        return self
+
+    def order_by(self, *a):
+        return self
+
+    def first(self):
+        return self._resultado
+
+
+class _Session:
+    def __init__(self):
+        self.latest = None
+
+    def query(self, model):
+        return _Query(self.latest)
+
+
+@pytest.fixture(autouse=True)
+def _en_tmp(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def _build(session, registros, codec="none"):
+    staging = StagingWriter(f"staging-{len(os.listdir('.'))}.jsonl")
+    with staging:
+        for r in registros:
+            staging.write(r)
+    resource = NS(id="res-1", name="Recurso", target_table=None)
+    execution = NS(id="exec", staging_path=staging.path, total_records=len(registros),
+                   execution_params=None)
+    builder = DatasetBuilder()
+    dataset = builder.build(session, resource, execution, staging=staging, codec=codec)
+    dataset.deleted_at = None
+    session.latest = dataset
+    return builder, dataset
+
+
+@pytest.mark.parametrize("codec", ["none", "zstd"])
+def test_version_identica_enlaza_el_mismo_blob(codec):
+    session = _Session()
+    datos = [{"id": str(i), "v": i} for i in range(100)]
+    b1, d1 = _build(session, datos, codec)
+    assert b1.unchanged_from is None
+    assert blob_store.refcount(d1.checksum, codec) == 1
+
+    b2, d2 = _build(session, datos, codec)
+    assert b2.unchanged_from is d1
+    assert d2.data_path != d1.data_path and os.path.samefile(d1.data_path, d2.data_path)
+    assert blob_store.refcount(d1.checksum, codec) == 2
+    assert os.path.samefile(d1.data_path + ".idx", d2.data_path + ".idx")
+    assert not [f for f in os.listdir(".") if f.startswith("staging-")]
+
+    b3, d3 = _build(session, datos + [{"id": "nuevo"}], codec)
+    assert b3.unchanged_from is None and d3.checksum != d1.checksum
+
+    for d in (d1, d2):
+        os.remove(d.data_path)
+        blob_store.release(d.checksum, codec)
+    assert not os.path.exists(blob_store.blob_path(d1.checksum, codec))
+    assert list(blob_store.orphan_blobs()) == []
+
+
+def test_release_conserva_el_blob_mientras_haya_enlaces():
+    session = _Session()
+    _, d1 = _build(session, [{"id": "a"}])
+    _, d2 = _build(session, [{"id": "a"}])
+    os.remove(d1.data_path)
+    assert not blob_store.release(d1.checksum)
+    with open(d2.data_path, encoding="utf-8") as f:
+        assert f.read() == '{"id": "a"}\n'
+
+
+def test_desalojo_excluye_blobs_compartidos_con_retenidos():
+    session = _Session()
+    _, d1 = _build(session, [{"id": "a"}])
+    _, d2 = _build(session, [{"id": "a"}])
+    _, d3 = _build(session, [{"id": "b"}])
+    # d2 retenido (p. ej. la versión más nueva): desalojar d1 no libera nada
+    assert _liberan_disco([d1, d3]) == [d3]
+    # si se desalojan todas las que lo enlazan, sí
+    assert _liberan_disco([d1, d2, d3]) == [d1, d2, d3]
@@ -0,0 +1,81 @@
+"""Tests del almacenamiento comprimido de datasets (app/utils/dataset_io.py)."""
+import gzip
+import os
+import json
+from itertools import islice
+
+import pytest
+
+from app.builders.staging_writer import StagingWriter
+from app.utils import dataset_io
+from app.utils.dataset_io import compress_file, data_filename, normalize_codec, open_text, open_text_at
+from app.utils.line_index import build_line_index, iter_lines_from, open_line_index
+
+CODECS = ["gzip", "zstd"]
+
+
+@pytest.fixture(autouse=True)
+def _frames_pequenos(monkeypatch):
+    monkeypatch.setattr(dataset_io, "FRAME_BYTES", 4096)   # muchos frames con pocos datos
+
+
+def _jsonl(path, n):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(json.dumps({"id": str(i), "nombre": f"Municipio {i} — ñ"}, ensure_ascii=False) + "\n")
+    return str(path)
+
+
+def test_normalize_codec():
+    assert normalize_codec(None) == "none" and normalize_codec("ZST") == "zstd"
+    assert normalize_codec("gz") == "gzip"
+    with pytest.raises(ValueError):
+        normalize_codec("brotli")
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_frames_independientes_y_salto(tmp_path, codec):
+    src = _jsonl(tmp_path / "src.jsonl", 3000)
+    dst = str(tmp_path / data_filename(codec))
+    compress_file(src, dst, codec)
+    with open(src, encoding="utf-8") as f:
+        original = f.read()
+    with open_text(dst) as f:
+        assert f.read() == original
+    if codec == "gzip":                                   # legible por herramientas estándar
+        assert gzip.decompress(open(dst, "rb").read()).decode("utf-8") == original
+    frames = dataset_io._read_frames(dst)
+    assert frames is not None and len(frames[0]) > 10
+    offset = len(original[:original.index('{"id": "2500"')].encode("utf-8"))   # bytes, no caracteres
+    with open_text_at(dst, offset) as f:
+        assert json.loads(f.readline())["id"] == "2500"
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_indice_de_lineas_sobre_comprimido(tmp_path, codec):
+    src = _jsonl(tmp_path / "src.jsonl", 2000)
+    dst = str(tmp_path / data_filename(codec))
+    compress_file(src, dst, codec)
+    assert build_line_index(dst) == 2000
+    assert open_line_index(dst) is not None
+    assert [json.loads(l)["id"] for l in islice(iter_lines_from(dst, 1234), 3)] == ["1234", "1235", "1236"]
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_publicar_staging_comprimido(tmp_path, codec):
+    with StagingWriter(str(tmp_path / "exec.jsonl")) as w:
+        for i in range(500):
+            w.write({"id": i})
+    dst = str(tmp_path / data_filename(codec))
+    w.publish(dst, codec)
+    assert not (tmp_path / "exec.jsonl").exists()
+    assert open_line_index(dst).lines == 500
+    assert json.loads(next(iter_lines_from(dst, 321)))["id"] == 321
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_fichero_vacio_es_un_flujo_valido(tmp_path, codec):
+    dst = str(tmp_path / data_filename(codec))
+    compress_file(os.devnull, dst, codec)
+    with open_text(dst) as f:
+        assert f.read() == ""
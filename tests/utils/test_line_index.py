@@ -0,0 +1,69 @@
+"""Tests del índice de líneas por offset de byte (app/utils/line_index.py)."""
+import json
+from itertools import islice
+
+from app.utils.line_index import (LineIndexWriter, build_line_index, index_path, iter_lines_from,
+                                   open_line_index)
+
+
+def _jsonl(path, n):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(json.dumps({"id": str(i), "nombre": f"Año {i} ñ"}, ensure_ascii=False) + "\n")
+            if i == 2:
+                f.write("\n")                        # línea vacía: cuenta como línea
+    return str(path)
+
+
+def test_indice_salta_a_la_linea_exacta(tmp_path):
+    path = _jsonl(tmp_path / "data.jsonl", 1000)
+    assert build_line_index(path) == 1001
+    idx = open_line_index(path)
+    assert idx is not None and idx.lines == 1001
+    with open(path, "r", encoding="utf-8") as f:
+        esperadas = f.readlines()
+    for start in (0, 3, 4, 500, 1000):
+        assert list(islice(iter_lines_from(path, start), 5)) == esperadas[start:start + 5]
+    assert list(iter_lines_from(path, 5000)) == []
+
+
+def test_sin_indice_o_desfasado_recorre_igual(tmp_path):
+    path = _jsonl(tmp_path / "data.jsonl", 50)
+    assert open_line_index(path) is None
+    sin = list(iter_lines_from(path, 10))
+    build_line_index(path)
+    assert list(iter_lines_from(path, 10)) == sin
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"id": "extra"}\n')
+    assert open_line_index(path) is None          # el JSONL cambió de tamaño
+    assert list(iter_lines_from(path, 50))[-1].startswith('{"id": "extra"}')
+
+
+def test_fichero_vacio(tmp_path):
+    path = tmp_path / "data.jsonl"
+    path.write_text("")
+    assert build_line_index(str(path)) == 0
+    assert open_line_index(str(path)).lines == 0
+    assert list(iter_lines_from(str(path), 0)) == []
+    assert (tmp_path / "data.jsonl.idx").exists() and index_path(str(path)).endswith(".idx")
+
+
+def test_escritores_concurrentes_no_comparten_temporal(tmp_path):
+    path = _jsonl(tmp_path / "data.jsonl", 20)
+    a = LineIndexWriter(index_path(path))
+    b = LineIndexWriter(index_path(path))
+    assert a._tmp != b._tmp
+    for w, n in ((a, 3), (b, 5)):
+        for i in range(n):
+            w.add(i)
+    a.close(0)
+    b.abort()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["data.jsonl", "data.jsonl.idx"]
+
+
+def test_el_indice_se_cierra(tmp_path):
+    path = _jsonl(tmp_path / "data.jsonl", 10)
+    build_line_index(path)
+    with open_line_index(path) as idx:
+        assert idx.offset(1) > 0
+    assert idx._mm.closed